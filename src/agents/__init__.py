@@ -5,8 +5,9 @@ Agent系统模块
 """
 
 from .base import BaseAgent, AgentState, AgentMessage, AgentResponse
+from .routing import KeywordRouter, TaskRoute, CollaborationRule, RoutingDecision, RoutingMetrics
 from .manager import AgentManager
-from .communication import MessageBroker, AgentCommunicator
+from .communication import MessageBroker, AgentCommunicator, InMemoryTransport
 from .state_manager import AgentStateManager
 from .orchestrator import (
     AgentOrchestrator, CollaborationTask, CollaborationMode, 
@@ -18,9 +19,15 @@ __all__ = [
     "AgentState", 
     "AgentMessage",
     "AgentResponse",
+    "KeywordRouter",
+    "TaskRoute",
+    "CollaborationRule",
+    "RoutingDecision",
+    "RoutingMetrics",
     "AgentManager",
     "MessageBroker",
     "AgentCommunicator", 
+    "InMemoryTransport",
     "AgentStateManager",
     "AgentOrchestrator",
     "CollaborationTask",
@@ -17,6 +17,8 @@ from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 
+from .routing import KeywordRouter, RoutingDecision, RoutingMetrics
+
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +92,9 @@ class BaseAgent(ABC):
     基于LangGraph框架构建，提供Agent的核心功能和工作流管理。
     """
     
+    # 任务路由表，子类在类定义时编译一次，所有实例共享
+    task_router: Optional[KeywordRouter] = None
+    
     def __init__(
         self,
         agent_id: str,
@@ -108,6 +113,7 @@ class BaseAgent(ABC):
         
         # 初始化状态
         self.state = AgentState(agent_id=agent_id)
+        self.routing_metrics = RoutingMetrics()
         
         # 创建LangGraph工作流
         self.workflow = self._create_workflow()
@@ -432,6 +438,16 @@ class BaseAgent(ABC):
             "success": len([r for r in collaboration_results if "error" not in r]) > 0
         }
     
+    def route_task(self, content: str) -> RoutingDecision:
+        """按任务路由表识别任务类型和协作需求，并记录路由统计"""
+        if self.task_router is None:
+            return RoutingDecision(task_type="general", required_agents=[], matched_keywords=frozenset())
+        return self.task_router.route(content, self.routing_metrics)
+    
+    def get_routing_metrics(self) -> Dict[str, Any]:
+        """获取路由统计"""
+        return self.routing_metrics.to_dict()
+    
     def get_capabilities(self) -> List[AgentCapability]:
         """获取Agent能力列表"""
         return self.capabilities
@@ -7,15 +7,26 @@ Agent间消息通信系统
 import json
 import asyncio
 from typing import Dict, List, Optional, Callable, Any
-from datetime import datetime
 import logging
 import uuid
 
 import aio_pika
 from aio_pika import Message, DeliveryMode, ExchangeType
 from aio_pika.abc import AbstractConnection, AbstractChannel, AbstractExchange, AbstractQueue
+from aio_pika.pool import Pool
 from pydantic import BaseModel
 
+try:
+    import orjson
+except ImportError:
+    # 如果orjson不可用，使用标准库json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 from .base import AgentMessage, MessageType, AgentResponse
 from ..core.config import settings
 
@@ -31,6 +42,68 @@ class CommunicationConfig(BaseModel):
     response_timeout: int = 30  # 响应超时时间（秒）
     max_retries: int = 3
     retry_delay: float = 1.0
+    prefetch_count: int = 10
+    channel_pool_size: int = 4  # 发布通道池大小
+    publisher_confirms: bool = True
+    serializer: str = "orjson"  # json / orjson / msgpack，依赖不可用时回退到json
+    persist_request_response: bool = False  # 请求/响应消息是否持久化
+    max_concurrent_handlers: int = 10  # 单个Agent并发执行的消息处理器数量
+    local_queue_size: int = 1000  # 进程内传输每个Agent的队列容量
+
+
+class MessageSerializer:
+    """
+    消息序列化器
+    
+    消息体包含schema版本号，接收端根据content_type选择反序列化方式，
+    因此不同序列化配置的Agent之间可以互通。
+    """
+    
+    SCHEMA_VERSION = 1
+    CONTENT_TYPES = {
+        "json": "application/json",
+        "orjson": "application/json",
+        "msgpack": "application/msgpack",
+    }
+    
+    def __init__(self, fmt: str = "orjson"):
+        if fmt == "orjson" and orjson is None:
+            fmt = "json"
+        if fmt == "msgpack" and msgpack is None:
+            fmt = "orjson" if orjson is not None else "json"
+        if fmt not in self.CONTENT_TYPES:
+            raise ValueError(f"Unsupported serializer: {fmt}")
+        self.format = fmt
+        self.content_type = self.CONTENT_TYPES[fmt]
+    
+    def dumps(self, message: AgentMessage) -> bytes:
+        """序列化消息"""
+        data = message.model_dump()
+        data["schema_version"] = self.SCHEMA_VERSION
+        
+        if self.format == "orjson":
+            return orjson.dumps(data, default=str)
+        if self.format == "msgpack":
+            return msgpack.packb(data, default=str, use_bin_type=True)
+        return json.dumps(data, default=str).encode()
+    
+    @classmethod
+    def loads(cls, body: bytes, content_type: Optional[str] = None) -> AgentMessage:
+        """反序列化消息"""
+        if content_type == cls.CONTENT_TYPES["msgpack"]:
+            if msgpack is None:
+                raise RuntimeError("msgpack is required to decode this message")
+            data = msgpack.unpackb(body, raw=False)
+        elif orjson is not None:
+            data = orjson.loads(body)
+        else:
+            data = json.loads(body.decode())
+        
+        version = data.pop("schema_version", 1)
+        if version > cls.SCHEMA_VERSION:
+            raise ValueError(f"Unsupported message schema version: {version}")
+        
+        return AgentMessage.model_validate(data)
 
 
 class MessageBroker:
@@ -45,6 +118,8 @@ class MessageBroker:
         self.connection: Optional[AbstractConnection] = None
         self.channel: Optional[AbstractChannel] = None
         self.exchange: Optional[AbstractExchange] = None
+        self.serializer = MessageSerializer(self.config.serializer)
+        self.channel_pool: Optional[Pool] = None
         self.logger = logging.getLogger(__name__)
     
     async def initialize(self) -> None:
@@ -56,9 +131,9 @@ class MessageBroker:
                 client_properties={"connection_name": "agent_communication"}
             )
             
-            # 创建通道
+            # 创建通道（用于声明队列和消费）
             self.channel = await self.connection.channel()
-            await self.channel.set_qos(prefetch_count=10)
+            await self.channel.set_qos(prefetch_count=self.config.prefetch_count)
             
             # 声明交换机
             self.exchange = await self.channel.declare_exchange(
@@ -67,14 +142,24 @@ class MessageBroker:
                 durable=True
             )
             
+            # 发布通道池，每个通道开启publisher confirms
+            self.channel_pool = Pool(self._create_publish_channel, max_size=self.config.channel_pool_size)
+            
             self.logger.info("Message broker initialized successfully")
             
         except Exception as e:
             self.logger.error(f"Failed to initialize message broker: {e}")
             raise
     
+    async def _create_publish_channel(self) -> AbstractChannel:
+        """创建发布通道"""
+        return await self.connection.channel(publisher_confirms=self.config.publisher_confirms)
+    
     async def close(self) -> None:
         """关闭消息代理"""
+        if self.channel_pool and not self.channel_pool.is_closed:
+            await self.channel_pool.close()
+        
         if self.connection and not self.connection.is_closed:
             await self.connection.close()
             self.logger.info("Message broker closed")
@@ -106,6 +191,36 @@ class MessageBroker:
         self.logger.debug(f"Declared queue for agent {agent_id}")
         return queue
     
+    def _build_amqp_message(self, message: AgentMessage) -> Message:
+        """构建AMQP消息"""
+        # 请求/响应消息生命周期很短，默认不持久化以降低broker写盘开销
+        if message.correlation_id and not self.config.persist_request_response:
+            delivery_mode = DeliveryMode.NOT_PERSISTENT
+        else:
+            delivery_mode = DeliveryMode.PERSISTENT
+        
+        return Message(
+            self.serializer.dumps(message),
+            content_type=self.serializer.content_type,
+            delivery_mode=delivery_mode,
+            headers={
+                "message_id": message.id,
+                "message_type": message.type,
+                "sender_id": message.sender_id,
+                "timestamp": message.timestamp.isoformat(),
+                "schema_version": MessageSerializer.SCHEMA_VERSION
+            }
+        )
+    
+    async def _publish_on_pool(self, items: List[tuple]) -> None:
+        """在池化通道上并发发布消息，publisher confirms以流水线方式等待"""
+        async with self.channel_pool.acquire() as channel:
+            exchange = await channel.get_exchange(self.config.exchange_name, ensure=False)
+            await asyncio.gather(*(
+                exchange.publish(amqp_message, routing_key=routing_key)
+                for amqp_message, routing_key in items
+            ))
+    
     async def publish_message(
         self, 
         message: AgentMessage, 
@@ -122,26 +237,15 @@ class MessageBroker:
             raise RuntimeError("Message broker not initialized")
         
         try:
-            # 序列化消息
-            message_body = json.dumps(message.dict(), default=str)
+            amqp_message = self._build_amqp_message(message)
             
-            # 创建AMQP消息
-            amqp_message = Message(
-                message_body.encode(),
-                delivery_mode=DeliveryMode.PERSISTENT,
-                headers={
-                    "message_id": message.id,
-                    "message_type": message.type,
-                    "sender_id": message.sender_id,
-                    "timestamp": message.timestamp.isoformat()
-                }
-            )
-            
-            # 发布消息
-            await self.exchange.publish(
-                amqp_message,
-                routing_key=routing_key
-            )
+            if self.channel_pool:
+                await self._publish_on_pool([(amqp_message, routing_key)])
+            else:
+                await self.exchange.publish(
+                    amqp_message,
+                    routing_key=routing_key
+                )
             
             self.logger.debug(f"Published message {message.id} to {routing_key}")
             
@@ -149,6 +253,45 @@ class MessageBroker:
             self.logger.error(f"Failed to publish message: {e}")
             raise
     
+    async def publish_batch(
+        self,
+        messages: List[tuple],
+        batch_size: int = 100
+    ) -> None:
+        """
+        批量发布消息
+        
+        每批消息在同一个池化通道上并发发布，确认以流水线方式返回，
+        不同批次分布到不同通道上。
+        
+        Args:
+            messages: (消息, 路由键) 列表
+            batch_size: 每个通道一次发布的消息数量
+        """
+        if not self.exchange:
+            raise RuntimeError("Message broker not initialized")
+        
+        try:
+            items = [
+                (self._build_amqp_message(message), routing_key)
+                for message, routing_key in messages
+            ]
+            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+            
+            if self.channel_pool:
+                await asyncio.gather(*(self._publish_on_pool(batch) for batch in batches))
+            else:
+                await asyncio.gather(*(
+                    self.exchange.publish(amqp_message, routing_key=routing_key)
+                    for amqp_message, routing_key in items
+                ))
+            
+            self.logger.debug(f"Published batch of {len(items)} messages")
+            
+        except Exception as e:
+            self.logger.error(f"Failed to publish message batch: {e}")
+            raise
+    
     async def health_check(self) -> Dict[str, Any]:
         """
         健康检查
@@ -174,6 +317,49 @@ class MessageBroker:
             }
 
 
+class InMemoryTransport:
+    """
+    进程内消息传输
+    
+    同一进程内的Agent之间直接传递AgentMessage对象，不经过序列化和RabbitMQ。
+    每个本地Agent拥有一个有界asyncio队列，队列满时发送方等待，形成背压。
+    消息对象本身被直接交给接收方，发送后不应再修改。
+    """
+    
+    def __init__(self, max_queue_size: int = 1000):
+        self.max_queue_size = max_queue_size
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.logger = logging.getLogger(__name__)
+    
+    def register(self, agent_id: str) -> asyncio.Queue:
+        """注册本地Agent并返回其接收队列"""
+        queue = self.queues.get(agent_id)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self.queues[agent_id] = queue
+            self.logger.debug(f"Registered local agent {agent_id}")
+        return queue
+    
+    def unregister(self, agent_id: str) -> None:
+        """注销本地Agent"""
+        self.queues.pop(agent_id, None)
+    
+    def is_local(self, agent_id: Optional[str]) -> bool:
+        """接收者是否在本进程内"""
+        return agent_id is not None and agent_id in self.queues
+    
+    async def deliver(self, message: AgentMessage) -> None:
+        """投递消息到本地Agent队列"""
+        queue = self.queues.get(message.receiver_id)
+        if queue is None:
+            raise RuntimeError(f"Agent {message.receiver_id} is not registered locally")
+        await queue.put(message)
+    
+    def get_queue_depths(self) -> Dict[str, int]:
+        """获取各本地Agent的队列深度"""
+        return {agent_id: queue.qsize() for agent_id, queue in self.queues.items()}
+
+
 class AgentCommunicator:
     """
     Agent通信器
@@ -185,16 +371,21 @@ class AgentCommunicator:
         self, 
         agent_id: str, 
         message_broker: MessageBroker,
-        config: Optional[CommunicationConfig] = None
+        config: Optional[CommunicationConfig] = None,
+        local_transport: Optional[InMemoryTransport] = None
     ):
         self.agent_id = agent_id
         self.message_broker = message_broker
         self.config = config or CommunicationConfig()
+        self.local_transport = local_transport
         self.queue: Optional[AbstractQueue] = None
         self.message_handlers: Dict[MessageType, Callable] = {}
         self.pending_responses: Dict[str, asyncio.Future] = {}
         self.logger = logging.getLogger(f"communicator.{agent_id}")
         self._consumer_task: Optional[asyncio.Task] = None
+        self._local_consumer_task: Optional[asyncio.Task] = None
+        self._handler_semaphore = asyncio.Semaphore(self.config.max_concurrent_handlers)
+        self._handler_tasks: set = set()
     
     async def initialize(self) -> None:
         """初始化通信器"""
@@ -205,6 +396,11 @@ class AgentCommunicator:
             # 启动消息消费者
             self._consumer_task = asyncio.create_task(self._start_consuming())
             
+            # 注册进程内传输，同进程的Agent直接投递到本地队列
+            if self.local_transport:
+                local_queue = self.local_transport.register(self.agent_id)
+                self._local_consumer_task = asyncio.create_task(self._consume_local(local_queue))
+            
             self.logger.info(f"Agent communicator initialized for {self.agent_id}")
             
         except Exception as e:
@@ -213,12 +409,22 @@ class AgentCommunicator:
     
     async def close(self) -> None:
         """关闭通信器"""
-        if self._consumer_task:
-            self._consumer_task.cancel()
-            try:
-                await self._consumer_task
-            except asyncio.CancelledError:
-                pass
+        if self.local_transport:
+            self.local_transport.unregister(self.agent_id)
+        
+        for task in (self._consumer_task, self._local_consumer_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        
+        # 取消仍在执行的消息处理任务
+        for task in list(self._handler_tasks):
+            task.cancel()
+        if self._handler_tasks:
+            await asyncio.gather(*self._handler_tasks, return_exceptions=True)
         
         # 取消所有待处理的响应
         for future in self.pending_responses.values():
@@ -262,11 +468,21 @@ class AgentCommunicator:
             if wait_for_response and not message.correlation_id:
                 message.correlation_id = str(uuid.uuid4())
             
-            # 发送消息
-            await self.message_broker.publish_message(
-                message, 
-                message.receiver_id or "broadcast"
-            )
+            # 在发布前注册响应Future，避免响应先于等待到达而丢失
+            if wait_for_response and message.correlation_id:
+                self.pending_responses.setdefault(
+                    message.correlation_id,
+                    asyncio.get_running_loop().create_future()
+                )
+            
+            # 发送消息：本地Agent走进程内传输，其余走RabbitMQ
+            if self.local_transport and self.local_transport.is_local(message.receiver_id):
+                await self.local_transport.deliver(message)
+            else:
+                await self.message_broker.publish_message(
+                    message, 
+                    message.receiver_id or "broadcast"
+                )
             
             # 如果需要等待响应
             if wait_for_response and message.correlation_id:
@@ -275,6 +491,8 @@ class AgentCommunicator:
             return None
             
         except Exception as e:
+            if wait_for_response and message.correlation_id:
+                self.pending_responses.pop(message.correlation_id, None)
             self.logger.error(f"Failed to send message: {e}")
             raise
     
@@ -296,81 +514,117 @@ class AgentCommunicator:
         try:
             async with self.queue.iterator() as queue_iter:
                 async for message in queue_iter:
-                    try:
-                        await self._process_message(message)
-                        await message.ack()
-                    except Exception as e:
-                        self.logger.error(f"Error processing message: {e}")
-                        await message.nack(requeue=False)
+                    # 信号量限制并发处理数量，满载时暂停从队列取消息
+                    await self._handler_semaphore.acquire()
+                    task = asyncio.create_task(self._handle_delivery(message))
+                    self._handler_tasks.add(task)
+                    task.add_done_callback(self._handler_tasks.discard)
                         
         except asyncio.CancelledError:
             self.logger.info("Message consumer cancelled")
         except Exception as e:
             self.logger.error(f"Error in message consumer: {e}")
     
+    async def _consume_local(self, local_queue: asyncio.Queue) -> None:
+        """消费进程内传输的消息"""
+        try:
+            while True:
+                agent_message = await local_queue.get()
+                await self._handler_semaphore.acquire()
+                task = asyncio.create_task(self._handle_local_message(agent_message))
+                self._handler_tasks.add(task)
+                task.add_done_callback(self._handler_tasks.discard)
+                
+        except asyncio.CancelledError:
+            self.logger.info("Local message consumer cancelled")
+    
+    async def _handle_local_message(self, agent_message: AgentMessage) -> None:
+        """处理单条进程内消息"""
+        try:
+            await self._dispatch_message(agent_message)
+        except Exception as e:
+            self.logger.error(f"Error processing local message: {e}")
+        finally:
+            self._handler_semaphore.release()
+    
+    async def _handle_delivery(self, amqp_message) -> None:
+        """处理单条投递并确认"""
+        try:
+            await self._process_message(amqp_message)
+            await amqp_message.ack()
+        except Exception as e:
+            self.logger.error(f"Error processing message: {e}")
+            await amqp_message.nack(requeue=False)
+        finally:
+            self._handler_semaphore.release()
+    
     async def _process_message(self, amqp_message) -> None:
         """处理接收到的消息"""
         try:
             # 反序列化消息
-            message_data = json.loads(amqp_message.body.decode())
-            
-            # 转换时间字段
-            if "timestamp" in message_data:
-                message_data["timestamp"] = datetime.fromisoformat(message_data["timestamp"])
+            content_type = getattr(amqp_message, "content_type", None)
+            if not isinstance(content_type, str):
+                content_type = None
+            body = amqp_message.body
+            if not isinstance(body, (bytes, bytearray)):
+                body = body.decode().encode()
+            agent_message = MessageSerializer.loads(bytes(body), content_type)
             
-            agent_message = AgentMessage(**message_data)
-            
-            self.logger.debug(f"Received message {agent_message.id} from {agent_message.sender_id}")
-            
-            # 检查是否是响应消息
-            if (agent_message.type == MessageType.RESPONSE and 
-                agent_message.correlation_id and 
-                agent_message.correlation_id in self.pending_responses):
+            await self._dispatch_message(agent_message)
                 
-                future = self.pending_responses.pop(agent_message.correlation_id)
-                if not future.done():
-                    future.set_result(agent_message)
-                return
+        except Exception as e:
+            self.logger.error(f"Error processing message: {e}")
+    
+    async def _dispatch_message(self, agent_message: AgentMessage) -> None:
+        """分发消息：完成等待中的响应，或调用注册的处理器"""
+        self.logger.debug(f"Received message {agent_message.id} from {agent_message.sender_id}")
+        
+        # 检查是否是响应消息
+        if (agent_message.type == MessageType.RESPONSE and 
+            agent_message.correlation_id and 
+            agent_message.correlation_id in self.pending_responses):
             
-            # 查找并调用消息处理器
-            handler = self.message_handlers.get(agent_message.type)
-            if handler:
-                try:
-                    result = await handler(agent_message)
+            future = self.pending_responses.pop(agent_message.correlation_id)
+            if not future.done():
+                future.set_result(agent_message)
+            return
+        
+        # 查找并调用消息处理器
+        handler = self.message_handlers.get(agent_message.type)
+        if handler:
+            try:
+                result = await handler(agent_message)
+                
+                # 如果消息需要响应，发送响应
+                if agent_message.correlation_id and result:
+                    response_message = AgentMessage(
+                        type=MessageType.RESPONSE,
+                        sender_id=self.agent_id,
+                        receiver_id=agent_message.sender_id,
+                        content=str(result),
+                        correlation_id=agent_message.correlation_id,
+                        metadata={"original_message_id": agent_message.id}
+                    )
                     
-                    # 如果消息需要响应，发送响应
-                    if agent_message.correlation_id and result:
-                        response_message = AgentMessage(
-                            type=MessageType.RESPONSE,
-                            sender_id=self.agent_id,
-                            receiver_id=agent_message.sender_id,
-                            content=str(result),
-                            correlation_id=agent_message.correlation_id,
-                            metadata={"original_message_id": agent_message.id}
-                        )
-                        
-                        await self.send_message(response_message)
-                        
-                except Exception as e:
-                    self.logger.error(f"Error in message handler: {e}")
+                    await self.send_message(response_message)
                     
-                    # 发送错误响应
-                    if agent_message.correlation_id:
-                        error_response = AgentMessage(
-                            type=MessageType.ERROR,
-                            sender_id=self.agent_id,
-                            receiver_id=agent_message.sender_id,
-                            content=f"Error processing message: {str(e)}",
-                            correlation_id=agent_message.correlation_id,
-                            metadata={"error": str(e)}
-                        )
-                        
-                        await self.send_message(error_response)
-            else:
-                self.logger.warning(f"No handler for message type {agent_message.type}")
+            except Exception as e:
+                self.logger.error(f"Error in message handler: {e}")
                 
-        except Exception as e:
-            self.logger.error(f"Error processing message: {e}")
+                # 发送错误响应
+                if agent_message.correlation_id:
+                    error_response = AgentMessage(
+                        type=MessageType.ERROR,
+                        sender_id=self.agent_id,
+                        receiver_id=agent_message.sender_id,
+                        content=f"Error processing message: {str(e)}",
+                        correlation_id=agent_message.correlation_id,
+                        metadata={"error": str(e)}
+                    )
+                    
+                    await self.send_message(error_response)
+        else:
+            self.logger.warning(f"No handler for message type {agent_message.type}")
     
     async def _wait_for_response(self, correlation_id: str) -> Optional[AgentMessage]:
         """
@@ -382,8 +636,10 @@ class AgentCommunicator:
         Returns:
             响应消息
         """
-        future = asyncio.Future()
-        self.pending_responses[correlation_id] = future
+        future = self.pending_responses.get(correlation_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending_responses[correlation_id] = future
         
         try:
             # 等待响应，设置超时
@@ -423,5 +679,7 @@ class AgentCommunicator:
             "queue_initialized": self.queue is not None,
             "consumer_running": self._consumer_task and not self._consumer_task.done(),
             "pending_responses": len(self.pending_responses),
+            "active_handlers": len(self._handler_tasks),
+            "local_transport": self.local_transport is not None,
             "registered_handlers": len(self.message_handlers)
         }
\ No newline at end of file
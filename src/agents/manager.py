@@ -12,7 +12,7 @@ import uuid
 
 from .base import BaseAgent, AgentMessage, AgentResponse, MessageType, AgentStatus, AgentCapability
 from .state_manager import AgentStateManager, StateManagerConfig
-from .communication import MessageBroker, AgentCommunicator, CommunicationConfig
+from .communication import MessageBroker, AgentCommunicator, CommunicationConfig, InMemoryTransport
 
 
 logger = logging.getLogger(__name__)
@@ -70,10 +70,17 @@ class AgentManager:
     def __init__(
         self,
         state_config: Optional[StateManagerConfig] = None,
-        comm_config: Optional[CommunicationConfig] = None
+        comm_config: Optional[CommunicationConfig] = None,
+        enable_local_transport: bool = True
     ):
+        self.comm_config = comm_config or CommunicationConfig()
         self.state_manager = AgentStateManager(state_config)
-        self.message_broker = MessageBroker(comm_config)
+        self.message_broker = MessageBroker(self.comm_config)
+        
+        # 进程内传输：本进程启动的Agent之间直接传递消息，远程Agent仍走RabbitMQ
+        self.local_transport: Optional[InMemoryTransport] = (
+            InMemoryTransport(self.comm_config.local_queue_size) if enable_local_transport else None
+        )
         
         # Agent注册表
         self.registrations: Dict[str, AgentRegistration] = {}
@@ -189,7 +196,12 @@ class AgentManager:
             registration = self.registrations[agent_id]
             
             # 创建通信器
-            communicator = AgentCommunicator(agent_id, self.message_broker)
+            communicator = AgentCommunicator(
+                agent_id,
+                self.message_broker,
+                self.comm_config,
+                local_transport=self.local_transport
+            )
             await communicator.initialize()
             
             # 创建Agent实例
@@ -539,7 +551,8 @@ class AgentManager:
                 "current_task": state.current_task,
                 "error_count": state.error_count,
                 "last_active": state.last_active,
-                "available": agent.is_available()
+                "available": agent.is_available(),
+                "routing_metrics": agent.get_routing_metrics()
             }
         
         return result
@@ -561,6 +574,10 @@ class AgentManager:
             "active_tasks": len(self.active_tasks),
             "agent_metrics": agent_metrics,
             "message_broker": broker_health,
+            "local_transport": {
+                "enabled": self.local_transport is not None,
+                "queue_depths": self.local_transport.get_queue_depths() if self.local_transport else {}
+            },
             "state_manager": state_health,
             "capabilities": list(self.capability_index.keys())
         }
\ No newline at end of file
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.lead_service import LeadService
 from src.services.opportunity_service import OpportunityService
@@ -120,6 +121,23 @@ class CRMExpertAgent(BaseAgent):
     - 知识库管理和维护
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("process_guidance", keywords=("流程", "流程设计", "流程优化", "最佳实践", "标准流程")),
+            TaskRoute("knowledge_integration", keywords=("知识", "知识库", "知识整合", "最佳实践", "经验总结")),
+            TaskRoute("quality_control", keywords=("质量", "质量评估", "数据质量", "流程质量", "系统质量")),
+            TaskRoute("system_integration", keywords=("集成", "系统集成", "外部系统", "数据同步", "接口")),
+            TaskRoute("compliance_check", keywords=("合规", "合规性", "标准", "规范", "审计"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "销售流程", "销售管理"), agents=("sales_agent", "sales_management_agent")),
+            CollaborationRule(keywords=("客户", "客户成功", "客户管理"), agents=("customer_success_agent",)),
+            CollaborationRule(keywords=("市场", "线索", "营销"), agents=("market_agent",)),
+            CollaborationRule(keywords=("系统", "技术", "运维"), agents=("system_management_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "crm_expert_agent",
@@ -212,57 +230,16 @@ class CRMExpertAgent(BaseAgent):
         分析CRM专家相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 流程指导相关
-            if any(keyword in content for keyword in ["流程", "流程设计", "流程优化", "最佳实践", "标准流程"]):
-                task_type = "process_guidance"
-                
-            # 知识整合相关
-            elif any(keyword in content for keyword in ["知识", "知识库", "知识整合", "最佳实践", "经验总结"]):
-                task_type = "knowledge_integration"
-                
-            # 质量控制相关
-            elif any(keyword in content for keyword in ["质量", "质量评估", "数据质量", "流程质量", "系统质量"]):
-                task_type = "quality_control"
-                
-            # 系统集成相关
-            elif any(keyword in content for keyword in ["集成", "系统集成", "外部系统", "数据同步", "接口"]):
-                task_type = "system_integration"
-                
-            # 合规检查相关
-            elif any(keyword in content for keyword in ["合规", "合规性", "标准", "规范", "审计"]):
-                task_type = "compliance_check"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["销售", "销售流程", "销售管理"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                required_agents.append("sales_management_agent")
-                
-            if any(keyword in content for keyword in ["客户", "客户成功", "客户管理"]):
-                needs_collaboration = True
-                required_agents.append("customer_success_agent")
-                
-            if any(keyword in content for keyword in ["市场", "线索", "营销"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
-                
-            if any(keyword in content for keyword in ["系统", "技术", "运维"]):
-                needs_collaboration = True
-                required_agents.append("system_management_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "crm_admin"),
@@ -555,12 +532,12 @@ class CRMExpertAgent(BaseAgent):
             """
             
             # 检索相关最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{industry}行业{process_type}流程最佳实践",
                 collection_name=self.knowledge_collections["best_practices"]
             )
             
-            enhanced_prompt = f"{guidance_prompt}\n\n参考最佳实践：\n{rag_result.answer}"
+            enhanced_prompt = f"{guidance_prompt}\n\n参考最佳实践：\n{rag_context.text}"
             
             # 使用LLM生成流程指导
             llm_response = await llm_service.chat_completion(
@@ -617,27 +594,18 @@ class CRMExpertAgent(BaseAgent):
             请提供结构化、全面的知识整合结果。
             """
             
-            # 检索多个知识源
-            knowledge_sources = []
-            for collection_name in self.knowledge_collections.values():
-                try:
-                    rag_result = await rag_service.query(
-                        question=topic,
-                        collection_name=collection_name,
-                        top_k=3
-                    )
-                    knowledge_sources.append({
-                        "source": collection_name,
-                        "content": rag_result.answer,
-                        "confidence": rag_result.confidence
-                    })
-                except Exception as e:
-                    logger.warning(f"检索知识源 {collection_name} 失败: {e}")
+            # 同时检索所有知识源（只生成一次查询向量，按排名融合）
+            collections = list(self.knowledge_collections.values())
+            knowledge_context = await rag_service.multi_collection_retrieve(
+                question=topic,
+                collections=collections,
+                max_tokens=500 * len(collections)
+            )
             
             # 整合所有知识源
             combined_knowledge = "\n\n".join([
-                f"来源 {source['source']}:\n{source['content']}" 
-                for source in knowledge_sources
+                f"来源 {collection_name}:\n{knowledge_context.text_for(collection_name)}" 
+                for collection_name in knowledge_context.collections
             ])
             
             enhanced_prompt = f"{integration_prompt}\n\n参考知识：\n{combined_knowledge}"
@@ -655,8 +623,8 @@ class CRMExpertAgent(BaseAgent):
                 topic=topic,
                 category=category,
                 integrated_knowledge=content,
-                sources=[source["source"] for source in knowledge_sources],
-                confidence_score=sum(source["confidence"] for source in knowledge_sources) / len(knowledge_sources) if knowledge_sources else 0.5,
+                sources=knowledge_context.collections,
+                confidence_score=knowledge_context.confidence if knowledge_context.documents else 0.5,
                 recommendations=self._extract_list_items(content, "建议"),
                 related_topics=self._extract_related_topics(content),
                 last_updated=datetime.now()
@@ -706,12 +674,12 @@ class CRMExpertAgent(BaseAgent):
             """
             
             # 检索质量评估标准
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"CRM系统{assessment_type}质量评估标准和方法",
                 collection_name=self.knowledge_collections["industry_standards"]
             )
             
-            enhanced_prompt = f"{assessment_prompt}\n\n评估标准：\n{rag_result.answer}"
+            enhanced_prompt = f"{assessment_prompt}\n\n评估标准：\n{rag_context.text}"
             
             # 使用LLM生成质量评估
             llm_response = await llm_service.chat_completion(
@@ -770,12 +738,12 @@ class CRMExpertAgent(BaseAgent):
             """
             
             # 检索集成指南
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{source_system}到{target_system}系统集成最佳实践",
                 collection_name=self.knowledge_collections["integration_guides"]
             )
             
-            enhanced_prompt = f"{config_prompt}\n\n集成指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{config_prompt}\n\n集成指南：\n{rag_context.text}"
             
             # 使用LLM生成集成配置
             llm_response = await llm_service.chat_completion(
@@ -834,12 +802,12 @@ class CRMExpertAgent(BaseAgent):
             """
             
             # 检索合规标准
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{compliance_standard}合规要求和检查清单",
                 collection_name=self.knowledge_collections["industry_standards"]
             )
             
-            enhanced_prompt = f"{compliance_prompt}\n\n合规标准：\n{rag_result.answer}"
+            enhanced_prompt = f"{compliance_prompt}\n\n合规标准：\n{rag_context.text}"
             
             # 使用LLM生成合规检查结果
             llm_response = await llm_service.chat_completion(
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.opportunity_service import OpportunityService
 from src.services.llm_service import llm_service
@@ -120,6 +121,22 @@ class CustomerSuccessAgent(BaseAgent):
     - 客户使用数据分析
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("health_monitoring", keywords=("健康度", "客户状态", "风险预警", "流失预警")),
+            TaskRoute("renewal_strategy", keywords=("续约", "续费", "合同续签", "续约策略")),
+            TaskRoute("expansion_identification", keywords=("扩展", "增购", "升级", "交叉销售")),
+            TaskRoute("value_analysis", keywords=("价值分析", "roi", "投资回报", "价值实现")),
+            TaskRoute("customer_data_access", keywords=("使用数据", "行为分析", "使用情况", "活跃度"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "商务谈判", "价格"), agents=("sales_agent",)),
+            CollaborationRule(keywords=("产品", "功能", "技术", "实施"), agents=("product_agent",)),
+            CollaborationRule(keywords=("市场", "竞争", "行业"), agents=("market_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "customer_success_agent",
@@ -212,52 +229,16 @@ class CustomerSuccessAgent(BaseAgent):
         分析客户成功相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 健康度监控相关
-            if any(keyword in content for keyword in ["健康度", "客户状态", "风险预警", "流失预警"]):
-                task_type = "health_monitoring"
-                
-            # 续约策略相关
-            elif any(keyword in content for keyword in ["续约", "续费", "合同续签", "续约策略"]):
-                task_type = "renewal_strategy"
-                
-            # 扩展机会相关
-            elif any(keyword in content for keyword in ["扩展", "增购", "升级", "交叉销售"]):
-                task_type = "expansion_identification"
-                
-            # 价值分析相关
-            elif any(keyword in content for keyword in ["价值分析", "roi", "投资回报", "价值实现"]):
-                task_type = "value_analysis"
-                
-            # 客户数据访问相关
-            elif any(keyword in content for keyword in ["使用数据", "行为分析", "使用情况", "活跃度"]):
-                task_type = "customer_data_access"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["销售", "商务谈判", "价格"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                
-            if any(keyword in content for keyword in ["产品", "功能", "技术", "实施"]):
-                needs_collaboration = True
-                required_agents.append("product_agent")
-                
-            if any(keyword in content for keyword in ["市场", "竞争", "行业"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "customer_success_manager"),
@@ -613,12 +594,12 @@ class CustomerSuccessAgent(BaseAgent):
             """
             
             # 检索健康度评估方法
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="客户健康度评估方法和指标体系",
                 collection_name=self.knowledge_collections["success_methodology"]
             )
             
-            enhanced_prompt = f"{health_prompt}\n\n评估方法：\n{rag_result.answer}"
+            enhanced_prompt = f"{health_prompt}\n\n评估方法：\n{rag_context.text}"
             
             # 使用LLM生成健康度分析
             llm_response = await llm_service.chat_completion(
@@ -697,12 +678,12 @@ class CustomerSuccessAgent(BaseAgent):
             """
             
             # 检索续约最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{customer.industry}行业客户续约策略和最佳实践",
                 collection_name=self.knowledge_collections["renewal_strategies"]
             )
             
-            enhanced_prompt = f"{strategy_prompt}\n\n最佳实践：\n{rag_result.answer}"
+            enhanced_prompt = f"{strategy_prompt}\n\n最佳实践：\n{rag_context.text}"
             
             # 生成续约策略
             llm_response = await llm_service.chat_completion(
@@ -781,12 +762,12 @@ class CustomerSuccessAgent(BaseAgent):
             """
             
             # 检索扩展机会识别方法
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="客户扩展机会识别和评估方法",
                 collection_name=self.knowledge_collections["expansion_playbooks"]
             )
             
-            enhanced_prompt = f"{expansion_prompt}\n\n识别方法：\n{rag_result.answer}"
+            enhanced_prompt = f"{expansion_prompt}\n\n识别方法：\n{rag_context.text}"
             
             # 生成扩展机会分析
             llm_response = await llm_service.chat_completion(
@@ -852,12 +833,12 @@ class CustomerSuccessAgent(BaseAgent):
             """
             
             # 检索价值框架
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="客户价值实现分析框架和方法",
                 collection_name=self.knowledge_collections["value_frameworks"]
             )
             
-            enhanced_prompt = f"{value_prompt}\n\n价值框架：\n{rag_result.answer}"
+            enhanced_prompt = f"{value_prompt}\n\n价值框架：\n{rag_context.text}"
             
             # 生成价值分析
             llm_response = await llm_service.chat_completion(
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.lead_service import LeadService
 from src.services.opportunity_service import OpportunityService
@@ -124,6 +125,23 @@ class ManagementStrategyAgent(BaseAgent):
     - 商业数据源集成
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("business_analysis", keywords=("业务分析", "绩效分析", "经营分析", "业绩分析")),
+            TaskRoute("trend_forecasting", keywords=("预测", "趋势", "预期", "展望")),
+            TaskRoute("strategy_planning", keywords=("战略", "规划", "策略", "计划")),
+            TaskRoute("decision_support", keywords=("决策", "选择", "建议", "方案")),
+            TaskRoute("external_data_access", keywords=("市场数据", "行业报告", "竞争对手", "外部数据"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "客户", "线索"), agents=("sales_agent",)),
+            CollaborationRule(keywords=("市场", "营销", "推广"), agents=("market_agent",)),
+            CollaborationRule(keywords=("产品", "技术", "功能"), agents=("product_agent",)),
+            CollaborationRule(keywords=("团队", "人员", "管理"), agents=("sales_management_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "management_strategy_agent",
@@ -219,56 +237,16 @@ class ManagementStrategyAgent(BaseAgent):
         分析管理策略相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 业务分析相关
-            if any(keyword in content for keyword in ["业务分析", "绩效分析", "经营分析", "业绩分析"]):
-                task_type = "business_analysis"
-                
-            # 趋势预测相关
-            elif any(keyword in content for keyword in ["预测", "趋势", "预期", "展望"]):
-                task_type = "trend_forecasting"
-                
-            # 战略规划相关
-            elif any(keyword in content for keyword in ["战略", "规划", "策略", "计划"]):
-                task_type = "strategy_planning"
-                
-            # 决策支持相关
-            elif any(keyword in content for keyword in ["决策", "选择", "建议", "方案"]):
-                task_type = "decision_support"
-                
-            # 外部数据访问相关
-            elif any(keyword in content for keyword in ["市场数据", "行业报告", "竞争对手", "外部数据"]):
-                task_type = "external_data_access"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["销售", "客户", "线索"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                
-            if any(keyword in content for keyword in ["市场", "营销", "推广"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
-                
-            if any(keyword in content for keyword in ["产品", "技术", "功能"]):
-                needs_collaboration = True
-                required_agents.append("product_agent")
-                
-            if any(keyword in content for keyword in ["团队", "人员", "管理"]):
-                needs_collaboration = True
-                required_agents.append("sales_management_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "executive"),
@@ -559,12 +537,12 @@ class ManagementStrategyAgent(BaseAgent):
             """
             
             # 检索相关分析框架
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{analysis_type.value}业务分析方法和框架",
                 collection_name=self.knowledge_collections["business_frameworks"]
             )
             
-            enhanced_prompt = f"{analysis_prompt}\n\n分析框架：\n{rag_result.answer}"
+            enhanced_prompt = f"{analysis_prompt}\n\n分析框架：\n{rag_context.text}"
             
             # 使用LLM生成分析
             llm_response = await llm_service.chat_completion(
@@ -628,12 +606,12 @@ class ManagementStrategyAgent(BaseAgent):
             """
             
             # 检索预测方法
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{forecast_type.value}预测方法和模型",
                 collection_name=self.knowledge_collections["business_frameworks"]
             )
             
-            enhanced_prompt = f"{forecast_prompt}\n\n预测方法：\n{rag_result.answer}"
+            enhanced_prompt = f"{forecast_prompt}\n\n预测方法：\n{rag_context.text}"
             
             # 生成预测
             llm_response = await llm_service.chat_completion(
@@ -698,12 +676,12 @@ class ManagementStrategyAgent(BaseAgent):
             """
             
             # 检索战略模型
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{strategy_level.value}层面战略规划方法和模型",
                 collection_name=self.knowledge_collections["strategy_models"]
             )
             
-            enhanced_prompt = f"{strategy_prompt}\n\n战略模型：\n{rag_result.answer}"
+            enhanced_prompt = f"{strategy_prompt}\n\n战略模型：\n{rag_context.text}"
             
             # 生成战略建议
             llm_response = await llm_service.chat_completion(
@@ -756,12 +734,12 @@ class ManagementStrategyAgent(BaseAgent):
             """
             
             # 检索决策模型
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="决策分析方法和框架",
                 collection_name=self.knowledge_collections["decision_models"]
             )
             
-            enhanced_prompt = f"{decision_prompt}\n\n决策模型：\n{rag_result.answer}"
+            enhanced_prompt = f"{decision_prompt}\n\n决策模型：\n{rag_context.text}"
             
             # 生成决策支持
             llm_response = await llm_service.chat_completion(
@@ -5,18 +5,22 @@
 支持Function Calling和MCP协议集成
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
+import time
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.lead_service import LeadService
 from src.services.lead_scoring_service import LeadScoringService
 from src.services.llm_service import llm_service
-from src.services.rag_service import rag_service, RAGMode
+from src.services.rag_service import rag_service, RAGMode, RAGContext
+from src.core.config import settings
 from src.core.database import get_db
 
 logger = logging.getLogger(__name__)
@@ -53,6 +57,15 @@ class LeadScoreDetail:
     algorithm_version: str
 
 
+@dataclass
+class LeadBatchResult:
+    """批量线索评分中单个线索的结果"""
+    lead_id: str
+    score_detail: Optional[LeadScoreDetail] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+
+
 @dataclass
 class MarketTrend:
     """市场趋势分析"""
@@ -110,6 +123,22 @@ class MarketAgent(BaseAgent):
     - 数据分析操作
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("lead_scoring", keywords=("线索评分", "评估线索", "线索质量", "转化概率"), keyword_groups=(("评估", "线索"), ("线索", "质量"))),
+            TaskRoute("market_trend_analysis", keywords=("市场趋势", "行业分析", "市场发展", "行业前景", "市场预测")),
+            TaskRoute("competitive_analysis", keywords=("竞争对手", "竞争分析", "市场竞争", "竞争情况", "对手分析")),
+            TaskRoute("marketing_strategy", keywords=("营销策略", "市场策略", "推广方案", "营销建议")),
+            TaskRoute("market_data_analysis", keywords=("数据分析", "市场数据", "统计分析", "报告生成"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "客户关系", "成交"), agents=("sales_agent",)),
+            CollaborationRule(keywords=("产品", "技术", "解决方案"), agents=("product_agent",)),
+            CollaborationRule(keywords=("团队", "管理", "资源配置"), agents=("sales_management_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "market_agent",
@@ -226,54 +255,16 @@ class MarketAgent(BaseAgent):
         分析市场相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 线索评分相关
-            if (any(keyword in content for keyword in ["线索评分", "评估线索", "线索质量", "转化概率"]) or
-                ("评估" in content and "线索" in content) or
-                ("线索" in content and "质量" in content)):
-                task_type = "lead_scoring"
-                
-            # 市场趋势分析相关
-            elif any(keyword in content for keyword in ["市场趋势", "行业分析", "市场发展", "行业前景", "市场预测"]):
-                task_type = "market_trend_analysis"
-                
-            # 竞争分析相关
-            elif any(keyword in content for keyword in ["竞争对手", "竞争分析", "市场竞争", "竞争情况", "对手分析"]):
-                task_type = "competitive_analysis"
-                
-            # 营销策略相关
-            elif any(keyword in content for keyword in ["营销策略", "市场策略", "推广方案", "营销建议"]):
-                task_type = "marketing_strategy"
-                
-            # 市场数据分析相关
-            elif any(keyword in content for keyword in ["数据分析", "市场数据", "统计分析", "报告生成"]):
-                task_type = "market_data_analysis"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["销售", "客户关系", "成交"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                
-            if any(keyword in content for keyword in ["产品", "技术", "解决方案"]):
-                needs_collaboration = True
-                required_agents.append("product_agent")
-                
-            if any(keyword in content for keyword in ["团队", "管理", "资源配置"]):
-                needs_collaboration = True
-                required_agents.append("sales_management_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "marketing_manager"),
@@ -564,20 +555,27 @@ class MarketAgent(BaseAgent):
     
     # 核心业务方法实现
     
-    async def score_lead(self, lead_id: str) -> LeadScoreDetail:
+    async def score_lead(
+        self,
+        lead_id: str,
+        industry_contexts: Optional[Dict[str, asyncio.Task]] = None
+    ) -> LeadScoreDetail:
         """
         智能评估线索质量和转化潜力
+        
+        Args:
+            lead_id: 线索ID
+            industry_contexts: 批量评分时共享的行业评分知识缓存，同一行业只检索一次
         """
         try:
-            # 获取线索信息
+            # 获取线索信息并计算基础评分
             async with get_db() as db:
                 lead = await self.lead_service.get_lead(lead_id, db)
                 
                 if not lead:
                     raise ValueError(f"线索不存在: {lead_id}")
-            
-            # 使用评分服务计算基础评分
-            async with get_db() as db:
+                
+                # 使用评分服务计算基础评分
                 base_score = await self.scoring_service.calculate_lead_score(lead, db)
             
             # 使用LLM和RAG进行深度分析
@@ -607,13 +605,10 @@ class MarketAgent(BaseAgent):
             """
             
             # 检索相关评分知识
-            rag_result = await rag_service.query(
-                question=f"如何评估{lead.industry}行业线索质量",
-                collection_name=self.knowledge_collections["lead_scoring_models"]
-            )
+            rag_context = await self._get_industry_scoring_context(lead.industry, industry_contexts)
             
             # 结合RAG结果优化分析提示
-            enhanced_prompt = f"{analysis_prompt}\n\n参考评分模型：\n{rag_result.answer}"
+            enhanced_prompt = f"{analysis_prompt}\n\n参考评分模型：\n{rag_context.text}"
             
             # 使用LLM生成深度分析
             llm_response = await llm_service.chat_completion(
@@ -631,7 +626,7 @@ class MarketAgent(BaseAgent):
             
             # 计算最终评分（结合基础评分和LLM分析）
             final_score = base_score.total_score if base_score else 0.0
-            confidence = min((rag_result.confidence + 0.3), 1.0)
+            confidence = min((rag_context.confidence + 0.3), 1.0)
             
             return LeadScoreDetail(
                 lead_id=lead_id,
@@ -648,6 +643,82 @@ class MarketAgent(BaseAgent):
             logger.error(f"线索评分失败: {e}")
             raise
     
+    async def _get_industry_scoring_context(
+        self,
+        industry: str,
+        industry_contexts: Optional[Dict[str, asyncio.Task]] = None
+    ) -> RAGContext:
+        """检索行业线索评分知识；传入缓存时同一行业的并发线索共享同一次检索"""
+        if industry_contexts is None:
+            return await rag_service.retrieve_context(
+                question=f"如何评估{industry}行业线索质量",
+                collection_name=self.knowledge_collections["lead_scoring_models"]
+            )
+        
+        task = industry_contexts.get(industry)
+        if task is None:
+            task = asyncio.create_task(self._get_industry_scoring_context(industry))
+            industry_contexts[industry] = task
+        
+        try:
+            # shield：单个线索超时取消时不影响同行业其他线索共享的检索
+            return await asyncio.shield(task)
+        except Exception:
+            # 检索失败不缓存，后续线索重新检索
+            if industry_contexts.get(industry) is task:
+                del industry_contexts[industry]
+            raise
+    
+    async def stream_score_leads(
+        self,
+        lead_ids: List[str],
+        max_concurrency: int = settings.MARKET_LEAD_BATCH_CONCURRENCY,
+        lead_timeout: float = settings.MARKET_LEAD_SCORING_TIMEOUT
+    ) -> AsyncIterator[LeadBatchResult]:
+        """
+        流式批量线索评分
+        
+        同时评分的线索数不超过max_concurrency，完成一个再启动下一个；同一行业的线索共享
+        一次评分知识检索。单个线索超时或失败不影响其他线索。
+        
+        Yields:
+            LeadBatchResult: 按完成顺序产出的单个线索结果
+        """
+        industry_contexts: Dict[str, asyncio.Task] = {}
+        pending = iter(lead_ids)
+        in_flight: Dict[asyncio.Task, str] = {}
+        
+        try:
+            while True:
+                # 补充在途任务
+                while len(in_flight) < max_concurrency:
+                    lead_id = next(pending, None)
+                    if lead_id is None:
+                        break
+                    task = asyncio.create_task(asyncio.wait_for(
+                        self.score_lead(lead_id, industry_contexts=industry_contexts), lead_timeout
+                    ))
+                    in_flight[task] = lead_id
+                
+                if not in_flight:
+                    break
+                
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    lead_id = in_flight.pop(task)
+                    try:
+                        yield LeadBatchResult(lead_id=lead_id, score_detail=task.result())
+                    except asyncio.TimeoutError:
+                        logger.error(f"线索 {lead_id} 评分超时({lead_timeout}秒)")
+                        yield LeadBatchResult(lead_id=lead_id, error=f"评分超时({lead_timeout}秒)", timed_out=True)
+                    except Exception as e:
+                        yield LeadBatchResult(lead_id=lead_id, error=str(e))
+        finally:
+            for task in in_flight:
+                task.cancel()
+            for task in industry_contexts.values():
+                task.cancel()
+    
     async def analyze_market_trend(self, industry: str) -> MarketTrend:
         """
         分析中文市场趋势和行业发展方向
@@ -669,16 +740,16 @@ class MarketAgent(BaseAgent):
             请提供具体的数据支撑和专业见解，分析要深入、准确。
             """
             
-            # 检索相关市场趋势数据
-            rag_result = await rag_service.query(
-                question=f"中国{industry}行业市场趋势和发展前景",
-                collection_name=self.knowledge_collections["market_trends"]
-            )
-            
-            # 检索行业报告
-            industry_report = await rag_service.query(
-                question=f"{industry}行业分析报告",
-                collection_name=self.knowledge_collections["industry_reports"]
+            # 并发检索相关市场趋势数据和行业报告
+            rag_context, industry_report = await asyncio.gather(
+                rag_service.retrieve_context(
+                    question=f"中国{industry}行业市场趋势和发展前景",
+                    collection_name=self.knowledge_collections["market_trends"]
+                ),
+                rag_service.retrieve_context(
+                    question=f"{industry}行业分析报告",
+                    collection_name=self.knowledge_collections["industry_reports"]
+                )
             )
             
             # 增强提示
@@ -686,10 +757,10 @@ class MarketAgent(BaseAgent):
             {trend_prompt}
             
             参考市场数据：
-            {rag_result.answer}
+            {rag_context.text}
             
             行业报告摘要：
-            {industry_report.answer}
+            {industry_report.text}
             """
             
             # 生成趋势分析
@@ -712,7 +783,7 @@ class MarketAgent(BaseAgent):
                 opportunities=self._extract_list_items(content, "市场机会"),
                 threats=self._extract_list_items(content, "潜在威胁"),
                 analysis_date=datetime.now(),
-                confidence_score=min((rag_result.confidence + industry_report.confidence) / 2 + 0.2, 1.0)
+                confidence_score=min((rag_context.confidence + industry_report.confidence) / 2 + 0.2, 1.0)
             )
             
         except Exception as e:
@@ -742,16 +813,16 @@ class MarketAgent(BaseAgent):
             请提供客观、专业的分析，重点关注中国市场情况。
             """
             
-            # 检索竞争情报
-            competitive_intel = await rag_service.query(
-                question=f"{competitor}竞争对手分析",
-                collection_name=self.knowledge_collections["competitive_intelligence"]
-            )
-            
-            # 检索行业竞争格局
-            market_landscape = await rag_service.query(
-                question=f"{competitor}所在行业竞争格局",
-                collection_name=self.knowledge_collections["industry_reports"]
+            # 并发检索竞争情报和行业竞争格局
+            competitive_intel, market_landscape = await asyncio.gather(
+                rag_service.retrieve_context(
+                    question=f"{competitor}竞争对手分析",
+                    collection_name=self.knowledge_collections["competitive_intelligence"]
+                ),
+                rag_service.retrieve_context(
+                    question=f"{competitor}所在行业竞争格局",
+                    collection_name=self.knowledge_collections["industry_reports"]
+                )
             )
             
             # 增强提示
@@ -759,10 +830,10 @@ class MarketAgent(BaseAgent):
             {competitive_prompt}
             
             竞争情报：
-            {competitive_intel.answer}
+            {competitive_intel.text}
             
             市场格局：
-            {market_landscape.answer}
+            {market_landscape.text}
             """
             
             # 生成竞争分析
@@ -825,16 +896,16 @@ class MarketAgent(BaseAgent):
             请提供实用、可执行的营销策略建议。
             """
             
-            # 检索营销最佳实践
-            marketing_practices = await rag_service.query(
-                question=f"{industry}行业营销策略最佳实践",
-                collection_name=self.knowledge_collections["marketing_strategies"]
-            )
-            
-            # 检索客户细分数据
-            customer_segments = await rag_service.query(
-                question=f"{industry}行业客户细分和特征",
-                collection_name=self.knowledge_collections["customer_segments"]
+            # 并发检索营销最佳实践和客户细分数据
+            marketing_practices, customer_segments = await asyncio.gather(
+                rag_service.retrieve_context(
+                    question=f"{industry}行业营销策略最佳实践",
+                    collection_name=self.knowledge_collections["marketing_strategies"]
+                ),
+                rag_service.retrieve_context(
+                    question=f"{industry}行业客户细分和特征",
+                    collection_name=self.knowledge_collections["customer_segments"]
+                )
             )
             
             # 增强提示
@@ -842,10 +913,10 @@ class MarketAgent(BaseAgent):
             {strategy_prompt}
             
             营销最佳实践：
-            {marketing_practices.answer}
+            {marketing_practices.text}
             
             客户细分参考：
-            {customer_segments.answer}
+            {customer_segments.text}
             """
             
             # 生成营销策略
@@ -950,33 +1021,45 @@ class MarketAgent(BaseAgent):
                     "error": "线索ID列表不能为空"
                 }
             
-            results = []
-            for lead_id in lead_ids:
-                try:
-                    score_detail = await self.score_lead(lead_id)
-                    results.append({
-                        "lead_id": lead_id,
+            lead_ids = list(dict.fromkeys(lead_ids))
+            start_time = time.perf_counter()
+            
+            results = {}
+            timed_out_count = 0
+            async for item in self.stream_score_leads(
+                lead_ids,
+                max_concurrency=kwargs.get("max_concurrency", settings.MARKET_LEAD_BATCH_CONCURRENCY),
+                lead_timeout=kwargs.get("lead_timeout", settings.MARKET_LEAD_SCORING_TIMEOUT)
+            ):
+                if item.score_detail is not None:
+                    results[item.lead_id] = {
+                        "lead_id": item.lead_id,
                         "success": True,
-                        "score": score_detail.total_score,
-                        "confidence": score_detail.confidence,
-                        "recommendations": score_detail.recommendations[:3]  # 只返回前3个建议
-                    })
-                except Exception as e:
-                    results.append({
-                        "lead_id": lead_id,
+                        "score": item.score_detail.total_score,
+                        "confidence": item.score_detail.confidence,
+                        "recommendations": item.score_detail.recommendations[:3]  # 只返回前3个建议
+                    }
+                else:
+                    timed_out_count += item.timed_out
+                    results[item.lead_id] = {
+                        "lead_id": item.lead_id,
                         "success": False,
-                        "error": str(e)
-                    })
+                        "error": item.error
+                    }
             
-            success_count = len([r for r in results if r["success"]])
+            elapsed = time.perf_counter() - start_time
+            success_count = len([r for r in results.values() if r["success"]])
             
             return {
                 "success": True,
-                "batch_results": results,
+                "batch_results": [results[lead_id] for lead_id in lead_ids],
                 "summary": {
                     "total": len(lead_ids),
                     "success": success_count,
-                    "failed": len(lead_ids) - success_count
+                    "failed": len(lead_ids) - success_count,
+                    "timed_out": timed_out_count,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "leads_per_second": round(len(lead_ids) / elapsed, 2) if elapsed > 0 else None
                 }
             }
             
@@ -5,6 +5,7 @@
 支持Function Calling和MCP协议集成
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict, List, Any, Optional, Union
@@ -13,6 +14,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.opportunity_service import OpportunityService
 from src.services.llm_service import llm_service
@@ -132,6 +134,22 @@ class ProductAgent(BaseAgent):
     - 产品数据库访问
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("solution_matching", keywords=("产品匹配", "方案推荐", "解决方案", "产品选择", "技术选型")),
+            TaskRoute("technical_proposal", keywords=("技术方案", "技术建议", "架构设计", "方案设计")),
+            TaskRoute("implementation_planning", keywords=("实施规划", "项目计划", "部署计划", "上线计划")),
+            TaskRoute("technical_support", keywords=("技术问题", "技术支持", "技术咨询", "如何实现")),
+            TaskRoute("product_inquiry", keywords=("产品信息", "产品功能", "产品特性", "产品介绍"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "客户关系", "商务谈判", "价格"), agents=("sales_agent",)),
+            CollaborationRule(keywords=("市场分析", "竞争对手", "行业趋势"), agents=("market_agent",)),
+            CollaborationRule(keywords=("客户成功", "实施后", "用户培训"), agents=("customer_success_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "product_agent",
@@ -226,52 +244,16 @@ class ProductAgent(BaseAgent):
         分析产品相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 产品匹配相关
-            if any(keyword in content for keyword in ["产品匹配", "方案推荐", "解决方案", "产品选择", "技术选型"]):
-                task_type = "solution_matching"
-                
-            # 技术方案相关
-            elif any(keyword in content for keyword in ["技术方案", "技术建议", "架构设计", "方案设计"]):
-                task_type = "technical_proposal"
-                
-            # 实施规划相关
-            elif any(keyword in content for keyword in ["实施规划", "项目计划", "部署计划", "上线计划"]):
-                task_type = "implementation_planning"
-                
-            # 技术支持相关
-            elif any(keyword in content for keyword in ["技术问题", "技术支持", "技术咨询", "如何实现"]):
-                task_type = "technical_support"
-                
-            # 产品信息查询相关
-            elif any(keyword in content for keyword in ["产品信息", "产品功能", "产品特性", "产品介绍"]):
-                task_type = "product_inquiry"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["销售", "客户关系", "商务谈判", "价格"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                
-            if any(keyword in content for keyword in ["市场分析", "竞争对手", "行业趋势"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
-                
-            if any(keyword in content for keyword in ["客户成功", "实施后", "用户培训"]):
-                needs_collaboration = True
-                required_agents.append("customer_success_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "product_manager"),
@@ -589,16 +571,12 @@ class ProductAgent(BaseAgent):
             请提供专业、详细的匹配分析。
             """
             
-            # 检索产品目录
-            product_catalog = await rag_service.query(
-                question=f"匹配需求的产品：{', '.join(requirements)}",
-                collection_name=self.knowledge_collections["product_catalog"]
-            )
-            
-            # 检索解决方案模板
-            solution_templates = await rag_service.query(
-                question=f"类似需求的解决方案模板",
-                collection_name=self.knowledge_collections["solution_templates"]
+            # 同时检索产品目录和解决方案模板
+            catalog_collection = self.knowledge_collections["product_catalog"]
+            template_collection = self.knowledge_collections["solution_templates"]
+            solution_context = await rag_service.multi_collection_retrieve(
+                question=f"匹配需求的产品和解决方案：{', '.join(requirements)}",
+                collections=[catalog_collection, template_collection]
             )
             
             # 增强提示
@@ -606,10 +584,10 @@ class ProductAgent(BaseAgent):
             {matching_prompt}
             
             产品目录信息：
-            {product_catalog.answer}
+            {solution_context.text_for(catalog_collection)}
             
             解决方案模板：
-            {solution_templates.answer}
+            {solution_context.text_for(template_collection)}
             """
             
             # 使用LLM生成匹配分析
@@ -627,7 +605,7 @@ class ProductAgent(BaseAgent):
                 requirements=requirements,
                 recommended_products=self._extract_recommended_products(content),
                 solution_type=self._extract_solution_type(content),
-                match_score=self._calculate_match_score(content, product_catalog.confidence),
+                match_score=self._calculate_match_score(content, solution_context.confidence),
                 technical_fit=self._extract_technical_fit(content),
                 business_fit=self._extract_business_fit(content),
                 implementation_complexity=self._extract_complexity(content),
@@ -692,16 +670,16 @@ class ProductAgent(BaseAgent):
             方案要专业、可执行、符合行业最佳实践。
             """
             
-            # 检索技术文档
-            technical_docs = await rag_service.query(
-                question=f"{customer_info.get('industry', '')}行业技术方案",
-                collection_name=self.knowledge_collections["technical_docs"]
-            )
-            
-            # 检索实施指南
-            implementation_guide = await rag_service.query(
-                question="技术方案实施最佳实践",
-                collection_name=self.knowledge_collections["implementation_guides"]
+            # 并发检索技术文档和实施指南
+            technical_docs, implementation_guide = await asyncio.gather(
+                rag_service.retrieve_context(
+                    question=f"{customer_info.get('industry', '')}行业技术方案",
+                    collection_name=self.knowledge_collections["technical_docs"]
+                ),
+                rag_service.retrieve_context(
+                    question="技术方案实施最佳实践",
+                    collection_name=self.knowledge_collections["implementation_guides"]
+                )
             )
             
             # 增强提示
@@ -709,10 +687,10 @@ class ProductAgent(BaseAgent):
             {proposal_prompt}
             
             技术参考文档：
-            {technical_docs.answer}
+            {technical_docs.text}
             
             实施指南：
-            {implementation_guide.answer}
+            {implementation_guide.text}
             """
             
             # 生成技术方案
@@ -780,16 +758,16 @@ class ProductAgent(BaseAgent):
             规划要详细、可执行、风险可控。
             """
             
-            # 检索实施最佳实践
-            best_practices = await rag_service.query(
-                question=f"{technical_complexity}复杂度项目实施最佳实践",
-                collection_name=self.knowledge_collections["implementation_guides"]
-            )
-            
-            # 检索案例研究
-            case_studies = await rag_service.query(
-                question="类似项目实施案例",
-                collection_name=self.knowledge_collections["case_studies"]
+            # 并发检索实施最佳实践和案例研究
+            best_practices, case_studies = await asyncio.gather(
+                rag_service.retrieve_context(
+                    question=f"{technical_complexity}复杂度项目实施最佳实践",
+                    collection_name=self.knowledge_collections["implementation_guides"]
+                ),
+                rag_service.retrieve_context(
+                    question="类似项目实施案例",
+                    collection_name=self.knowledge_collections["case_studies"]
+                )
             )
             
             # 增强提示
@@ -797,10 +775,10 @@ class ProductAgent(BaseAgent):
             {planning_prompt}
             
             最佳实践参考：
-            {best_practices.answer}
+            {best_practices.text}
             
             案例研究：
-            {case_studies.answer}
+            {case_studies.text}
             """
             
             # 生成实施规划
@@ -863,16 +841,12 @@ class ProductAgent(BaseAgent):
             回答要专业、准确、实用。
             """
             
-            # 检索技术文档
-            tech_docs = await rag_service.query(
-                question=technical_question,
-                collection_name=self.knowledge_collections["technical_docs"]
-            )
-            
-            # 检索故障排除指南
-            troubleshooting = await rag_service.query(
+            # 同时检索技术文档和故障排除指南
+            docs_collection = self.knowledge_collections["technical_docs"]
+            troubleshooting_collection = self.knowledge_collections["troubleshooting"]
+            support_context = await rag_service.multi_collection_retrieve(
                 question=technical_question,
-                collection_name=self.knowledge_collections["troubleshooting"]
+                collections=[docs_collection, troubleshooting_collection]
             )
             
             # 增强提示
@@ -880,10 +854,10 @@ class ProductAgent(BaseAgent):
             {support_prompt}
             
             技术文档参考：
-            {tech_docs.answer}
+            {support_context.text_for(docs_collection)}
             
             故障排除指南：
-            {troubleshooting.answer}
+            {support_context.text_for(troubleshooting_collection)}
             """
             
             # 生成技术支持响应
@@ -899,8 +873,8 @@ class ProductAgent(BaseAgent):
                 "question": technical_question,
                 "answer": content,
                 "urgency": urgency,
-                "confidence": min(tech_docs.confidence + troubleshooting.confidence, 1.0),
-                "sources": tech_docs.sources + troubleshooting.sources,
+                "confidence": support_context.confidence,
+                "sources": support_context.sources,
                 "response_time": datetime.now().isoformat(),
                 "follow_up_needed": urgency in ["high", "critical"]
             }
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.lead_service import LeadService
 from src.services.opportunity_service import OpportunityService
@@ -106,6 +107,22 @@ class SalesAgent(BaseAgent):
     - CRM系统操作
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("customer_analysis", keywords=("客户分析", "客户画像", "客户背景", "分析客户"), patterns=(r'分析.*客户',)),
+            TaskRoute("talking_points", keywords=("话术", "怎么说", "如何沟通", "开场白", "异议处理")),
+            TaskRoute("opportunity_assessment", keywords=("机会评估", "成交概率", "销售机会", "项目评估")),
+            TaskRoute("action_recommendation", keywords=("下一步", "建议", "策略", "怎么办", "如何推进")),
+            TaskRoute("crm_operation", keywords=("创建", "更新", "修改", "删除", "查询"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("产品", "技术方案", "实施"), agents=("product_agent",)),
+            CollaborationRule(keywords=("市场分析", "竞争对手", "行业趋势", "市场竞争", "竞争情况"), agents=("market_agent",)),
+            CollaborationRule(keywords=("团队", "管理", "绩效"), agents=("sales_management_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "sales_agent",
@@ -192,54 +209,16 @@ class SalesAgent(BaseAgent):
         分析销售相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 客户分析相关
-            import re
-            if (any(keyword in content for keyword in ["客户分析", "客户画像", "客户背景", "分析客户"]) or
-                re.search(r'分析.*客户', content)):
-                task_type = "customer_analysis"
-                
-            # 话术生成相关
-            elif any(keyword in content for keyword in ["话术", "怎么说", "如何沟通", "开场白", "异议处理"]):
-                task_type = "talking_points"
-                
-            # 机会评估相关
-            elif any(keyword in content for keyword in ["机会评估", "成交概率", "销售机会", "项目评估"]):
-                task_type = "opportunity_assessment"
-                
-            # 行动建议相关
-            elif any(keyword in content for keyword in ["下一步", "建议", "策略", "怎么办", "如何推进"]):
-                task_type = "action_recommendation"
-                
-            # CRM操作相关
-            elif any(keyword in content for keyword in ["创建", "更新", "修改", "删除", "查询"]):
-                task_type = "crm_operation"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["产品", "技术方案", "实施"]):
-                needs_collaboration = True
-                required_agents.append("product_agent")
-                
-            if any(keyword in content for keyword in ["市场分析", "竞争对手", "行业趋势", "市场竞争", "竞争情况"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
-                
-            if any(keyword in content for keyword in ["团队", "管理", "绩效"]):
-                needs_collaboration = True
-                required_agents.append("sales_management_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "sales_rep"),
@@ -555,13 +534,13 @@ class SalesAgent(BaseAgent):
             """
             
             # 检索相关销售知识
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"如何分析{customer.industry}行业的{customer.size}规模客户",
                 collection_name=self.knowledge_collections["sales_methodology"]
             )
             
             # 结合RAG结果优化分析提示
-            enhanced_prompt = f"{analysis_prompt}\n\n参考知识：\n{rag_result.answer}"
+            enhanced_prompt = f"{analysis_prompt}\n\n参考知识：\n{rag_context.text}"
             
             # 使用LLM生成分析
             llm_response = await llm_service.chat_completion(
@@ -581,7 +560,7 @@ class SalesAgent(BaseAgent):
                 buying_signals=self._extract_list_items(analysis_content, "购买信号"),
                 risk_factors=self._extract_list_items(analysis_content, "风险因素"),
                 recommended_approach=self._extract_section(analysis_content, "推荐销售策略"),
-                confidence_score=min(rag_result.confidence + 0.2, 1.0),
+                confidence_score=min(rag_context.confidence + 0.2, 1.0),
                 analysis_date=datetime.now()
             )
             
@@ -622,13 +601,13 @@ class SalesAgent(BaseAgent):
             """
             
             # 检索相关话术模板
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{industry}行业{sales_stage}阶段销售话术",
                 collection_name=self.knowledge_collections["talking_scripts"]
             )
             
             # 增强提示
-            enhanced_prompt = f"{prompt}\n\n参考话术模板：\n{rag_result.answer}"
+            enhanced_prompt = f"{prompt}\n\n参考话术模板：\n{rag_context.text}"
             
             # 生成话术
             llm_response = await llm_service.chat_completion(
@@ -694,12 +673,12 @@ class SalesAgent(BaseAgent):
             """
             
             # 检索成功案例
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"类似销售机会成功案例和评估方法",
                 collection_name=self.knowledge_collections["success_cases"]
             )
             
-            enhanced_prompt = f"{assessment_prompt}\n\n参考案例：\n{rag_result.answer}"
+            enhanced_prompt = f"{assessment_prompt}\n\n参考案例：\n{rag_context.text}"
             
             # 生成评估
             llm_response = await llm_service.chat_completion(
@@ -754,12 +733,12 @@ class SalesAgent(BaseAgent):
             """
             
             # 检索最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="销售跟进和推进的最佳实践",
                 collection_name=self.knowledge_collections["sales_methodology"]
             )
             
-            enhanced_prompt = f"{recommendation_prompt}\n\n最佳实践参考：\n{rag_result.answer}"
+            enhanced_prompt = f"{recommendation_prompt}\n\n最佳实践参考：\n{rag_context.text}"
             
             # 生成建议
             llm_response = await llm_service.chat_completion(
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.customer_service import CustomerService
 from src.services.lead_service import LeadService
 from src.services.opportunity_service import OpportunityService
@@ -111,6 +112,22 @@ class SalesManagementAgent(BaseAgent):
     - HR系统集成
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("team_analysis", keywords=("团队分析", "团队表现", "团队绩效", "整体表现")),
+            TaskRoute("performance_evaluation", keywords=("绩效评估", "绩效考核", "表现评估", "员工评估")),
+            TaskRoute("resource_allocation", keywords=("资源配置", "资源分配", "人员分配", "区域分配")),
+            TaskRoute("capacity_planning", keywords=("产能规划", "人力规划", "团队规划", "招聘需求")),
+            TaskRoute("hr_integration", keywords=("人事", "hr", "员工信息", "组织架构"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("客户", "客户满意度", "客户反馈"), agents=("customer_success_agent",)),
+            CollaborationRule(keywords=("销售策略", "销售技巧", "销售培训"), agents=("sales_agent",)),
+            CollaborationRule(keywords=("市场", "竞争", "行业分析"), agents=("market_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "sales_management_agent",
@@ -199,52 +216,16 @@ class SalesManagementAgent(BaseAgent):
         分析销售管理相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 团队分析相关
-            if any(keyword in content for keyword in ["团队分析", "团队表现", "团队绩效", "整体表现"]):
-                task_type = "team_analysis"
-                
-            # 绩效评估相关
-            elif any(keyword in content for keyword in ["绩效评估", "绩效考核", "表现评估", "员工评估"]):
-                task_type = "performance_evaluation"
-                
-            # 资源配置相关
-            elif any(keyword in content for keyword in ["资源配置", "资源分配", "人员分配", "区域分配"]):
-                task_type = "resource_allocation"
-                
-            # 产能规划相关
-            elif any(keyword in content for keyword in ["产能规划", "人力规划", "团队规划", "招聘需求"]):
-                task_type = "capacity_planning"
-                
-            # HR集成相关
-            elif any(keyword in content for keyword in ["人事", "hr", "员工信息", "组织架构"]):
-                task_type = "hr_integration"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["客户", "客户满意度", "客户反馈"]):
-                needs_collaboration = True
-                required_agents.append("customer_success_agent")
-                
-            if any(keyword in content for keyword in ["销售策略", "销售技巧", "销售培训"]):
-                needs_collaboration = True
-                required_agents.append("sales_agent")
-                
-            if any(keyword in content for keyword in ["市场", "竞争", "行业分析"]):
-                needs_collaboration = True
-                required_agents.append("market_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "sales_manager"),
@@ -542,12 +523,12 @@ class SalesManagementAgent(BaseAgent):
             """
             
             # 检索相关管理理论
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"销售团队{analysis_type.value}分析方法和最佳实践",
                 collection_name=self.knowledge_collections["management_theory"]
             )
             
-            enhanced_prompt = f"{analysis_prompt}\n\n参考理论：\n{rag_result.answer}"
+            enhanced_prompt = f"{analysis_prompt}\n\n参考理论：\n{rag_context.text}"
             
             # 使用LLM生成分析
             llm_response = await llm_service.chat_completion(
@@ -603,12 +584,12 @@ class SalesManagementAgent(BaseAgent):
             """
             
             # 检索绩效评估模型
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="销售人员绩效评估标准和方法",
                 collection_name=self.knowledge_collections["performance_models"]
             )
             
-            enhanced_prompt = f"{evaluation_prompt}\n\n评估标准：\n{rag_result.answer}"
+            enhanced_prompt = f"{evaluation_prompt}\n\n评估标准：\n{rag_context.text}"
             
             # 生成评估
             llm_response = await llm_service.chat_completion(
@@ -664,12 +645,12 @@ class SalesManagementAgent(BaseAgent):
             """
             
             # 检索最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"销售{allocation_type}资源配置优化方法",
                 collection_name=self.knowledge_collections["team_best_practices"]
             )
             
-            enhanced_prompt = f"{optimization_prompt}\n\n最佳实践：\n{rag_result.answer}"
+            enhanced_prompt = f"{optimization_prompt}\n\n最佳实践：\n{rag_context.text}"
             
             # 生成优化方案
             llm_response = await llm_service.chat_completion(
@@ -724,12 +705,12 @@ class SalesManagementAgent(BaseAgent):
             """
             
             # 检索产能规划方法
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question="销售团队产能规划和人力资源规划方法",
                 collection_name=self.knowledge_collections["management_theory"]
             )
             
-            enhanced_prompt = f"{planning_prompt}\n\n规划方法：\n{rag_result.answer}"
+            enhanced_prompt = f"{planning_prompt}\n\n规划方法：\n{rag_context.text}"
             
             # 生成规划
             llm_response = await llm_service.chat_completion(
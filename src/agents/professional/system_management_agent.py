@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from src.agents.base import BaseAgent, AgentMessage, AgentResponse, AgentCapability
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule
 from src.services.llm_service import llm_service
 from src.services.rag_service import rag_service, RAGMode
 from src.core.database import get_db
@@ -136,6 +137,22 @@ class SystemManagementAgent(BaseAgent):
     - 基础设施管理工具集成
     """
     
+    # 任务路由表：任务类型按顺序匹配，协作规则可同时命中多条
+    task_router = KeywordRouter(
+        routes=[
+            TaskRoute("system_monitoring", keywords=("监控", "健康", "状态", "性能", "告警")),
+            TaskRoute("security_management", keywords=("安全", "漏洞", "威胁", "防护", "合规")),
+            TaskRoute("integration_management", keywords=("集成", "接口", "同步", "连接", "配置")),
+            TaskRoute("performance_optimization", keywords=("优化", "性能", "调优", "响应时间", "吞吐量")),
+            TaskRoute("infrastructure_management", keywords=("基础设施", "服务器", "数据库", "存储", "网络", "部署"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("crm", "业务", "流程"), agents=("crm_expert_agent",)),
+            CollaborationRule(keywords=("客户", "用户体验"), agents=("customer_success_agent",)),
+            CollaborationRule(keywords=("数据", "分析", "报告"), agents=("management_strategy_agent",))
+        ]
+    )
+    
     def __init__(
         self,
         agent_id: str = "system_management_agent",
@@ -230,52 +247,16 @@ class SystemManagementAgent(BaseAgent):
         分析系统管理相关任务
         """
         try:
-            content = message.content.lower()
             metadata = message.metadata or {}
             
-            # 识别任务类型
-            task_type = "general"
-            needs_collaboration = False
-            required_agents = []
-            
-            # 系统监控相关
-            if any(keyword in content for keyword in ["监控", "健康", "状态", "性能", "告警"]):
-                task_type = "system_monitoring"
-                
-            # 安全管理相关
-            elif any(keyword in content for keyword in ["安全", "漏洞", "威胁", "防护", "合规"]):
-                task_type = "security_management"
-                
-            # 集成管理相关
-            elif any(keyword in content for keyword in ["集成", "接口", "同步", "连接", "配置"]):
-                task_type = "integration_management"
-                
-            # 性能优化相关
-            elif any(keyword in content for keyword in ["优化", "性能", "调优", "响应时间", "吞吐量"]):
-                task_type = "performance_optimization"
-                
-            # 基础设施管理相关
-            elif any(keyword in content for keyword in ["基础设施", "服务器", "数据库", "存储", "网络", "部署"]):
-                task_type = "infrastructure_management"
-            
-            # 判断是否需要协作
-            if any(keyword in content for keyword in ["crm", "业务", "流程"]):
-                needs_collaboration = True
-                required_agents.append("crm_expert_agent")
-                
-            if any(keyword in content for keyword in ["客户", "用户体验"]):
-                needs_collaboration = True
-                required_agents.append("customer_success_agent")
-                
-            if any(keyword in content for keyword in ["数据", "分析", "报告"]):
-                needs_collaboration = True
-                required_agents.append("management_strategy_agent")
+            # 按路由表识别任务类型和协作需求
+            decision = self.route_task(message.content)
             
             return {
-                "task_type": task_type,
-                "needs_collaboration": needs_collaboration,
-                "required_agents": required_agents,
-                "collaboration_type": "sequential" if needs_collaboration else None,
+                "task_type": decision.task_type,
+                "needs_collaboration": decision.needs_collaboration,
+                "required_agents": decision.required_agents,
+                "collaboration_type": "sequential" if decision.needs_collaboration else None,
                 "priority": metadata.get("priority", "medium"),
                 "context": {
                     "user_role": metadata.get("user_role", "system_admin"),
@@ -561,12 +542,12 @@ class SystemManagementAgent(BaseAgent):
             """
             
             # 检索监控最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"系统{monitoring_type}监控分析和健康评估方法",
                 collection_name=self.knowledge_collections["monitoring_guides"]
             )
             
-            enhanced_prompt = f"{health_prompt}\n\n监控指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{health_prompt}\n\n监控指南：\n{rag_context.text}"
             
             # 使用LLM生成健康分析
             llm_response = await llm_service.chat_completion(
@@ -623,12 +604,12 @@ class SystemManagementAgent(BaseAgent):
             """
             
             # 检索安全最佳实践
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"系统{assessment_type}安全评估和防护措施",
                 collection_name=self.knowledge_collections["security_practices"]
             )
             
-            enhanced_prompt = f"{security_prompt}\n\n安全指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{security_prompt}\n\n安全指南：\n{rag_context.text}"
             
             # 使用LLM生成安全评估
             llm_response = await llm_service.chat_completion(
@@ -682,12 +663,12 @@ class SystemManagementAgent(BaseAgent):
             """
             
             # 检索集成管理指南
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"系统集成{operation}操作最佳实践",
                 collection_name=self.knowledge_collections["infrastructure_management"]
             )
             
-            enhanced_prompt = f"{management_prompt}\n\n集成指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{management_prompt}\n\n集成指南：\n{rag_context.text}"
             
             # 使用LLM生成管理方案
             llm_response = await llm_service.chat_completion(
@@ -746,12 +727,12 @@ class SystemManagementAgent(BaseAgent):
             """
             
             # 检索性能优化指南
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{component}性能优化最佳实践和调优方法",
                 collection_name=self.knowledge_collections["system_administration"]
             )
             
-            enhanced_prompt = f"{optimization_prompt}\n\n优化指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{optimization_prompt}\n\n优化指南：\n{rag_context.text}"
             
             # 使用LLM生成优化方案
             llm_response = await llm_service.chat_completion(
@@ -807,12 +788,12 @@ class SystemManagementAgent(BaseAgent):
             """
             
             # 检索基础设施管理指南
-            rag_result = await rag_service.query(
+            rag_context = await rag_service.retrieve_context(
                 question=f"{resource_type}基础设施{operation}操作指南",
                 collection_name=self.knowledge_collections["infrastructure_management"]
             )
             
-            enhanced_prompt = f"{management_prompt}\n\n管理指南：\n{rag_result.answer}"
+            enhanced_prompt = f"{management_prompt}\n\n管理指南：\n{rag_context.text}"
             
             # 使用LLM生成管理方案
             llm_response = await llm_service.chat_completion(
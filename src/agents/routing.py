@@ -0,0 +1,166 @@
+"""
+Agent任务路由
+
+把专业Agent analyze_task 中的关键词判断声明为路由表，编译成一个多模式匹配器，
+一次扫描消息即可得到任务类型和协作需求，并按Agent记录路由统计。
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, FrozenSet, Tuple
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    """
+    任务类型路由规则
+
+    任一关键词出现、任一关键词组全部出现或任一正则命中即匹配；
+    路由表按顺序判断，先匹配的规则优先（等同原来的 if/elif 链）。
+    """
+    task_type: str
+    keywords: Tuple[str, ...] = ()
+    keyword_groups: Tuple[Tuple[str, ...], ...] = ()
+    patterns: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class CollaborationRule:
+    """协作规则：任一关键词出现时需要这些Agent协作"""
+    keywords: Tuple[str, ...]
+    agents: Tuple[str, ...]
+
+
+@dataclass
+class RoutingDecision:
+    """路由结果"""
+    task_type: str
+    required_agents: List[str]
+    matched_keywords: FrozenSet[str]
+
+    @property
+    def needs_collaboration(self) -> bool:
+        return bool(self.required_agents)
+
+
+@dataclass
+class RoutingMetrics:
+    """路由统计"""
+    total_routed: int = 0
+    total_time: float = 0.0
+    task_type_counts: Dict[str, int] = field(default_factory=dict)
+    collaboration_counts: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, decision: RoutingDecision, elapsed: float) -> None:
+        self.total_routed += 1
+        self.total_time += elapsed
+        self.task_type_counts[decision.task_type] = self.task_type_counts.get(decision.task_type, 0) + 1
+        for agent in decision.required_agents:
+            self.collaboration_counts[agent] = self.collaboration_counts.get(agent, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_routed": self.total_routed,
+            "total_time_ms": self.total_time * 1000,
+            "average_time_us": self.total_time / self.total_routed * 1e6 if self.total_routed else 0.0,
+            "task_type_counts": dict(self.task_type_counts),
+            "collaboration_counts": dict(self.collaboration_counts)
+        }
+
+
+class KeywordRouter:
+    """
+    关键词路由器
+
+    所有规则中的关键词编译成一个按长度降序的正则分支，匹配时每次从上一个
+    命中位置的下一个字符继续搜索，从而找到所有（包括相互重叠的）关键词：
+    同一位置只返回最长的关键词，被它包含的较短关键词在编译时预先展开。
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[TaskRoute],
+        collaborations: Sequence[CollaborationRule] = (),
+        default_task_type: str = "general"
+    ):
+        self.routes = tuple(routes)
+        self.collaborations = tuple(collaborations)
+        self.default_task_type = default_task_type
+
+        keywords: Set[str] = set()
+        for route in self.routes:
+            keywords.update(route.keywords)
+            for group in route.keyword_groups:
+                keywords.update(group)
+        for rule in self.collaborations:
+            keywords.update(rule.keywords)
+        keywords = {keyword.lower() for keyword in keywords if keyword}
+
+        ordered = sorted(keywords, key=lambda keyword: (-len(keyword), keyword))
+        self._matcher: Optional[re.Pattern] = (
+            re.compile("|".join(re.escape(keyword) for keyword in ordered)) if ordered else None
+        )
+        # 命中某个关键词时，它包含的所有关键词也都出现在消息中
+        self._implied: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(other for other in ordered if other in keyword)
+            for keyword in ordered
+        }
+
+        self._compiled_routes = [
+            (
+                route.task_type,
+                frozenset(keyword.lower() for keyword in route.keywords),
+                [frozenset(keyword.lower() for keyword in group) for group in route.keyword_groups],
+                [re.compile(pattern) for pattern in route.patterns]
+            )
+            for route in self.routes
+        ]
+        self._compiled_collaborations = [
+            (frozenset(keyword.lower() for keyword in rule.keywords), rule.agents)
+            for rule in self.collaborations
+        ]
+
+    def match_keywords(self, content: str) -> FrozenSet[str]:
+        """返回消息中出现的所有关键词（content应已转为小写）"""
+        if self._matcher is None:
+            return frozenset()
+
+        match = self._matcher.search(content)
+        if match is None:
+            return frozenset()
+
+        matched: Set[str] = set()
+        search = self._matcher.search
+        while match is not None:
+            matched |= self._implied[match.group()]
+            match = search(content, match.start() + 1)
+        return frozenset(matched)
+
+    def route(self, content: str, metrics: Optional[RoutingMetrics] = None) -> RoutingDecision:
+        """一次扫描得到任务类型和需要协作的Agent"""
+        start_time = time.perf_counter()
+        content = content.lower()
+        matched = self.match_keywords(content)
+
+        task_type = self.default_task_type
+        for route_type, keywords, groups, patterns in self._compiled_routes:
+            if (not keywords.isdisjoint(matched) or
+                    (groups and any(group <= matched for group in groups)) or
+                    (patterns and any(pattern.search(content) for pattern in patterns))):
+                task_type = route_type
+                break
+
+        required_agents = []
+        for keywords, agents in self._compiled_collaborations:
+            if not keywords.isdisjoint(matched):
+                required_agents.extend(agents)
+
+        decision = RoutingDecision(
+            task_type=task_type,
+            required_agents=required_agents,
+            matched_keywords=matched
+        )
+        if metrics is not None:
+            metrics.record(decision, time.perf_counter() - start_time)
+        return decision
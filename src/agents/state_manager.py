@@ -20,6 +20,50 @@ from ..core.config import settings
 logger = logging.getLogger(__name__)
 
 
+# 从各二级索引中移除Agent并扣减错误总数
+# KEYS: 索引集合, 错误计数哈希, 统计哈希, 活跃时间有序集合, 过期时间有序集合, 各状态集合...
+_REMOVE_FROM_INDEXES = """
+local function remove_agent(agent_id)
+    local errors = tonumber(redis.call('HGET', KEYS[2], agent_id) or '0')
+    if errors ~= 0 then
+        redis.call('HINCRBY', KEYS[3], 'total_errors', -errors)
+    end
+    redis.call('HDEL', KEYS[2], agent_id)
+    redis.call('SREM', KEYS[1], agent_id)
+    redis.call('ZREM', KEYS[4], agent_id)
+    redis.call('ZREM', KEYS[5], agent_id)
+    for i = 6, #KEYS do
+        redis.call('SREM', KEYS[i], agent_id)
+    end
+end
+"""
+
+# 删除指定Agent的索引，ARGV: Agent ID列表
+_REMOVE_AGENTS_SCRIPT = _REMOVE_FROM_INDEXES + """
+for _, agent_id in ipairs(ARGV) do
+    remove_agent(agent_id)
+end
+return #ARGV
+"""
+
+# 清理过期时间早于ARGV[1]的Agent索引，返回清理数量
+_PURGE_EXPIRED_SCRIPT = _REMOVE_FROM_INDEXES + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[5], '-inf', ARGV[1])
+for _, agent_id in ipairs(expired) do
+    remove_agent(agent_id)
+end
+return #expired
+"""
+
+# 更新Agent错误计数并按差值累加错误总数，KEYS: 错误计数哈希, 统计哈希; ARGV: Agent ID, 错误数
+_SET_ERROR_COUNT_SCRIPT = """
+local previous = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('HINCRBY', KEYS[2], 'total_errors', tonumber(ARGV[2]) - previous)
+return previous
+"""
+
+
 class StateManagerConfig(BaseModel):
     """状态管理器配置"""
     redis_url: str = settings.REDIS_URL
@@ -33,6 +77,8 @@ class AgentStateManager:
     Agent状态管理器
     
     负责Agent状态的持久化存储、检索和管理，使用Redis作为存储后端。
+    状态、错误数、最近活跃时间和过期时间同时写入二级索引（按状态的集合、
+    错误计数哈希和有序集合），系统指标和按状态/活跃时间的查询不再逐个加载状态。
     """
     
     def __init__(self, config: Optional[StateManagerConfig] = None):
@@ -53,6 +99,11 @@ class AgentStateManager:
             
             # 测试连接
             await self.redis_client.ping()
+            
+            # 首次启动时为已有状态补建二级索引
+            if not await self.redis_client.exists(self._get_stats_key()):
+                await self.rebuild_indexes()
+            
             self.logger.info("Agent state manager initialized successfully")
             
             # 启动清理任务
@@ -83,6 +134,51 @@ class AgentStateManager:
         """获取索引键"""
         return f"{self.config.key_prefix}index"
     
+    def _get_status_key(self, status: AgentStatus) -> str:
+        """获取状态集合键"""
+        return f"{self.config.key_prefix}status:{AgentStatus(status).value}"
+    
+    def _get_errors_key(self) -> str:
+        """获取错误计数哈希键"""
+        return f"{self.config.key_prefix}errors"
+    
+    def _get_stats_key(self) -> str:
+        """获取统计哈希键"""
+        return f"{self.config.key_prefix}stats"
+    
+    def _get_last_active_key(self) -> str:
+        """获取最近活跃时间有序集合键"""
+        return f"{self.config.key_prefix}last_active"
+    
+    def _get_expiry_key(self) -> str:
+        """获取状态过期时间有序集合键"""
+        return f"{self.config.key_prefix}expires"
+    
+    def _get_index_keys(self) -> List[str]:
+        """索引清理脚本使用的键列表"""
+        return [
+            self._get_index_key(),
+            self._get_errors_key(),
+            self._get_stats_key(),
+            self._get_last_active_key(),
+            self._get_expiry_key(),
+            *(self._get_status_key(status) for status in AgentStatus)
+        ]
+    
+    def _index_state(self, pipe, agent_id: str, state: AgentState) -> None:
+        """在管道中写入Agent的二级索引"""
+        for status in AgentStatus:
+            if status != state.status:
+                pipe.srem(self._get_status_key(status), agent_id)
+        pipe.sadd(self._get_status_key(state.status), agent_id)
+        pipe.zadd(self._get_last_active_key(), {agent_id: state.last_active.timestamp()})
+        pipe.zadd(self._get_expiry_key(), {agent_id: datetime.now().timestamp() + self.config.ttl})
+        pipe.eval(
+            _SET_ERROR_COUNT_SCRIPT, 2,
+            self._get_errors_key(), self._get_stats_key(),
+            agent_id, state.error_count
+        )
+    
     async def save_state(self, agent_id: str, state: AgentState) -> None:
         """
         保存Agent状态
@@ -116,6 +212,7 @@ class AgentStateManager:
             
             # 更新索引
             pipe.sadd(index_key, agent_id)
+            self._index_state(pipe, agent_id, state)
             
             await pipe.execute()
             
@@ -184,6 +281,8 @@ class AgentStateManager:
             pipe = self.redis_client.pipeline()
             pipe.delete(state_key)
             pipe.srem(index_key, agent_id)
+            index_keys = self._get_index_keys()
+            pipe.eval(_REMOVE_AGENTS_SCRIPT, len(index_keys), *index_keys, agent_id)
             
             results = await pipe.execute()
             deleted = results[0] > 0
@@ -226,15 +325,16 @@ class AgentStateManager:
         Returns:
             符合条件的Agent ID列表
         """
-        agent_ids = await self.list_agents()
-        matching_agents = []
-        
-        for agent_id in agent_ids:
-            state = await self.load_state(agent_id)
-            if state and state.status == status:
-                matching_agents.append(agent_id)
+        if not self.redis_client:
+            raise RuntimeError("State manager not initialized")
         
-        return matching_agents
+        try:
+            await self._purge_expired()
+            return list(await self.redis_client.smembers(self._get_status_key(status)))
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get agents by status {status}: {e}")
+            return []
     
     async def get_active_agents(self, since: Optional[datetime] = None) -> List[str]:
         """
@@ -246,18 +346,21 @@ class AgentStateManager:
         Returns:
             活跃的Agent ID列表
         """
+        if not self.redis_client:
+            raise RuntimeError("State manager not initialized")
+        
         if since is None:
             since = datetime.now() - timedelta(hours=1)
         
-        agent_ids = await self.list_agents()
-        active_agents = []
-        
-        for agent_id in agent_ids:
-            state = await self.load_state(agent_id)
-            if state and state.last_active >= since:
-                active_agents.append(agent_id)
-        
-        return active_agents
+        try:
+            await self._purge_expired()
+            return list(await self.redis_client.zrangebyscore(
+                self._get_last_active_key(), since.timestamp(), "+inf"
+            ))
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get active agents: {e}")
+            return []
     
     async def update_agent_status(self, agent_id: str, status: AgentStatus) -> bool:
         """
@@ -310,52 +413,88 @@ class AgentStateManager:
         Returns:
             系统指标字典
         """
-        agent_ids = await self.list_agents()
+        if not self.redis_client:
+            raise RuntimeError("State manager not initialized")
         
-        status_counts = {status: 0 for status in AgentStatus}
-        total_errors = 0
-        active_count = 0
+        # 一次管道往返：先清理过期索引，再读取各计数
+        index_keys = self._get_index_keys()
+        active_since = (datetime.now() - timedelta(hours=1)).timestamp()
         
-        for agent_id in agent_ids:
-            state = await self.load_state(agent_id)
-            if state:
-                status_counts[state.status] += 1
-                total_errors += state.error_count
-                
-                # 检查是否在最近1小时内活跃
-                if (datetime.now() - state.last_active).total_seconds() < 3600:
-                    active_count += 1
+        pipe = self.redis_client.pipeline()
+        pipe.eval(_PURGE_EXPIRED_SCRIPT, len(index_keys), *index_keys, datetime.now().timestamp())
+        pipe.scard(self._get_index_key())
+        pipe.zcount(self._get_last_active_key(), active_since, "+inf")
+        pipe.hget(self._get_stats_key(), "total_errors")
+        for status in AgentStatus:
+            pipe.scard(self._get_status_key(status))
+        
+        _, total_agents, active_count, total_errors, *status_sizes = await pipe.execute()
+        
+        status_counts = dict(zip(AgentStatus, (int(size) for size in status_sizes)))
+        total_agents = int(total_agents)
+        total_errors = int(total_errors or 0)
         
         return {
-            "total_agents": len(agent_ids),
-            "active_agents": active_count,
+            "total_agents": total_agents,
+            "active_agents": int(active_count),
             "status_distribution": status_counts,
             "total_errors": total_errors,
-            "average_errors": total_errors / len(agent_ids) if agent_ids else 0
+            "average_errors": total_errors / total_agents if total_agents else 0
         }
     
+    async def rebuild_indexes(self) -> int:
+        """
+        根据现有状态重建二级索引
+        
+        用于升级前写入的状态或索引与状态不一致时，会逐个加载状态。
+        
+        Returns:
+            重建索引的Agent数量
+        """
+        if not self.redis_client:
+            raise RuntimeError("State manager not initialized")
+        
+        agent_ids = await self.list_agents()
+        
+        pipe = self.redis_client.pipeline()
+        pipe.delete(
+            self._get_errors_key(),
+            self._get_last_active_key(),
+            self._get_expiry_key(),
+            *(self._get_status_key(status) for status in AgentStatus)
+        )
+        pipe.hset(self._get_stats_key(), "total_errors", 0)
+        
+        indexed = 0
+        for agent_id in agent_ids:
+            state = await self.load_state(agent_id)
+            if state is None:
+                pipe.srem(self._get_index_key(), agent_id)
+                continue
+            self._index_state(pipe, agent_id, state)
+            indexed += 1
+        
+        await pipe.execute()
+        
+        self.logger.info(f"Rebuilt state indexes for {indexed} agents")
+        return indexed
+    
+    async def _purge_expired(self) -> int:
+        """清理状态已过期Agent的索引"""
+        index_keys = self._get_index_keys()
+        return await self.redis_client.eval(
+            _PURGE_EXPIRED_SCRIPT, len(index_keys), *index_keys, datetime.now().timestamp()
+        )
+    
     async def _cleanup_expired_states(self) -> None:
         """清理过期的Agent状态"""
         while True:
             try:
                 await asyncio.sleep(self.config.cleanup_interval)
                 
-                agent_ids = await self.list_agents()
-                expired_agents = []
-                
-                for agent_id in agent_ids:
-                    state_key = self._get_state_key(agent_id)
-                    ttl = await self.redis_client.ttl(state_key)
-                    
-                    # 如果TTL为-1（永不过期）或-2（不存在），则需要清理
-                    if ttl == -2:
-                        expired_agents.append(agent_id)
-                
-                # 清理过期的Agent
-                if expired_agents:
-                    index_key = self._get_index_key()
-                    await self.redis_client.srem(index_key, *expired_agents)
-                    self.logger.info(f"Cleaned up {len(expired_agents)} expired agent states")
+                expired_count = await self._purge_expired()
+                if expired_count:
+                    self.logger.info(f"Cleaned up {expired_count} expired agent states")
                 
             except asyncio.CancelledError:
                 break
@@ -377,7 +516,7 @@ class AgentStateManager:
             await self.redis_client.ping()
             
             # 获取基本统计信息
-            agent_count = len(await self.list_agents())
+            agent_count = await self.redis_client.scard(self._get_index_key())
             
             return {
                 "status": "healthy",
@@ -6,7 +6,7 @@ from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
 
-from src.services.rag_service import rag_service, RAGMode, RAGConfig
+from src.services.rag_service import RAGService, RAGMode, RAGConfig, get_rag_service
 # from src.core.exceptions import ServiceError  # 暂时注释掉，如果需要可以后续添加
 
 router = APIRouter()
@@ -56,7 +56,8 @@ class RAGConfigUpdate(BaseModel):
 async def add_documents(
     documents: List[DocumentInput],
     collection_name: str = "rag_knowledge",
-    background_tasks: BackgroundTasks = None
+    background_tasks: BackgroundTasks = None,
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """
     添加文档到RAG知识库
@@ -91,7 +92,7 @@ async def add_documents(
 
 
 @router.post("/query", response_model=RAGQueryResponse, summary="RAG查询")
-async def rag_query(request: RAGQueryRequest):
+async def rag_query(request: RAGQueryRequest, rag_service: RAGService = Depends(get_rag_service)):
     """
     执行RAG查询
     
@@ -123,7 +124,7 @@ async def rag_query(request: RAGQueryRequest):
 
 
 @router.get("/config", summary="获取RAG配置")
-async def get_rag_config():
+async def get_rag_config(rag_service: RAGService = Depends(get_rag_service)):
     """获取当前RAG配置"""
     try:
         config = rag_service.config
@@ -144,7 +145,10 @@ async def get_rag_config():
 
 
 @router.put("/config", summary="更新RAG配置")
-async def update_rag_config(config_update: RAGConfigUpdate):
+async def update_rag_config(
+    config_update: RAGConfigUpdate,
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
     更新RAG配置
     
@@ -180,7 +184,7 @@ async def update_rag_config(config_update: RAGConfigUpdate):
 
 
 @router.get("/stats", summary="获取RAG统计信息")
-async def get_rag_stats():
+async def get_rag_stats(rag_service: RAGService = Depends(get_rag_service)):
     """获取RAG服务统计信息"""
     try:
         stats = await rag_service.get_stats()
@@ -190,7 +194,7 @@ async def get_rag_stats():
 
 
 @router.post("/initialize", summary="初始化RAG服务")
-async def initialize_rag_service():
+async def initialize_rag_service(rag_service: RAGService = Depends(get_rag_service)):
     """初始化RAG服务"""
     try:
         await rag_service.initialize()
@@ -200,7 +204,7 @@ async def initialize_rag_service():
 
 
 @router.get("/health", summary="RAG服务健康检查")
-async def rag_health_check():
+async def rag_health_check(rag_service: RAGService = Depends(get_rag_service)):
     """RAG服务健康检查"""
     try:
         # 简单的健康检查
@@ -224,7 +228,10 @@ async def rag_health_check():
 
 # 示例查询端点
 @router.post("/demo/query", summary="RAG演示查询")
-async def demo_rag_query(question: str = "什么是RAG技术？"):
+async def demo_rag_query(
+    question: str = "什么是RAG技术？",
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
     RAG演示查询，使用预设的示例数据
     """
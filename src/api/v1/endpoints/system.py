@@ -9,7 +9,8 @@ import logging
 
 from src.core.config import settings
 from src.core.database import get_redis
-from src.services.llm_service import llm_service
+from src.services.llm_service import EnhancedLLMService, get_llm_service
+from src.services.warmup import warmup_status
 import redis.asyncio as redis
 
 router = APIRouter()
@@ -17,7 +18,7 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(llm_service: EnhancedLLMService = Depends(get_llm_service)):
     """系统健康检查"""
     health_status = {
         "status": "healthy",
@@ -46,6 +47,9 @@ async def health_check():
             "api_base": settings.OPENAI_BASE_URL
         }
         
+        # 模型预热状态（预热失败时模型会在首次使用时重新加载，不视为不健康）
+        checks["models"] = warmup_status.to_dict()
+        
         # 检查Qdrant
         checks["qdrant"] = {
             "status": "configured" if settings.qdrant_configured else "not_configured",
@@ -75,7 +79,7 @@ async def health_check():
 
 
 @router.get("/config")
-async def get_config():
+async def get_config(llm_service: EnhancedLLMService = Depends(get_llm_service)):
     """获取系统配置信息（脱敏）"""
     return {
         "app_name": settings.APP_NAME,
@@ -98,7 +102,7 @@ async def get_config():
 
 
 @router.get("/models")
-async def get_model_info():
+async def get_model_info(llm_service: EnhancedLLMService = Depends(get_llm_service)):
     """获取模型信息"""
     if not llm_service.is_available():
         raise HTTPException(
@@ -110,7 +114,7 @@ async def get_model_info():
 
 
 @router.post("/test-llm")
-async def test_llm_connection():
+async def test_llm_connection(llm_service: EnhancedLLMService = Depends(get_llm_service)):
     """测试LLM连接"""
     if not llm_service.is_available():
         raise HTTPException(
@@ -4,7 +4,7 @@
 提供业务流程工作流的REST API接口。
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from pydantic import BaseModel, Field
@@ -142,6 +142,12 @@ async def get_lead_management_workflow() -> LeadManagementWorkflow:
     return _lead_management_workflow
 
 
+async def shutdown_workflows() -> None:
+    """停止工作流后台worker"""
+    if _lead_management_workflow is not None:
+        await _lead_management_workflow.stop_worker()
+
+
 @router.post("/customer-discovery/start", response_model=Dict[str, str])
 async def start_customer_discovery(
     request: CustomerDiscoveryRequest,
@@ -342,22 +348,67 @@ async def complete_discovery_task(
         )
 
 
+@router.post("/customer-discovery/{task_id}/cancel")
+async def cancel_customer_discovery(
+    task_id: str,
+    current_user: UserResponse = Depends(get_current_user),
+    workflow: CustomerDiscoveryWorkflow = Depends(get_customer_discovery_workflow)
+):
+    """
+    取消客户发现任务
+    
+    停止任务中所有在途的潜在客户处理，已完成的客户结果保留在任务中。
+    """
+    try:
+        cancelled = await workflow.cancel_discovery(task_id)
+        
+        if not cancelled:
+            raise HTTPException(
+                status_code=404,
+                detail=f"任务 {task_id} 不存在"
+            )
+        
+        return {
+            "task_id": task_id,
+            "message": "客户发现任务已取消",
+            "status": "cancelled"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"取消任务失败: {str(e)}"
+        )
+
+
 @router.get("/customer-discovery/active-tasks")
 async def get_active_discovery_tasks(
+    stage: Optional[DiscoveryStage] = Query(None, description="按阶段过滤"),
+    priority: Optional[Priority] = Query(None, description="按优先级过滤"),
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
     current_user: UserResponse = Depends(get_current_user),
     workflow: CustomerDiscoveryWorkflow = Depends(get_workflow)
 ):
     """
     获取活跃的客户发现任务列表
     
-    返回当前用户的所有活跃客户发现任务。
+    按创建时间倒序游标分页返回客户发现任务，可按阶段、优先级和状态过滤。
     """
     try:
-        active_tasks = []
+        filters = {
+            key: value for key, value in
+            {"stage": stage, "priority": priority, "status": status}.items()
+            if value is not None
+        }
+        tasks, next_cursor = workflow.active_tasks.list_page(limit=limit, cursor=cursor, **filters)
         
-        for task_id, task in workflow.active_tasks.items():
-            task_info = {
-                "task_id": task_id,
+        active_tasks = [
+            {
+                "task_id": task.task_id,
                 "title": task.title,
                 "stage": task.stage.value,
                 "priority": task.priority.value,
@@ -366,16 +417,17 @@ async def get_active_discovery_tasks(
                 "due_date": task.due_date.isoformat(),
                 "created_at": task.created_at.isoformat()
             }
-            active_tasks.append(task_info)
-        
-        # 按创建时间倒序排列
-        active_tasks.sort(key=lambda x: x["created_at"], reverse=True)
+            for task in tasks
+        ]
         
         return {
             "active_tasks": active_tasks,
-            "total_count": len(active_tasks)
+            "total_count": workflow.active_tasks.count(**filters),
+            "next_cursor": next_cursor
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -442,30 +494,7 @@ async def get_workflow_stats(
     返回工作流的整体统计信息。
     """
     try:
-        stats = {
-            "total_tasks": len(workflow.active_tasks),
-            "tasks_by_stage": {},
-            "tasks_by_priority": {},
-            "tasks_by_status": {},
-            "average_progress": 0.0
-        }
-        
-        if workflow.active_tasks:
-            # 按阶段统计
-            for task in workflow.active_tasks.values():
-                stage = task.stage.value
-                priority = task.priority.value
-                status = task.status
-                
-                stats["tasks_by_stage"][stage] = stats["tasks_by_stage"].get(stage, 0) + 1
-                stats["tasks_by_priority"][priority] = stats["tasks_by_priority"].get(priority, 0) + 1
-                stats["tasks_by_status"][status] = stats["tasks_by_status"].get(status, 0) + 1
-            
-            # 计算平均进度
-            total_progress = sum(task.progress for task in workflow.active_tasks.values())
-            stats["average_progress"] = total_progress / len(workflow.active_tasks)
-        
-        return stats
+        return await workflow.get_workflow_metrics()
         
     except Exception as e:
         raise HTTPException(
@@ -521,6 +550,7 @@ async def process_new_lead(
     处理新线索
     
     启动线索管理流程，包括评分、资格认证、分配和跟进计划。
+    各阶段由后台worker异步执行，接口创建线索后立即返回任务ID，可通过状态接口查询进度。
     """
     try:
         task_id = await workflow.process_new_lead(
@@ -531,7 +561,7 @@ async def process_new_lead(
         return {
             "task_id": task_id,
             "message": "线索处理流程已启动",
-            "status": "started"
+            "status": "queued" if workflow.job_queue else "started"
         }
         
     except Exception as e:
@@ -703,20 +733,31 @@ async def get_lead_workflow_metrics(
 
 @router.get("/lead-management/active-tasks")
 async def get_active_lead_tasks(
+    stage: Optional[WorkflowStage] = Query(None, description="按阶段过滤"),
+    priority: Optional[LeadPriority] = Query(None, description="按优先级过滤"),
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    assigned_to: Optional[str] = Query(None, description="按销售代表过滤"),
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
     current_user: UserResponse = Depends(get_current_user),
     workflow: LeadManagementWorkflow = Depends(get_lead_management_workflow)
 ):
     """
     获取活跃的线索任务列表
     
-    返回当前所有活跃的线索处理任务。
+    按创建时间倒序游标分页返回线索处理任务，可按阶段、优先级、状态和销售代表过滤。
     """
     try:
-        active_tasks = []
+        filters = {
+            key: value for key, value in
+            {"stage": stage, "priority": priority, "status": status, "assigned_to": assigned_to}.items()
+            if value is not None
+        }
+        tasks, next_cursor = workflow.active_tasks.list_page(limit=limit, cursor=cursor, **filters)
         
-        for task_id, task in workflow.active_tasks.items():
-            task_info = {
-                "task_id": task_id,
+        active_tasks = [
+            {
+                "task_id": task.task_id,
                 "lead_id": task.lead_id,
                 "title": task.title,
                 "stage": task.stage.value,
@@ -727,16 +768,17 @@ async def get_active_lead_tasks(
                 "due_date": task.due_date.isoformat(),
                 "created_at": task.created_at.isoformat()
             }
-            active_tasks.append(task_info)
-        
-        # 按创建时间倒序排列
-        active_tasks.sort(key=lambda x: x["created_at"], reverse=True)
+            for task in tasks
+        ]
         
         return {
             "active_tasks": active_tasks,
-            "total_count": len(active_tasks)
+            "total_count": workflow.active_tasks.count(**filters),
+            "next_cursor": next_cursor
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,67 @@
+"""
+按需创建的服务单例
+
+服务模块原来在导入时就创建全局实例。LazyService把实例化推迟到第一次使用；
+ServiceProxy作为模块级的全局实例名导出，`from src.services.xxx import xxx_service`
+只拿到代理，第一次访问属性时才创建真正的实例。
+"""
+
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """首次调用get()时才创建的服务单例"""
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        """实例是否已创建"""
+        return self._instance is not None
+
+    def get(self) -> T:
+        """获取服务实例，首次调用时创建"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+
+class ServiceProxy:
+    """
+    服务代理
+
+    属性读取、赋值和删除都转发给LazyService管理的实例，因此
+    patch.object(xxx_service, "method") 修改的是真正的实例，所有导入方都能看到。
+    """
+
+    __slots__ = ("_lazy_service",)
+
+    def __init__(self, lazy_service: LazyService):
+        object.__setattr__(self, "_lazy_service", lazy_service)
+
+    @property
+    def __class__(self):
+        # 使isinstance(xxx_service, XxxService)保持成立
+        return type(self._lazy_service.get())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_service.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_service.get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._lazy_service.get(), name)
+
+    def __repr__(self) -> str:
+        if not self._lazy_service.created:
+            return "<ServiceProxy (未创建)>"
+        return repr(self._lazy_service.get())
@@ -15,6 +15,7 @@ from pathlib import Path
 from src.core.config import settings
 from src.core.database import init_db
 from src.api.v1.router import api_router
+from src.services.warmup import start_warmup
 from src.websocket.manager import ConnectionManager
 
 # 确保日志目录存在
@@ -37,10 +38,15 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("数据库初始化完成")
     
+    # 后台预热模型，不阻塞启动
+    warmup_task = start_warmup()
+    
     yield
     
     # 关闭时清理资源
     logger.info("正在清理应用程序资源...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
 
 
 # 创建FastAPI应用实例
@@ -3,6 +3,7 @@
 from .customer import Customer, CompanySize, CustomerStatus
 from .lead import Lead, LeadScore, ScoreFactor, LeadInteraction, LeadStatus, LeadSource
 from .conversation import Conversation, Message, ConversationState, ConversationStatus, MessageRole
+from .workflow_job import WorkflowJob, WorkflowJobStatus, WorkflowTaskArchive
 from .knowledge import (
     Knowledge, KnowledgeChunk, KnowledgeType, KnowledgeStatus,
     QualityMetrics, UsageStatistics, KnowledgeMetadata,
@@ -30,6 +31,9 @@ __all__ = [
     "ConversationState",
     "ConversationStatus",
     "MessageRole",
+    "WorkflowJob",
+    "WorkflowJobStatus",
+    "WorkflowTaskArchive",
     "Knowledge",
     "KnowledgeChunk",
     "KnowledgeType",
@@ -4,7 +4,7 @@
 
 from sqlalchemy import Column, String, DateTime, Text, JSON, Enum as SQLEnum, Float, Integer, ForeignKey, Boolean
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 import uuid
 import enum
@@ -139,7 +139,11 @@ class Opportunity(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
     
     # 关系
-    customer = relationship("Customer", back_populates="opportunities")
+    # Customer模型未声明opportunities关系，这里通过backref反向注册，避免客户模块依赖本模块
+    customer = relationship(
+        "Customer",
+        backref=backref("opportunities", cascade="all, delete-orphan")
+    )
     stage = relationship("OpportunityStage", back_populates="opportunities")
     activities = relationship("OpportunityActivity", back_populates="opportunity", cascade="all, delete-orphan")
     stage_history = relationship("OpportunityStageHistory", back_populates="opportunity", cascade="all, delete-orphan")
@@ -220,4 +224,35 @@ class OpportunityStageHistory(Base):
     to_stage = relationship("OpportunityStage", foreign_keys=[to_stage_id])
 
     def __repr__(self):
-        return f"<OpportunityStageHistory(id={self.id}, opportunity_id={self.opportunity_id}, changed_at={self.changed_at})>"
\ No newline at end of file
+        return f"<OpportunityStageHistory(id={self.id}, opportunity_id={self.opportunity_id}, changed_at={self.changed_at})>"
+
+class OpportunityStageRollup(Base):
+    """销售机会阶段汇总模型
+
+    由阶段转换在同一事务内增量维护，漏斗分析直接读取汇总值，
+    不再扫描阶段历史表。
+    """
+    __tablename__ = "opportunity_stage_rollups"
+
+    stage_id = Column(UUID(as_uuid=True), ForeignKey("opportunity_stages.id"), primary_key=True, comment="阶段ID")
+    
+    # 转换计数
+    entered_count = Column(Integer, nullable=False, default=0, comment="进入该阶段的次数")
+    exited_count = Column(Integer, nullable=False, default=0, comment="离开该阶段的次数")
+    advanced_count = Column(Integer, nullable=False, default=0, comment="推进到后续阶段的次数")
+    
+    # 停留时间汇总
+    duration_count = Column(Integer, nullable=False, default=0, comment="有停留天数记录的离开次数")
+    duration_days_sum = Column(Integer, nullable=False, default=0, comment="停留天数合计")
+    
+    # 离开时的机会价值合计
+    exited_value_sum = Column(Float, nullable=False, default=0.0, comment="离开该阶段时的机会价值合计")
+    
+    # 时间戳
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
+    
+    # 关系
+    stage = relationship("OpportunityStage")
+
+    def __repr__(self):
+        return f"<OpportunityStageRollup(stage_id={self.stage_id}, entered={self.entered_count}, exited={self.exited_count})>"
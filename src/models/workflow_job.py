@@ -0,0 +1,83 @@
+"""
+工作流阶段任务和任务归档数据模型
+"""
+
+from sqlalchemy import Column, String, DateTime, Text, JSON, Integer, Float, Index, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+import enum
+
+from src.core.database import Base
+
+
+class WorkflowJobStatus(str, enum.Enum):
+    """阶段任务状态枚举"""
+    PENDING = "pending"      # 等待执行（含等待重试）
+    RUNNING = "running"      # 已被worker领取
+    SUCCEEDED = "succeeded"  # 执行成功
+    DEAD = "dead"            # 重试次数耗尽
+
+
+class WorkflowJob(Base):
+    """工作流阶段任务模型
+
+    每个工作流任务的每个阶段对应一条记录，(queue, task_id, stage) 唯一，
+    重复入队不会产生重复执行。worker通过租约领取任务，租约过期的任务可被重新领取。
+    """
+    __tablename__ = "workflow_jobs"
+    __table_args__ = (
+        UniqueConstraint("queue", "task_id", "stage", name="uq_workflow_jobs_queue_task_stage"),
+        Index("ix_workflow_jobs_queue_status_available", "queue", "status", "available_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    queue = Column(String(100), nullable=False, comment="队列名称")
+    task_id = Column(String(255), nullable=False, index=True, comment="工作流任务ID")
+    stage = Column(String(50), nullable=False, comment="工作流阶段")
+    priority = Column(Integer, nullable=False, default=0, comment="优先级，越大越先执行")
+
+    # 任务快照
+    payload = Column(JSON, default=dict, comment="入队时的任务快照")
+    result = Column(JSON, comment="执行完成后的任务快照")
+
+    # 执行状态
+    status = Column(SQLEnum(WorkflowJobStatus), nullable=False, default=WorkflowJobStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0, comment="已执行次数")
+    max_attempts = Column(Integer, nullable=False, default=5, comment="最大执行次数")
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="可执行时间")
+    locked_by = Column(String(255), comment="领取任务的worker")
+    locked_until = Column(DateTime, comment="租约到期时间")
+    last_error = Column(Text, comment="最近一次错误")
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, comment="最近一次开始执行时间")
+    finished_at = Column(DateTime, comment="完成时间")
+
+
+class WorkflowTaskArchive(Base):
+    """工作流任务归档模型
+
+    已完成且超过保留时间的工作流任务从内存任务注册表移出后保存在此表，
+    按 (workflow, task_id) 查询历史任务。
+    """
+    __tablename__ = "workflow_task_archive"
+    __table_args__ = (
+        UniqueConstraint("workflow", "task_id", name="uq_workflow_task_archive_workflow_task"),
+        Index("ix_workflow_task_archive_workflow_completed", "workflow", "completed_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    workflow = Column(String(100), nullable=False, comment="工作流名称")
+    task_id = Column(String(255), nullable=False, comment="工作流任务ID")
+    stage = Column(String(50), comment="最终阶段")
+    priority = Column(String(20), comment="优先级")
+    status = Column(String(50), comment="任务状态")
+    assignee = Column(String(255), index=True, comment="负责人")
+    progress = Column(Float, default=0.0)
+
+    snapshot = Column(JSON, default=dict, comment="任务快照")
+
+    created_at = Column(DateTime, comment="任务创建时间")
+    completed_at = Column(DateTime, comment="任务最后更新时间")
+    archived_at = Column(DateTime, default=datetime.utcnow)
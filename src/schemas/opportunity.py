@@ -309,6 +309,8 @@ class FunnelAnalysis(BaseModel):
     weighted_value: float = Field(..., description="加权价值")
     conversion_rate: float = Field(..., description="转化率")
     average_duration: float = Field(..., description="平均停留时间(天)")
+    entered_count: int = Field(0, description="进入该阶段的次数")
+    advanced_count: int = Field(0, description="推进到后续阶段的次数")
 
 
 class FunnelAnalysisResponse(BaseModel):
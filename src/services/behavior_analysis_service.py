@@ -2,11 +2,13 @@
 
 import asyncio
 import logging
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 from datetime import datetime, timedelta
 import json
 from collections import defaultdict
+import itertools
 
 from ..models.multimodal import (
     BehaviorData, CustomerValueIndicator, DataModalityType,
@@ -16,6 +18,151 @@ from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 转化指标关键字 -> 漏斗阶段（按顺序匹配第一个）
+FUNNEL_STAGE_KEYWORDS = [
+    ('contact_form', 'contact_form'),
+    ('demo_request', 'demo_request'),
+    ('pricing_page', 'pricing_interest'),
+    ('download', 'resource_download')
+]
+
+# 单次会话页面浏览数超过该值视为异常浏览
+EXCESSIVE_PAGE_VIEWS = 50
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass
+class BehaviorColumns:
+    """
+    多个客户会话数据的列式表示
+
+    会话按客户连续排列，customer_offsets[i]:customer_offsets[i+1] 为第i个客户的会话；
+    页面访问和转化指标按会话顺序展平并编码为整数。
+    """
+    customer_ids: List[str]
+    customer_offsets: np.ndarray
+    session_ids: List[str]
+    timestamps: np.ndarray
+    hours: np.ndarray
+    weekdays: np.ndarray
+    engagement: np.ndarray
+    durations: np.ndarray
+    page_counts: np.ndarray
+    click_counts: np.ndarray
+    page_codes: np.ndarray
+    pages: List[str]
+    conversion_counts: np.ndarray
+    conversion_codes: np.ndarray
+    conversion_indicators: List[str]
+
+    @classmethod
+    def from_sessions(cls, behavior_by_customer: Dict[str, List[BehaviorData]]) -> "BehaviorColumns":
+        """按列提取会话对象的字段构建列式数据"""
+        sessions = [data for behavior_data in behavior_by_customer.values() for data in behavior_data]
+        customer_offsets = np.cumsum(
+            [0] + [len(behavior_data) for behavior_data in behavior_by_customer.values()], dtype=np.int64
+        )
+
+        page_views = [data.page_views for data in sessions]
+        conversion_indicators = [data.conversion_indicators for data in sessions]
+        page_codes, pages = _encode([
+            page_view.get('url', 'unknown') for views in page_views for page_view in views
+        ])
+        conversion_codes, indicators = _encode([
+            indicator for session_indicators in conversion_indicators for indicator in session_indicators
+        ])
+
+        # 小时和星期按时间戳本身的本地时间计算（1970-01-01为星期四）
+        seconds = _wall_clock_seconds([data.timestamp for data in sessions])
+        days = np.floor_divide(seconds, 86400).astype(np.int64)
+
+        return cls(
+            customer_ids=list(behavior_by_customer),
+            customer_offsets=customer_offsets,
+            session_ids=[data.session_id for data in sessions],
+            timestamps=seconds,
+            hours=np.floor_divide(seconds, 3600).astype(np.int64) % 24,
+            weekdays=(days + 3) % 7,
+            engagement=np.array([data.engagement_score for data in sessions], dtype=np.float64),
+            durations=np.array([sum(data.time_spent.values()) for data in sessions], dtype=np.float64),
+            page_counts=np.fromiter(map(len, page_views), dtype=np.int64, count=len(sessions)),
+            click_counts=np.array([len(data.click_events) for data in sessions], dtype=np.int64),
+            page_codes=page_codes,
+            pages=pages,
+            conversion_counts=np.fromiter(map(len, conversion_indicators), dtype=np.int64, count=len(sessions)),
+            conversion_codes=conversion_codes,
+            conversion_indicators=indicators
+        )
+
+    @property
+    def sessions_per_customer(self) -> np.ndarray:
+        return np.diff(self.customer_offsets)
+
+    @property
+    def session_customer(self) -> np.ndarray:
+        """每个会话所属客户的序号"""
+        return np.repeat(np.arange(len(self.customer_ids)), self.sessions_per_customer)
+
+
+def _encode(values: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """按首次出现顺序把字符串编码为整数，返回 (编码数组, 取值表)"""
+    index: Dict[str, int] = {}
+    first_seen = np.fromiter(map(index.setdefault, values, itertools.count()), dtype=np.int64, count=len(values))
+    codes = np.unique(first_seen, return_inverse=True)[1].reshape(-1)
+    return codes.astype(np.int64), list(index)
+
+
+def _wall_clock_seconds(timestamps: List[datetime]) -> np.ndarray:
+    """时间戳转换为自1970-01-01起的本地时间秒数（带时区的时间戳按其自身时区的本地时间）"""
+    try:
+        return np.array([(timestamp - _EPOCH).total_seconds() for timestamp in timestamps], dtype=np.float64)
+    except TypeError:
+        return np.array(
+            [(timestamp.replace(tzinfo=None) - _EPOCH).total_seconds() for timestamp in timestamps],
+            dtype=np.float64
+        )
+
+
+def _customer_sum(customer: np.ndarray, values: np.ndarray, customer_count: int) -> np.ndarray:
+    """按客户分组求和"""
+    return np.bincount(customer, weights=values, minlength=customer_count)
+
+
+def _ranked_groups(
+    customer: np.ndarray,
+    keys: np.ndarray,
+    customer_count: int,
+    limit: int
+) -> Tuple[np.ndarray, List[int], List[int], np.ndarray]:
+    """
+    按客户统计键出现次数，取每个客户出现次数最多的前limit个键
+
+    次数相同时按客户内首次出现的先后排序。
+
+    Returns:
+        (按客户排列的键, 对应次数, 每个客户在结果中的起止位置, 每个客户不同键的数量)
+    """
+    unique_keys, first_seen, counts = np.unique(keys, return_index=True, return_counts=True)
+    owners = customer[first_seen]
+    order = np.lexsort((first_seen, -counts, owners))
+    unique_keys, counts = unique_keys[order], counts[order]
+
+    distinct = np.bincount(owners, minlength=customer_count)
+    group_starts = np.repeat(np.cumsum(distinct) - distinct, distinct)
+    kept = np.arange(len(order)) - group_starts < limit
+    bounds = np.concatenate(([0], np.cumsum(np.minimum(distinct, limit))))
+    return unique_keys[kept], counts[kept].tolist(), bounds.tolist(), distinct
+
+
+def _entropy(counts: np.ndarray) -> np.ndarray:
+    """按行计算分布的熵"""
+    totals = counts.sum(axis=1, keepdims=True)
+    probabilities = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+    log_probabilities = np.log2(probabilities, out=np.zeros(counts.shape), where=probabilities > 0)
+    return -(probabilities * log_probabilities).sum(axis=1)
+
+
 class BehaviorAnalysisService:
     """客户行为分析服务"""
     
@@ -45,262 +192,291 @@ class BehaviorAnalysisService:
         Returns:
             Dict: 行为分析结果
         """
-        try:
-            if not behavior_data:
-                return self._create_empty_analysis(customer_id)
+        results = await self.analyze_customers_batch({customer_id: behavior_data}, time_window)
+        return results[customer_id]
+    
+    async def analyze_customers_batch(
+        self,
+        behavior_by_customer: Dict[str, List[BehaviorData]],
+        time_window: Optional[timedelta] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量分析多个客户的行为数据
+        
+        所有客户的会话先转换为列式数组，各项指标按客户分组一次性向量化计算。
+        
+        Args:
+            behavior_by_customer: 客户ID -> 行为数据列表
+            time_window: 分析时间窗口
             
+        Returns:
+            Dict: 客户ID -> 行为分析结果
+        """
+        try:
             # 过滤时间窗口内的数据
             if time_window:
                 cutoff_time = datetime.now() - time_window
-                behavior_data = [
-                    data for data in behavior_data 
-                    if data.timestamp >= cutoff_time
-                ]
+                behavior_by_customer = {
+                    customer_id: [data for data in behavior_data if data.timestamp >= cutoff_time]
+                    for customer_id, behavior_data in behavior_by_customer.items()
+                }
+            
+            non_empty = {
+                customer_id: behavior_data
+                for customer_id, behavior_data in behavior_by_customer.items()
+                if behavior_data
+            }
+            results = {
+                customer_id: self._create_empty_analysis(customer_id)
+                for customer_id in behavior_by_customer
+                if customer_id not in non_empty
+            }
+            if not non_empty:
+                return results
+            
+            columns = BehaviorColumns.from_sessions(non_empty)
             
             # 计算基础指标
-            engagement_metrics = await self._calculate_engagement_metrics(behavior_data)
+            engagement_metrics = self._calculate_engagement_metrics(columns)
             
             # 分析访问模式
-            access_patterns = await self._analyze_access_patterns(behavior_data)
+            access_patterns, consistency_scores = self._analyze_access_patterns(columns)
             
             # 计算转化指标
-            conversion_metrics = await self._calculate_conversion_metrics(behavior_data)
+            conversion_metrics = self._calculate_conversion_metrics(columns)
             
             # 识别行为异常
-            anomalies = await self._detect_behavior_anomalies(behavior_data)
+            anomalies = self._detect_behavior_anomalies(columns)
             
-            # 生成行为画像
-            behavior_profile = await self._generate_behavior_profile(
-                engagement_metrics, access_patterns, conversion_metrics
-            )
+            analysis_timestamp = datetime.now()
+            for index, customer_id in enumerate(columns.customer_ids):
+                # 生成行为画像
+                behavior_profile = await self._generate_behavior_profile(
+                    engagement_metrics[index], access_patterns[index],
+                    conversion_metrics[index], consistency_scores[index]
+                )
+                
+                results[customer_id] = {
+                    'customer_id': customer_id,
+                    'analysis_timestamp': analysis_timestamp,
+                    'data_points_count': engagement_metrics[index]['sessions_count'],
+                    'engagement_metrics': engagement_metrics[index],
+                    'access_patterns': access_patterns[index],
+                    'conversion_metrics': conversion_metrics[index],
+                    'behavior_profile': behavior_profile,
+                    'anomalies': anomalies[index],
+                    'recommendations': await self._generate_recommendations(behavior_profile)
+                }
             
-            return {
-                'customer_id': customer_id,
-                'analysis_timestamp': datetime.now(),
-                'data_points_count': len(behavior_data),
-                'engagement_metrics': engagement_metrics,
-                'access_patterns': access_patterns,
-                'conversion_metrics': conversion_metrics,
-                'behavior_profile': behavior_profile,
-                'anomalies': anomalies,
-                'recommendations': await self._generate_recommendations(behavior_profile)
-            }
+            return {customer_id: results[customer_id] for customer_id in behavior_by_customer}
             
         except Exception as e:
             logger.error(f"客户行为分析失败: {str(e)}")
             raise
     
-    async def _calculate_engagement_metrics(
-        self, 
-        behavior_data: List[BehaviorData]
-    ) -> Dict[str, float]:
+    def _calculate_engagement_metrics(self, columns: BehaviorColumns) -> List[Dict[str, float]]:
         """计算参与度指标"""
-        if not behavior_data:
-            return {}
-        
-        # 计算平均参与度
-        avg_engagement = np.mean([data.engagement_score for data in behavior_data])
-        
-        # 计算总页面浏览量
-        total_page_views = sum(len(data.page_views) for data in behavior_data)
-        
-        # 计算总点击次数
-        total_clicks = sum(len(data.click_events) for data in behavior_data)
-        
-        # 计算平均会话时长
-        total_time = sum(
-            sum(data.time_spent.values()) for data in behavior_data
-        )
-        avg_session_duration = total_time / len(behavior_data) if behavior_data else 0
-        
-        # 计算跳出率(单页面会话比例)
-        single_page_sessions = sum(
-            1 for data in behavior_data if len(data.page_views) == 1
-        )
-        bounce_rate = single_page_sessions / len(behavior_data) if behavior_data else 0
-        
-        return {
-            'average_engagement_score': avg_engagement,
-            'total_page_views': total_page_views,
-            'total_clicks': total_clicks,
-            'average_session_duration': avg_session_duration,
-            'bounce_rate': bounce_rate,
-            'sessions_count': len(behavior_data)
-        }
-    
-    async def _analyze_access_patterns(
-        self, 
-        behavior_data: List[BehaviorData]
-    ) -> Dict[str, Any]:
-        """分析访问模式"""
-        # 统计访问时间分布
-        hour_distribution = defaultdict(int)
-        day_distribution = defaultdict(int)
-        
-        # 统计页面访问频率
-        page_frequency = defaultdict(int)
-        
-        # 统计访问路径
-        access_paths = []
-        
-        for data in behavior_data:
-            # 时间分布
-            timestamp = data.timestamp
-            hour_distribution[timestamp.hour] += 1
-            day_distribution[timestamp.weekday()] += 1
-            
-            # 页面频率
-            for page_view in data.page_views:
-                page_url = page_view.get('url', 'unknown')
-                page_frequency[page_url] += 1
-            
-            # 访问路径
-            if data.page_views:
-                path = [pv.get('url', 'unknown') for pv in data.page_views]
-                access_paths.append(path)
-        
-        # 找出最常访问的时间段
-        peak_hour = max(hour_distribution.items(), key=lambda x: x[1])[0] if hour_distribution else 0
-        peak_day = max(day_distribution.items(), key=lambda x: x[1])[0] if day_distribution else 0
-        
-        # 找出最热门页面
-        top_pages = sorted(page_frequency.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        return {
-            'peak_access_hour': peak_hour,
-            'peak_access_day': peak_day,
-            'hour_distribution': dict(hour_distribution),
-            'day_distribution': dict(day_distribution),
-            'top_pages': top_pages,
-            'unique_pages_visited': len(page_frequency),
-            'common_access_paths': self._find_common_paths(access_paths)
-        }
-    
-    def _find_common_paths(self, paths: List[List[str]]) -> List[Dict[str, Any]]:
-        """找出常见的访问路径"""
-        path_frequency = defaultdict(int)
+        customer = columns.session_customer
+        customer_count = len(columns.customer_ids)
+        sessions = columns.sessions_per_customer
         
-        for path in paths:
-            if len(path) >= 2:
-                # 统计2-3页面的访问序列
-                for i in range(len(path) - 1):
-                    sequence = tuple(path[i:i+2])
-                    path_frequency[sequence] += 1
+        # 平均参与度、总页面浏览量、总点击次数、平均会话时长
+        avg_engagement = _customer_sum(customer, columns.engagement, customer_count) / sessions
+        total_page_views = _customer_sum(customer, columns.page_counts, customer_count)
+        total_clicks = _customer_sum(customer, columns.click_counts, customer_count)
+        avg_session_duration = _customer_sum(customer, columns.durations, customer_count) / sessions
         
-        # 返回最常见的路径
-        common_paths = sorted(path_frequency.items(), key=lambda x: x[1], reverse=True)[:5]
+        # 跳出率(单页面会话比例)
+        bounce_rate = _customer_sum(customer, columns.page_counts == 1, customer_count) / sessions
         
         return [
             {
-                'path': list(path),
-                'frequency': freq,
-                'percentage': freq / len(paths) if paths else 0
+                'average_engagement_score': engagement,
+                'total_page_views': int(page_views),
+                'total_clicks': int(clicks),
+                'average_session_duration': duration,
+                'bounce_rate': bounce,
+                'sessions_count': int(count)
             }
-            for path, freq in common_paths
+            for engagement, page_views, clicks, duration, bounce, count in zip(
+                avg_engagement.tolist(), total_page_views.tolist(), total_clicks.tolist(),
+                avg_session_duration.tolist(), bounce_rate.tolist(), sessions.tolist()
+            )
         ]
     
-    async def _calculate_conversion_metrics(
+    def _analyze_access_patterns(
         self, 
-        behavior_data: List[BehaviorData]
-    ) -> Dict[str, Any]:
-        """计算转化指标"""
-        conversion_events = []
-        funnel_stages = defaultdict(int)
-        
-        for data in behavior_data:
-            # 收集转化指标
-            conversion_events.extend(data.conversion_indicators)
-            
-            # 分析漏斗阶段
-            for indicator in data.conversion_indicators:
-                if 'contact_form' in indicator:
-                    funnel_stages['contact_form'] += 1
-                elif 'demo_request' in indicator:
-                    funnel_stages['demo_request'] += 1
-                elif 'pricing_page' in indicator:
-                    funnel_stages['pricing_interest'] += 1
-                elif 'download' in indicator:
-                    funnel_stages['resource_download'] += 1
-        
-        # 计算转化率
-        total_sessions = len(behavior_data)
-        conversion_rate = len(set(conversion_events)) / total_sessions if total_sessions > 0 else 0
-        
-        return {
-            'conversion_rate': conversion_rate,
-            'total_conversion_events': len(conversion_events),
-            'unique_conversion_events': len(set(conversion_events)),
-            'funnel_stages': dict(funnel_stages),
-            'conversion_velocity': self._calculate_conversion_velocity(behavior_data)
-        }
-    
-    def _calculate_conversion_velocity(self, behavior_data: List[BehaviorData]) -> float:
-        """计算转化速度"""
-        if len(behavior_data) < 2:
-            return 0.0
+        columns: BehaviorColumns
+    ) -> Tuple[List[Dict[str, Any]], List[float]]:
+        """分析访问模式，同时返回基于访问时间分布的行为一致性评分"""
+        customer = columns.session_customer
+        customer_count = len(columns.customer_ids)
         
-        # 计算从首次访问到转化的平均时间
-        first_visit = min(data.timestamp for data in behavior_data)
-        conversion_times = []
+        # 访问时间分布
+        hour_counts, hour_peaks = self._time_distribution(customer, columns.hours, 24, customer_count)
+        day_counts, day_peaks = self._time_distribution(customer, columns.weekdays, 7, customer_count)
         
-        for data in behavior_data:
-            if data.conversion_indicators:
-                time_to_conversion = (data.timestamp - first_visit).total_seconds() / 3600  # 小时
-                conversion_times.append(time_to_conversion)
+        # 一致性评分(熵越低，一致性越高)
+        hour_consistency = 1 - _entropy(hour_counts) / np.log2(24)
+        day_consistency = 1 - _entropy(day_counts) / np.log2(7)
+        consistency_scores = ((hour_consistency + day_consistency) / 2).tolist()
+        
+        # 页面访问频率
+        page_session = np.repeat(np.arange(len(columns.session_ids)), columns.page_counts)
+        page_customer = customer[page_session]
+        page_vocabulary = len(columns.pages)
+        pages = np.array(columns.pages, dtype=object)
+        page_keys, page_frequencies, page_bounds, unique_pages = _ranked_groups(
+            page_customer, page_customer * page_vocabulary + columns.page_codes, customer_count, 5
+        )
+        page_names = pages[page_keys % page_vocabulary].tolist()
+        
+        # 相邻页面组成的访问路径
+        same_session = page_session[:-1] == page_session[1:]
+        pair_keys = (
+            page_customer[:-1][same_session] * page_vocabulary + columns.page_codes[:-1][same_session]
+        ) * page_vocabulary + columns.page_codes[1:][same_session]
+        pair_keys, pair_frequencies, pair_bounds, _ = _ranked_groups(
+            page_customer[:-1][same_session], pair_keys, customer_count, 5
+        )
+        pair_sources = pages[pair_keys // page_vocabulary % page_vocabulary].tolist()
+        pair_targets = pages[pair_keys % page_vocabulary].tolist()
+        path_counts = _customer_sum(customer, columns.page_counts > 0, customer_count).tolist()
+        
+        access_patterns = []
+        for index, (hour_row, day_row, hour_peak, day_peak, unique_count) in enumerate(zip(
+            hour_counts.tolist(), day_counts.tolist(), hour_peaks.tolist(), day_peaks.tolist(), unique_pages.tolist()
+        )):
+            page_start, page_end = page_bounds[index], page_bounds[index + 1]
+            path_start, path_end = pair_bounds[index], pair_bounds[index + 1]
+            access_patterns.append({
+                'peak_access_hour': hour_peak,
+                'peak_access_day': day_peak,
+                'hour_distribution': {hour: count for hour, count in enumerate(hour_row) if count},
+                'day_distribution': {day: count for day, count in enumerate(day_row) if count},
+                'top_pages': list(zip(page_names[page_start:page_end], page_frequencies[page_start:page_end])),
+                'unique_pages_visited': unique_count,
+                'common_access_paths': [
+                    {'path': [source, target], 'frequency': frequency, 'percentage': frequency / path_counts[index]}
+                    for source, target, frequency in zip(
+                        pair_sources[path_start:path_end], pair_targets[path_start:path_end],
+                        pair_frequencies[path_start:path_end]
+                    )
+                ]
+            })
         
-        return np.mean(conversion_times) if conversion_times else 0.0
+        return access_patterns, consistency_scores
     
-    async def _detect_behavior_anomalies(
-        self, 
-        behavior_data: List[BehaviorData]
-    ) -> List[Dict[str, Any]]:
-        """检测行为异常"""
-        anomalies = []
-        
-        if not behavior_data:
-            return anomalies
-        
-        # 计算基准指标
-        engagement_scores = [data.engagement_score for data in behavior_data]
-        avg_engagement = np.mean(engagement_scores)
-        std_engagement = np.std(engagement_scores)
+    @staticmethod
+    def _time_distribution(
+        customer: np.ndarray,
+        values: np.ndarray,
+        buckets: int,
+        customer_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """按客户统计时间分布，返回 (分布矩阵, 访问最多的时间段)；次数相同时取最先出现的"""
+        keys = customer * buckets + values
+        counts = np.bincount(keys, minlength=customer_count * buckets).reshape(customer_count, buckets)
+        
+        unique_keys, first_seen = np.unique(keys, return_index=True)
+        first_seen_matrix = np.full(customer_count * buckets, len(keys), dtype=np.int64)
+        first_seen_matrix[unique_keys] = first_seen
+        first_seen_matrix = first_seen_matrix.reshape(customer_count, buckets)
+        
+        ranking = counts * (len(keys) + 1) - first_seen_matrix
+        return counts, ranking.argmax(axis=1)
+    
+    def _calculate_conversion_metrics(self, columns: BehaviorColumns) -> List[Dict[str, Any]]:
+        """计算转化指标"""
+        customer = columns.session_customer
+        customer_count = len(columns.customer_ids)
+        sessions = columns.sessions_per_customer
+        
+        conversion_customer = np.repeat(customer, columns.conversion_counts)
+        total_events = np.bincount(conversion_customer, minlength=customer_count)
+        unique_events = np.zeros(customer_count, dtype=np.int64)
+        if len(conversion_customer):
+            unique_keys = np.unique(conversion_customer * len(columns.conversion_indicators) + columns.conversion_codes)
+            unique_events = np.bincount(unique_keys // len(columns.conversion_indicators), minlength=customer_count)
+        
+        # 漏斗阶段：每个不同的转化指标只匹配一次
+        stage_names = [name for _, name in FUNNEL_STAGE_KEYWORDS]
+        indicator_stages = np.array([
+            next((position for position, (keyword, _) in enumerate(FUNNEL_STAGE_KEYWORDS) if keyword in indicator), -1)
+            for indicator in columns.conversion_indicators
+        ], dtype=np.int64)
+        event_stages = indicator_stages[columns.conversion_codes] if len(indicator_stages) else columns.conversion_codes
+        matched = event_stages >= 0
+        funnel_counts = np.bincount(
+            conversion_customer[matched] * len(stage_names) + event_stages[matched],
+            minlength=customer_count * len(stage_names)
+        ).reshape(customer_count, len(stage_names))
+        
+        # 转化速度：从首次访问到发生转化的会话的平均小时数
+        first_visit = np.minimum.reduceat(columns.timestamps, columns.customer_offsets[:-1])
+        converted = columns.conversion_counts > 0
+        hours_to_conversion = (columns.timestamps - first_visit[customer]) / 3600
+        converted_sessions = _customer_sum(customer, converted, customer_count)
+        velocity = np.divide(
+            _customer_sum(customer, np.where(converted, hours_to_conversion, 0.0), customer_count),
+            converted_sessions,
+            out=np.zeros(customer_count),
+            where=(converted_sessions > 0) & (sessions >= 2)
+        )
         
-        session_durations = [
-            sum(data.time_spent.values()) for data in behavior_data
+        return [
+            {
+                'conversion_rate': unique_count / session_count,
+                'total_conversion_events': total_count,
+                'unique_conversion_events': unique_count,
+                'funnel_stages': {stage_names[stage]: count for stage, count in enumerate(stage_counts) if count},
+                'conversion_velocity': customer_velocity
+            }
+            for unique_count, session_count, total_count, stage_counts, customer_velocity in zip(
+                unique_events.tolist(), sessions.tolist(), total_events.tolist(),
+                funnel_counts.tolist(), velocity.tolist()
+            )
         ]
-        avg_duration = np.mean(session_durations)
-        std_duration = np.std(session_durations)
-        
-        # 检测异常
-        for i, data in enumerate(behavior_data):
-            session_duration = sum(data.time_spent.values())
-            
-            # 参与度异常
-            if abs(data.engagement_score - avg_engagement) > 2 * std_engagement:
-                anomalies.append({
-                    'type': 'engagement_anomaly',
-                    'session_id': data.session_id,
-                    'value': data.engagement_score,
-                    'expected_range': [avg_engagement - std_engagement, avg_engagement + std_engagement],
-                    'severity': 'high' if abs(data.engagement_score - avg_engagement) > 3 * std_engagement else 'medium'
-                })
-            
-            # 会话时长异常
-            if abs(session_duration - avg_duration) > 2 * std_duration:
-                anomalies.append({
-                    'type': 'duration_anomaly',
-                    'session_id': data.session_id,
-                    'value': session_duration,
-                    'expected_range': [avg_duration - std_duration, avg_duration + std_duration],
-                    'severity': 'high' if abs(session_duration - avg_duration) > 3 * std_duration else 'medium'
-                })
+    
+    def _detect_behavior_anomalies(self, columns: BehaviorColumns) -> List[List[Dict[str, Any]]]:
+        """检测行为异常（参与度和会话时长按客户计算z-score）"""
+        customer = columns.session_customer
+        customer_count = len(columns.customer_ids)
+        anomalies: List[List[Dict[str, Any]]] = [[] for _ in range(customer_count)]
+        
+        checks = []
+        for anomaly_type, values in (
+            ('engagement_anomaly', columns.engagement),
+            ('duration_anomaly', columns.durations)
+        ):
+            mean = _customer_sum(customer, values, customer_count) / columns.sessions_per_customer
+            deviation = np.abs(values - mean[customer])
+            std = np.sqrt(_customer_sum(customer, deviation ** 2, customer_count) / columns.sessions_per_customer)
+            checks.append((anomaly_type, values, mean, std, deviation > 2 * std[customer], deviation > 3 * std[customer]))
+        excessive = columns.page_counts > EXCESSIVE_PAGE_VIEWS
+        
+        flagged = excessive.copy()
+        for check in checks:
+            flagged |= check[4]
+        
+        for session in np.flatnonzero(flagged).tolist():
+            owner = customer[session]
+            for anomaly_type, values, mean, std, is_anomaly, is_severe in checks:
+                if is_anomaly[session]:
+                    anomalies[owner].append({
+                        'type': anomaly_type,
+                        'session_id': columns.session_ids[session],
+                        'value': float(values[session]),
+                        'expected_range': [float(mean[owner] - std[owner]), float(mean[owner] + std[owner])],
+                        'severity': 'high' if is_severe[session] else 'medium'
+                    })
             
             # 异常访问模式
-            if len(data.page_views) > 50:  # 单次会话页面浏览过多
-                anomalies.append({
+            if excessive[session]:
+                anomalies[owner].append({
                     'type': 'excessive_browsing',
-                    'session_id': data.session_id,
-                    'value': len(data.page_views),
+                    'session_id': columns.session_ids[session],
+                    'value': int(columns.page_counts[session]),
                     'severity': 'medium'
                 })
         
@@ -310,7 +486,8 @@ class BehaviorAnalysisService:
         self,
         engagement_metrics: Dict[str, float],
         access_patterns: Dict[str, Any],
-        conversion_metrics: Dict[str, Any]
+        conversion_metrics: Dict[str, Any],
+        behavior_consistency: float = 0.0
     ) -> Dict[str, Any]:
         """生成行为画像"""
         # 计算综合评分
@@ -349,7 +526,7 @@ class BehaviorAnalysisService:
                 'hour': access_patterns.get('peak_access_hour', 9),
                 'day': access_patterns.get('peak_access_day', 1)
             },
-            'behavior_consistency': self._calculate_consistency_score(access_patterns),
+            'behavior_consistency': behavior_consistency,
             'digital_maturity': self._assess_digital_maturity(engagement_metrics)
         }
     
@@ -406,38 +583,6 @@ class BehaviorAnalysisService:
             'confidence': min(1.0, intent_score + 0.1)
         }
     
-    def _calculate_consistency_score(self, access_patterns: Dict[str, Any]) -> float:
-        """计算行为一致性评分"""
-        # 基于访问时间分布的一致性
-        hour_dist = access_patterns.get('hour_distribution', {})
-        day_dist = access_patterns.get('day_distribution', {})
-        
-        if not hour_dist or not day_dist:
-            return 0.0
-        
-        # 计算时间分布的集中度
-        hour_entropy = self._calculate_entropy(list(hour_dist.values()))
-        day_entropy = self._calculate_entropy(list(day_dist.values()))
-        
-        # 一致性评分(熵越低，一致性越高)
-        max_hour_entropy = np.log2(24)  # 24小时的最大熵
-        max_day_entropy = np.log2(7)    # 7天的最大熵
-        
-        hour_consistency = 1 - (hour_entropy / max_hour_entropy)
-        day_consistency = 1 - (day_entropy / max_day_entropy)
-        
-        return (hour_consistency + day_consistency) / 2
-    
-    def _calculate_entropy(self, values: List[int]) -> float:
-        """计算熵值"""
-        if not values or sum(values) == 0:
-            return 0.0
-        
-        total = sum(values)
-        probabilities = [v / total for v in values if v > 0]
-        
-        return -sum(p * np.log2(p) for p in probabilities)
-    
     def _assess_digital_maturity(self, engagement_metrics: Dict[str, float]) -> str:
         """评估数字化成熟度"""
         avg_session_duration = engagement_metrics.get('average_session_duration', 0)
@@ -9,6 +9,7 @@ from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from dataclasses import dataclass
 
+from src.core.lazy import LazyService, ServiceProxy
 from src.services.hybrid_search_service import hybrid_search_service, HybridSearchResult, SearchMode
 from src.services.embedding_service import embedding_service
 
@@ -443,5 +444,7 @@ class ChineseSemanticSearchService:
             return {'primary_intent': 'search', 'keywords': []}
 
 
-# 全局中文语义搜索服务实例
-chinese_search_service = ChineseSemanticSearchService()
\ No newline at end of file
+# 全局中文语义搜索服务实例（首次访问时创建）
+_chinese_search_service = LazyService(ChineseSemanticSearchService)
+get_chinese_search_service = _chinese_search_service.get
+chinese_search_service = ServiceProxy(_chinese_search_service)
@@ -15,7 +15,7 @@ from src.schemas.conversation import (
     MessageCreate, MessageResponse, ConversationHistory,
     ConversationStateUpdate
 )
-from src.services.conversation_state_tracker import ConversationStateTracker
+from src.services.conversation_state_tracker import ConversationStateTracker, conversation_state_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +25,7 @@ class ConversationService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.state_tracker = ConversationStateTracker(db)
+        self.state_tracker = ConversationStateTracker(db, cache=conversation_state_cache)
     
     async def get_conversations(
         self, 
@@ -298,6 +298,10 @@ class ConversationService:
             logger.error(f"Error getting conversation history {conversation_id}: {str(e)}")
             return None
     
+    def state_turn(self, conversation_id: str):
+        """对话轮次上下文，轮次内的状态修改合并为一次写入"""
+        return self.state_tracker.turn(conversation_id)
+    
     async def update_conversation_state(
         self, 
         conversation_id: str, 
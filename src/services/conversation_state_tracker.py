@@ -3,13 +3,20 @@
 """
 
 from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+import copy
 import json
 import logging
+import time
+import redis.asyncio as redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func, cast, literal, Text
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import selectinload
 
+from src.core.config import settings
 from src.models.conversation import Conversation, Message, ConversationState, ConversationStatus, MessageRole
 from src.schemas.conversation import (
     ConversationContext, ConversationState as ConversationStateSchema,
@@ -18,15 +25,164 @@ from src.schemas.conversation import (
 
 logger = logging.getLogger(__name__)
 
+# 可由ConversationStateUpdate更新的状态列
+STATE_COLUMNS = (
+    "current_task", "current_agent", "context_variables", "flow_state", "step_history",
+    "last_intent", "entities", "short_term_memory", "long_term_memory"
+)
+# 可按键做局部更新的JSON字典列
+DICT_COLUMNS = ("context_variables", "entities", "short_term_memory", "long_term_memory")
+
+
+class ConversationStateCache:
+    """对话状态缓存
+
+    进程内LRU为一级缓存，可选Redis为多进程共享的二级缓存，值为状态列的快照字典。
+    状态写入提交后同步刷新缓存（write-through），TTL只用于兜底绕过跟踪器的写入。
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 300,
+        redis_client: Optional[redis.Redis] = None,
+        key_prefix: str = "conversation_state:"
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+    
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """获取状态快照副本，未命中返回None"""
+        if self.ttl_seconds <= 0:
+            return None
+        
+        entry = self._entries.get(conversation_id)
+        if entry is not None:
+            expires_at, snapshot = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(conversation_id)
+                return copy.deepcopy(snapshot)
+            self._entries.pop(conversation_id, None)
+        
+        if self.redis_client is None:
+            return None
+        
+        try:
+            data = await self.redis_client.get(self.key_prefix + conversation_id)
+        except Exception as e:
+            logger.warning(f"Error reading conversation state cache from redis: {str(e)}")
+            return None
+        if not data:
+            return None
+        
+        snapshot = json.loads(data)
+        self._set_local(conversation_id, snapshot)
+        return copy.deepcopy(snapshot)
+    
+    async def set(self, conversation_id: str, snapshot: Dict[str, Any]) -> None:
+        """写入状态快照"""
+        if self.ttl_seconds <= 0:
+            return
+        
+        self._set_local(conversation_id, copy.deepcopy(snapshot))
+        
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(
+                    self.key_prefix + conversation_id,
+                    json.dumps(snapshot, default=str, ensure_ascii=False),
+                    ex=self.ttl_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Error writing conversation state cache to redis: {str(e)}")
+    
+    async def invalidate(self, conversation_id: Optional[str] = None) -> None:
+        """使单个对话或全部缓存失效"""
+        if conversation_id is None:
+            self._entries.clear()
+            return
+        
+        self._entries.pop(conversation_id, None)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.delete(self.key_prefix + conversation_id)
+            except Exception as e:
+                logger.warning(f"Error invalidating conversation state cache in redis: {str(e)}")
+    
+    def _set_local(self, conversation_id: str, snapshot: Dict[str, Any]) -> None:
+        self._entries[conversation_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _build_state_cache() -> ConversationStateCache:
+    redis_client = None
+    if settings.CONVERSATION_STATE_CACHE_REDIS:
+        from src.core.database import redis_client
+    return ConversationStateCache(
+        max_entries=settings.CONVERSATION_STATE_CACHE_SIZE,
+        ttl_seconds=settings.CONVERSATION_STATE_CACHE_TTL,
+        redis_client=redis_client,
+        key_prefix=f"{settings.CACHE_PREFIX}conversation_state:"
+    )
+
+
+# 全局对话状态缓存实例
+conversation_state_cache = _build_state_cache()
+
 
 class ConversationStateTracker:
-    """对话状态跟踪器"""
+    """对话状态跟踪器
+    
+    读取优先命中状态缓存；在turn()内的多次状态修改只记录脏列，
+    退出时合并为一条UPDATE提交，PostgreSQL上字典列按键做JSONB局部更新。
+    """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: Optional[ConversationStateCache] = None):
         self.db = db
+        self.cache = cache
         self.context_memory_limit = 50  # 上下文记忆限制
         self.short_term_memory_ttl = timedelta(hours=2)  # 短期记忆TTL
         self.long_term_memory_threshold = 5  # 长期记忆阈值
+        
+        # 进行中的轮次: 对话ID -> 嵌套深度
+        self._turns: Dict[str, int] = {}
+        # 轮次内的工作快照，None表示基线未知
+        self._snapshots: Dict[str, Optional[Dict[str, Any]]] = {}
+        # 待写入的脏列: 对话ID -> {"values": 列完整值, "patches": 列键级差异}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+    
+    @asynccontextmanager
+    async def turn(self, conversation_id: str):
+        """对话轮次：合并期间的状态修改，正常退出时一次写入，异常时丢弃"""
+        key = str(conversation_id)
+        if key not in self._turns:
+            self._snapshots[key] = await self.cache.get(key) if self.cache else None
+        self._turns[key] = self._turns.get(key, 0) + 1
+        
+        failed = False
+        try:
+            yield self
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._turns[key] -= 1
+            if self._turns[key] == 0:
+                del self._turns[key]
+                if failed:
+                    self._pending.pop(key, None)
+                    self._snapshots.pop(key, None)
+        
+        if key not in self._turns:
+            success = await self._flush(conversation_id)
+            self._snapshots.pop(key, None)
+            if not success:
+                raise RuntimeError(f"Failed to persist conversation state for conversation {conversation_id}")
     
     async def initialize_conversation_state(
         self, 
@@ -65,6 +221,9 @@ class ConversationStateTracker:
             await self.db.commit()
             await self.db.refresh(conversation_state)
             
+            if self.cache:
+                await self.cache.set(str(conversation_id), self._snapshot(conversation_state))
+            
             logger.info(f"Initialized conversation state for conversation {conversation_id}")
             return conversation_state
             
@@ -74,13 +233,30 @@ class ConversationStateTracker:
             raise
     
     async def get_conversation_state(self, conversation_id: str) -> Optional[ConversationState]:
-        """获取对话状态"""
+        """获取对话状态，优先使用轮次快照和状态缓存"""
+        key = str(conversation_id)
         try:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None and self.cache:
+                snapshot = await self.cache.get(key)
+            if snapshot is not None:
+                if key in self._turns:
+                    self._snapshots[key] = snapshot
+                return ConversationState(**copy.deepcopy(snapshot))
+            
             result = await self.db.execute(
                 select(ConversationState)
                 .where(ConversationState.conversation_id == conversation_id)
             )
-            return result.scalar_one_or_none()
+            state = result.scalar_one_or_none()
+            
+            if state is not None:
+                snapshot = self._snapshot(state)
+                if key in self._turns:
+                    self._snapshots[key] = copy.deepcopy(snapshot)
+                if self.cache:
+                    await self.cache.set(key, snapshot)
+            return state
         except Exception as e:
             logger.error(f"Error getting conversation state: {str(e)}")
             return None
@@ -90,54 +266,29 @@ class ConversationStateTracker:
         conversation_id: str, 
         state_update: ConversationStateUpdate
     ) -> bool:
-        """更新对话状态"""
-        try:
-            # 构建更新字典
-            update_data = {}
-            
-            if state_update.current_task is not None:
-                update_data["current_task"] = state_update.current_task
-            
-            if state_update.current_agent is not None:
-                update_data["current_agent"] = state_update.current_agent
-            
-            if state_update.context_variables is not None:
-                update_data["context_variables"] = state_update.context_variables
-            
-            if state_update.flow_state is not None:
-                update_data["flow_state"] = state_update.flow_state
-            
-            if state_update.last_intent is not None:
-                update_data["last_intent"] = state_update.last_intent
-            
-            if state_update.entities is not None:
-                update_data["entities"] = state_update.entities
-            
-            if state_update.short_term_memory is not None:
-                update_data["short_term_memory"] = state_update.short_term_memory
-            
-            if state_update.long_term_memory is not None:
-                update_data["long_term_memory"] = state_update.long_term_memory
-            
-            if update_data:
-                update_data["updated_at"] = datetime.utcnow()
-                
-                await self.db.execute(
-                    update(ConversationState)
-                    .where(ConversationState.conversation_id == conversation_id)
-                    .values(**update_data)
-                )
-                await self.db.commit()
-                
-                logger.info(f"Updated conversation state for conversation {conversation_id}")
-                return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error updating conversation state: {str(e)}")
-            await self.db.rollback()
+        """更新对话状态，轮次内只记录脏列，轮次外立即写入"""
+        # 构建更新字典
+        update_data = {
+            column: getattr(state_update, column)
+            for column in STATE_COLUMNS
+            if getattr(state_update, column) is not None
+        }
+        
+        if not update_data:
             return False
+        
+        key = str(conversation_id)
+        if key not in self._turns:
+            try:
+                async with self.turn(conversation_id):
+                    self._record_update(key, update_data)
+                return True
+            except Exception as e:
+                logger.error(f"Error updating conversation state: {str(e)}")
+                return False
+        
+        self._record_update(key, update_data)
+        return True
     
     async def add_to_context(
         self, 
@@ -210,8 +361,9 @@ class ConversationStateTracker:
             
             short_term[key] = memory_item
             
-            # 清理过期的短期记忆
-            short_term = self._clean_expired_memory(short_term)
+            # 过期项在读取时惰性移除，只有超出容量时才整体清理
+            if len(short_term) > self.context_memory_limit:
+                short_term = self._clean_expired_memory(short_term)
             
             return await self.update_conversation_state(
                 conversation_id,
@@ -511,4 +663,104 @@ class ConversationStateTracker:
             
         except Exception as e:
             logger.error(f"Error removing short term memory: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _record_update(self, key: str, update_data: Dict[str, Any]) -> None:
+        """记录脏列；基线快照已知时按键计算字典列差异"""
+        pending = self._pending.setdefault(key, {"values": {}, "patches": {}})
+        snapshot = self._snapshots.get(key)
+        
+        for column, value in update_data.items():
+            value = copy.deepcopy(value)
+            base = snapshot.get(column) if snapshot is not None else None
+            
+            if column in DICT_COLUMNS:
+                patches = pending["patches"]
+                can_patch = (
+                    isinstance(base, dict)
+                    and isinstance(value, dict)
+                    and (column not in pending["values"] or column in patches)
+                )
+                if can_patch:
+                    patch = patches.setdefault(column, {"set": {}, "removed": set()})
+                    for item_key, item_value in value.items():
+                        if item_key not in base or base[item_key] != item_value:
+                            patch["set"][item_key] = item_value
+                            patch["removed"].discard(item_key)
+                    for item_key in base.keys() - value.keys():
+                        patch["set"].pop(item_key, None)
+                        patch["removed"].add(item_key)
+                else:
+                    patches.pop(column, None)
+            
+            pending["values"][column] = value
+            if snapshot is not None:
+                snapshot[column] = copy.deepcopy(value)
+    
+    async def _flush(self, conversation_id: str) -> bool:
+        """把待写入的脏列合并为一条UPDATE并提交，成功后刷新缓存"""
+        key = str(conversation_id)
+        pending = self._pending.pop(key, None)
+        if not pending or not pending["values"]:
+            return True
+        
+        values = dict(pending["values"])
+        if self._supports_jsonb_patch():
+            for column, patch in pending["patches"].items():
+                values[column] = self._jsonb_patch_expression(column, patch)
+        values["updated_at"] = datetime.utcnow()
+        
+        try:
+            await self.db.execute(
+                update(ConversationState)
+                .where(ConversationState.conversation_id == conversation_id)
+                .values(**values)
+            )
+            await self.db.commit()
+        except Exception as e:
+            logger.error(f"Error flushing conversation state: {str(e)}")
+            await self.db.rollback()
+            if self.cache:
+                await self.cache.invalidate(key)
+            return False
+        
+        if self.cache:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                await self.cache.set(key, snapshot)
+            else:
+                await self.cache.invalidate(key)
+        
+        logger.info(f"Updated conversation state for conversation {key}")
+        return True
+    
+    def _supports_jsonb_patch(self) -> bool:
+        try:
+            return self.db.get_bind().dialect.name == "postgresql"
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _jsonb_patch_expression(column: str, patch: Dict[str, Any]):
+        """构建 (coalesce(col::jsonb, '{}') || :set - :removed)::json 局部更新表达式"""
+        expression = func.coalesce(
+            cast(getattr(ConversationState, column), JSONB), cast(literal("{}", Text), JSONB)
+        )
+        if patch["set"]:
+            expression = expression.op("||")(
+                cast(literal(json.dumps(patch["set"], default=str, ensure_ascii=False), Text), JSONB)
+            )
+        if patch["removed"]:
+            expression = expression.op("-")(literal(sorted(patch["removed"]), ARRAY(Text)))
+        return cast(expression, ConversationState.__table__.c[column].type)
+    
+    @staticmethod
+    def _snapshot(state: ConversationState) -> Dict[str, Any]:
+        """提取状态行的可缓存快照"""
+        snapshot = {
+            "id": str(state.id) if state.id is not None else None,
+            "conversation_id": str(state.conversation_id) if state.conversation_id is not None else None,
+        }
+        for column in STATE_COLUMNS:
+            snapshot[column] = copy.deepcopy(getattr(state, column))
+        return snapshot
@@ -14,6 +14,7 @@ from elasticsearch.exceptions import (
 )
 
 from src.core.config import settings
+from src.core.lazy import LazyService, ServiceProxy
 
 logger = logging.getLogger(__name__)
 
@@ -606,5 +607,7 @@ class ElasticsearchService:
                 logger.error(f"关闭Elasticsearch连接失败: {e}")
 
 
-# 全局Elasticsearch服务实例
-elasticsearch_service = ElasticsearchService()
\ No newline at end of file
+# 全局Elasticsearch服务实例（首次访问时创建）
+_elasticsearch_service = LazyService(ElasticsearchService)
+get_elasticsearch_service = _elasticsearch_service.get
+elasticsearch_service = ServiceProxy(_elasticsearch_service)
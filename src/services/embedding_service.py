@@ -7,8 +7,6 @@ import logging
 import sys
 from typing import List, Dict, Any, Optional, Union
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import torch
 from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import json
@@ -19,9 +17,22 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", message="`encoder_attention_mask` is deprecated")
 
 from src.core.config import settings
+from src.core.lazy import LazyService, ServiceProxy
 
 logger = logging.getLogger(__name__)
 
+# sentence_transformers会连带导入torch，耗时数秒，延迟到首次加载模型时导入
+SentenceTransformer = None
+
+
+def _sentence_transformer_class():
+    """按需导入SentenceTransformer"""
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        from sentence_transformers import SentenceTransformer as sentence_transformer_class
+        SentenceTransformer = sentence_transformer_class
+    return SentenceTransformer
+
 
 class EmbeddingService:
     """
@@ -31,57 +42,68 @@ class EmbeddingService:
     """
     
     def __init__(self):
-        self.model: Optional[SentenceTransformer] = None
-        self.reranker_model: Optional[SentenceTransformer] = None
+        self.model: Optional[Any] = None
+        self.reranker_model: Optional[Any] = None
         self.executor = ThreadPoolExecutor(max_workers=2)
         self._model_loaded = False
         self._reranker_loaded = False
+        # 后台预热与首个请求可能同时触发加载，加锁保证每个模型只加载一次
+        self._model_lock = asyncio.Lock()
+        self._reranker_lock = asyncio.Lock()
         self.cache: Dict[str, np.ndarray] = {}
         self.max_cache_size = 1000
         
     async def initialize(self) -> None:
         """初始化嵌入模型"""
-        try:
-            logger.info("正在初始化BGE-M3嵌入模型...")
-            
-            # 在线程池中加载模型以避免阻塞
-            loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(
-                self.executor,
-                self._load_embedding_model
-            )
-            self._model_loaded = True
+        async with self._model_lock:
+            if self._model_loaded:
+                return
             
-            logger.info(f"BGE-M3嵌入模型初始化完成，设备: {settings.BGE_DEVICE}")
-            
-        except Exception as e:
-            logger.error(f"初始化嵌入模型失败: {e}")
-            raise
+            try:
+                logger.info("正在初始化BGE-M3嵌入模型...")
+                
+                # 在线程池中加载模型以避免阻塞
+                loop = asyncio.get_event_loop()
+                self.model = await loop.run_in_executor(
+                    self.executor,
+                    self._load_embedding_model
+                )
+                self._model_loaded = True
+                
+                logger.info(f"BGE-M3嵌入模型初始化完成，设备: {settings.BGE_DEVICE}")
+                
+            except Exception as e:
+                logger.error(f"初始化嵌入模型失败: {e}")
+                raise
     
     async def initialize_reranker(self) -> None:
         """初始化重排序模型"""
-        try:
-            logger.info("正在初始化BGE重排序模型...")
-            
-            loop = asyncio.get_event_loop()
-            self.reranker_model = await loop.run_in_executor(
-                self.executor,
-                self._load_reranker_model
-            )
-            self._reranker_loaded = True
-            
-            logger.info("BGE重排序模型初始化完成")
+        async with self._reranker_lock:
+            if self._reranker_loaded:
+                return
             
-        except Exception as e:
-            logger.error(f"初始化重排序模型失败: {e}")
-            raise
+            try:
+                logger.info("正在初始化BGE重排序模型...")
+                
+                loop = asyncio.get_event_loop()
+                self.reranker_model = await loop.run_in_executor(
+                    self.executor,
+                    self._load_reranker_model
+                )
+                self._reranker_loaded = True
+                
+                logger.info("BGE重排序模型初始化完成")
+                
+            except Exception as e:
+                logger.error(f"初始化重排序模型失败: {e}")
+                raise
     
-    def _load_embedding_model(self) -> SentenceTransformer:
+    def _load_embedding_model(self) -> Any:
         """加载嵌入模型"""
         try:
             # Suppress specific deprecation warnings from transformers
             warnings.filterwarnings("ignore", message="`encoder_attention_mask` is deprecated", category=FutureWarning)
-            model = SentenceTransformer(
+            model = _sentence_transformer_class()(
                 settings.BGE_MODEL_NAME,
                 device=settings.BGE_DEVICE
             )
@@ -95,12 +117,12 @@ class EmbeddingService:
             logger.error(f"加载BGE-M3模型失败: {e}")
             raise
     
-    def _load_reranker_model(self) -> SentenceTransformer:
+    def _load_reranker_model(self) -> Any:
         """加载重排序模型"""
         try:
             # Suppress specific deprecation warnings from transformers
             warnings.filterwarnings("ignore", message="`encoder_attention_mask` is deprecated", category=FutureWarning)
-            model = SentenceTransformer(
+            model = _sentence_transformer_class()(
                 settings.BGE_RERANKER_MODEL,
                 device=settings.BGE_DEVICE
             )
@@ -423,5 +445,7 @@ class EmbeddingService:
         logger.info("嵌入服务已关闭")
 
 
-# 全局嵌入服务实例
-embedding_service = EmbeddingService()
+# 全局嵌入服务实例（首次访问时创建）
+_embedding_service = LazyService(EmbeddingService)
+get_embedding_service = _embedding_service.get
+embedding_service = ServiceProxy(_embedding_service)
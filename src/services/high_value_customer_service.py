@@ -2,7 +2,9 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Union
 import numpy as np
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -27,10 +29,304 @@ class ValueScoringWeights:
     demographic_weight: float = 0.15
     voice_sentiment_weight: float = 0.05
 
+@dataclass(frozen=True)
+class ValueIndicatorSpec:
+    """价值指标定义"""
+    name: str
+    source_modality: DataModalityType
+    weight: float
+    confidence: float
+    calculation_method: str
+
+# 价值指标定义，顺序即画像中指标的顺序（行为、交易、参与度、人口统计、语音情感）
+VALUE_INDICATORS = [
+    ValueIndicatorSpec("visit_frequency", DataModalityType.BEHAVIOR, 0.3, 0.9, "visits_per_day_normalized"),
+    ValueIndicatorSpec("average_engagement", DataModalityType.BEHAVIOR, 0.4, 0.95, "mean_engagement_score"),
+    ValueIndicatorSpec("session_depth", DataModalityType.BEHAVIOR, 0.2, 0.85, "average_page_views_normalized"),
+    ValueIndicatorSpec("conversion_activity", DataModalityType.BEHAVIOR, 0.1, 0.8, "total_conversions_normalized"),
+    ValueIndicatorSpec("company_size", DataModalityType.TEXT, 0.4, 0.95, "categorical_mapping"),
+    ValueIndicatorSpec("industry_value", DataModalityType.TEXT, 0.3, 0.8, "industry_classification"),
+    ValueIndicatorSpec("customer_status", DataModalityType.TEXT, 0.3, 0.9, "status_mapping"),
+    ValueIndicatorSpec("digital_engagement", DataModalityType.BEHAVIOR, 0.6, 0.9, "mean_digital_engagement"),
+    ValueIndicatorSpec("voice_engagement", DataModalityType.VOICE, 0.4, 0.8, "composite_voice_engagement"),
+    ValueIndicatorSpec("location_value", DataModalityType.TEXT, 0.5, 0.7, "city_tier_classification"),
+    ValueIndicatorSpec("company_stability", DataModalityType.TEXT, 0.5, 0.6, "company_age_assessment"),
+    ValueIndicatorSpec("sentiment_positivity", DataModalityType.VOICE, 0.4, 0.8, "positive_sentiment_ratio"),
+    ValueIndicatorSpec("voice_clarity", DataModalityType.VOICE, 0.3, 0.9, "average_transcription_confidence"),
+    ValueIndicatorSpec("intent_clarity", DataModalityType.VOICE, 0.3, 0.7, "intent_detection_ratio"),
+]
+INDICATOR_INDEX = {spec.name: index for index, spec in enumerate(VALUE_INDICATORS)}
+
+# 特征矩阵的列：行为和语音数据为按客户聚合的计数/求和，客户基础信息为映射后的评分
+FEATURE_COLUMNS = [
+    'windowed_sessions', 'windowed_engagement_sum', 'windowed_page_views_sum', 'windowed_conversions',
+    'sessions', 'engagement_sum',
+    'size_score', 'industry_score', 'status_score', 'location_score', 'stability_score',
+    'voice_calls', 'voice_engagement_sum', 'voice_positive', 'voice_confidence_sum', 'voice_intents'
+]
+FEATURE_INDEX = {name: index for index, name in enumerate(FEATURE_COLUMNS)}
+
+COMPANY_SIZE_SCORES = {
+    'startup': 0.2,
+    'small': 0.4,
+    'medium': 0.6,
+    'large': 0.8,
+    'enterprise': 1.0
+}
+HIGH_VALUE_INDUSTRIES = {'finance', 'technology', 'healthcare', 'manufacturing', 'retail'}
+CUSTOMER_STATUS_SCORES = {
+    'prospect': 0.3,
+    'qualified': 0.6,
+    'customer': 0.9,
+    'inactive': 0.1
+}
+# 地理位置价值，一线城市给予更高评分，其他城市为0.6
+CITY_TIER_SCORES = {
+    **{city: 1.0 for city in ('北京', '上海', '广州', '深圳')},
+    **{city: 0.8 for city in ('杭州', '南京', '成都', '武汉', '西安', '苏州')}
+}
+SENTIMENT_ENGAGEMENT = {'positive': 1.0, 'neutral': 0.5}
+
+
+def _company_stability_score(founded_year: Optional[int], current_year: int) -> float:
+    """公司成立时间(稳定性指标)，3-20年的公司给予较高评分"""
+    if not founded_year:
+        return 0.5
+    company_age = current_year - founded_year
+    if 3 <= company_age <= 20:
+        return 0.9
+    elif company_age > 20:
+        return 0.8
+    return 0.6
+
+
+@dataclass
+class CustomerFeatureMatrix:
+    """
+    客户 × 特征矩阵
+
+    每行一个客户，列见 FEATURE_COLUMNS。各列都是普通的计数、求和和映射评分，
+    也可以直接由数据库聚合查询的结果构造。
+    """
+    customer_ids: List[str]
+    features: np.ndarray
+    window_days: int = 30
+
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+
+    @classmethod
+    def build(
+        cls,
+        customer_data: List[Dict[str, Any]],
+        behavior_data: List[BehaviorData],
+        voice_data: List[VoiceAnalysisResult],
+        time_window: Optional[timedelta] = None
+    ) -> "CustomerFeatureMatrix":
+        """按列提取客户基础数据，行为和语音数据各遍历一次，构建特征矩阵"""
+        # 客户基础数据（同一客户ID出现多次时保留首次出现的位置、使用最后一条数据）
+        records = [customer for customer in customer_data if customer.get('id')]
+        rows = dict(zip([customer['id'] for customer in records], range(len(records))))
+        if len(rows) < len(records):
+            records = [records[index] for index in rows.values()]
+            rows = dict(zip(rows, range(len(rows))))
+        
+        customer_count = len(rows)
+        features = np.zeros((customer_count, len(FEATURE_COLUMNS)), order='F')
+        if not customer_count:
+            return cls(customer_ids=[], features=features)
+        
+        current_year = datetime.now().year
+        founded_years = [customer.get('founded_year') for customer in records]
+        stability_scores = {year: _company_stability_score(year, current_year) for year in set(founded_years)}
+        for column, scores in (
+            ('size_score', [COMPANY_SIZE_SCORES.get(customer.get('size', 'small'), 0.4) for customer in records]),
+            ('industry_score', [
+                0.8 if (customer.get('industry') or 'unknown').lower() in HIGH_VALUE_INDUSTRIES else 0.4
+                for customer in records
+            ]),
+            ('status_score', [CUSTOMER_STATUS_SCORES.get(customer.get('status', 'prospect'), 0.3) for customer in records]),
+            ('location_score', [
+                CITY_TIER_SCORES.get((customer.get('location') or {}).get('city', ''), 0.6) for customer in records
+            ]),
+            ('stability_score', [stability_scores[year] for year in founded_years])
+        ):
+            features[:, FEATURE_INDEX[column]] = scores
+        
+        # 行为数据
+        cutoff_time = datetime.now() - time_window if time_window else None
+        behavior_rows, windowed, engagement, page_views, conversions = [], [], [], [], []
+        for behavior in behavior_data:
+            row = rows.get(behavior.customer_id)
+            if row is None:
+                continue
+            behavior_rows.append(row)
+            windowed.append(cutoff_time is None or behavior.timestamp >= cutoff_time)
+            engagement.append(behavior.engagement_score)
+            page_views.append(len(behavior.page_views))
+            conversions.append(len(behavior.conversion_indicators))
+
+        if behavior_rows:
+            behavior_rows = np.array(behavior_rows)
+            windowed = np.array(windowed, dtype=np.float64)
+            engagement = np.array(engagement, dtype=np.float64)
+            for column, weights in (
+                ('windowed_sessions', windowed),
+                ('windowed_engagement_sum', engagement * windowed),
+                ('windowed_page_views_sum', np.array(page_views) * windowed),
+                ('windowed_conversions', np.array(conversions) * windowed),
+                ('sessions', None),
+                ('engagement_sum', engagement)
+            ):
+                features[:, FEATURE_INDEX[column]] = np.bincount(
+                    behavior_rows, weights=weights, minlength=customer_count
+                )
+
+        # 语音数据(假设voice_data中包含customer_id)
+        voice_rows, voice_engagement, positive, confidence, intents = [], [], [], [], []
+        for voice in voice_data:
+            # 这里需要根据实际数据结构调整
+            row = rows.get(getattr(voice, 'customer_id', None))
+            if row is None:
+                continue
+            voice_rows.append(row)
+            # 综合考虑置信度、情感和意图
+            voice_engagement.append(
+                voice.confidence * 0.4 +
+                SENTIMENT_ENGAGEMENT.get(voice.sentiment, 0.2) * 0.3 +
+                (1.0 if voice.intent else 0.5) * 0.3
+            )
+            positive.append(voice.sentiment == 'positive')
+            confidence.append(voice.confidence)
+            intents.append(bool(voice.intent))
+
+        if voice_rows:
+            for column, weights in (
+                ('voice_calls', None),
+                ('voice_engagement_sum', voice_engagement),
+                ('voice_positive', np.array(positive, dtype=np.float64)),
+                ('voice_confidence_sum', confidence),
+                ('voice_intents', np.array(intents, dtype=np.float64))
+            ):
+                features[:, FEATURE_INDEX[column]] = np.bincount(
+                    voice_rows, weights=weights, minlength=customer_count
+                )
+
+        return cls(
+            customer_ids=list(rows),
+            features=features,
+            window_days=max(1, time_window.days if time_window else 30)
+        )
+
+
+def score_feature_matrix(
+    features: np.ndarray,
+    window_days: int,
+    weights: ValueScoringWeights
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    向量化计算所有价值指标和加权综合评分
+
+    模块级函数，便于在进程池中对矩阵分片执行。
+
+    Returns:
+        (指标值矩阵, 指标是否存在的掩码, 综合评分)，指标列顺序同 VALUE_INDICATORS
+    """
+    column = lambda name: features[:, FEATURE_INDEX[name]]
+    windowed_sessions = column('windowed_sessions')
+    sessions = column('sessions')
+    voice_calls = column('voice_calls')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        windowed_mean = lambda name: column(name) / windowed_sessions
+        voice_mean = lambda name: column(name) / voice_calls
+        indicator_values = {
+            'visit_frequency': np.minimum(1.0, windowed_sessions / window_days / 5),
+            'average_engagement': windowed_mean('windowed_engagement_sum'),
+            'session_depth': np.minimum(1.0, windowed_mean('windowed_page_views_sum') / 20),
+            'conversion_activity': np.minimum(1.0, column('windowed_conversions') / 10),
+            'company_size': column('size_score'),
+            'industry_value': column('industry_score'),
+            'customer_status': column('status_score'),
+            'digital_engagement': column('engagement_sum') / sessions,
+            'voice_engagement': voice_mean('voice_engagement_sum'),
+            'location_value': column('location_score'),
+            'company_stability': column('stability_score'),
+            'sentiment_positivity': voice_mean('voice_positive'),
+            'voice_clarity': voice_mean('voice_confidence_sum'),
+            'intent_clarity': voice_mean('voice_intents'),
+        }
+
+    presence_by_modality = {
+        DataModalityType.BEHAVIOR: windowed_sessions > 0,
+        DataModalityType.TEXT: np.ones(len(features), dtype=bool),
+        DataModalityType.VOICE: voice_calls > 0
+    }
+    # 指标按行排列 (指标数 × 客户数)，每个指标的数据连续存放
+    present = np.stack([presence_by_modality[spec.source_modality] for spec in VALUE_INDICATORS])
+    # 数字化参与度不受时间窗口限制
+    present[INDICATOR_INDEX['digital_engagement']] = sessions > 0
+    values = np.stack([indicator_values[spec.name] for spec in VALUE_INDICATORS])
+    values[~present] = 0.0
+
+    # 各模态的加权评分
+    weighted_confidence = np.array([spec.weight * spec.confidence for spec in VALUE_INDICATORS])
+    modality_scores = {}
+    modality_present = {}
+    for modality in (DataModalityType.BEHAVIOR, DataModalityType.TEXT, DataModalityType.VOICE):
+        columns = [index for index, spec in enumerate(VALUE_INDICATORS) if spec.source_modality == modality]
+        total_weight = weighted_confidence[columns] @ present[columns]
+        modality_scores[modality] = (weighted_confidence[columns] @ values[columns]) / np.maximum(total_weight, 0.001)
+        modality_present[modality] = present[columns].any(axis=0)
+
+    # 应用模态权重；没有某些模态的数据时按比例调整权重
+    final_score = (
+        modality_scores[DataModalityType.BEHAVIOR] * weights.behavioral_weight +
+        modality_scores[DataModalityType.TEXT] * weights.transactional_weight +
+        modality_scores[DataModalityType.VOICE] * weights.voice_sentiment_weight
+    )
+    available_weight = (
+        modality_present[DataModalityType.BEHAVIOR] * weights.behavioral_weight +
+        modality_present[DataModalityType.TEXT] * (weights.transactional_weight + weights.demographic_weight) +
+        modality_present[DataModalityType.VOICE] * weights.voice_sentiment_weight
+    )
+    final_score = np.divide(final_score, available_weight, out=final_score, where=available_weight > 0)
+
+    return values.T, present.T, np.clip(final_score, 0.0, 1.0)
+
+
+@dataclass
+class CustomerValueScores:
+    """批量价值评分结果"""
+    customer_ids: List[str]
+    scores: np.ndarray
+    indicator_values: np.ndarray
+    indicator_present: np.ndarray
+
+    def indicators(self, row: int) -> List[CustomerValueIndicator]:
+        """第row个客户的价值指标列表"""
+        return [
+            CustomerValueIndicator(
+                indicator_name=spec.name,
+                value=float(self.indicator_values[row, index]),
+                weight=spec.weight,
+                confidence=spec.confidence,
+                source_modality=spec.source_modality,
+                calculation_method=spec.calculation_method
+            )
+            for index, spec in enumerate(VALUE_INDICATORS)
+            if self.indicator_present[row, index]
+        ]
+
+
 class HighValueCustomerService:
     """高价值客户识别服务"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        shard_size: int = settings.HIGH_VALUE_SCORING_SHARD_SIZE,
+        max_workers: int = settings.HIGH_VALUE_SCORING_WORKERS
+    ):
         self.settings = settings
         self.scoring_weights = ValueScoringWeights()
         self.value_thresholds = {
@@ -40,6 +336,9 @@ class HighValueCustomerService:
             'low': 0.30
         }
         self.model_cache = {}
+        self.shard_size = shard_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         
     async def identify_high_value_customers(
         self,
@@ -61,31 +360,38 @@ class HighValueCustomerService:
             List[HighValueCustomerProfile]: 高价值客户画像列表
         """
         try:
-            high_value_customers = []
+            # 批量计算所有客户的价值评分
+            value_scores = await self.score_customers(customer_data, behavior_data, voice_data, time_window)
             
-            # 按客户ID分组数据
-            customer_groups = self._group_data_by_customer(
-                customer_data, behavior_data, voice_data
-            )
+            # 只为达到阈值的客户生成完整画像，按评分排序
+            selected = np.flatnonzero(value_scores.scores >= self.value_thresholds['medium'])
+            selected = selected[np.argsort(-value_scores.scores[selected], kind='stable')]
+            selected_ids = {value_scores.customer_ids[row] for row in selected}
+            
+            # 按客户ID分组画像需要的原始数据
+            grouped_data = {customer_id: {'behavior_data': [], 'voice_data': []} for customer_id in selected_ids}
+            for behavior in behavior_data:
+                if behavior.customer_id in grouped_data:
+                    grouped_data[behavior.customer_id]['behavior_data'].append(behavior)
+            for voice in voice_data:
+                customer_id = getattr(voice, 'customer_id', None)
+                if customer_id in grouped_data:
+                    grouped_data[customer_id]['voice_data'].append(voice)
             
-            for customer_id, grouped_data in customer_groups.items():
+            high_value_customers = []
+            for row in selected.tolist():
+                customer_id = value_scores.customer_ids[row]
                 try:
-                    # 计算客户价值评分
-                    value_profile = await self._calculate_customer_value(
-                        customer_id, grouped_data, time_window
-                    )
-                    
-                    # 判断是否为高价值客户
-                    if value_profile.overall_score >= self.value_thresholds['medium']:
-                        high_value_customers.append(value_profile)
-                        
+                    high_value_customers.append(await self._build_customer_profile(
+                        customer_id,
+                        float(value_scores.scores[row]),
+                        value_scores.indicators(row),
+                        grouped_data[customer_id]
+                    ))
                 except Exception as e:
                     logger.error(f"计算客户 {customer_id} 价值评分失败: {str(e)}")
                     continue
             
-            # 按评分排序
-            high_value_customers.sort(key=lambda x: x.overall_score, reverse=True)
-            
             logger.info(f"识别出 {len(high_value_customers)} 个高价值客户")
             return high_value_customers
             
@@ -93,85 +399,71 @@ class HighValueCustomerService:
             logger.error(f"高价值客户识别失败: {str(e)}")
             raise
     
-    def _group_data_by_customer(
+    async def score_customers(
         self,
         customer_data: List[Dict[str, Any]],
         behavior_data: List[BehaviorData],
-        voice_data: List[VoiceAnalysisResult]
-    ) -> Dict[str, Dict[str, Any]]:
-        """按客户ID分组数据"""
-        groups = {}
-        
-        # 分组客户基础数据
-        for customer in customer_data:
-            customer_id = customer.get('id')
-            if customer_id:
-                groups[customer_id] = {
-                    'customer_info': customer,
-                    'behavior_data': [],
-                    'voice_data': []
-                }
-        
-        # 分组行为数据
-        for behavior in behavior_data:
-            customer_id = behavior.customer_id
-            if customer_id in groups:
-                groups[customer_id]['behavior_data'].append(behavior)
+        voice_data: List[VoiceAnalysisResult],
+        time_window: Optional[timedelta] = None
+    ) -> CustomerValueScores:
+        """
+        批量计算客户价值评分
         
-        # 分组语音数据(假设voice_data中包含customer_id)
-        for voice in voice_data:
-            # 这里需要根据实际数据结构调整
-            customer_id = getattr(voice, 'customer_id', None)
-            if customer_id and customer_id in groups:
-                groups[customer_id]['voice_data'].append(voice)
+        Args:
+            customer_data: 客户基础数据
+            behavior_data: 行为数据
+            voice_data: 语音分析数据
+            time_window: 分析时间窗口
+            
+        Returns:
+            CustomerValueScores: 所有客户的指标和综合评分
+        """
+        matrix = CustomerFeatureMatrix.build(customer_data, behavior_data, voice_data, time_window)
+        return await self.score_feature_matrix(matrix)
+    
+    async def score_feature_matrix(self, matrix: CustomerFeatureMatrix) -> CustomerValueScores:
+        """对特征矩阵评分，客户数超过分片大小时分片到进程池并行计算"""
+        if len(matrix) <= self.shard_size or self.max_workers <= 1:
+            values, present, scores = score_feature_matrix(matrix.features, matrix.window_days, self.scoring_weights)
+        else:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            
+            loop = asyncio.get_running_loop()
+            shards = await asyncio.gather(*[
+                loop.run_in_executor(
+                    self._process_pool, score_feature_matrix,
+                    matrix.features[start:start + self.shard_size], matrix.window_days, self.scoring_weights
+                )
+                for start in range(0, len(matrix), self.shard_size)
+            ])
+            values, present, scores = (np.concatenate(parts) for parts in zip(*shards))
         
-        return groups
+        return CustomerValueScores(
+            customer_ids=matrix.customer_ids,
+            scores=scores,
+            indicator_values=values,
+            indicator_present=present
+        )
     
-    async def _calculate_customer_value(
+    def close(self) -> None:
+        """关闭评分进程池"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+    
+    async def _build_customer_profile(
         self,
         customer_id: str,
-        grouped_data: Dict[str, Any],
-        time_window: Optional[timedelta]
+        overall_score: float,
+        all_indicators: List[CustomerValueIndicator],
+        grouped_data: Dict[str, Any]
     ) -> HighValueCustomerProfile:
-        """计算客户价值评分"""
+        """生成客户价值画像"""
         
-        customer_info = grouped_data['customer_info']
         behavior_data = grouped_data['behavior_data']
         voice_data = grouped_data['voice_data']
         
-        # 计算各维度指标
-        behavioral_indicators = await self._calculate_behavioral_indicators(
-            behavior_data, time_window
-        )
-        
-        transactional_indicators = await self._calculate_transactional_indicators(
-            customer_info
-        )
-        
-        engagement_indicators = await self._calculate_engagement_indicators(
-            behavior_data, voice_data
-        )
-        
-        demographic_indicators = await self._calculate_demographic_indicators(
-            customer_info
-        )
-        
-        voice_sentiment_indicators = await self._calculate_voice_sentiment_indicators(
-            voice_data
-        )
-        
-        # 合并所有指标
-        all_indicators = (
-            behavioral_indicators + 
-            transactional_indicators + 
-            engagement_indicators + 
-            demographic_indicators + 
-            voice_sentiment_indicators
-        )
-        
-        # 计算综合评分
-        overall_score = self._calculate_weighted_score(all_indicators)
-        
         # 生成行为模式分析
         behavioral_patterns = await self._analyze_behavioral_patterns(behavior_data)
         
@@ -182,7 +474,7 @@ class HighValueCustomerService:
         
         # 预测客户价值
         predicted_value = await self._predict_customer_value(
-            all_indicators, behavioral_patterns
+            overall_score, behavioral_patterns
         )
         
         # 识别风险因素
@@ -214,342 +506,6 @@ class HighValueCustomerService:
             last_updated=datetime.now()
         )
     
-    async def _calculate_behavioral_indicators(
-        self,
-        behavior_data: List[BehaviorData],
-        time_window: Optional[timedelta]
-    ) -> List[CustomerValueIndicator]:
-        """计算行为指标"""
-        indicators = []
-        
-        if not behavior_data:
-            return indicators
-        
-        # 过滤时间窗口
-        if time_window:
-            cutoff_time = datetime.now() - time_window
-            behavior_data = [
-                data for data in behavior_data 
-                if data.timestamp >= cutoff_time
-            ]
-        
-        if not behavior_data:
-            return indicators
-        
-        # 访问频率指标
-        visit_frequency = len(behavior_data) / max(1, time_window.days if time_window else 30)
-        indicators.append(CustomerValueIndicator(
-            indicator_name="visit_frequency",
-            value=min(1.0, visit_frequency / 5),  # 标准化到0-1
-            weight=0.3,
-            confidence=0.9,
-            source_modality=DataModalityType.BEHAVIOR,
-            calculation_method="visits_per_day_normalized"
-        ))
-        
-        # 平均参与度
-        avg_engagement = np.mean([data.engagement_score for data in behavior_data])
-        indicators.append(CustomerValueIndicator(
-            indicator_name="average_engagement",
-            value=avg_engagement,
-            weight=0.4,
-            confidence=0.95,
-            source_modality=DataModalityType.BEHAVIOR,
-            calculation_method="mean_engagement_score"
-        ))
-        
-        # 会话深度(平均页面浏览数)
-        avg_page_views = np.mean([len(data.page_views) for data in behavior_data])
-        session_depth_score = min(1.0, avg_page_views / 20)  # 标准化
-        indicators.append(CustomerValueIndicator(
-            indicator_name="session_depth",
-            value=session_depth_score,
-            weight=0.2,
-            confidence=0.85,
-            source_modality=DataModalityType.BEHAVIOR,
-            calculation_method="average_page_views_normalized"
-        ))
-        
-        # 转化指标数量
-        total_conversions = sum(len(data.conversion_indicators) for data in behavior_data)
-        conversion_score = min(1.0, total_conversions / 10)  # 标准化
-        indicators.append(CustomerValueIndicator(
-            indicator_name="conversion_activity",
-            value=conversion_score,
-            weight=0.1,
-            confidence=0.8,
-            source_modality=DataModalityType.BEHAVIOR,
-            calculation_method="total_conversions_normalized"
-        ))
-        
-        return indicators
-    
-    async def _calculate_transactional_indicators(
-        self,
-        customer_info: Dict[str, Any]
-    ) -> List[CustomerValueIndicator]:
-        """计算交易指标"""
-        indicators = []
-        
-        # 公司规模指标
-        company_size = customer_info.get('size', 'small')
-        size_scores = {
-            'startup': 0.2,
-            'small': 0.4,
-            'medium': 0.6,
-            'large': 0.8,
-            'enterprise': 1.0
-        }
-        size_score = size_scores.get(company_size, 0.4)
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="company_size",
-            value=size_score,
-            weight=0.4,
-            confidence=0.95,
-            source_modality=DataModalityType.TEXT,
-            calculation_method="categorical_mapping"
-        ))
-        
-        # 行业价值指标
-        industry = customer_info.get('industry', 'unknown')
-        high_value_industries = [
-            'finance', 'technology', 'healthcare', 'manufacturing', 'retail'
-        ]
-        industry_score = 0.8 if industry.lower() in high_value_industries else 0.4
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="industry_value",
-            value=industry_score,
-            weight=0.3,
-            confidence=0.8,
-            source_modality=DataModalityType.TEXT,
-            calculation_method="industry_classification"
-        ))
-        
-        # 客户状态指标
-        status = customer_info.get('status', 'prospect')
-        status_scores = {
-            'prospect': 0.3,
-            'qualified': 0.6,
-            'customer': 0.9,
-            'inactive': 0.1
-        }
-        status_score = status_scores.get(status, 0.3)
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="customer_status",
-            value=status_score,
-            weight=0.3,
-            confidence=0.9,
-            source_modality=DataModalityType.TEXT,
-            calculation_method="status_mapping"
-        ))
-        
-        return indicators
-    
-    async def _calculate_engagement_indicators(
-        self,
-        behavior_data: List[BehaviorData],
-        voice_data: List[VoiceAnalysisResult]
-    ) -> List[CustomerValueIndicator]:
-        """计算参与度指标"""
-        indicators = []
-        
-        # 数字化参与度
-        if behavior_data:
-            digital_engagement = np.mean([data.engagement_score for data in behavior_data])
-            indicators.append(CustomerValueIndicator(
-                indicator_name="digital_engagement",
-                value=digital_engagement,
-                weight=0.6,
-                confidence=0.9,
-                source_modality=DataModalityType.BEHAVIOR,
-                calculation_method="mean_digital_engagement"
-            ))
-        
-        # 语音参与度
-        if voice_data:
-            # 基于语音分析的参与度
-            voice_engagement_factors = []
-            for voice in voice_data:
-                # 综合考虑置信度、情感和意图
-                engagement_factor = (
-                    voice.confidence * 0.4 +
-                    (1.0 if voice.sentiment == 'positive' else 0.5 if voice.sentiment == 'neutral' else 0.2) * 0.3 +
-                    (1.0 if voice.intent else 0.5) * 0.3
-                )
-                voice_engagement_factors.append(engagement_factor)
-            
-            voice_engagement = np.mean(voice_engagement_factors)
-            indicators.append(CustomerValueIndicator(
-                indicator_name="voice_engagement",
-                value=voice_engagement,
-                weight=0.4,
-                confidence=0.8,
-                source_modality=DataModalityType.VOICE,
-                calculation_method="composite_voice_engagement"
-            ))
-        
-        return indicators
-    
-    async def _calculate_demographic_indicators(
-        self,
-        customer_info: Dict[str, Any]
-    ) -> List[CustomerValueIndicator]:
-        """计算人口统计学指标"""
-        indicators = []
-        
-        # 地理位置价值(假设有地理信息)
-        location = customer_info.get('location', {})
-        city = location.get('city', '')
-        
-        # 一线城市给予更高评分
-        tier1_cities = ['北京', '上海', '广州', '深圳']
-        tier2_cities = ['杭州', '南京', '成都', '武汉', '西安', '苏州']
-        
-        if city in tier1_cities:
-            location_score = 1.0
-        elif city in tier2_cities:
-            location_score = 0.8
-        else:
-            location_score = 0.6
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="location_value",
-            value=location_score,
-            weight=0.5,
-            confidence=0.7,
-            source_modality=DataModalityType.TEXT,
-            calculation_method="city_tier_classification"
-        ))
-        
-        # 公司成立时间(稳定性指标)
-        founded_year = customer_info.get('founded_year')
-        if founded_year:
-            company_age = datetime.now().year - founded_year
-            # 3-20年的公司给予较高评分
-            if 3 <= company_age <= 20:
-                stability_score = 0.9
-            elif company_age > 20:
-                stability_score = 0.8
-            else:
-                stability_score = 0.6
-        else:
-            stability_score = 0.5
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="company_stability",
-            value=stability_score,
-            weight=0.5,
-            confidence=0.6,
-            source_modality=DataModalityType.TEXT,
-            calculation_method="company_age_assessment"
-        ))
-        
-        return indicators
-    
-    async def _calculate_voice_sentiment_indicators(
-        self,
-        voice_data: List[VoiceAnalysisResult]
-    ) -> List[CustomerValueIndicator]:
-        """计算语音情感指标"""
-        indicators = []
-        
-        if not voice_data:
-            return indicators
-        
-        # 整体情感倾向
-        positive_count = sum(1 for voice in voice_data if voice.sentiment == 'positive')
-        sentiment_ratio = positive_count / len(voice_data)
-        
-        indicators.append(CustomerValueIndicator(
-            indicator_name="sentiment_positivity",
-            value=sentiment_ratio,
-            weight=0.4,
-            confidence=0.8,
-            source_modality=DataModalityType.VOICE,
-            calculation_method="positive_sentiment_ratio"
-        ))
-        
-        # 语音质量和清晰度
-        avg_confidence = np.mean([voice.confidence for voice in voice_data])
-        indicators.append(CustomerValueIndicator(
-            indicator_name="voice_clarity",
-            value=avg_confidence,
-            weight=0.3,
-            confidence=0.9,
-            source_modality=DataModalityType.VOICE,
-            calculation_method="average_transcription_confidence"
-        ))
-        
-        # 意图明确性
-        intent_clarity = sum(1 for voice in voice_data if voice.intent) / len(voice_data)
-        indicators.append(CustomerValueIndicator(
-            indicator_name="intent_clarity",
-            value=intent_clarity,
-            weight=0.3,
-            confidence=0.7,
-            source_modality=DataModalityType.VOICE,
-            calculation_method="intent_detection_ratio"
-        ))
-        
-        return indicators
-    
-    def _calculate_weighted_score(
-        self,
-        indicators: List[CustomerValueIndicator]
-    ) -> float:
-        """计算加权综合评分"""
-        if not indicators:
-            return 0.0
-        
-        # 按模态分组
-        modality_groups = {}
-        for indicator in indicators:
-            modality = indicator.source_modality
-            if modality not in modality_groups:
-                modality_groups[modality] = []
-            modality_groups[modality].append(indicator)
-        
-        # 计算各模态的加权评分
-        modality_scores = {}
-        for modality, group_indicators in modality_groups.items():
-            total_weighted_value = sum(
-                indicator.value * indicator.weight * indicator.confidence
-                for indicator in group_indicators
-            )
-            total_weight = sum(
-                indicator.weight * indicator.confidence
-                for indicator in group_indicators
-            )
-            modality_scores[modality] = total_weighted_value / max(total_weight, 0.001)
-        
-        # 应用模态权重
-        final_score = 0.0
-        weights = self.scoring_weights
-        
-        final_score += modality_scores.get(DataModalityType.BEHAVIOR, 0) * weights.behavioral_weight
-        final_score += modality_scores.get(DataModalityType.TEXT, 0) * weights.transactional_weight
-        final_score += modality_scores.get(DataModalityType.INTERACTION, 0) * weights.engagement_weight
-        final_score += modality_scores.get(DataModalityType.VOICE, 0) * weights.voice_sentiment_weight
-        
-        # 如果没有某些模态的数据，按比例调整权重
-        available_weight = 0
-        if DataModalityType.BEHAVIOR in modality_scores:
-            available_weight += weights.behavioral_weight
-        if DataModalityType.TEXT in modality_scores:
-            available_weight += weights.transactional_weight + weights.demographic_weight
-        if DataModalityType.INTERACTION in modality_scores:
-            available_weight += weights.engagement_weight
-        if DataModalityType.VOICE in modality_scores:
-            available_weight += weights.voice_sentiment_weight
-        
-        if available_weight > 0:
-            final_score = final_score / available_weight
-        
-        return min(1.0, max(0.0, final_score))
-    
     async def _analyze_behavioral_patterns(
         self,
         behavior_data: List[BehaviorData]
@@ -669,12 +625,11 @@ class HighValueCustomerService:
     
     async def _predict_customer_value(
         self,
-        indicators: List[CustomerValueIndicator],
+        current_score: float,
         behavioral_patterns: Dict[str, Any]
     ) -> float:
         """预测客户价值"""
-        # 基于当前指标和行为模式预测未来价值
-        current_score = self._calculate_weighted_score(indicators)
+        # 基于当前评分和行为模式预测未来价值
         
         # 趋势调整
         engagement_trend = behavioral_patterns.get('engagement_trend', 'stable')
@@ -847,27 +802,34 @@ class HighValueCustomerService:
     
     async def get_value_distribution(
         self,
-        customer_profiles: List[HighValueCustomerProfile]
+        customer_profiles: Union[List[HighValueCustomerProfile], CustomerValueScores]
     ) -> Dict[str, Any]:
-        """获取价值分布统计"""
-        if not customer_profiles:
-            return {}
+        """
+        获取价值分布统计
+        
+        Args:
+            customer_profiles: 客户画像列表，或 score_customers 返回的批量评分结果
+        """
+        if isinstance(customer_profiles, CustomerValueScores):
+            scores = customer_profiles.scores
+        else:
+            scores = np.array([profile.overall_score for profile in customer_profiles], dtype=np.float64)
         
-        scores = [profile.overall_score for profile in customer_profiles]
+        if not len(scores):
+            return {}
         
-        # 按价值等级分类
-        value_distribution = {
-            'very_high': sum(1 for score in scores if score >= self.value_thresholds['very_high']),
-            'high': sum(1 for score in scores if self.value_thresholds['high'] <= score < self.value_thresholds['very_high']),
-            'medium': sum(1 for score in scores if self.value_thresholds['medium'] <= score < self.value_thresholds['high']),
-            'low': sum(1 for score in scores if score < self.value_thresholds['medium'])
-        }
+        # 按价值等级分类：low < medium <= ... < high <= ... < very_high <= ...
+        bins = [self.value_thresholds['medium'], self.value_thresholds['high'], self.value_thresholds['very_high']]
+        level_counts = np.bincount(np.searchsorted(bins, scores, side='right'), minlength=4)
+        value_distribution = dict(zip(['low', 'medium', 'high', 'very_high'], level_counts.tolist()))
         
         return {
-            'total_customers': len(customer_profiles),
-            'value_distribution': value_distribution,
-            'average_score': np.mean(scores),
-            'median_score': np.median(scores),
-            'score_std': np.std(scores),
-            'top_10_percent_threshold': np.percentile(scores, 90)
+            'total_customers': len(scores),
+            'value_distribution': {
+                level: value_distribution[level] for level in ('very_high', 'high', 'medium', 'low')
+            },
+            'average_score': float(np.mean(scores)),
+            'median_score': float(np.median(scores)),
+            'score_std': float(np.std(scores)),
+            'top_10_percent_threshold': float(np.percentile(scores, 90))
         }
\ No newline at end of file
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 
+from src.core.lazy import LazyService, ServiceProxy
 from src.services.vector_service import vector_service, VectorDocument, VectorSearchResult
 from src.services.elasticsearch_service import (
     elasticsearch_service, ElasticsearchDocument, ElasticsearchSearchResult
@@ -630,5 +631,7 @@ class HybridSearchService:
             logger.error(f"关闭混合搜索服务失败: {e}")
 
 
-# 全局混合搜索服务实例
-hybrid_search_service = HybridSearchService()
\ No newline at end of file
+# 全局混合搜索服务实例（首次访问时创建）
+_hybrid_search_service = LazyService(HybridSearchService)
+get_hybrid_search_service = _hybrid_search_service.get
+hybrid_search_service = ServiceProxy(_hybrid_search_service)
@@ -22,6 +22,7 @@ from langchain.schema.output import ChatResult, ChatGeneration
 from langchain.schema.messages import BaseMessage as LangChainBaseMessage
 
 from src.core.config import settings
+from src.core.lazy import LazyService, ServiceProxy
 
 logger = logging.getLogger(__name__)
 
@@ -896,8 +897,11 @@ class EnhancedLLMService:
         }
 
 
-# 全局增强LLM服务实例
-enhanced_llm_service = EnhancedLLMService()
+# 全局增强LLM服务实例（首次访问时创建）
+_enhanced_llm_service = LazyService(EnhancedLLMService)
+get_llm_service = _enhanced_llm_service.get
+
+enhanced_llm_service = ServiceProxy(_enhanced_llm_service)
 
 # 保持向后兼容
 llm_service = enhanced_llm_service
@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
 import numpy as np
 from datetime import datetime, timedelta
 import json
@@ -31,6 +31,13 @@ class FusionConfig:
     confidence_threshold: float = 0.6
     max_processing_time: int = 300  # 秒
 
+@dataclass
+class CustomerBatchResult:
+    """批量分析中单个客户的处理结果"""
+    customer_id: str
+    result: Optional[MultimodalAnalysisResult] = None
+    error: Optional[str] = None
+
 class MultimodalFusionService:
     """多模态数据融合服务"""
     
@@ -45,13 +52,15 @@ class MultimodalFusionService:
         
     async def process_multimodal_analysis(
         self,
-        request: MultimodalAnalysisRequest
+        request: MultimodalAnalysisRequest,
+        preloaded_data: Optional[Dict[DataModalityType, List[Any]]] = None
     ) -> MultimodalAnalysisResult:
         """
         处理多模态分析请求
         
         Args:
             request: 多模态分析请求
+            preloaded_data: 已整批加载的模态数据，这些模态不再单独收集
             
         Returns:
             MultimodalAnalysisResult: 分析结果
@@ -65,7 +74,8 @@ class MultimodalFusionService:
             multimodal_data = await self._collect_multimodal_data(
                 request.customer_id,
                 request.modalities,
-                request.time_range
+                request.time_range,
+                preloaded_data
             )
             
             # 数据预处理
@@ -129,48 +139,42 @@ class MultimodalFusionService:
         self,
         customer_id: str,
         modalities: List[DataModalityType],
-        time_range: Dict[str, datetime]
+        time_range: Dict[str, datetime],
+        preloaded_data: Optional[Dict[DataModalityType, List[Any]]] = None
     ) -> Dict[DataModalityType, List[Any]]:
         """收集多模态数据"""
-        data_collection = {}
-        
-        # 并行收集各种模态的数据
-        collection_tasks = []
-        
-        if DataModalityType.TEXT in modalities:
-            collection_tasks.append(
-                self._collect_text_data(customer_id, time_range)
-            )
-        
-        if DataModalityType.VOICE in modalities:
-            collection_tasks.append(
-                self._collect_voice_data(customer_id, time_range)
-            )
-        
-        if DataModalityType.BEHAVIOR in modalities:
-            collection_tasks.append(
-                self._collect_behavior_data(customer_id, time_range)
-            )
-        
-        if DataModalityType.INTERACTION in modalities:
-            collection_tasks.append(
-                self._collect_interaction_data(customer_id, time_range)
-            )
+        collectors = {
+            DataModalityType.TEXT: self._collect_text_data,
+            DataModalityType.VOICE: self._collect_voice_data,
+            DataModalityType.BEHAVIOR: self._collect_behavior_data,
+            DataModalityType.INTERACTION: self._collect_interaction_data
+        }
+        preloaded_data = preloaded_data or {}
+        data_collection = {
+            modality: preloaded_data[modality]
+            for modality in modalities if modality in preloaded_data
+        }
         
-        # 等待所有数据收集完成
-        results = await asyncio.gather(*collection_tasks, return_exceptions=True)
+        # 并行收集其余模态的数据
+        pending_modalities = [
+            modality for modality in modalities
+            if modality in collectors and modality not in data_collection
+        ]
+        results = await asyncio.gather(
+            *[collectors[modality](customer_id, time_range) for modality in pending_modalities],
+            return_exceptions=True
+        )
         
         # 整理结果
-        modality_list = [m for m in modalities]
-        for i, result in enumerate(results):
-            if not isinstance(result, Exception) and i < len(modality_list):
-                data_collection[modality_list[i]] = result
-            elif isinstance(result, Exception):
-                logger.warning(f"收集 {modality_list[i] if i < len(modality_list) else 'unknown'} 数据失败: {str(result)}")
-                if i < len(modality_list):
-                    data_collection[modality_list[i]] = []
-        
-        return data_collection
+        for modality, result in zip(pending_modalities, results):
+            if isinstance(result, Exception):
+                logger.warning(f"收集 {modality.value} 数据失败: {str(result)}")
+                data_collection[modality] = []
+            else:
+                data_collection[modality] = result
+        
+        # 保持请求中的模态顺序
+        return {modality: data_collection[modality] for modality in modalities if modality in data_collection}
     
     async def _collect_text_data(
         self,
@@ -259,71 +263,83 @@ class MultimodalFusionService:
         time_range: Dict[str, datetime]
     ) -> List[BehaviorData]:
         """收集行为数据"""
-        # 模拟行为数据收集
-        behavior_data = [
-            BehaviorData(
-                customer_id=customer_id,
-                session_id=f"session_{customer_id}_1",
-                page_views=[
-                    {"url": "/products", "timestamp": datetime.now() - timedelta(hours=2), "duration": 120},
-                    {"url": "/pricing", "timestamp": datetime.now() - timedelta(hours=2, minutes=-5), "duration": 180},
-                    {"url": "/demo", "timestamp": datetime.now() - timedelta(hours=2, minutes=-10), "duration": 300}
-                ],
-                click_events=[
-                    {"element": "demo_button", "timestamp": datetime.now() - timedelta(hours=2, minutes=-10)},
-                    {"element": "pricing_link", "timestamp": datetime.now() - timedelta(hours=2, minutes=-5)},
-                    {"element": "contact_form", "timestamp": datetime.now() - timedelta(hours=2, minutes=-2)}
-                ],
-                time_spent={
-                    "/products": 120.0,
-                    "/pricing": 180.0,
-                    "/demo": 300.0
-                },
-                interaction_patterns={
-                    "scroll_depth": 0.85,
-                    "click_through_rate": 0.75,
-                    "form_completion": True
-                },
-                engagement_score=0.82,
-                conversion_indicators=["demo_request", "contact_form_filled"],
-                timestamp=datetime.now() - timedelta(hours=2)
-            ),
-            BehaviorData(
-                customer_id=customer_id,
-                session_id=f"session_{customer_id}_2",
-                page_views=[
-                    {"url": "/case-studies", "timestamp": datetime.now() - timedelta(hours=24), "duration": 240},
-                    {"url": "/features", "timestamp": datetime.now() - timedelta(hours=24, minutes=-8), "duration": 200}
-                ],
-                click_events=[
-                    {"element": "case_study_download", "timestamp": datetime.now() - timedelta(hours=24, minutes=-5)},
-                    {"element": "feature_comparison", "timestamp": datetime.now() - timedelta(hours=24, minutes=-3)}
-                ],
-                time_spent={
-                    "/case-studies": 240.0,
-                    "/features": 200.0
-                },
-                interaction_patterns={
-                    "scroll_depth": 0.92,
-                    "click_through_rate": 0.68,
-                    "form_completion": False
-                },
-                engagement_score=0.75,
-                conversion_indicators=["resource_download"],
-                timestamp=datetime.now() - timedelta(hours=24)
-            )
-        ]
-        
+        behavior_by_customer = await self._collect_behavior_data_bulk([customer_id], time_range)
+        return behavior_by_customer[customer_id]
+    
+    async def _collect_behavior_data_bulk(
+        self,
+        customer_ids: List[str],
+        time_range: Dict[str, datetime]
+    ) -> Dict[str, List[BehaviorData]]:
+        """整批收集多个客户的行为数据"""
         # 过滤时间范围
         start_time = time_range.get('start', datetime.now() - timedelta(days=30))
         end_time = time_range.get('end', datetime.now())
         
-        filtered_data = [
-            data for data in behavior_data
-            if start_time <= data.timestamp <= end_time
-        ]
+        # 模拟行为数据收集
+        # 在实际实现中，这里会按客户ID列表一次查询整批客户的数据
+        behavior_by_customer = {}
+        for customer_id in customer_ids:
+            behavior_data = [
+                BehaviorData(
+                    customer_id=customer_id,
+                    session_id=f"session_{customer_id}_1",
+                    page_views=[
+                        {"url": "/products", "timestamp": datetime.now() - timedelta(hours=2), "duration": 120},
+                        {"url": "/pricing", "timestamp": datetime.now() - timedelta(hours=2, minutes=-5), "duration": 180},
+                        {"url": "/demo", "timestamp": datetime.now() - timedelta(hours=2, minutes=-10), "duration": 300}
+                    ],
+                    click_events=[
+                        {"element": "demo_button", "timestamp": datetime.now() - timedelta(hours=2, minutes=-10)},
+                        {"element": "pricing_link", "timestamp": datetime.now() - timedelta(hours=2, minutes=-5)},
+                        {"element": "contact_form", "timestamp": datetime.now() - timedelta(hours=2, minutes=-2)}
+                    ],
+                    time_spent={
+                        "/products": 120.0,
+                        "/pricing": 180.0,
+                        "/demo": 300.0
+                    },
+                    interaction_patterns={
+                        "scroll_depth": 0.85,
+                        "click_through_rate": 0.75,
+                        "form_completion": True
+                    },
+                    engagement_score=0.82,
+                    conversion_indicators=["demo_request", "contact_form_filled"],
+                    timestamp=datetime.now() - timedelta(hours=2)
+                ),
+                BehaviorData(
+                    customer_id=customer_id,
+                    session_id=f"session_{customer_id}_2",
+                    page_views=[
+                        {"url": "/case-studies", "timestamp": datetime.now() - timedelta(hours=24), "duration": 240},
+                        {"url": "/features", "timestamp": datetime.now() - timedelta(hours=24, minutes=-8), "duration": 200}
+                    ],
+                    click_events=[
+                        {"element": "case_study_download", "timestamp": datetime.now() - timedelta(hours=24, minutes=-5)},
+                        {"element": "feature_comparison", "timestamp": datetime.now() - timedelta(hours=24, minutes=-3)}
+                    ],
+                    time_spent={
+                        "/case-studies": 240.0,
+                        "/features": 200.0
+                    },
+                    interaction_patterns={
+                        "scroll_depth": 0.92,
+                        "click_through_rate": 0.68,
+                        "form_completion": False
+                    },
+                    engagement_score=0.75,
+                    conversion_indicators=["resource_download"],
+                    timestamp=datetime.now() - timedelta(hours=24)
+                )
+            ]
+            
+            behavior_by_customer[customer_id] = [
+                data for data in behavior_data
+                if start_time <= data.timestamp <= end_time
+            ]
         
-        return filtered_data
+        return behavior_by_customer
     
     async def _collect_interaction_data(
         self,
@@ -331,38 +347,50 @@ class MultimodalFusionService:
         time_range: Dict[str, datetime]
     ) -> List[Dict[str, Any]]:
         """收集交互数据"""
-        # 模拟交互数据收集
-        interaction_data = [
-            {
-                'id': f'interaction_{customer_id}_1',
-                'type': 'email',
-                'direction': 'inbound',
-                'content': '询问产品功能详情',
-                'timestamp': datetime.now() - timedelta(days=1),
-                'response_time': 3600,  # 1小时响应
-                'satisfaction_score': 0.8
-            },
-            {
-                'id': f'interaction_{customer_id}_2',
-                'type': 'phone_call',
-                'direction': 'outbound',
-                'content': '产品演示预约',
-                'timestamp': datetime.now() - timedelta(hours=6),
-                'response_time': 0,
-                'satisfaction_score': 0.9
-            }
-        ]
-        
+        interaction_by_customer = await self._collect_interaction_data_bulk([customer_id], time_range)
+        return interaction_by_customer[customer_id]
+    
+    async def _collect_interaction_data_bulk(
+        self,
+        customer_ids: List[str],
+        time_range: Dict[str, datetime]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """整批收集多个客户的交互数据"""
         # 过滤时间范围
         start_time = time_range.get('start', datetime.now() - timedelta(days=30))
         end_time = time_range.get('end', datetime.now())
         
-        filtered_data = [
-            data for data in interaction_data
-            if start_time <= data['timestamp'] <= end_time
-        ]
+        # 模拟交互数据收集
+        # 在实际实现中，这里会按客户ID列表一次查询整批客户的数据
+        interaction_by_customer = {}
+        for customer_id in customer_ids:
+            interaction_data = [
+                {
+                    'id': f'interaction_{customer_id}_1',
+                    'type': 'email',
+                    'direction': 'inbound',
+                    'content': '询问产品功能详情',
+                    'timestamp': datetime.now() - timedelta(days=1),
+                    'response_time': 3600,  # 1小时响应
+                    'satisfaction_score': 0.8
+                },
+                {
+                    'id': f'interaction_{customer_id}_2',
+                    'type': 'phone_call',
+                    'direction': 'outbound',
+                    'content': '产品演示预约',
+                    'timestamp': datetime.now() - timedelta(hours=6),
+                    'response_time': 0,
+                    'satisfaction_score': 0.9
+                }
+            ]
+            
+            interaction_by_customer[customer_id] = [
+                data for data in interaction_data
+                if start_time <= data['timestamp'] <= end_time
+            ]
         
-        return filtered_data
+        return interaction_by_customer
     
     async def _preprocess_data(
         self,
@@ -1119,112 +1147,6 @@ class MultimodalFusionService:
         
         return results
     
-    async def batch_process_customers(
-        self,
-        customer_ids: List[str],
-        analysis_type: str = 'high_value_identification'
-    ) -> Dict[str, MultimodalAnalysisResult]:
-        """批量处理客户"""
-        
-        results = {}
-        
-        # 并行处理多个客户
-        tasks = []
-        for customer_id in customer_ids:
-            request = MultimodalAnalysisRequest(
-                customer_id=customer_id,
-                analysis_type=analysis_type,
-                modalities=[
-                    DataModalityType.TEXT,
-                    DataModalityType.VOICE,
-                    DataModalityType.BEHAVIOR,
-                    DataModalityType.INTERACTION
-                ],
-                time_range={
-                    'start': datetime.now() - timedelta(days=30),
-                    'end': datetime.now()
-                }
-            )
-            tasks.append(self.process_multimodal_analysis(request))
-        
-        # 等待所有任务完成
-        task_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 整理结果
-        for i, result in enumerate(task_results):
-            customer_id = customer_ids[i]
-            if isinstance(result, Exception):
-                logger.error(f"客户 {customer_id} 处理失败: {str(result)}")
-            else:
-                results[customer_id] = result
-        
-        return results
-        anomalies = []
-        
-        # 检测各种异常模式
-        
-        # 1. 参与度异常
-        if DataModalityType.BEHAVIOR in processed_data:
-            behavior_points = processed_data[DataModalityType.BEHAVIOR]
-            if behavior_points:
-                engagement_scores = [
-                    point.processed_data.get('engagement_score', 0.5) 
-                    for point in behavior_points
-                ]
-                if len(engagement_scores) > 1:
-                    std_engagement = np.std(engagement_scores)
-                    if std_engagement > 0.3:
-                        anomalies.append("客户参与度波动较大，行为不一致")
-        
-        # 2. 情感不一致
-        text_sentiment = None
-        voice_sentiment = None
-        
-        if DataModalityType.TEXT in processed_data:
-            text_points = processed_data[DataModalityType.TEXT]
-            if text_points:
-                text_sentiment = np.mean([
-                    1.0 if point.processed_data.get('sentiment') == 'positive' 
-                    else 0.5 if point.processed_data.get('sentiment') == 'neutral' 
-                    else 0.0
-                    for point in text_points
-                ])
-        
-        if DataModalityType.VOICE in processed_data:
-            voice_points = processed_data[DataModalityType.VOICE]
-            if voice_points:
-                voice_sentiment = np.mean([
-                    1.0 if point.raw_data.get('sentiment') == 'positive' 
-                    else 0.5 if point.raw_data.get('sentiment') == 'neutral' 
-                    else 0.0
-                    for point in voice_points
-                ])
-        
-        if text_sentiment is not None and voice_sentiment is not None:
-            if abs(text_sentiment - voice_sentiment) > 0.4:
-                anomalies.append("文本和语音情感表达不一致")
-        
-        # 3. 时间异常
-        all_timestamps = []
-        for modality_points in processed_data.values():
-            for point in modality_points:
-                all_timestamps.append(point.timestamp)
-        
-        if len(all_timestamps) > 1:
-            # 检查是否有异常的时间间隔
-            sorted_timestamps = sorted(all_timestamps)
-            intervals = [
-                (sorted_timestamps[i+1] - sorted_timestamps[i]).total_seconds() / 3600
-                for i in range(len(sorted_timestamps) - 1)
-            ]
-            
-            if any(interval > 168 for interval in intervals):  # 超过一周
-                anomalies.append("客户交互存在异常长的时间间隔")
-        
-        return anomalies
-    
-
-    
     async def _perform_high_value_analysis(
         self,
         fusion_result: DataFusionResult,
@@ -1439,42 +1361,128 @@ class MultimodalFusionService:
         customer_ids: List[str],
         analysis_type: str = 'high_value_identification',
         time_window: Optional[timedelta] = None
-    ) -> List[MultimodalAnalysisResult]:
-        """批量处理客户分析"""
+    ) -> Dict[str, MultimodalAnalysisResult]:
+        """批量处理客户分析，返回成功处理的客户结果"""
         
-        results = []
+        result_dict = {}
+        async for item in self.stream_process_customers(customer_ids, analysis_type, time_window):
+            if item.result is not None:
+                result_dict[item.customer_id] = item.result
         
-        # 并行处理多个客户
-        tasks = []
-        for customer_id in customer_ids:
-            request = MultimodalAnalysisRequest(
-                customer_id=customer_id,
-                analysis_type=analysis_type,
-                modalities=[
-                    DataModalityType.TEXT,
-                    DataModalityType.VOICE,
-                    DataModalityType.BEHAVIOR,
-                    DataModalityType.INTERACTION
-                ],
-                time_range={
-                    'start': datetime.now() - (time_window or timedelta(days=30)),
-                    'end': datetime.now()
-                }
-            )
-            tasks.append(self.process_multimodal_analysis(request))
+        logger.info(f"批量处理完成，成功处理 {len(result_dict)}/{len(customer_ids)} 个客户")
         
-        # 等待所有任务完成
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return result_dict
+    
+    async def stream_process_customers(
+        self,
+        customer_ids: List[str],
+        analysis_type: str = 'high_value_identification',
+        time_window: Optional[timedelta] = None,
+        max_concurrency: int = settings.MULTIMODAL_BATCH_CONCURRENCY,
+        customer_timeout: Optional[float] = None,
+        load_size: int = settings.MULTIMODAL_BATCH_LOAD_SIZE
+    ) -> AsyncIterator[CustomerBatchResult]:
+        """
+        流式批量处理客户分析
         
-        # 整理结果为字典格式
-        result_dict = {}
-        for i, result in enumerate(results):
-            customer_id = customer_ids[i]
-            if not isinstance(result, Exception):
-                result_dict[customer_id] = result
-            else:
-                logger.error(f"客户 {customer_id} 处理失败: {str(result)}")
+        同时处理的客户数不超过max_concurrency，处理完一个再启动下一个；单个客户超时或失败
+        不影响其他客户。行为和交互数据每load_size个客户整批加载一次，处理到对应客户时才加载。
         
-        logger.info(f"批量处理完成，成功处理 {len(result_dict)}/{len(customer_ids)} 个客户")
+        Args:
+            customer_ids: 客户ID列表
+            analysis_type: 分析类型
+            time_window: 分析时间窗口，默认30天
+            max_concurrency: 同时处理的客户数
+            customer_timeout: 单个客户的处理超时(秒)，默认为融合配置的最大处理时间
+            load_size: 每次整批加载数据的客户数
+            
+        Yields:
+            CustomerBatchResult: 按完成顺序产出的单个客户结果
+        """
+        timeout = customer_timeout or self.fusion_config.max_processing_time
+        requests = self._iter_batch_requests(customer_ids, analysis_type, time_window, load_size)
+        in_flight: Dict[asyncio.Task, str] = {}
+        exhausted = False
+        
+        try:
+            while True:
+                # 补充在途任务
+                while not exhausted and len(in_flight) < max_concurrency:
+                    try:
+                        request, preloaded_data = await requests.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    task = asyncio.create_task(asyncio.wait_for(
+                        self.process_multimodal_analysis(request, preloaded_data), timeout
+                    ))
+                    in_flight[task] = request.customer_id
+                
+                if not in_flight:
+                    break
+                
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    customer_id = in_flight.pop(task)
+                    try:
+                        yield CustomerBatchResult(customer_id=customer_id, result=task.result())
+                    except asyncio.TimeoutError:
+                        logger.error(f"客户 {customer_id} 处理超时({timeout}秒)")
+                        yield CustomerBatchResult(customer_id=customer_id, error=f"处理超时({timeout}秒)")
+                    except Exception as e:
+                        logger.error(f"客户 {customer_id} 处理失败: {str(e)}")
+                        yield CustomerBatchResult(customer_id=customer_id, error=str(e))
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await requests.aclose()
+    
+    async def _iter_batch_requests(
+        self,
+        customer_ids: List[str],
+        analysis_type: str,
+        time_window: Optional[timedelta],
+        load_size: int
+    ) -> AsyncIterator[Tuple[MultimodalAnalysisRequest, Dict[DataModalityType, List[Any]]]]:
+        """逐个产出客户分析请求和预加载数据，行为和交互数据按load_size分批整批加载"""
+        time_range = {
+            'start': datetime.now() - (time_window or timedelta(days=30)),
+            'end': datetime.now()
+        }
+        modalities = [
+            DataModalityType.TEXT,
+            DataModalityType.VOICE,
+            DataModalityType.BEHAVIOR,
+            DataModalityType.INTERACTION
+        ]
+        bulk_collectors = {
+            DataModalityType.BEHAVIOR: self._collect_behavior_data_bulk,
+            DataModalityType.INTERACTION: self._collect_interaction_data_bulk
+        }
         
-        return result_dict
\ No newline at end of file
+        for start in range(0, len(customer_ids), load_size):
+            chunk = customer_ids[start:start + load_size]
+            results = await asyncio.gather(
+                *[collector(chunk, time_range) for collector in bulk_collectors.values()],
+                return_exceptions=True
+            )
+            
+            # 整批加载失败的模态改为逐个客户收集
+            loaded_data = {}
+            for modality, result in zip(bulk_collectors, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"批量加载 {modality.value} 数据失败，改为逐个客户收集: {str(result)}")
+                else:
+                    loaded_data[modality] = result
+            
+            for customer_id in chunk:
+                request = MultimodalAnalysisRequest(
+                    customer_id=customer_id,
+                    analysis_type=analysis_type,
+                    modalities=modalities,
+                    time_range=time_range
+                )
+                yield request, {
+                    modality: data_by_customer.get(customer_id, [])
+                    for modality, data_by_customer in loaded_data.items()
+                }
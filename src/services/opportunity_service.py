@@ -4,14 +4,15 @@
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, asc
+from sqlalchemy import select, update, delete, func, and_, or_, desc, asc, cast, event, Integer
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 import logging
+import time
 
 from src.models.opportunity import (
     Opportunity, OpportunityStage, OpportunityActivity, 
-    OpportunityStageHistory, OpportunityStatus
+    OpportunityStageHistory, OpportunityStageRollup, OpportunityStatus
 )
 from src.models.customer import Customer
 from src.schemas.opportunity import (
@@ -21,11 +22,89 @@ from src.schemas.opportunity import (
     StageTransitionRequest, StageTransitionResponse,
     OpportunityStatistics, FunnelAnalysis, FunnelAnalysisResponse
 )
+from src.core.config import settings
 from src.core.exceptions import NotFoundError, ValidationError, BusinessLogicError
 
 logger = logging.getLogger(__name__)
 
 
+class OpportunityStatisticsCache:
+    """销售机会统计结果缓存
+
+    进程内短期缓存，键为统计过滤条件元组。机会或阶段的任何ORM写入都会清空缓存，
+    TTL只用于兜底其他进程或绕过ORM的写入。
+    """
+    
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[tuple, tuple] = {}
+    
+    def get(self, key: tuple) -> Optional[OpportunityStatistics]:
+        """获取未过期的缓存结果"""
+        if self.ttl_seconds <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        return value.model_copy(deep=True)
+    
+    def set(self, key: tuple, value: OpportunityStatistics) -> None:
+        """写入缓存结果"""
+        if self.ttl_seconds <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value.model_copy(deep=True))
+    
+    def invalidate(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+
+# 全局统计缓存实例
+opportunity_statistics_cache = OpportunityStatisticsCache(ttl_seconds=settings.OPPORTUNITY_STATS_CACHE_TTL)
+
+
+def _invalidate_statistics_cache(mapper, connection, target) -> None:
+    opportunity_statistics_cache.invalidate()
+
+
+for _model in (Opportunity, OpportunityStage):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_statistics_cache)
+
+
+async def increment_stage_rollup(db: AsyncSession, stage_id, **increments) -> None:
+    """在当前事务内累加阶段汇总计数，汇总行不存在时创建"""
+    values = {
+        name: getattr(OpportunityStageRollup, name) + amount
+        for name, amount in increments.items()
+    }
+    values["updated_at"] = datetime.utcnow()
+    result = await db.execute(
+        update(OpportunityStageRollup)
+        .where(OpportunityStageRollup.stage_id == stage_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.add(OpportunityStageRollup(
+            stage_id=stage_id,
+            entered_count=increments.get("entered_count", 0),
+            exited_count=increments.get("exited_count", 0),
+            advanced_count=increments.get("advanced_count", 0),
+            duration_count=increments.get("duration_count", 0),
+            duration_days_sum=increments.get("duration_days_sum", 0),
+            exited_value_sum=increments.get("exited_value_sum", 0.0)
+        ))
+        await db.flush()
+
+
 class OpportunityStageService:
     """销售机会阶段服务"""
     
@@ -45,6 +124,10 @@ class OpportunityStageService:
             # 创建阶段
             stage = OpportunityStage(**stage_data.model_dump())
             self.db.add(stage)
+            await self.db.flush()
+            
+            # 创建阶段汇总行
+            self.db.add(OpportunityStageRollup(stage_id=stage.id))
             await self.db.commit()
             await self.db.refresh(stage)
             
@@ -139,6 +222,9 @@ class OpportunityStageService:
             if opportunities_count.scalar() > 0:
                 raise BusinessLogicError("无法删除正在使用的阶段")
             
+            await self.db.execute(
+                delete(OpportunityStageRollup).where(OpportunityStageRollup.stage_id == stage_id)
+            )
             await self.db.delete(stage)
             await self.db.commit()
             
@@ -193,6 +279,7 @@ class OpportunityService:
                 changed_by=opportunity_data.assigned_to or "system"
             )
             self.db.add(stage_history)
+            await increment_stage_rollup(self.db, stage.id, entered_count=1)
             
             await self.db.commit()
             await self.db.refresh(opportunity)
@@ -439,9 +526,104 @@ class OpportunityService:
         )
         self.db.add(stage_history)
         
+        # 同一事务内更新阶段汇总
+        await self._update_stage_rollups(opportunity, to_stage_id, duration_days)
+        
         # 更新机会阶段
         opportunity.stage_id = to_stage_id
     
+    async def _update_stage_rollups(
+        self,
+        opportunity: Opportunity,
+        to_stage_id: str,
+        duration_days: Optional[int]
+    ):
+        """累加源阶段的离开统计和目标阶段的进入统计"""
+        await increment_stage_rollup(self.db, to_stage_id, entered_count=1)
+        
+        if not opportunity.stage_id:
+            return
+        
+        orders_result = await self.db.execute(
+            select(OpportunityStage.id, OpportunityStage.order)
+            .where(OpportunityStage.id.in_([opportunity.stage_id, to_stage_id]))
+        )
+        orders = {str(stage_id): order for stage_id, order in orders_result.all()}
+        from_order = orders.get(str(opportunity.stage_id))
+        to_order = orders.get(str(to_stage_id))
+        advanced = from_order is not None and to_order is not None and to_order > from_order
+        
+        await increment_stage_rollup(
+            self.db,
+            opportunity.stage_id,
+            exited_count=1,
+            advanced_count=1 if advanced else 0,
+            duration_count=1 if duration_days is not None else 0,
+            duration_days_sum=duration_days or 0,
+            exited_value_sum=opportunity.value or 0.0
+        )
+    
+    async def rebuild_stage_rollups(self) -> int:
+        """根据阶段历史重建全部阶段汇总（用于初次上线或数据修复）"""
+        try:
+            stage_orders = {
+                stage_id: order
+                for stage_id, order in (
+                    await self.db.execute(select(OpportunityStage.id, OpportunityStage.order))
+                ).all()
+            }
+            rollups = {
+                stage_id: OpportunityStageRollup(
+                    stage_id=stage_id, entered_count=0, exited_count=0, advanced_count=0,
+                    duration_count=0, duration_days_sum=0, exited_value_sum=0.0
+                )
+                for stage_id in stage_orders
+            }
+            
+            entered_result = await self.db.execute(
+                select(OpportunityStageHistory.to_stage_id, func.count(OpportunityStageHistory.id))
+                .group_by(OpportunityStageHistory.to_stage_id)
+            )
+            for stage_id, count in entered_result.all():
+                if stage_id in rollups:
+                    rollups[stage_id].entered_count = count
+            
+            exited_result = await self.db.execute(
+                select(
+                    OpportunityStageHistory.from_stage_id,
+                    OpportunityStageHistory.to_stage_id,
+                    func.count(OpportunityStageHistory.id),
+                    func.count(OpportunityStageHistory.duration_days),
+                    func.coalesce(func.sum(OpportunityStageHistory.duration_days), 0),
+                    func.coalesce(func.sum(Opportunity.value), 0.0)
+                )
+                .join(Opportunity, Opportunity.id == OpportunityStageHistory.opportunity_id)
+                .where(OpportunityStageHistory.from_stage_id.isnot(None))
+                .group_by(OpportunityStageHistory.from_stage_id, OpportunityStageHistory.to_stage_id)
+            )
+            for from_id, to_id, count, duration_count, duration_sum, value_sum in exited_result.all():
+                rollup = rollups.get(from_id)
+                if rollup is None:
+                    continue
+                rollup.exited_count += count
+                rollup.duration_count += duration_count
+                rollup.duration_days_sum += int(duration_sum)
+                rollup.exited_value_sum += float(value_sum)
+                if to_id in stage_orders and stage_orders[to_id] > stage_orders[from_id]:
+                    rollup.advanced_count += count
+            
+            await self.db.execute(delete(OpportunityStageRollup))
+            self.db.add_all(rollups.values())
+            await self.db.commit()
+            
+            logger.info(f"重建阶段汇总成功: {len(rollups)} 个阶段")
+            return len(rollups)
+            
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"重建阶段汇总失败: {e}")
+            raise
+    
     async def _validate_stage_transition(
         self, 
         opportunity: Opportunity, 
@@ -469,9 +651,20 @@ class OpportunityService:
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        assigned_to: Optional[str] = None
+        assigned_to: Optional[str] = None,
+        use_cache: bool = True
     ) -> OpportunityStatistics:
-        """获取销售机会统计"""
+        """获取销售机会统计
+
+        统计全部在数据库端通过分组聚合完成（总量、状态分布、阶段分布、负责人分布），
+        不再把机会逐行加载到Python中计算。结果按过滤条件短期缓存，机会或阶段写入时失效。
+        """
+        cache_key = (start_date, end_date, assigned_to)
+        if use_cache:
+            cached = opportunity_statistics_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         # 构建基础查询条件
         conditions = []
         if start_date:
@@ -481,69 +674,75 @@ class OpportunityService:
         if assigned_to:
             conditions.append(Opportunity.assigned_to == assigned_to)
         
-        base_query = select(Opportunity)
+        now = datetime.utcnow()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        
+        # 总量、加权价值、状态分布、销售周期和时间范围统计：一次聚合查询
+        status_columns = [
+            func.count(Opportunity.id).filter(Opportunity.status == status).label(f"status_{status.value}")
+            for status in OpportunityStatus
+        ]
+        totals_query = select(
+            func.count(Opportunity.id).label("total_opportunities"),
+            func.coalesce(func.sum(Opportunity.value), 0.0).label("total_value"),
+            func.coalesce(
+                func.sum(Opportunity.value * func.coalesce(Opportunity.probability, 0.0)), 0.0
+            ).label("weighted_value"),
+            func.avg(
+                self._days_between(Opportunity.actual_close_date, Opportunity.created_at)
+            ).filter(Opportunity.actual_close_date.isnot(None)).label("average_sales_cycle"),
+            func.count(Opportunity.id).filter(
+                Opportunity.created_at >= month_start
+            ).label("created_this_month"),
+            func.count(Opportunity.id).filter(
+                and_(
+                    Opportunity.expected_close_date >= month_start,
+                    Opportunity.expected_close_date < month_start + timedelta(days=32)
+                )
+            ).label("expected_close_this_month"),
+            *status_columns
+        )
         if conditions:
-            base_query = base_query.where(and_(*conditions))
+            totals_query = totals_query.where(and_(*conditions))
         
-        # 总机会数和总价值
-        result = await self.db.execute(base_query)
-        opportunities = result.scalars().all()
+        totals = (await self.db.execute(totals_query)).one()
         
-        total_opportunities = len(opportunities)
-        total_value = sum(opp.value for opp in opportunities)
-        weighted_value = sum(opp.value * (opp.probability or 0) for opp in opportunities)
+        total_opportunities = totals.total_opportunities or 0
+        total_value = float(totals.total_value or 0)
+        weighted_value = float(totals.weighted_value or 0)
         
         # 按状态统计
-        by_status = {}
-        for status in OpportunityStatus:
-            count = len([opp for opp in opportunities if opp.status == status])
-            by_status[status.value] = count
+        by_status = {
+            status.value: getattr(totals, f"status_{status.value}") or 0
+            for status in OpportunityStatus
+        }
         
         # 按阶段统计
-        stage_counts = {}
-        for opp in opportunities:
-            stage_name = opp.stage.name if opp.stage else "未知"
-            stage_counts[stage_name] = stage_counts.get(stage_name, 0) + 1
+        stage_name = func.coalesce(OpportunityStage.name, "未知")
+        stage_query = (
+            select(stage_name, func.count(Opportunity.id))
+            .select_from(Opportunity)
+            .outerjoin(OpportunityStage, Opportunity.stage_id == OpportunityStage.id)
+            .group_by(stage_name)
+        )
+        if conditions:
+            stage_query = stage_query.where(and_(*conditions))
+        stage_counts = {name: count for name, count in (await self.db.execute(stage_query)).all()}
         
         # 按负责人统计
-        assigned_counts = {}
-        for opp in opportunities:
-            assignee = opp.assigned_to or "未分配"
-            assigned_counts[assignee] = assigned_counts.get(assignee, 0) + 1
+        assignee = func.coalesce(Opportunity.assigned_to, "未分配")
+        assigned_query = select(assignee, func.count(Opportunity.id)).group_by(assignee)
+        if conditions:
+            assigned_query = assigned_query.where(and_(*conditions))
+        assigned_counts = {name: count for name, count in (await self.db.execute(assigned_query)).all()}
         
         # 计算平均值和比率
         average_value = total_value / total_opportunities if total_opportunities > 0 else 0
         won_count = by_status.get("won", 0)
         win_rate = won_count / total_opportunities if total_opportunities > 0 else 0
+        average_sales_cycle = float(totals.average_sales_cycle or 0)
         
-        # 计算平均销售周期
-        closed_opportunities = [opp for opp in opportunities if opp.actual_close_date]
-        if closed_opportunities:
-            total_cycle_days = sum(
-                (opp.actual_close_date - opp.created_at).days 
-                for opp in closed_opportunities
-            )
-            average_sales_cycle = total_cycle_days / len(closed_opportunities)
-        else:
-            average_sales_cycle = 0
-        
-        # 时间范围统计
-        now = datetime.utcnow()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        created_this_month = len([
-            opp for opp in opportunities 
-            if opp.created_at >= month_start
-        ])
-        
-        expected_close_this_month = len([
-            opp for opp in opportunities 
-            if opp.expected_close_date and 
-            opp.expected_close_date >= month_start and 
-            opp.expected_close_date < month_start + timedelta(days=32)
-        ])
-        
-        return OpportunityStatistics(
+        statistics = OpportunityStatistics(
             total_opportunities=total_opportunities,
             total_value=total_value,
             weighted_value=weighted_value,
@@ -554,55 +753,86 @@ class OpportunityService:
             average_value=average_value,
             win_rate=win_rate,
             average_sales_cycle=average_sales_cycle,
-            created_this_month=created_this_month,
-            expected_close_this_month=expected_close_this_month
+            created_this_month=totals.created_this_month or 0,
+            expected_close_this_month=totals.expected_close_this_month or 0
         )
+        
+        if use_cache:
+            opportunity_statistics_cache.set(cache_key, statistics)
+        
+        return statistics
+    
+    def _days_between(self, end_column, start_column):
+        """两个时间列之间的整天数（向下取整），按数据库方言生成表达式"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return cast(func.julianday(end_column) - func.julianday(start_column), Integer)
+        return func.floor(func.extract("epoch", end_column - start_column) / 86400)
     
     async def get_funnel_analysis(self) -> FunnelAnalysisResponse:
-        """获取销售漏斗分析"""
-        # 获取所有活跃阶段
-        stages_result = await self.db.execute(
-            select(OpportunityStage)
+        """获取销售漏斗分析
+
+        一次查询完成：活跃阶段左连接按阶段分组的未关闭机会聚合以及阶段汇总表。
+        转化率取自实际阶段转换（推进次数/进入次数），尚无转换记录的阶段回退为阶段预设概率。
+        """
+        open_pipeline = (
+            select(
+                Opportunity.stage_id.label("stage_id"),
+                func.count(Opportunity.id).label("opportunity_count"),
+                func.sum(Opportunity.value).label("total_value"),
+                func.sum(
+                    Opportunity.value * func.coalesce(Opportunity.probability, 0.0)
+                ).label("weighted_value")
+            )
+            .where(Opportunity.status == OpportunityStatus.OPEN)
+            .group_by(Opportunity.stage_id)
+            .subquery()
+        )
+        
+        result = await self.db.execute(
+            select(
+                OpportunityStage,
+                open_pipeline.c.opportunity_count,
+                open_pipeline.c.total_value,
+                open_pipeline.c.weighted_value,
+                OpportunityStageRollup
+            )
+            .outerjoin(open_pipeline, open_pipeline.c.stage_id == OpportunityStage.id)
+            .outerjoin(OpportunityStageRollup, OpportunityStageRollup.stage_id == OpportunityStage.id)
             .where(OpportunityStage.is_active == True)
             .order_by(OpportunityStage.order)
         )
-        stages = stages_result.scalars().all()
         
         funnel_stages = []
         total_pipeline_value = 0
         weighted_pipeline_value = 0
         
-        for stage in stages:
-            # 获取该阶段的机会
-            opportunities_result = await self.db.execute(
-                select(Opportunity)
-                .where(
-                    and_(
-                        Opportunity.stage_id == stage.id,
-                        Opportunity.status == OpportunityStatus.OPEN
-                    )
-                )
-            )
-            opportunities = opportunities_result.scalars().all()
-            
-            opportunity_count = len(opportunities)
-            stage_total_value = sum(opp.value for opp in opportunities)
-            stage_weighted_value = sum(opp.value * (opp.probability or 0) for opp in opportunities)
+        for stage, opportunity_count, stage_total_value, stage_weighted_value, rollup in result.all():
+            stage_total_value = float(stage_total_value or 0)
+            stage_weighted_value = float(stage_weighted_value or 0)
+            entered_count = rollup.entered_count if rollup else 0
+            advanced_count = rollup.advanced_count if rollup else 0
             
-            # 计算转化率（简化版本，可以根据实际需求优化）
-            conversion_rate = stage.probability
+            if entered_count > 0:
+                conversion_rate = advanced_count / entered_count
+            else:
+                conversion_rate = stage.probability
             
-            # 计算平均停留时间
-            average_duration = await self._calculate_average_stage_duration(stage.id)
+            if rollup and rollup.duration_count:
+                average_duration = rollup.duration_days_sum / rollup.duration_count
+            else:
+                average_duration = 0.0
             
             funnel_stages.append(FunnelAnalysis(
                 stage_id=str(stage.id),
                 stage_name=stage.name,
-                opportunity_count=opportunity_count,
+                opportunity_count=opportunity_count or 0,
                 total_value=stage_total_value,
                 weighted_value=stage_weighted_value,
                 conversion_rate=conversion_rate,
-                average_duration=average_duration
+                average_duration=average_duration,
+                entered_count=entered_count,
+                advanced_count=advanced_count
             ))
             
             total_pipeline_value += stage_total_value
@@ -621,23 +851,6 @@ class OpportunityService:
             weighted_pipeline_value=weighted_pipeline_value,
             analysis_date=datetime.utcnow()
         )
-    
-    async def _calculate_average_stage_duration(self, stage_id: str) -> float:
-        """计算阶段平均停留时间"""
-        result = await self.db.execute(
-            select(OpportunityStageHistory.duration_days)
-            .where(
-                and_(
-                    OpportunityStageHistory.from_stage_id == stage_id,
-                    OpportunityStageHistory.duration_days.isnot(None)
-                )
-            )
-        )
-        durations = result.scalars().all()
-        
-        if durations:
-            return sum(durations) / len(durations)
-        return 0.0
 
 
 class OpportunityActivityService:
@@ -4,50 +4,26 @@
 """
 
 import asyncio
+import importlib.util
 import logging
 import json
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import List, Dict, Any, Optional, Union, Tuple, TYPE_CHECKING
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 
 import numpy as np
-from langchain.schema import Document
-from langchain.prompts import PromptTemplate
-try:
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.prompts import PromptTemplate
+
+if TYPE_CHECKING:
     from langchain.retrievers import VectorStoreRetriever
     from langchain.chains import RetrievalQA
-    from langchain_core.runnables import RunnablePassthrough
-    from langchain_core.output_parsers import StrOutputParser
-except ImportError:
-    # 如果导入失败，使用占位符
-    RecursiveCharacterTextSplitter = None
-    VectorStoreRetriever = None
-    RetrievalQA = None
-    RunnablePassthrough = None
-    StrOutputParser = None
-
-try:
-    from llama_index.core import VectorStoreIndex, ServiceContext, StorageContext
-    from llama_index.core.node_parser import SimpleNodeParser
-    from llama_index.core.schema import NodeWithScore, TextNode
-    from llama_index.core.retrievers import VectorIndexRetriever
+    from llama_index.core import VectorStoreIndex
     from llama_index.core.query_engine import RetrieverQueryEngine
-    from llama_index.core.postprocessor import SimilarityPostprocessor
-except ImportError:
-    # 如果llama_index不可用，使用占位符
-    VectorStoreIndex = None
-    ServiceContext = None
-    StorageContext = None
-    SimpleNodeParser = None
-    NodeWithScore = None
-    TextNode = None
-    VectorIndexRetriever = None
-    RetrieverQueryEngine = None
-    SimilarityPostprocessor = None
 
 from src.core.config import settings
+from src.core.lazy import LazyService, ServiceProxy
 from src.services.vector_service import vector_service, VectorDocument, VectorSearchResult
 from src.services.embedding_service import embedding_service
 from src.services.llm_service import llm_service
@@ -55,6 +31,11 @@ from src.services.llm_service import llm_service
 logger = logging.getLogger(__name__)
 
 
+def _llama_index_available() -> bool:
+    """LlamaIndex是否已安装（只查找模块，不导入）"""
+    return importlib.util.find_spec("llama_index") is not None
+
+
 class RAGMode(str, Enum):
     """RAG模式枚举"""
     SIMPLE = "simple"  # 简单检索
@@ -76,6 +57,7 @@ class RAGConfig:
     enable_fusion: bool = True
     temperature: float = 0.1
     max_tokens: int = 1000
+    context_token_budget: int = 1500  # retrieve_context默认返回的上下文token上限
 
 
 @dataclass
@@ -101,6 +83,63 @@ class RetrievalResult:
     metadata: Dict[str, Any] = None
 
 
+@dataclass
+class RAGContext:
+    """检索上下文（只检索、不生成回答），由调用方拼入自己的提示词"""
+    question: str
+    documents: List[Document]
+    scores: List[float]
+    confidence: float
+    token_count: int
+    retrieval_time: float
+    collection_name: str
+    
+    @property
+    def text(self) -> str:
+        """按相关性排序拼接的上下文文本"""
+        return "\n\n".join(
+            f"文档{i+1}: {doc.page_content}"
+            for i, doc in enumerate(self.documents)
+        )
+    
+    @property
+    def sources(self) -> List[Dict[str, Any]]:
+        """来源信息，格式同RAGResult.sources"""
+        return _format_sources(self.documents, self.scores)
+    
+    @property
+    def collections(self) -> List[str]:
+        """上下文文档实际来自的集合（按首次出现顺序）"""
+        return list(dict.fromkeys(
+            doc.metadata.get('collection_name', self.collection_name)
+            for doc in self.documents
+        ))
+    
+    def text_for(self, collection_name: str) -> str:
+        """指定来源集合的上下文文本，多集合检索时供调用方按来源分段拼入提示词"""
+        return "\n\n".join(
+            f"文档{i+1}: {doc.page_content}"
+            for i, doc in enumerate(
+                doc for doc in self.documents
+                if doc.metadata.get('collection_name', self.collection_name) == collection_name
+            )
+        )
+
+
+def _format_sources(documents: List[Document], scores: List[float]) -> List[Dict[str, Any]]:
+    """生成来源信息列表"""
+    sources = []
+    for i, (doc, score) in enumerate(zip(documents, scores)):
+        source = {
+            'index': i + 1,
+            'content': doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
+            'metadata': doc.metadata,
+            'score': score
+        }
+        sources.append(source)
+    return sources
+
+
 class ChineseTextSplitter:
     """中文文本分割器"""
     
@@ -202,8 +241,22 @@ class ContextWindowManager:
             logger.warning("上下文窗口不足，无法添加检索文档")
             return query, []
         
+        selected_docs, _ = self.select_documents(documents, available_tokens)
+        return query, selected_docs
+    
+    def select_documents(
+        self,
+        documents: List[Document],
+        token_budget: int,
+        presorted: bool = False
+    ) -> Tuple[List[Document], int]:
+        """
+        按重要性选择不超过token预算的文档，最后一篇放不下时截断，返回 (文档, 使用的token数)
+        
+        presorted为True时保留传入顺序（如已按融合排名排序）
+        """
         # 按重要性排序文档
-        sorted_docs = self._sort_documents_by_importance(documents)
+        sorted_docs = documents if presorted else self._sort_documents_by_importance(documents)
         
         # 选择适合的文档
         selected_docs = []
@@ -211,12 +264,12 @@ class ContextWindowManager:
         
         for doc in sorted_docs:
             doc_tokens = len(doc.page_content)
-            if used_tokens + doc_tokens <= available_tokens:
+            if used_tokens + doc_tokens <= token_budget:
                 selected_docs.append(doc)
                 used_tokens += doc_tokens
             else:
                 # 尝试截断文档
-                remaining_tokens = available_tokens - used_tokens
+                remaining_tokens = token_budget - used_tokens
                 if remaining_tokens > 100:  # 至少保留100个字符
                     truncated_content = doc.page_content[:remaining_tokens] + "..."
                     truncated_doc = Document(
@@ -224,9 +277,10 @@ class ContextWindowManager:
                         metadata=doc.metadata
                     )
                     selected_docs.append(truncated_doc)
+                    used_tokens += remaining_tokens
                 break
         
-        return query, selected_docs
+        return selected_docs, used_tokens
     
     def _sort_documents_by_importance(self, documents: List[Document]) -> List[Document]:
         """按重要性排序文档"""
@@ -254,7 +308,7 @@ class ResultFusion:
         method: str = 'rrf'
     ) -> List[VectorSearchResult]:
         """融合多个检索结果"""
-        if not results_list or not results_list[0]:
+        if not any(results_list):
             return []
         
         fusion_func = self.fusion_methods.get(method, self._reciprocal_rank_fusion)
@@ -383,12 +437,12 @@ class RAGService:
         self.result_fusion = ResultFusion()
         
         # LangChain组件
-        self.retriever: Optional[VectorStoreRetriever] = None
-        self.qa_chain: Optional[RetrievalQA] = None
+        self.retriever: Optional["VectorStoreRetriever"] = None
+        self.qa_chain: Optional["RetrievalQA"] = None
         
         # LlamaIndex组件
-        self.llama_index: Optional[VectorStoreIndex] = None
-        self.query_engine: Optional[RetrieverQueryEngine] = None
+        self.llama_index: Optional["VectorStoreIndex"] = None
+        self.query_engine: Optional["RetrieverQueryEngine"] = None
         
         # 中文优化的提示模板
         self.chinese_prompt_template = PromptTemplate(
@@ -425,7 +479,7 @@ class RAGService:
                 await embedding_service.initialize_reranker()
             
             # 初始化LlamaIndex（如果可用）
-            if VectorStoreIndex is not None:
+            if _llama_index_available():
                 await self._initialize_llama_index()
             
             logger.info("RAG服务初始化完成")
@@ -437,6 +491,10 @@ class RAGService:
     async def _initialize_llama_index(self) -> None:
         """初始化LlamaIndex组件"""
         try:
+            # LlamaIndex导入较慢，只在初始化时导入
+            from llama_index.core import ServiceContext
+            from llama_index.core.node_parser import SimpleNodeParser
+            
             # 创建服务上下文
             service_context = ServiceContext.from_defaults(
                 embed_model=None,  # 使用自定义嵌入服务
@@ -711,6 +769,155 @@ class RAGService:
             logger.error(f"生成回答失败: {e}")
             return f"生成回答时出现错误: {str(e)}"
     
+    async def retrieve_context(
+        self,
+        question: str,
+        mode: RAGMode = RAGMode.HYBRID,
+        collection_name: str = "rag_knowledge",
+        max_tokens: Optional[int] = None
+    ) -> RAGContext:
+        """
+        只检索不生成，返回按相关性排序、截断到token预算内的文档
+        
+        供Agent拼入自己的提示词后只调用一次LLM，避免先由query()生成回答、
+        再把回答嵌套进第二次生成。
+        
+        Args:
+            question: 检索问题
+            mode: 检索模式
+            collection_name: 知识库集合
+            max_tokens: 上下文token上限，默认为config.context_token_budget
+        """
+        retrieval_result = await self.retrieve(
+            query=question,
+            mode=mode,
+            collection_name=collection_name
+        )
+        
+        documents, token_count = self.context_manager.select_documents(
+            retrieval_result.documents,
+            max_tokens or self.config.context_token_budget
+        )
+        
+        return RAGContext(
+            question=question,
+            documents=documents,
+            scores=[doc.metadata.get('score', 0.0) for doc in documents],
+            confidence=self._calculate_confidence(
+                retrieval_result.scores,
+                len(retrieval_result.documents)
+            ),
+            token_count=token_count,
+            retrieval_time=retrieval_result.retrieval_time,
+            collection_name=collection_name
+        )
+    
+    async def multi_collection_retrieve(
+        self,
+        question: str,
+        collections: List[str],
+        per_collection_k: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ) -> RAGContext:
+        """
+        同一问题跨多个知识库集合检索，只生成一次查询向量
+        
+        各集合并发按向量检索，用倒数排名融合(RRF)合并后截断到token预算内。
+        每个文档的metadata带有collection_name（来源集合）、score（相似度）和
+        rrf_score（融合分数），可通过RAGContext.text_for()按来源分段。
+        单个集合检索失败只记录日志，不影响其他集合。
+        
+        Args:
+            question: 检索问题
+            collections: 知识库集合列表
+            per_collection_k: 每个集合返回的文档数，默认为config.rerank_top_k
+            max_tokens: 上下文token上限，默认为config.context_token_budget
+        """
+        start_time = datetime.now()
+        collections = list(dict.fromkeys(collections))
+        per_collection_k = per_collection_k or self.config.rerank_top_k
+        
+        def empty_context() -> RAGContext:
+            return RAGContext(
+                question=question,
+                documents=[],
+                scores=[],
+                confidence=0.0,
+                token_count=0,
+                retrieval_time=(datetime.now() - start_time).total_seconds(),
+                collection_name=", ".join(collections)
+            )
+        
+        try:
+            query_embedding = await embedding_service.encode(question)
+        except Exception as e:
+            logger.error(f"生成查询向量失败: {e}")
+            return empty_context()
+        
+        if query_embedding is None or getattr(query_embedding, 'size', 0) == 0:
+            logger.error("嵌入服务返回空或无效的向量，无法执行多集合检索")
+            return empty_context()
+        
+        search_results = await asyncio.gather(*[
+            vector_service.search_by_vector(
+                vector=query_embedding,
+                collection_name=collection_name,
+                limit=per_collection_k,
+                score_threshold=self.config.similarity_threshold
+            )
+            for collection_name in collections
+        ], return_exceptions=True)
+        
+        # 给文档加上来源集合；不同集合的文档ID可能相同，融合前用 集合/ID 区分
+        results_list = []
+        for collection_name, results in zip(collections, search_results):
+            if isinstance(results, Exception):
+                logger.warning(f"检索知识源 {collection_name} 失败: {results}")
+                continue
+            results_list.append([
+                VectorSearchResult(
+                    document=VectorDocument(
+                        id=f"{collection_name}/{result.document.id}",
+                        content=result.document.content,
+                        metadata={
+                            **result.document.metadata,
+                            'collection_name': collection_name,
+                            'score': result.score,
+                            'distance': result.distance
+                        }
+                    ),
+                    score=result.score,
+                    distance=result.distance
+                )
+                for result in results
+            ])
+        
+        fused_results = self.result_fusion.fuse_results(results_list, method='rrf')
+        fused_documents = [
+            Document(
+                page_content=result.document.content,
+                metadata={**result.document.metadata, 'rrf_score': result.score}
+            )
+            for result in fused_results
+        ]
+        
+        documents, token_count = self.context_manager.select_documents(
+            fused_documents,
+            max_tokens or self.config.context_token_budget,
+            presorted=True
+        )
+        similarity_scores = [doc.metadata['score'] for doc in fused_documents]
+        
+        return RAGContext(
+            question=question,
+            documents=documents,
+            scores=[doc.metadata['score'] for doc in documents],
+            confidence=self._calculate_confidence(similarity_scores, len(fused_documents)),
+            token_count=token_count,
+            retrieval_time=(datetime.now() - start_time).total_seconds(),
+            collection_name=", ".join(collections)
+        )
+    
     async def query(
         self, 
         question: str, 
@@ -746,18 +953,7 @@ class RAGService:
             )
             
             # 4. 准备源信息
-            sources = []
-            for i, (doc, score) in enumerate(zip(
-                retrieval_result.documents, 
-                retrieval_result.scores
-            )):
-                source = {
-                    'index': i + 1,
-                    'content': doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                    'metadata': doc.metadata,
-                    'score': score
-                }
-                sources.append(source)
+            sources = _format_sources(retrieval_result.documents, retrieval_result.scores)
             
             total_time = (datetime.now() - total_start_time).total_seconds()
             
@@ -843,7 +1039,7 @@ class RAGService:
                 },
                 'vector_service': vector_stats,
                 'embedding_service': embedding_info,
-                'llama_index_available': VectorStoreIndex is not None
+                'llama_index_available': _llama_index_available()
             }
             
         except Exception as e:
@@ -859,5 +1055,7 @@ class RAGService:
             logger.error(f"关闭RAG服务失败: {e}")
 
 
-# 全局RAG服务实例
-rag_service = RAGService()
\ No newline at end of file
+# 全局RAG服务实例（首次访问时创建）
+_rag_service = LazyService(RAGService)
+get_rag_service = _rag_service.get
+rag_service = ServiceProxy(_rag_service)
@@ -20,6 +20,7 @@ from qdrant_client.http.models import (
 from qdrant_client.http.exceptions import UnexpectedResponse
 
 from src.core.config import settings
+from src.core.lazy import LazyService, ServiceProxy
 from src.services.embedding_service import embedding_service
 
 logger = logging.getLogger(__name__)
@@ -842,5 +843,7 @@ class VectorService:
                 logger.error(f"关闭Qdrant连接失败: {e}")
 
 
-# 全局向量服务实例
-vector_service = VectorService()
+# 全局向量服务实例（首次访问时创建）
+_vector_service = LazyService(VectorService)
+get_vector_service = _vector_service.get
+vector_service = ServiceProxy(_vector_service)
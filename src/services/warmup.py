@@ -0,0 +1,76 @@
+"""
+服务预热
+
+API启动后在后台加载BGE嵌入和重排序模型。预热期间API照常处理CRUD请求，
+预热完成前到达的检索请求会等待同一次模型加载，不会重复加载。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupStatus:
+    """预热状态"""
+    state: str = "pending"  # pending / running / completed / failed / disabled
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "status": self.state,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "errors": dict(self.errors)
+        }
+
+
+# 全局预热状态
+warmup_status = WarmupStatus()
+
+
+async def warm_up_services(status: WarmupStatus = warmup_status) -> WarmupStatus:
+    """依次加载嵌入模型和重排序模型，单个模型失败不影响其他模型"""
+    # 嵌入服务在这里才导入，API导入阶段不加载模型相关依赖
+    from src.services.embedding_service import get_embedding_service
+
+    embedding_service = get_embedding_service()
+    steps = [
+        ("embedding_model", embedding_service.initialize),
+        ("reranker_model", embedding_service.initialize_reranker)
+    ]
+
+    status.state = "running"
+    status.started_at = time.perf_counter()
+    status.errors.clear()
+    logger.info("开始后台预热模型...")
+
+    for name, step in steps:
+        try:
+            await step()
+        except Exception as e:
+            logger.warning(f"预热 {name} 失败，将在首次使用时重试: {e}")
+            status.errors[name] = str(e)
+
+    status.finished_at = time.perf_counter()
+    status.state = "failed" if status.errors else "completed"
+    logger.info(f"模型预热结束: {status.state}, 耗时 {status.finished_at - status.started_at:.2f}秒")
+    return status
+
+
+def start_warmup(status: WarmupStatus = warmup_status) -> Optional[asyncio.Task]:
+    """在后台启动预热任务；配置关闭预热时返回None"""
+    if not settings.BGE_WARMUP_ON_STARTUP:
+        status.state = "disabled"
+        return None
+    return asyncio.create_task(warm_up_services(status))
@@ -6,12 +6,15 @@
 """
 
 import asyncio
+import json
 import logging
+import uuid
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from src.agents.professional.sales_agent import SalesAgent
 from src.agents.professional.market_agent import MarketAgent
@@ -22,7 +25,9 @@ from src.services.rag_service import rag_service
 from src.models.customer import Customer
 from src.models.lead import Lead
 from src.schemas.customer import CustomerCreate, CustomerResponse
-from src.core.database import get_db
+from src.core.database import get_db, AsyncSessionLocal
+from src.workflows.task_registry import TaskRegistry, RegisteredTask
+from src.workflows.prospect_executor import ProspectExecutor, ProspectStatus, ProspectExecutionCancelled
 
 logger = logging.getLogger(__name__)
 
@@ -103,7 +108,7 @@ class VisitPlan:
 
 
 @dataclass
-class DiscoveryTask:
+class DiscoveryTask(RegisteredTask):
     """发现任务"""
     task_id: str
     customer_id: Optional[str]
@@ -118,6 +123,43 @@ class DiscoveryTask:
     results: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """转换为可持久化的JSON快照"""
+        return {
+            'task_id': self.task_id,
+            'customer_id': self.customer_id,
+            'stage': self.stage.value,
+            'priority': self.priority.value,
+            'title': self.title,
+            'description': self.description,
+            'assigned_agent': self.assigned_agent,
+            'due_date': self.due_date.isoformat(),
+            'status': self.status,
+            'progress': self.progress,
+            'results': json.loads(json.dumps(self.results, default=str)),
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "DiscoveryTask":
+        """从持久化快照恢复任务"""
+        return cls(
+            task_id=snapshot['task_id'],
+            customer_id=snapshot.get('customer_id'),
+            stage=DiscoveryStage(snapshot['stage']),
+            priority=Priority(snapshot['priority']),
+            title=snapshot.get('title', ''),
+            description=snapshot.get('description', ''),
+            assigned_agent=snapshot.get('assigned_agent', ''),
+            due_date=datetime.fromisoformat(snapshot['due_date']),
+            status=snapshot.get('status', 'pending'),
+            progress=snapshot.get('progress', 0.0),
+            results=snapshot.get('results', {}),
+            created_at=datetime.fromisoformat(snapshot['created_at']),
+            updated_at=datetime.fromisoformat(snapshot['updated_at'])
+        )
 
 
 class CustomerDiscoveryWorkflow:
@@ -129,7 +171,8 @@ class CustomerDiscoveryWorkflow:
         market_agent: MarketAgent,
         crm_expert_agent: CRMExpertAgent,
         customer_service: CustomerService,
-        lead_service: LeadService
+        lead_service: LeadService,
+        session_factory: Optional[async_sessionmaker] = None
     ):
         self.sales_agent = sales_agent
         self.market_agent = market_agent
@@ -137,12 +180,19 @@ class CustomerDiscoveryWorkflow:
         self.customer_service = customer_service
         self.lead_service = lead_service
         
-        # 活跃的发现任务
-        self.active_tasks: Dict[str, DiscoveryTask] = {}
+        # 活跃的发现任务，按阶段、优先级、状态和负责Agent索引，已完成任务过期后归档
+        self.active_tasks: TaskRegistry[DiscoveryTask] = TaskRegistry(
+            "customer_discovery",
+            assignee_field="assigned_agent",
+            session_factory=session_factory
+        )
         
         # 客户画像缓存
         self.customer_profiles: Dict[str, CustomerProfile] = {}
         
+        # 进行中任务的潜在客户并发执行器，用于取消
+        self._executors: Dict[str, ProspectExecutor] = {}
+        
         self.logger = logging.getLogger(__name__)
     
     async def start_customer_discovery(
@@ -163,7 +213,7 @@ class CustomerDiscoveryWorkflow:
             发现任务ID
         """
         try:
-            task_id = f"discovery_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            task_id = f"discovery_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
             
             # 创建发现任务
             discovery_task = DiscoveryTask(
@@ -178,9 +228,16 @@ class CustomerDiscoveryWorkflow:
             )
             
             self.active_tasks[task_id] = discovery_task
+            self._executors[task_id] = ProspectExecutor()
             
             # 启动研究阶段
-            await self._execute_research_stage(task_id, target_criteria)
+            try:
+                await self._execute_research_stage(task_id, target_criteria)
+            except ProspectExecutionCancelled:
+                self.logger.info(f"客户发现流程已取消: {task_id}")
+                return task_id
+            finally:
+                self._executors.pop(task_id, None)
             
             self.logger.info(f"启动客户发现流程: {task_id}")
             return task_id
@@ -189,6 +246,59 @@ class CustomerDiscoveryWorkflow:
             self.logger.error(f"启动客户发现流程失败: {e}")
             raise
     
+    async def cancel_discovery(self, task_id: str) -> bool:
+        """取消进行中的客户发现任务，停止所有在途的Agent调用"""
+        task = self.active_tasks.get(task_id)
+        if not task:
+            return False
+        
+        executor = self._executors.get(task_id)
+        if executor:
+            executor.cancel()
+        
+        for progress in task.results.get('prospect_progress', {}).values():
+            if progress['status'] in (ProspectStatus.PENDING.value, ProspectStatus.RUNNING.value):
+                progress['status'] = ProspectStatus.CANCELLED.value
+        
+        task.status = "cancelled"
+        task.updated_at = datetime.now()
+        self.logger.info(f"取消客户发现任务: {task_id}")
+        return True
+    
+    def _get_executor(self, task_id: str) -> ProspectExecutor:
+        """获取任务的执行器，单独调用阶段方法时按需创建"""
+        executor = self._executors.get(task_id)
+        if executor is None:
+            executor = self._executors[task_id] = ProspectExecutor()
+        return executor
+    
+    async def _call_agent(self, executor: Optional[ProspectExecutor], func, **kwargs):
+        """通过执行器调用Agent，未提供执行器时直接调用"""
+        if executor is None:
+            return await func(**kwargs)
+        return await executor.call(func, **kwargs)
+    
+    def _set_prospect_progress(
+        self,
+        task: DiscoveryTask,
+        company_name: str,
+        stage: DiscoveryStage,
+        status: ProspectStatus,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """记录单个潜在客户的处理进度"""
+        progress = task.results.setdefault('prospect_progress', {})
+        entry = progress.setdefault(company_name, {})
+        entry.update({
+            'stage': stage.value,
+            'status': status.value,
+            'updated_at': datetime.now().isoformat()
+        })
+        if error is not None:
+            entry['error'] = str(error)
+        else:
+            entry.pop('error', None)
+    
     async def _execute_research_stage(
         self,
         task_id: str,
@@ -197,18 +307,21 @@ class CustomerDiscoveryWorkflow:
         """执行研究阶段"""
         try:
             task = self.active_tasks[task_id]
-            
-            # 使用市场Agent进行市场研究
-            market_research = await self.market_agent.analyze_market_segment(
-                industry=target_criteria.get('industry'),
-                company_size=target_criteria.get('company_size'),
-                location=target_criteria.get('location')
-            )
-            
-            # 使用RAG服务获取行业知识
-            industry_insights = await rag_service.query(
-                question=f"关于{target_criteria.get('industry')}行业的客户特征和痛点",
-                mode="hybrid"
+            executor = self._get_executor(task_id)
+            
+            # 市场研究和行业知识检索相互独立，并发执行
+            market_research, industry_insights = await asyncio.gather(
+                executor.call(
+                    self.market_agent.analyze_market_segment,
+                    industry=target_criteria.get('industry'),
+                    company_size=target_criteria.get('company_size'),
+                    location=target_criteria.get('location')
+                ),
+                executor.call(
+                    rag_service.query,
+                    question=f"关于{target_criteria.get('industry')}行业的客户特征和痛点",
+                    mode="hybrid"
+                )
             )
             
             # 生成潜在客户列表
@@ -225,6 +338,10 @@ class CustomerDiscoveryWorkflow:
                 'potential_customers': potential_customers,
                 'research_completed_at': datetime.now().isoformat()
             })
+            for customer_data in potential_customers:
+                self._set_prospect_progress(
+                    task, customer_data.get('company_name', ''), DiscoveryStage.QUALIFICATION, ProspectStatus.PENDING
+                )
             
             task.progress = 0.2
             task.stage = DiscoveryStage.QUALIFICATION
@@ -232,21 +349,30 @@ class CustomerDiscoveryWorkflow:
             # 继续资格认证阶段
             await self._execute_qualification_stage(task_id)
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"研究阶段执行失败: {e}")
             raise
     
     async def _execute_qualification_stage(self, task_id: str) -> None:
-        """执行资格认证阶段"""
+        """执行资格认证阶段，各潜在客户并发认证，完成一个写入一个"""
         try:
             task = self.active_tasks[task_id]
+            executor = self._get_executor(task_id)
             potential_customers = task.results.get('potential_customers', [])
             
             qualified_customers = []
+            task.results['qualified_customers'] = qualified_customers
+            finished = 0
             
-            for customer_data in potential_customers:
+            async def qualify(customer_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                company_name = customer_data.get('company_name', '')
+                self._set_prospect_progress(task, company_name, DiscoveryStage.QUALIFICATION, ProspectStatus.RUNNING)
+                
                 # 使用销售Agent进行客户资格认证
-                qualification_result = await self.sales_agent.qualify_customer(
+                qualification_result = await executor.call(
+                    self.sales_agent.qualify_customer,
                     customer_data=customer_data,
                     qualification_criteria={
                         'budget_threshold': 100000,
@@ -255,18 +381,49 @@ class CustomerDiscoveryWorkflow:
                     }
                 )
                 
-                if qualification_result.get('qualified', False):
-                    # 创建详细的客户画像
-                    customer_profile = await self._create_customer_profile(
-                        customer_data,
-                        qualification_result
+                if not qualification_result.get('qualified', False):
+                    return None
+                
+                # 创建详细的客户画像
+                customer_profile = await self._create_customer_profile(
+                    customer_data,
+                    qualification_result,
+                    executor
+                )
+                
+                return {
+                    'customer_data': customer_data,
+                    'qualification_score': qualification_result.get('score', 0),
+                    'customer_profile': customer_profile.__dict__
+                }
+            
+            def on_done(index: int, result: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+                nonlocal finished
+                finished += 1
+                company_name = potential_customers[index].get('company_name', '')
+                
+                if error is not None:
+                    status = (
+                        ProspectStatus.CANCELLED if isinstance(error, ProspectExecutionCancelled)
+                        else ProspectStatus.FAILED
+                    )
+                    self._set_prospect_progress(task, company_name, DiscoveryStage.QUALIFICATION, status, error)
+                    if status == ProspectStatus.FAILED:
+                        self.logger.warning(f"客户资格认证失败: {company_name}, {error}")
+                else:
+                    self._set_prospect_progress(
+                        task,
+                        company_name,
+                        DiscoveryStage.CONTACT_PLANNING if result else DiscoveryStage.QUALIFICATION,
+                        ProspectStatus.PENDING if result else ProspectStatus.COMPLETED
                     )
-                    
-                    qualified_customers.append({
-                        'customer_data': customer_data,
-                        'qualification_score': qualification_result.get('score', 0),
-                        'customer_profile': customer_profile.__dict__
-                    })
+                    if result:
+                        qualified_customers.append(result)
+                
+                task.progress = 0.2 + 0.2 * finished / len(potential_customers)
+                task.updated_at = datetime.now()
+            
+            await executor.map(potential_customers, qualify, on_done)
             
             # 按资格分数排序
             qualified_customers.sort(
@@ -274,6 +431,15 @@ class CustomerDiscoveryWorkflow:
                 reverse=True
             )
             
+            # 只有前10个高质量客户进入接触规划
+            for customer_info in qualified_customers[10:]:
+                self._set_prospect_progress(
+                    task,
+                    customer_info['customer_data'].get('company_name', ''),
+                    DiscoveryStage.QUALIFICATION,
+                    ProspectStatus.COMPLETED
+                )
+            
             # 更新任务结果
             task.results['qualified_customers'] = qualified_customers
             task.progress = 0.4
@@ -282,40 +448,72 @@ class CustomerDiscoveryWorkflow:
             # 继续接触规划阶段
             await self._execute_contact_planning_stage(task_id)
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"资格认证阶段执行失败: {e}")
             raise
     
     async def _execute_contact_planning_stage(self, task_id: str) -> None:
-        """执行接触规划阶段"""
+        """执行接触规划阶段，各客户并发生成接触策略和拜访计划"""
         try:
             task = self.active_tasks[task_id]
-            qualified_customers = task.results.get('qualified_customers', [])
+            executor = self._get_executor(task_id)
+            qualified_customers = task.results.get('qualified_customers', [])[:10]  # 处理前10个高质量客户
             
             contact_plans = []
+            task.results['contact_plans'] = contact_plans
+            finished = 0
             
-            for customer_info in qualified_customers[:10]:  # 处理前10个高质量客户
+            async def plan(customer_info: Dict[str, Any]) -> Dict[str, Any]:
                 customer_profile = CustomerProfile(**customer_info['customer_profile'])
+                self._set_prospect_progress(
+                    task, customer_profile.company_name, DiscoveryStage.CONTACT_PLANNING, ProspectStatus.RUNNING
+                )
                 
                 # 生成接触策略
-                contact_strategy = await self._generate_contact_strategy(customer_profile)
+                contact_strategy = await self._generate_contact_strategy(customer_profile, executor)
                 
                 # 生成拜访计划
-                visit_plan = await self._generate_visit_plan(customer_profile, contact_strategy)
+                visit_plan = await self._generate_visit_plan(customer_profile, contact_strategy, executor)
                 
-                contact_plans.append({
+                return {
                     'customer_profile': customer_profile.__dict__,
                     'contact_strategy': contact_strategy.__dict__,
                     'visit_plan': visit_plan.__dict__
-                })
+                }
             
-            # 更新任务结果
-            task.results['contact_plans'] = contact_plans
+            def on_done(index: int, result: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+                nonlocal finished
+                finished += 1
+                company_name = qualified_customers[index]['customer_profile'].get('company_name', '')
+                
+                if error is not None:
+                    status = (
+                        ProspectStatus.CANCELLED if isinstance(error, ProspectExecutionCancelled)
+                        else ProspectStatus.FAILED
+                    )
+                    self._set_prospect_progress(task, company_name, DiscoveryStage.CONTACT_PLANNING, status, error)
+                else:
+                    self._set_prospect_progress(
+                        task, company_name, DiscoveryStage.CONTACT_PLANNING, ProspectStatus.COMPLETED
+                    )
+                    contact_plans.append(result)
+                
+                task.progress = 0.4 + 0.2 * finished / len(qualified_customers)
+                task.updated_at = datetime.now()
+            
+            results = await executor.map(qualified_customers, plan, on_done)
+            
+            # 按资格分数顺序排列，接触计划索引保持稳定
+            task.results['contact_plans'] = [result for result in results if result is not None]
             task.progress = 0.6
             task.stage = DiscoveryStage.INITIAL_CONTACT
             
-            self.logger.info(f"完成接触规划阶段，生成了{len(contact_plans)}个接触计划")
+            self.logger.info(f"完成接触规划阶段，生成了{len(task.results['contact_plans'])}个接触计划")
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"接触规划阶段执行失败: {e}")
             raise
@@ -369,12 +567,15 @@ class CustomerDiscoveryWorkflow:
     async def _create_customer_profile(
         self,
         customer_data: Dict[str, Any],
-        qualification_result: Dict[str, Any]
+        qualification_result: Dict[str, Any],
+        executor: Optional[ProspectExecutor] = None
     ) -> CustomerProfile:
         """创建客户画像"""
         try:
             # 使用CRM专家Agent增强客户画像
-            profile_enhancement = await self.crm_expert_agent.enhance_customer_profile(
+            profile_enhancement = await self._call_agent(
+                executor,
+                self.crm_expert_agent.enhance_customer_profile,
                 basic_info=customer_data,
                 qualification_data=qualification_result
             )
@@ -397,6 +598,8 @@ class CustomerDiscoveryWorkflow:
             
             return customer_profile
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"创建客户画像失败: {e}")
             # 返回基础画像
@@ -407,11 +610,17 @@ class CustomerDiscoveryWorkflow:
                 location=customer_data.get('location', '')
             )
     
-    async def _generate_contact_strategy(self, customer_profile: CustomerProfile) -> ContactStrategy:
+    async def _generate_contact_strategy(
+        self,
+        customer_profile: CustomerProfile,
+        executor: Optional[ProspectExecutor] = None
+    ) -> ContactStrategy:
         """生成接触策略"""
         try:
             # 使用销售Agent生成接触策略
-            strategy_result = await self.sales_agent.generate_contact_strategy(
+            strategy_result = await self._call_agent(
+                executor,
+                self.sales_agent.generate_contact_strategy,
                 customer_profile=customer_profile.__dict__
             )
             
@@ -429,6 +638,8 @@ class CustomerDiscoveryWorkflow:
             
             return contact_strategy
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"生成接触策略失败: {e}")
             # 返回默认策略
@@ -445,14 +656,17 @@ class CustomerDiscoveryWorkflow:
     async def _generate_visit_plan(
         self,
         customer_profile: CustomerProfile,
-        contact_strategy: ContactStrategy
+        contact_strategy: ContactStrategy,
+        executor: Optional[ProspectExecutor] = None
     ) -> VisitPlan:
         """生成拜访计划"""
         try:
             visit_id = f"visit_{customer_profile.company_name}_{datetime.now().strftime('%Y%m%d')}"
             
             # 使用销售Agent生成拜访计划
-            visit_plan_result = await self.sales_agent.create_visit_plan(
+            visit_plan_result = await self._call_agent(
+                executor,
+                self.sales_agent.create_visit_plan,
                 customer_profile=customer_profile.__dict__,
                 contact_strategy=contact_strategy.__dict__
             )
@@ -510,6 +724,8 @@ class CustomerDiscoveryWorkflow:
             
             return visit_plan
             
+        except ProspectExecutionCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"生成拜访计划失败: {e}")
             # 返回基础计划
@@ -620,7 +836,16 @@ class CustomerDiscoveryWorkflow:
         """获取任务状态"""
         task = self.active_tasks.get(task_id)
         if not task:
-            return None
+            # 已完成任务超过保留时间后从归档表读取
+            snapshot = await self.active_tasks.get_archived(task_id)
+            if not snapshot:
+                return None
+            task = DiscoveryTask.from_snapshot(snapshot)
+        
+        prospect_progress = task.results.get('prospect_progress', {})
+        prospects_by_status: Dict[str, int] = {}
+        for progress in prospect_progress.values():
+            prospects_by_status[progress['status']] = prospects_by_status.get(progress['status'], 0) + 1
         
         return {
             'task_id': task.task_id,
@@ -638,9 +863,28 @@ class CustomerDiscoveryWorkflow:
                 'qualified_customers_count': len(task.results.get('qualified_customers', [])),
                 'contact_plans_count': len(task.results.get('contact_plans', [])),
                 'contact_records_count': len(task.results.get('contact_records', []))
+            },
+            'prospect_progress': {
+                'total': len(prospect_progress),
+                'by_status': prospects_by_status,
+                'prospects': [
+                    {'company_name': company_name, **progress}
+                    for company_name, progress in prospect_progress.items()
+                ]
             }
         }
     
+    async def get_workflow_metrics(self) -> Dict[str, Any]:
+        """获取工作流指标，计数由任务注册表增量维护"""
+        return {
+            'total_tasks': len(self.active_tasks),
+            'tasks_by_stage': self.active_tasks.counts('stage'),
+            'tasks_by_priority': self.active_tasks.counts('priority'),
+            'tasks_by_status': self.active_tasks.counts('status'),
+            'average_progress': self.active_tasks.average_progress,
+            'archived_tasks': self.active_tasks.archived_count
+        }
+    
     async def get_visit_plan(self, task_id: str, customer_name: str) -> Optional[Dict[str, Any]]:
         """获取拜访计划"""
         task = self.active_tasks.get(task_id)
@@ -736,7 +980,8 @@ async def create_customer_discovery_workflow() -> CustomerDiscoveryWorkflow:
             market_agent=market_agent,
             crm_expert_agent=crm_expert_agent,
             customer_service=customer_service,
-            lead_service=lead_service
+            lead_service=lead_service,
+            session_factory=AsyncSessionLocal
         )
         
         return workflow
\ No newline at end of file
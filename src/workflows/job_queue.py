@@ -0,0 +1,403 @@
+"""
+工作流阶段任务队列
+
+基于数据库的持久化阶段任务队列和进程内worker。每个阶段执行完成后在同一事务中
+标记成功并入队下一阶段；失败按指数退避重试；worker崩溃后租约过期的任务会被重新领取。
+"""
+
+import asyncio
+import logging
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.models.workflow_job import WorkflowJob, WorkflowJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageOutcome:
+    """阶段执行结果"""
+    snapshot: Dict[str, Any]                 # 执行后的任务快照
+    next_stage: Optional[str] = None         # 下一阶段，None表示流程结束
+    priority: int = 0                        # 下一阶段任务优先级
+
+
+# 阶段处理函数：接收领取到的任务，返回执行结果
+StageHandler = Callable[[WorkflowJob], Awaitable[StageOutcome]]
+
+
+class StageJobQueue:
+    """持久化阶段任务队列
+
+    PostgreSQL上使用 FOR UPDATE SKIP LOCKED 领取任务，多个进程的worker可以共享同一队列。
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        max_attempts: int = settings.WORKFLOW_JOB_MAX_ATTEMPTS,
+        retry_delay: float = settings.WORKFLOW_JOB_RETRY_DELAY,
+        retry_backoff: float = 2.0,
+        max_retry_delay: float = 300.0,
+        lease_seconds: int = settings.WORKFLOW_JOB_LEASE_SECONDS
+    ):
+        self.queue_name = queue_name
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retry_backoff = retry_backoff
+        self.max_retry_delay = max_retry_delay
+        self.lease_seconds = lease_seconds
+
+    async def enqueue(
+        self,
+        task_id: str,
+        stage: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        delay: float = 0
+    ) -> bool:
+        """
+        入队阶段任务
+
+        Returns:
+            是否新建了任务，同一任务同一阶段已存在时返回False
+        """
+        async with self.session_factory() as session:
+            created = await self._add_job(session, task_id, stage, payload, priority, delay)
+            await session.commit()
+        return created
+
+    async def claim(self, worker_id: str, limit: int) -> List[WorkflowJob]:
+        """领取可执行的任务，包括租约已过期的运行中任务"""
+        if limit <= 0:
+            return []
+
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(WorkflowJob)
+                .where(
+                    WorkflowJob.queue == self.queue_name,
+                    or_(
+                        and_(
+                            WorkflowJob.status == WorkflowJobStatus.PENDING,
+                            WorkflowJob.available_at <= now
+                        ),
+                        and_(
+                            WorkflowJob.status == WorkflowJobStatus.RUNNING,
+                            WorkflowJob.locked_until < now
+                        )
+                    )
+                )
+                .order_by(WorkflowJob.priority.desc(), WorkflowJob.available_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+
+            claimed = []
+            for job in result.scalars().all():
+                if job.status == WorkflowJobStatus.RUNNING:
+                    logger.warning(f"阶段任务租约过期，重新领取: {job.task_id}/{job.stage}")
+                    if job.attempts >= job.max_attempts:
+                        job.status = WorkflowJobStatus.DEAD
+                        job.last_error = job.last_error or "worker租约过期且重试次数耗尽"
+                        job.finished_at = now
+                        continue
+
+                job.status = WorkflowJobStatus.RUNNING
+                job.attempts += 1
+                job.locked_by = worker_id
+                job.locked_until = now + timedelta(seconds=self.lease_seconds)
+                job.started_at = now
+                claimed.append(job)
+
+            await session.commit()
+        return claimed
+
+    async def complete(self, job: WorkflowJob, worker_id: str, outcome: StageOutcome) -> bool:
+        """
+        标记任务成功，并在同一事务中入队下一阶段
+
+        Returns:
+            是否仍持有租约，租约已被其他worker接管时返回False且不入队下一阶段
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(WorkflowJob)
+                .where(
+                    WorkflowJob.id == job.id,
+                    WorkflowJob.locked_by == worker_id,
+                    WorkflowJob.status == WorkflowJobStatus.RUNNING
+                )
+                .values(
+                    status=WorkflowJobStatus.SUCCEEDED,
+                    result=outcome.snapshot,
+                    locked_until=None,
+                    last_error=None,
+                    finished_at=datetime.utcnow()
+                )
+            )
+            if result.rowcount == 0:
+                await session.rollback()
+                return False
+
+            if outcome.next_stage:
+                await self._add_job(
+                    session, job.task_id, outcome.next_stage, outcome.snapshot, outcome.priority
+                )
+            await session.commit()
+        return True
+
+    async def fail(self, job: WorkflowJob, worker_id: str, error: str) -> WorkflowJobStatus:
+        """记录失败，未超过最大次数时按指数退避重新排队"""
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            values = {"status": WorkflowJobStatus.DEAD, "finished_at": now}
+        else:
+            delay = min(
+                self.retry_delay * self.retry_backoff ** (job.attempts - 1),
+                self.max_retry_delay
+            )
+            values = {
+                "status": WorkflowJobStatus.PENDING,
+                "available_at": now + timedelta(seconds=delay)
+            }
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(WorkflowJob)
+                .where(WorkflowJob.id == job.id, WorkflowJob.locked_by == worker_id)
+                .values(locked_until=None, last_error=error[:2000], **values)
+            )
+            await session.commit()
+        return values["status"]
+
+    async def get_depth(self) -> Dict[str, int]:
+        """按状态统计队列中的任务数"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(WorkflowJob.status, func.count())
+                .where(WorkflowJob.queue == self.queue_name)
+                .group_by(WorkflowJob.status)
+            )
+            counts = {status.value: 0 for status in WorkflowJobStatus}
+            for status, count in result.all():
+                counts[WorkflowJobStatus(status).value] = count
+        return counts
+
+    async def get_latest_snapshot(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务最近一次持久化的快照，用于重启后恢复任务状态"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(WorkflowJob)
+                .where(WorkflowJob.queue == self.queue_name, WorkflowJob.task_id == task_id)
+                .order_by(WorkflowJob.created_at.desc())
+                .limit(1)
+            )
+            job = result.scalar_one_or_none()
+        if job is None:
+            return None
+        return job.result if job.status == WorkflowJobStatus.SUCCEEDED and job.result else job.payload
+
+    async def _add_job(
+        self,
+        session: AsyncSession,
+        task_id: str,
+        stage: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        delay: float = 0
+    ) -> bool:
+        existing = await session.execute(
+            select(WorkflowJob.id).where(
+                WorkflowJob.queue == self.queue_name,
+                WorkflowJob.task_id == task_id,
+                WorkflowJob.stage == stage
+            )
+        )
+        if existing.first() is not None:
+            return False
+
+        session.add(WorkflowJob(
+            queue=self.queue_name,
+            task_id=task_id,
+            stage=stage,
+            priority=priority,
+            payload=payload,
+            status=WorkflowJobStatus.PENDING,
+            attempts=0,
+            max_attempts=self.max_attempts,
+            available_at=datetime.utcnow() + timedelta(seconds=delay)
+        ))
+        await session.flush()
+        return True
+
+
+@dataclass
+class StageLatency:
+    """单个阶段的执行耗时统计"""
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "average_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds
+        }
+
+
+class StageWorker:
+    """进程内阶段任务worker
+
+    轮询队列领取任务，同时执行的任务数不超过concurrency。
+    """
+
+    def __init__(
+        self,
+        queue: StageJobQueue,
+        handler: StageHandler,
+        concurrency: int = settings.WORKFLOW_WORKER_CONCURRENCY,
+        poll_interval: float = 0.5,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+
+        self._running = False
+        self._poll_task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+
+        self.started_at: Optional[float] = None
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.stage_latency: Dict[str, StageLatency] = {}
+
+    async def start(self) -> None:
+        """启动轮询"""
+        if self._running:
+            return
+        self._running = True
+        self.started_at = time.monotonic()
+        self._poll_task = asyncio.create_task(self._poll_loop())
+        logger.info(f"阶段任务worker已启动: {self.worker_id}, 并发数 {self.concurrency}")
+
+    async def stop(self) -> None:
+        """停止轮询并等待执行中的任务结束"""
+        self._running = False
+        self._wakeup.set()
+        if self._poll_task:
+            await self._poll_task
+            self._poll_task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        logger.info(f"阶段任务worker已停止: {self.worker_id}")
+
+    def notify(self) -> None:
+        """有新任务入队时唤醒轮询"""
+        self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """领取并启动一批任务，返回本次领取数量"""
+        jobs = await self.queue.claim(self.worker_id, self.concurrency - len(self._in_flight))
+        for job in jobs:
+            key = str(job.id)
+            self._in_flight[key] = asyncio.create_task(self._execute(job))
+        return len(jobs)
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """执行直到队列中没有立即可执行的任务（用于测试和批处理脚本）"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # 领取期间若有任务完成，可能入队了领取查询没看到的下一阶段，需要再领取一次
+            idle = not self._in_flight
+            claimed = await self.run_once()
+            if self._in_flight:
+                await asyncio.wait(list(self._in_flight.values()), return_when=asyncio.FIRST_COMPLETED)
+            elif idle and not claimed:
+                return
+        raise asyncio.TimeoutError("阶段任务队列未在限定时间内清空")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取worker吞吐和阶段耗时"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "worker_id": self.worker_id,
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "in_flight": len(self._in_flight),
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "throughput_per_second": self.succeeded / elapsed if elapsed > 0 else 0.0,
+            "stage_latency": {
+                stage: latency.to_dict() for stage, latency in self.stage_latency.items()
+            }
+        }
+
+    async def _poll_loop(self) -> None:
+        while self._running:
+            # 在领取前清除唤醒标记，领取期间完成的任务不会丢失唤醒
+            self._wakeup.clear()
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.error(f"领取阶段任务失败: {e}")
+                claimed = 0
+
+            if claimed and len(self._in_flight) < self.concurrency:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: WorkflowJob) -> None:
+        start_time = time.perf_counter()
+        try:
+            outcome = await self.handler(job)
+            self.stage_latency.setdefault(job.stage, StageLatency()).record(
+                time.perf_counter() - start_time
+            )
+            if await self.queue.complete(job, self.worker_id, outcome):
+                self.succeeded += 1
+            else:
+                logger.warning(f"阶段任务租约已被接管，丢弃结果: {job.task_id}/{job.stage}")
+        except Exception as e:
+            logger.error(f"阶段任务执行失败: {job.task_id}/{job.stage}, 第{job.attempts}次: {e}")
+            try:
+                status = await self.queue.fail(job, self.worker_id, str(e))
+                if status == WorkflowJobStatus.DEAD:
+                    self.dead += 1
+                else:
+                    self.retried += 1
+            except Exception as fail_error:
+                logger.error(f"记录阶段任务失败状态出错: {fail_error}")
+        finally:
+            self._in_flight.pop(str(job.id), None)
+            # 完成后可能有下一阶段入队或空出并发槽
+            self._wakeup.set()
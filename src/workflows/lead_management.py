@@ -6,12 +6,16 @@
 """
 
 import asyncio
+import json
 import logging
+import uuid
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from src.agents.professional.market_agent import MarketAgent
 from src.agents.professional.sales_management_agent import SalesManagementAgent
@@ -20,7 +24,11 @@ from src.services.lead_service import LeadService
 from src.services.customer_service import CustomerService
 from src.models.lead import Lead, LeadStatus, LeadSource
 from src.schemas.lead import LeadCreate, LeadUpdate, LeadResponse
-from src.core.database import get_db
+from src.core.config import settings
+from src.core.database import get_db, AsyncSessionLocal
+from src.models.workflow_job import WorkflowJob
+from src.workflows.job_queue import StageJobQueue, StageWorker, StageOutcome
+from src.workflows.task_registry import TaskRegistry, RegisteredTask
 
 logger = logging.getLogger(__name__)
 
@@ -95,7 +103,7 @@ class AssignmentRule:
 
 
 @dataclass
-class LeadWorkflowTask:
+class LeadWorkflowTask(RegisteredTask):
     """线索工作流任务"""
     task_id: str
     lead_id: str
@@ -110,27 +118,100 @@ class LeadWorkflowTask:
     results: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """转换为可持久化的JSON快照"""
+        return {
+            'task_id': self.task_id,
+            'lead_id': str(self.lead_id),
+            'stage': self.stage.value,
+            'priority': self.priority.value,
+            'assigned_to': self.assigned_to,
+            'title': self.title,
+            'description': self.description,
+            'due_date': self.due_date.isoformat(),
+            'status': self.status,
+            'progress': self.progress,
+            'results': json.loads(json.dumps(self.results, default=str)),
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "LeadWorkflowTask":
+        """从持久化快照恢复任务"""
+        return cls(
+            task_id=snapshot['task_id'],
+            lead_id=snapshot['lead_id'],
+            stage=WorkflowStage(snapshot['stage']),
+            priority=LeadPriority(snapshot['priority']),
+            assigned_to=snapshot.get('assigned_to'),
+            title=snapshot.get('title', ''),
+            description=snapshot.get('description', ''),
+            due_date=datetime.fromisoformat(snapshot['due_date']),
+            status=snapshot.get('status', 'pending'),
+            progress=snapshot.get('progress', 0.0),
+            results=snapshot.get('results', {}),
+            created_at=datetime.fromisoformat(snapshot['created_at']),
+            updated_at=datetime.fromisoformat(snapshot['updated_at'])
+        )
+
+
+# 阶段任务在队列中的优先级
+QUEUE_PRIORITY = {
+    LeadPriority.CRITICAL: 3,
+    LeadPriority.HIGH: 2,
+    LeadPriority.MEDIUM: 1,
+    LeadPriority.LOW: 0
+}
 
 
 class LeadManagementWorkflow:
-    """线索管理工作流"""
+    """线索管理工作流
+    
+    配置了job_queue时，各阶段作为持久化阶段任务由worker异步执行，
+    process_new_lead只创建线索和任务后立即返回；未配置时在调用方中依次执行各阶段。
+    """
     
     def __init__(
         self,
         market_agent: MarketAgent,
         sales_management_agent: SalesManagementAgent,
         sales_agent: SalesAgent,
-        lead_service: LeadService,
-        customer_service: CustomerService
+        lead_service: Optional[LeadService] = None,
+        customer_service: Optional[CustomerService] = None,
+        session_factory: Optional[async_sessionmaker] = None,
+        job_queue: Optional[StageJobQueue] = None,
+        worker_concurrency: int = settings.WORKFLOW_WORKER_CONCURRENCY
     ):
         self.market_agent = market_agent
         self.sales_management_agent = sales_management_agent
         self.sales_agent = sales_agent
         self.lead_service = lead_service
         self.customer_service = customer_service
+        self.session_factory = session_factory
         
-        # 活跃任务
-        self.active_tasks: Dict[str, LeadWorkflowTask] = {}
+        # 活跃任务，按阶段、优先级、状态和负责人索引，已完成任务过期后归档
+        self.active_tasks: TaskRegistry[LeadWorkflowTask] = TaskRegistry(
+            "lead_management",
+            assignee_field="assigned_to",
+            session_factory=session_factory
+        )
+        
+        # 阶段任务队列和worker
+        self.job_queue = job_queue
+        self.worker = (
+            StageWorker(job_queue, self._handle_stage_job, concurrency=worker_concurrency)
+            if job_queue else None
+        )
+        self._stage_handlers = {
+            WorkflowStage.SCORING: self._execute_scoring_stage,
+            WorkflowStage.QUALIFICATION: self._execute_qualification_stage,
+            WorkflowStage.ASSIGNMENT: self._execute_assignment_stage,
+            WorkflowStage.FOLLOW_UP: self._execute_follow_up_stage
+        }
+        # 已计入销售代表负载的任务，阶段重试时不重复计数
+        self._counted_assignments: Dict[str, str] = {}
         
         # 销售代表信息
         self.sales_reps: Dict[str, SalesRep] = {}
@@ -144,7 +225,57 @@ class LeadManagementWorkflow:
         self.logger = logging.getLogger(__name__)
         
         # 初始化默认数据
-        asyncio.create_task(self._initialize_default_data())
+        try:
+            asyncio.get_running_loop().create_task(self._initialize_default_data())
+        except RuntimeError:
+            self.logger.debug("无运行中的事件循环，跳过默认数据初始化")
+    
+    @asynccontextmanager
+    async def _lead_service_scope(self):
+        """获取线索服务，配置了会话工厂时每次使用独立会话（阶段在worker中执行，不能复用请求会话）"""
+        if self.session_factory is None:
+            yield self.lead_service
+            return
+        
+        async with self.session_factory() as db:
+            yield LeadService(db)
+    
+    def _advance_stage(self, task: LeadWorkflowTask, stage: WorkflowStage) -> WorkflowStage:
+        """进入下一阶段"""
+        task.stage = stage
+        task.updated_at = datetime.now()
+        return stage
+    
+    async def _run_stages(self, task_id: str, stage: Optional[WorkflowStage]) -> None:
+        """在当前协程中依次执行各阶段"""
+        while stage is not None:
+            stage = await self._stage_handlers[stage](task_id)
+    
+    async def _handle_stage_job(self, job: WorkflowJob) -> StageOutcome:
+        """执行队列中的单个阶段任务"""
+        task = self.active_tasks.get(job.task_id)
+        if task is None:
+            # worker重启后从入队快照恢复任务
+            task = LeadWorkflowTask.from_snapshot(job.payload)
+            self.active_tasks[task.task_id] = task
+        
+        next_stage = await self._stage_handlers[WorkflowStage(job.stage)](task.task_id)
+        
+        return StageOutcome(
+            snapshot=task.to_snapshot(),
+            next_stage=next_stage.value if next_stage else None,
+            priority=QUEUE_PRIORITY[task.priority]
+        )
+    
+    async def start_worker(self) -> None:
+        """启动阶段任务worker，会先接管未完成和租约过期的任务"""
+        if self.worker:
+            await self.worker.start()
+    
+    async def stop_worker(self) -> None:
+        """停止阶段任务worker"""
+        if self.worker:
+            await self.worker.stop()
     
     def _initialize_scoring_config(self) -> Dict[str, Any]:
         """初始化评分配置"""
@@ -276,7 +407,7 @@ class LeadManagementWorkflow:
             任务ID
         """
         try:
-            task_id = f"lead_task_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            task_id = f"lead_task_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
             
             # 创建线索记录
             lead_create = LeadCreate(
@@ -297,8 +428,7 @@ class LeadManagementWorkflow:
             )
             
             # 保存线索到数据库
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.create_lead(lead_create)
                 lead_id = lead.id
             
@@ -317,7 +447,17 @@ class LeadManagementWorkflow:
             self.active_tasks[task_id] = workflow_task
             
             # 启动评分阶段
-            await self._execute_scoring_stage(task_id)
+            if self.job_queue:
+                await self.job_queue.enqueue(
+                    task_id,
+                    WorkflowStage.SCORING.value,
+                    workflow_task.to_snapshot(),
+                    priority=QUEUE_PRIORITY[workflow_task.priority]
+                )
+                if self.worker:
+                    self.worker.notify()
+            else:
+                await self._run_stages(task_id, WorkflowStage.SCORING)
             
             self.logger.info(f"开始处理新线索: {task_id}, 线索ID: {lead_id}")
             return task_id
@@ -326,16 +466,15 @@ class LeadManagementWorkflow:
             self.logger.error(f"处理新线索失败: {e}")
             raise
     
-    async def _execute_scoring_stage(self, task_id: str) -> None:
-        """执行评分阶段"""
+    async def _execute_scoring_stage(self, task_id: str) -> Optional[WorkflowStage]:
+        """执行评分阶段，返回下一阶段"""
         try:
             task = self.active_tasks[task_id]
             task.stage = WorkflowStage.SCORING
             task.updated_at = datetime.now()
             
             # 获取线索详细信息
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.get_lead(task.lead_id)
                 
                 if not lead:
@@ -384,8 +523,7 @@ class LeadManagementWorkflow:
                 task.priority = LeadPriority.LOW
             
             # 更新线索状态和分数
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 await lead_service.update_lead(
                     task.lead_id,
                     LeadUpdate(
@@ -399,14 +537,14 @@ class LeadManagementWorkflow:
                 )
             
             # 继续资格认证阶段
-            await self._execute_qualification_stage(task_id)
+            return self._advance_stage(task, WorkflowStage.QUALIFICATION)
             
         except Exception as e:
             self.logger.error(f"评分阶段执行失败: {e}")
             raise
     
-    async def _execute_qualification_stage(self, task_id: str) -> None:
-        """执行资格认证阶段"""
+    async def _execute_qualification_stage(self, task_id: str) -> Optional[WorkflowStage]:
+        """执行资格认证阶段，返回下一阶段"""
         try:
             task = self.active_tasks[task_id]
             task.stage = WorkflowStage.QUALIFICATION
@@ -423,11 +561,10 @@ class LeadManagementWorkflow:
                     'recommended_actions': ['邮件培育', '内容推送', '定期跟进']
                 }
                 task.progress = 0.8
-                return
+                return None
             
             # 获取线索信息
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.get_lead(task.lead_id)
             
             # 使用销售Agent进行深度资格认证
@@ -456,26 +593,26 @@ class LeadManagementWorkflow:
             # 根据资格认证结果决定下一步
             if qualification_result.get('qualified', False):
                 # 继续分配阶段
-                await self._execute_assignment_stage(task_id)
-            else:
-                # 进入培育阶段
-                task.stage = WorkflowStage.NURTURING
-                task.progress = 0.8
+                return self._advance_stage(task, WorkflowStage.ASSIGNMENT)
+            
+            # 进入培育阶段
+            task.stage = WorkflowStage.NURTURING
+            task.progress = 0.8
+            return None
             
         except Exception as e:
             self.logger.error(f"资格认证阶段执行失败: {e}")
             raise
     
-    async def _execute_assignment_stage(self, task_id: str) -> None:
-        """执行分配阶段"""
+    async def _execute_assignment_stage(self, task_id: str) -> Optional[WorkflowStage]:
+        """执行分配阶段，返回下一阶段"""
         try:
             task = self.active_tasks[task_id]
             task.stage = WorkflowStage.ASSIGNMENT
             task.updated_at = datetime.now()
             
             # 获取线索信息
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.get_lead(task.lead_id)
             
             lead_score = LeadScore(**task.results['lead_score'])
@@ -500,8 +637,10 @@ class LeadManagementWorkflow:
             assignment_strategy = assignment_result.get('strategy', '')
             
             if assigned_rep_id and assigned_rep_id in self.sales_reps:
-                # 更新销售代表负载
-                self.sales_reps[assigned_rep_id].current_load += 1
+                # 更新销售代表负载（阶段重试时不重复计数）
+                if self._counted_assignments.get(task_id) != assigned_rep_id:
+                    self.sales_reps[assigned_rep_id].current_load += 1
+                    self._counted_assignments[task_id] = assigned_rep_id
                 self.sales_reps[assigned_rep_id].last_assignment = datetime.now()
                 
                 # 更新任务分配
@@ -515,8 +654,7 @@ class LeadManagementWorkflow:
                 }
                 
                 # 更新线索分配信息
-                async with get_db() as db:
-                    lead_service = LeadService(db)
+                async with self._lead_service_scope() as lead_service:
                     await lead_service.update_lead(
                         task.lead_id,
                         LeadUpdate(
@@ -532,19 +670,19 @@ class LeadManagementWorkflow:
                 task.progress = 0.7
                 
                 # 继续跟进阶段
-                await self._execute_follow_up_stage(task_id)
-                
-            else:
-                # 分配失败，记录原因
-                task.results['assignment_error'] = assignment_result.get('error', '无可用销售代表')
-                self.logger.warning(f"线索分配失败: {task_id}, 原因: {task.results['assignment_error']}")
+                return self._advance_stage(task, WorkflowStage.FOLLOW_UP)
+            
+            # 分配失败，记录原因
+            task.results['assignment_error'] = assignment_result.get('error', '无可用销售代表')
+            self.logger.warning(f"线索分配失败: {task_id}, 原因: {task.results['assignment_error']}")
+            return None
             
         except Exception as e:
             self.logger.error(f"分配阶段执行失败: {e}")
             raise
     
-    async def _execute_follow_up_stage(self, task_id: str) -> None:
-        """执行跟进阶段"""
+    async def _execute_follow_up_stage(self, task_id: str) -> Optional[WorkflowStage]:
+        """执行跟进阶段，流程结束返回None"""
         try:
             task = self.active_tasks[task_id]
             task.stage = WorkflowStage.FOLLOW_UP
@@ -558,8 +696,7 @@ class LeadManagementWorkflow:
                 raise ValueError("未找到分配的销售代表")
             
             # 获取线索信息
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.get_lead(task.lead_id)
             
             # 生成跟进计划
@@ -584,8 +721,7 @@ class LeadManagementWorkflow:
             task.progress = 0.9
             
             # 更新线索状态
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 await lead_service.update_lead(
                     task.lead_id,
                     LeadUpdate(
@@ -598,6 +734,7 @@ class LeadManagementWorkflow:
                 )
             
             self.logger.info(f"线索跟进计划已生成: {task_id}")
+            return None
             
         except Exception as e:
             self.logger.error(f"跟进阶段执行失败: {e}")
@@ -617,8 +754,7 @@ class LeadManagementWorkflow:
                 return False
             
             # 更新数据库中的线索状态
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 lead = await lead_service.get_lead(task.lead_id)
                 
                 if not lead:
@@ -694,8 +830,7 @@ class LeadManagementWorkflow:
             task.updated_at = datetime.now()
             
             # 更新数据库
-            async with get_db() as db:
-                lead_service = LeadService(db)
+            async with self._lead_service_scope() as lead_service:
                 await lead_service.update_lead(
                     task.lead_id,
                     LeadUpdate(
@@ -715,9 +850,23 @@ class LeadManagementWorkflow:
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务状态"""
         task = self.active_tasks.get(task_id)
+        if not task:
+            # 已完成任务超过保留时间后从归档表读取
+            snapshot = await self.active_tasks.get_archived(task_id)
+            if snapshot:
+                return self._format_task_status(LeadWorkflowTask.from_snapshot(snapshot))
+        if not task and self.job_queue:
+            # 进程重启后从阶段任务快照恢复
+            snapshot = await self.job_queue.get_latest_snapshot(task_id)
+            if snapshot:
+                task = LeadWorkflowTask.from_snapshot(snapshot)
+                self.active_tasks[task_id] = task
         if not task:
             return None
         
+        return self._format_task_status(task)
+    
+    def _format_task_status(self, task: LeadWorkflowTask) -> Dict[str, Any]:
         return {
             'task_id': task.task_id,
             'lead_id': task.lead_id,
@@ -740,11 +889,11 @@ class LeadManagementWorkflow:
         if not rep:
             return None
         
-        # 统计分配给该代表的活跃任务
-        assigned_tasks = [
-            task for task in self.active_tasks.values()
-            if task.assigned_to == rep_id and task.status != "completed"
-        ]
+        # 统计分配给该代表的未完成任务
+        assigned_tasks_count = (
+            self.active_tasks.count(assigned_to=rep_id)
+            - self.active_tasks.count(assigned_to=rep_id, status="completed")
+        )
         
         return {
             'rep_id': rep.rep_id,
@@ -753,7 +902,7 @@ class LeadManagementWorkflow:
             'max_capacity': rep.max_capacity,
             'utilization_rate': rep.current_load / rep.max_capacity if rep.max_capacity > 0 else 0,
             'performance_score': rep.performance_score,
-            'assigned_tasks_count': len(assigned_tasks),
+            'assigned_tasks_count': assigned_tasks_count,
             'territory': rep.territory,
             'skills': rep.skills,
             'specialties': rep.specialties,
@@ -761,6 +910,16 @@ class LeadManagementWorkflow:
             'last_assignment': rep.last_assignment.isoformat() if rep.last_assignment else None
         }
     
+    async def get_queue_metrics(self) -> Dict[str, Any]:
+        """获取阶段任务队列深度、阶段耗时和吞吐"""
+        if not self.job_queue:
+            return {}
+        
+        return {
+            'depth': await self.job_queue.get_depth(),
+            'worker': self.worker.get_metrics() if self.worker else None
+        }
+    
     async def get_workflow_metrics(self) -> Dict[str, Any]:
         """获取工作流指标"""
         try:
@@ -775,22 +934,10 @@ class LeadManagementWorkflow:
                     'sales_rep_utilization': {}
                 }
             
-            # 按阶段统计
-            tasks_by_stage = {}
-            tasks_by_priority = {}
-            total_progress = 0
-            completed_tasks = 0
-            
-            for task in self.active_tasks.values():
-                stage = task.stage.value
-                priority = task.priority.value
-                
-                tasks_by_stage[stage] = tasks_by_stage.get(stage, 0) + 1
-                tasks_by_priority[priority] = tasks_by_priority.get(priority, 0) + 1
-                total_progress += task.progress
-                
-                if task.status == "completed":
-                    completed_tasks += 1
+            # 阶段、优先级和完成数由任务注册表增量维护
+            tasks_by_stage = self.active_tasks.counts('stage')
+            tasks_by_priority = self.active_tasks.counts('priority')
+            completed_tasks = self.active_tasks.count(status="completed")
             
             # 销售代表利用率
             sales_rep_utilization = {}
@@ -803,15 +950,21 @@ class LeadManagementWorkflow:
                     'max_capacity': rep.max_capacity
                 }
             
-            return {
+            metrics = {
                 'total_tasks': total_tasks,
                 'tasks_by_stage': tasks_by_stage,
                 'tasks_by_priority': tasks_by_priority,
-                'average_progress': total_progress / total_tasks,
+                'average_progress': self.active_tasks.average_progress,
                 'completion_rate': completed_tasks / total_tasks,
-                'sales_rep_utilization': sales_rep_utilization
+                'sales_rep_utilization': sales_rep_utilization,
+                'archived_tasks': self.active_tasks.archived_count
             }
             
+            if self.job_queue:
+                metrics['job_queue'] = await self.get_queue_metrics()
+            
+            return metrics
+            
         except Exception as e:
             self.logger.error(f"获取工作流指标失败: {e}")
             return {}
@@ -843,17 +996,14 @@ async def create_lead_management_workflow() -> LeadManagementWorkflow:
         specialty="客户管理和销售流程"
     )
     
-    # 获取数据库会话
-    async with get_db() as db:
-        lead_service = LeadService(db)
-        customer_service = CustomerService(db)
-        
-        workflow = LeadManagementWorkflow(
-            market_agent=market_agent,
-            sales_management_agent=sales_management_agent,
-            sales_agent=sales_agent,
-            lead_service=lead_service,
-            customer_service=customer_service
-        )
-        
-        return workflow
\ No newline at end of file
+    # 阶段在worker中执行，每个阶段使用独立的数据库会话
+    workflow = LeadManagementWorkflow(
+        market_agent=market_agent,
+        sales_management_agent=sales_management_agent,
+        sales_agent=sales_agent,
+        session_factory=AsyncSessionLocal,
+        job_queue=StageJobQueue("lead_management", session_factory=AsyncSessionLocal)
+    )
+    await workflow.start_worker()
+    
+    return workflow
@@ -0,0 +1,167 @@
+"""
+潜在客户并发执行器
+
+工作流中逐个潜在客户的Agent调用（资格认证、画像增强、接触策略、拜访计划）并发执行，
+同时在途的LLM调用数和每分钟token用量受限，每个客户完成后立即回调以便流式写入任务结果，
+取消时停止所有在途调用。
+"""
+
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set, TypeVar
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class ProspectStatus(str, Enum):
+    """单个潜在客户的处理状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ProspectExecutionCancelled(Exception):
+    """执行已被取消"""
+
+
+class TokenBudget:
+    """每分钟token预算（令牌桶），tokens_per_minute为0时不限制"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._available = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """等待直到预算足够，按请求顺序放行"""
+        if self.tokens_per_minute <= 0:
+            return
+
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._available = min(
+                    self.tokens_per_minute,
+                    self._available + (now - self._updated_at) * self.tokens_per_minute / 60
+                )
+                self._updated_at = now
+
+                if self._available >= tokens:
+                    self._available -= tokens
+                    return
+                await asyncio.sleep((tokens - self._available) * 60 / self.tokens_per_minute)
+
+
+class ProspectExecutor:
+    """潜在客户并发执行器
+
+    call() 包装单次LLM调用，受最大在途调用数和token预算限制；
+    map() 为每个潜在客户启动一个协程，完成一个回调一个。
+    """
+
+    def __init__(
+        self,
+        max_concurrent_calls: int = settings.DISCOVERY_MAX_CONCURRENT_LLM_CALLS,
+        tokens_per_minute: int = settings.DISCOVERY_TOKENS_PER_MINUTE,
+        tokens_per_call: int = settings.DISCOVERY_ESTIMATED_TOKENS_PER_CALL
+    ):
+        self.max_concurrent_calls = max_concurrent_calls
+        self.tokens_per_call = tokens_per_call
+        self.budget = TokenBudget(tokens_per_minute)
+
+        self._semaphore = asyncio.Semaphore(max_concurrent_calls)
+        self._tasks: Set[asyncio.Task] = set()
+        self.cancelled = False
+
+        self.calls = 0
+        self.in_flight = 0
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[R]],
+        *args: Any,
+        tokens: Optional[int] = None,
+        **kwargs: Any
+    ) -> R:
+        """在并发和token预算限制内执行一次LLM调用"""
+        self._raise_if_cancelled()
+        await self.budget.acquire(tokens or self.tokens_per_call)
+        async with self._semaphore:
+            self._raise_if_cancelled()
+            self.in_flight += 1
+            self.calls += 1
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+    async def map(
+        self,
+        items: Sequence[T],
+        handler: Callable[[T], Awaitable[R]],
+        on_done: Optional[Callable[[int, Optional[R], Optional[BaseException]], None]] = None
+    ) -> List[Optional[R]]:
+        """
+        并发处理每个对象
+
+        Args:
+            items: 待处理对象
+            handler: 单个对象的处理协程
+            on_done: 每个对象完成时的回调 (索引, 结果, 异常)
+
+        Returns:
+            按输入顺序排列的结果，失败的对象为None
+
+        Raises:
+            ProspectExecutionCancelled: 执行被取消
+        """
+        self._raise_if_cancelled()
+
+        tasks = [asyncio.create_task(handler(item)) for item in items]
+        positions = {task: index for index, task in enumerate(tasks)}
+        self._tasks.update(tasks)
+        results: List[Optional[R]] = [None] * len(tasks)
+
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = positions[task]
+                    if task.cancelled():
+                        error: Optional[BaseException] = ProspectExecutionCancelled()
+                    else:
+                        error = task.exception()
+                        if error is None:
+                            results[index] = task.result()
+                    if on_done:
+                        on_done(index, results[index], error)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            self._tasks.difference_update(tasks)
+
+        self._raise_if_cancelled()
+        return results
+
+    def cancel(self) -> None:
+        """取消所有在途和未开始的调用"""
+        self.cancelled = True
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise ProspectExecutionCancelled("执行已取消")
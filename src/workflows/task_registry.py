@@ -0,0 +1,302 @@
+"""
+工作流任务注册表
+
+以任务ID保存工作流任务，并按阶段、优先级、状态和负责人维护二级索引和计数，
+工作流指标和任务列表不再需要遍历全部任务。已完成且超过保留时间的任务归档到数据库。
+"""
+
+import asyncio
+import base64
+import bisect
+import logging
+import time
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, Generic, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core.config import settings
+from src.models.workflow_job import WorkflowTaskArchive
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class RegisteredTask:
+    """可注册到TaskRegistry的任务混入类
+
+    被索引字段或进度变化时通知所属注册表，工作流中直接给任务字段赋值即可保持索引一致。
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        registry = self.__dict__.get("_registry")
+        if registry is None or name not in registry.watched_fields:
+            object.__setattr__(self, name, value)
+            return
+
+        old = self.__dict__.get(name, _MISSING)
+        object.__setattr__(self, name, value)
+        if old is not _MISSING and old != value:
+            registry._on_change(self, name, old, value)
+
+
+T = TypeVar("T", bound=RegisteredTask)
+
+
+def _index_key(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+class TaskRegistry(MutableMapping, Generic[T]):
+    """带二级索引的工作流任务注册表
+
+    按映射方式使用（registry[task_id] = task），索引、计数和创建时间排序在写入、
+    删除和任务字段变更时增量维护，count/counts/average_progress均为O(1)。
+    """
+
+    def __init__(
+        self,
+        workflow: str,
+        assignee_field: str,
+        index_fields: Sequence[str] = ("stage", "priority", "status"),
+        completed_status: str = "completed",
+        session_factory: Optional[async_sessionmaker] = None,
+        retention_hours: float = settings.WORKFLOW_TASK_RETENTION_HOURS,
+        archive_interval: float = settings.WORKFLOW_TASK_ARCHIVE_INTERVAL
+    ):
+        self.workflow = workflow
+        self.assignee_field = assignee_field
+        self.index_fields = tuple(index_fields) + (assignee_field,)
+        self.watched_fields = frozenset(self.index_fields + ("progress",))
+        self.completed_status = completed_status
+        self.session_factory = session_factory
+        self.retention = timedelta(hours=retention_hours)
+        self.archive_interval = archive_interval
+
+        self._tasks: Dict[str, T] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.index_fields}
+        self._order: List[Tuple[datetime, str]] = []
+        self._progress_sum = 0.0
+
+        self.archived_count = 0
+        self._last_archive = time.monotonic()
+        self._archive_task: Optional[asyncio.Task] = None
+
+    # 映射接口
+
+    def __getitem__(self, task_id: str) -> T:
+        return self._tasks[task_id]
+
+    def __setitem__(self, task_id: str, task: T) -> None:
+        if task_id in self._tasks:
+            del self[task_id]
+
+        self._tasks[task_id] = task
+        for field in self.index_fields:
+            self._indexes[field].setdefault(_index_key(getattr(task, field)), set()).add(task_id)
+        bisect.insort(self._order, (task.created_at, task_id))
+        self._progress_sum += task.progress
+        object.__setattr__(task, "_registry", self)
+
+        self._maybe_schedule_archive()
+
+    def __delitem__(self, task_id: str) -> None:
+        task = self._tasks.pop(task_id)
+        for field in self.index_fields:
+            self._discard(field, _index_key(getattr(task, field)), task_id)
+        position = bisect.bisect_left(self._order, (task.created_at, task_id))
+        if position < len(self._order) and self._order[position] == (task.created_at, task_id):
+            del self._order[position]
+        self._progress_sum -= task.progress
+        task.__dict__.pop("_registry", None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tasks)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def values(self):
+        return self._tasks.values()
+
+    def items(self):
+        return self._tasks.items()
+
+    # 计数
+
+    def count(self, **filters: Any) -> int:
+        """按索引字段统计任务数，多个条件取交集"""
+        if not filters:
+            return len(self._tasks)
+        if len(filters) == 1:
+            (field, value), = filters.items()
+            return len(self._indexes[field].get(_index_key(value), ()))
+        return len(self._matching_ids(filters))
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """按索引字段分组计数"""
+        return {key: len(task_ids) for key, task_ids in self._indexes[field].items() if task_ids}
+
+    @property
+    def average_progress(self) -> float:
+        return self._progress_sum / len(self._tasks) if self._tasks else 0.0
+
+    # 分页
+
+    def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        **filters: Any
+    ) -> Tuple[List[T], Optional[str]]:
+        """
+        按创建时间倒序分页列出任务
+
+        Returns:
+            (本页任务, 下一页游标)，没有更多任务时游标为None
+        """
+        if filters:
+            order = sorted(
+                (self._tasks[task_id].created_at, task_id) for task_id in self._matching_ids(filters)
+            )
+        else:
+            order = self._order
+
+        end = bisect.bisect_left(order, self._decode_cursor(cursor)) if cursor else len(order)
+        start = max(end - limit, 0)
+        page = [self._tasks[task_id] for _, task_id in reversed(order[start:end])]
+        next_cursor = self._encode_cursor(order[start]) if start > 0 else None
+        return page, next_cursor
+
+    # 归档
+
+    async def archive_expired(self, now: Optional[datetime] = None) -> int:
+        """将已完成且超过保留时间的任务写入归档表并移出注册表，返回归档数量"""
+        self._last_archive = time.monotonic()
+        if self.session_factory is None:
+            return 0
+
+        cutoff = (now or datetime.now()) - self.retention
+        expired = [
+            task_id for task_id in self._indexes["status"].get(self.completed_status, ())
+            if self._tasks[task_id].updated_at <= cutoff
+        ]
+        if not expired:
+            return 0
+
+        archived = 0
+        for offset in range(0, len(expired), 500):
+            batch = expired[offset:offset + 500]
+            try:
+                async with self.session_factory() as session:
+                    existing = await session.execute(
+                        select(WorkflowTaskArchive.task_id).where(
+                            WorkflowTaskArchive.workflow == self.workflow,
+                            WorkflowTaskArchive.task_id.in_(batch)
+                        )
+                    )
+                    already_archived = set(existing.scalars().all())
+                    session.add_all([
+                        self._to_archive(self._tasks[task_id])
+                        for task_id in batch
+                        if task_id in self._tasks and task_id not in already_archived
+                    ])
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"归档工作流任务失败: {self.workflow}, {e}")
+                break
+
+            for task_id in batch:
+                # 写入期间任务可能被重新打开
+                task = self._tasks.get(task_id)
+                if task is not None and task.status == self.completed_status:
+                    del self[task_id]
+                    archived += 1
+
+        self.archived_count += archived
+        if archived:
+            logger.info(f"已归档{archived}个已完成的工作流任务: {self.workflow}")
+        return archived
+
+    async def get_archived(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取已归档任务的快照"""
+        if self.session_factory is None:
+            return None
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(WorkflowTaskArchive.snapshot).where(
+                    WorkflowTaskArchive.workflow == self.workflow,
+                    WorkflowTaskArchive.task_id == task_id
+                )
+            )
+            return result.scalar_one_or_none()
+
+    def _maybe_schedule_archive(self) -> None:
+        if self.session_factory is None or time.monotonic() - self._last_archive < self.archive_interval:
+            return
+        if self._archive_task and not self._archive_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._last_archive = time.monotonic()
+        self._archive_task = loop.create_task(self.archive_expired())
+
+    def _to_archive(self, task: T) -> WorkflowTaskArchive:
+        return WorkflowTaskArchive(
+            workflow=self.workflow,
+            task_id=task.task_id,
+            stage=_index_key(task.stage),
+            priority=_index_key(task.priority),
+            status=task.status,
+            assignee=getattr(task, self.assignee_field),
+            progress=task.progress,
+            snapshot=task.to_snapshot(),
+            created_at=task.created_at,
+            completed_at=task.updated_at
+        )
+
+    # 内部维护
+
+    def _on_change(self, task: T, field: str, old: Any, new: Any) -> None:
+        if field == "progress":
+            self._progress_sum += new - old
+            return
+
+        task_id = task.task_id
+        self._discard(field, _index_key(old), task_id)
+        self._indexes[field].setdefault(_index_key(new), set()).add(task_id)
+
+    def _discard(self, field: str, key: Any, task_id: str) -> None:
+        task_ids = self._indexes[field].get(key)
+        if task_ids is not None:
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self._indexes[field][key]
+
+    def _matching_ids(self, filters: Dict[str, Any]) -> Set[str]:
+        sets = sorted(
+            (self._indexes[field].get(_index_key(value), set()) for field, value in filters.items()),
+            key=len
+        )
+        return sets[0].intersection(*sets[1:])
+
+    @staticmethod
+    def _encode_cursor(key: Tuple[datetime, str]) -> str:
+        created_at, task_id = key
+        raw = f"{created_at.isoformat()}|{task_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(created_at), task_id
+        except Exception:
+            raise ValueError(f"无效的分页游标: {cursor}")
@@ -8,8 +8,10 @@ import json
 from datetime import datetime
 from unittest.mock import Mock, AsyncMock, patch
 
+from aio_pika import DeliveryMode
+
 from src.agents.communication import (
-    MessageBroker, AgentCommunicator, CommunicationConfig
+    MessageBroker, AgentCommunicator, CommunicationConfig, MessageSerializer, InMemoryTransport
 )
 from src.agents.base import AgentMessage, MessageType
 
@@ -220,6 +222,38 @@ class TestMessageBroker:
         assert "Not connected" in health["message"]
 
 
+    @pytest.mark.asyncio
+    async def test_request_response_messages_not_persistent(self, message_broker, test_message):
+        """测试请求/响应消息默认不持久化"""
+        await message_broker.publish_message(test_message, "receiver-agent")
+        persistent_message = message_broker.exchange.publish.call_args[0][0]
+        
+        test_message.correlation_id = "corr-1"
+        await message_broker.publish_message(test_message, "receiver-agent")
+        request_message = message_broker.exchange.publish.call_args[0][0]
+        
+        assert persistent_message.delivery_mode == DeliveryMode.PERSISTENT
+        assert request_message.delivery_mode == DeliveryMode.NOT_PERSISTENT
+        assert request_message.headers["schema_version"] == MessageSerializer.SCHEMA_VERSION
+    
+    @pytest.mark.asyncio
+    async def test_publish_batch(self, message_broker):
+        """测试批量发布消息"""
+        messages = [
+            (
+                AgentMessage(type=MessageType.TASK, sender_id="sender", content=f"msg {i}"),
+                f"agent-{i % 3}"
+            )
+            for i in range(25)
+        ]
+        
+        await message_broker.publish_batch(messages, batch_size=10)
+        
+        assert message_broker.exchange.publish.call_count == 25
+        routing_keys = [call[1]["routing_key"] for call in message_broker.exchange.publish.call_args_list]
+        assert routing_keys == [routing_key for _, routing_key in messages]
+
+
 class TestAgentCommunicator:
     """测试Agent通信器"""
     
@@ -439,6 +473,137 @@ class TestAgentCommunicator:
         assert health["registered_handlers"] == 1
 
 
+    @pytest.mark.asyncio
+    async def test_concurrent_handler_limit(self, message_broker):
+        """测试消息处理器并发执行且受并发上限约束"""
+        config = CommunicationConfig(max_concurrent_handlers=3)
+        communicator = AgentCommunicator("test-agent-2", message_broker, config)
+        
+        running = 0
+        max_running = 0
+        
+        async def slow_handler(message):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+        
+        communicator.register_handler(MessageType.TASK, slow_handler)
+        
+        deliveries = []
+        for i in range(9):
+            message = AgentMessage(type=MessageType.TASK, sender_id="sender", content=f"msg {i}")
+            delivery = Mock()
+            delivery.body = MessageSerializer("json").dumps(message)
+            delivery.content_type = "application/json"
+            delivery.ack = AsyncMock()
+            delivery.nack = AsyncMock()
+            deliveries.append(delivery)
+        
+        class FakeIterator:
+            async def __aenter__(self):
+                return self
+            
+            async def __aexit__(self, *args):
+                return False
+            
+            def __aiter__(self):
+                return self._iterate()
+            
+            async def _iterate(self):
+                for delivery in deliveries:
+                    yield delivery
+        
+        communicator.queue = Mock()
+        communicator.queue.iterator = Mock(return_value=FakeIterator())
+        
+        start = asyncio.get_running_loop().time()
+        await communicator._start_consuming()
+        await asyncio.gather(*communicator._handler_tasks)
+        elapsed = asyncio.get_running_loop().time() - start
+        
+        assert max_running == 3
+        assert all(delivery.ack.await_count == 1 for delivery in deliveries)
+        assert elapsed < 0.05 * 9
+        
+        await communicator.close()
+
+
+class TestInMemoryTransport:
+    """测试进程内传输"""
+    
+    @pytest.fixture
+    async def local_pair(self, message_broker):
+        """共享进程内传输的两个通信器"""
+        transport = InMemoryTransport(max_queue_size=10)
+        requester = AgentCommunicator("local-requester", message_broker, local_transport=transport)
+        responder = AgentCommunicator("local-responder", message_broker, local_transport=transport)
+        
+        message_broker.declare_agent_queue = AsyncMock(return_value=AsyncMock())
+        with patch.object(AgentCommunicator, '_start_consuming', AsyncMock()):
+            await requester.initialize()
+            await responder.initialize()
+        
+        message_broker.publish_message = AsyncMock()
+        
+        yield transport, requester, responder
+        
+        await requester.close()
+        await responder.close()
+    
+    @pytest.mark.asyncio
+    async def test_request_response_bypasses_broker(self, local_pair):
+        """测试本地Agent请求/响应不经过消息代理"""
+        transport, requester, responder = local_pair
+        received = []
+        
+        async def handler(message):
+            received.append(message)
+            return f"handled: {message.content}"
+        
+        responder.register_handler(MessageType.TASK, handler)
+        
+        request = AgentMessage(
+            type=MessageType.TASK,
+            sender_id="local-requester",
+            receiver_id="local-responder",
+            content="ping"
+        )
+        response = await requester.send_message(request, wait_for_response=True)
+        
+        assert response.type == MessageType.RESPONSE
+        assert response.content == "handled: ping"
+        assert response.correlation_id == request.correlation_id
+        assert received[0] is request  # 零拷贝传递同一个对象
+        assert requester.get_pending_response_count() == 0
+        requester.message_broker.publish_message.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_remote_receiver_falls_back_to_broker(self, local_pair):
+        """测试非本地接收者回退到RabbitMQ"""
+        transport, requester, responder = local_pair
+        
+        message = AgentMessage(
+            type=MessageType.TASK,
+            sender_id="local-requester",
+            receiver_id="remote-agent",
+            content="ping"
+        )
+        await requester.send_message(message)
+        
+        requester.message_broker.publish_message.assert_called_once_with(message, "remote-agent")
+    
+    @pytest.mark.asyncio
+    async def test_unregister_on_close(self, local_pair):
+        """测试关闭通信器后从本地传输注销"""
+        transport, requester, responder = local_pair
+        
+        assert transport.is_local("local-responder")
+        await responder.close()
+        assert not transport.is_local("local-responder")
+
+
 class TestMessageSerialization:
     """测试消息序列化"""
     
@@ -482,6 +647,36 @@ class TestMessageSerialization:
         
         assert deserialized.metadata == message.metadata
 
+    
+    @pytest.mark.parametrize("fmt", ["json", "orjson", "msgpack"])
+    def test_message_serializer_round_trip(self, fmt):
+        """测试序列化器往返（依赖不可用时自动回退）"""
+        serializer = MessageSerializer(fmt)
+        message = AgentMessage(
+            type=MessageType.COLLABORATION,
+            sender_id="sender",
+            receiver_id="receiver",
+            content="协作请求",
+            metadata={"key": "value", "nested": {"list": [1, 2, 3]}},
+            correlation_id="corr-1"
+        )
+        
+        body = serializer.dumps(message)
+        deserialized = MessageSerializer.loads(body, serializer.content_type)
+        
+        assert deserialized == message
+    
+    def test_message_serializer_rejects_newer_schema(self):
+        """测试拒绝更高版本的消息schema"""
+        body = json.dumps({
+            "type": "task",
+            "sender_id": "sender",
+            "content": "Test",
+            "schema_version": MessageSerializer.SCHEMA_VERSION + 1
+        }).encode()
+        
+        with pytest.raises(ValueError, match="schema version"):
+            MessageSerializer.loads(body, "application/json")
 
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -117,13 +117,13 @@ class TestCRMExpertAgent:
         assert "customer_success_agent" in analysis["required_agents"]
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_provide_process_guidance(self, mock_llm, mock_rag, agent):
         """测试提供流程指导"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="销售流程最佳实践包括客户发现、需求分析、方案提议等步骤",
+            text="销售流程最佳实践包括客户发现、需求分析、方案提议等步骤",
             confidence=0.85
         )
         
@@ -174,13 +174,15 @@ class TestCRMExpertAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.multi_collection_retrieve')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_integrate_knowledge(self, mock_llm, mock_rag, agent):
         """测试知识整合"""
-        # Mock多个RAG服务调用
+        # Mock多集合RAG检索
         mock_rag.return_value = Mock(
-            answer="CRM最佳实践包括客户细分、个性化服务、数据驱动决策等",
+            documents=[Mock(), Mock()],
+            collections=["crm_best_practices", "crm_implementation_cases"],
+            text_for=Mock(return_value="CRM最佳实践包括客户细分、个性化服务、数据驱动决策等"),
             confidence=0.8
         )
         
@@ -218,18 +220,20 @@ class TestCRMExpertAgent:
         assert len(integration.sources) > 0
         assert len(integration.recommendations) >= 1
         
-        # 验证多次RAG调用
-        assert mock_rag.call_count >= 1
+        # 所有知识源在一次多集合检索中完成
+        mock_rag.assert_called_once()
+        assert mock_rag.call_args[1]['collections'] == list(agent.knowledge_collections.values())
+        assert integration.sources == ["crm_best_practices", "crm_implementation_cases"]
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_assess_quality(self, mock_llm, mock_rag, agent):
         """测试质量评估"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="CRM系统质量评估应包括数据完整性、流程合规性等维度",
+            text="CRM系统质量评估应包括数据完整性、流程合规性等维度",
             confidence=0.9
         )
         
@@ -286,13 +290,13 @@ class TestCRMExpertAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_configure_system_integration(self, mock_llm, mock_rag, agent):
         """测试系统集成配置"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="Salesforce到HiCRM的集成需要配置API认证、数据映射等",
+            text="Salesforce到HiCRM的集成需要配置API认证、数据映射等",
             confidence=0.85
         )
         
@@ -341,13 +345,13 @@ class TestCRMExpertAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_check_compliance(self, mock_llm, mock_rag, agent):
         """测试合规检查"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="GDPR合规要求包括数据保护、用户同意、数据删除权等",
+            text="GDPR合规要求包括数据保护、用户同意、数据删除权等",
             confidence=0.9
         )
         
@@ -568,11 +572,11 @@ class TestCRMExpertAgent:
     @pytest.mark.asyncio
     async def test_full_workflow_process_guidance(self, agent, sample_message):
         """测试完整的流程指导工作流"""
-        with patch('src.services.rag_service.rag_service.query') as mock_rag, \
+        with patch('src.services.rag_service.rag_service.retrieve_context') as mock_rag, \
              patch('src.services.llm_service.llm_service.chat_completion') as mock_llm:
             
             # Mock服务响应
-            mock_rag.return_value = Mock(answer="流程指导内容", confidence=0.8)
+            mock_rag.return_value = Mock(text="流程指导内容", confidence=0.8)
             mock_llm.return_value = {"content": "详细的流程指导内容"}
             
             # 执行完整工作流
@@ -13,6 +13,7 @@ from src.agents.professional.market_agent import (
     MarketAnalysisType,
     CompetitorType,
     LeadScoreDetail,
+    LeadBatchResult,
     MarketTrend,
     CompetitiveAnalysis,
     MarketingStrategy
@@ -159,8 +160,8 @@ class TestMarketAgent:
         market_agent.scoring_service.calculate_lead_score = AsyncMock(return_value=mock_base_score)
         
         # Mock RAG服务
-        mock_rag.query.return_value = Mock(
-            answer="制造业线索评分要点...",
+        mock_rag.retrieve_context.return_value = Mock(
+            text="制造业线索评分要点...",
             confidence=0.8,
             sources=[]
         )
@@ -196,7 +197,7 @@ class TestMarketAgent:
         
         # 验证服务调用
         market_agent.lead_service.get_lead.assert_called_once_with("lead_123", mock_db_session)
-        mock_rag.query.assert_called_once()
+        mock_rag.retrieve_context.assert_called_once()
         mock_llm.chat_completion.assert_called_once()
     
     @pytest.mark.asyncio
@@ -205,14 +206,14 @@ class TestMarketAgent:
     async def test_analyze_market_trend(self, mock_llm, mock_rag, market_agent):
         """测试市场趋势分析功能"""
         # Mock RAG服务
-        mock_rag.query.side_effect = [
+        mock_rag.retrieve_context.side_effect = [
             Mock(
-                answer="制造业市场趋势向好，预计增长12%...",
+                text="制造业市场趋势向好，预计增长12%...",
                 confidence=0.85,
                 sources=[]
             ),
             Mock(
-                answer="制造业行业报告显示...",
+                text="制造业行业报告显示...",
                 confidence=0.80,
                 sources=[]
             )
@@ -255,7 +256,7 @@ class TestMarketAgent:
         assert result.confidence_score > 0.0
         
         # 验证服务调用
-        assert mock_rag.query.call_count == 2
+        assert mock_rag.retrieve_context.call_count == 2
         mock_llm.chat_completion.assert_called_once()
     
     @pytest.mark.asyncio
@@ -264,14 +265,14 @@ class TestMarketAgent:
     async def test_generate_competitive_analysis(self, mock_llm, mock_rag, market_agent):
         """测试竞争分析功能"""
         # Mock RAG服务
-        mock_rag.query.side_effect = [
+        mock_rag.retrieve_context.side_effect = [
             Mock(
-                answer="华为竞争分析：技术实力强...",
+                text="华为竞争分析：技术实力强...",
                 confidence=0.85,
                 sources=[]
             ),
             Mock(
-                answer="通信设备行业竞争格局...",
+                text="通信设备行业竞争格局...",
                 confidence=0.80,
                 sources=[]
             )
@@ -317,7 +318,7 @@ class TestMarketAgent:
         assert result.threat_level == "high"
         
         # 验证服务调用
-        assert mock_rag.query.call_count == 2
+        assert mock_rag.retrieve_context.call_count == 2
         mock_llm.chat_completion.assert_called_once()
     
     @pytest.mark.asyncio
@@ -326,14 +327,14 @@ class TestMarketAgent:
     async def test_recommend_marketing_strategy(self, mock_llm, mock_rag, market_agent):
         """测试营销策略推荐功能"""
         # Mock RAG服务
-        mock_rag.query.side_effect = [
+        mock_rag.retrieve_context.side_effect = [
             Mock(
-                answer="制造业营销最佳实践...",
+                text="制造业营销最佳实践...",
                 confidence=0.85,
                 sources=[]
             ),
             Mock(
-                answer="制造业客户细分特征...",
+                text="制造业客户细分特征...",
                 confidence=0.80,
                 sources=[]
             )
@@ -394,7 +395,7 @@ class TestMarketAgent:
         assert result.expected_roi == 300.0
         
         # 验证服务调用
-        assert mock_rag.query.call_count == 2
+        assert mock_rag.retrieve_context.call_count == 2
         mock_llm.chat_completion.assert_called_once()
     
     @pytest.mark.asyncio
@@ -603,6 +604,119 @@ class TestMarketAgent:
         assert len(result["batch_results"]) == 2
         assert result["summary"]["total"] == 2
         assert result["summary"]["success"] == 2
+        assert result["summary"]["leads_per_second"] > 0
+    
+    def _mock_lead_scoring(self, market_agent, mock_llm, mock_rag, mock_db, industries):
+        """Mock批量评分依赖，industries为线索ID到行业的映射"""
+        mock_db.return_value.__aenter__.return_value = AsyncMock()
+        
+        async def get_lead(lead_id, db):
+            if lead_id not in industries:
+                return None
+            lead = Mock()
+            lead.id = lead_id
+            lead.name = lead_id
+            lead.industry = industries[lead_id]
+            return lead
+        
+        market_agent.lead_service.get_lead = AsyncMock(side_effect=get_lead)
+        mock_base_score = Mock()
+        mock_base_score.total_score = 80.0
+        mock_base_score.score_factors = []
+        market_agent.scoring_service.calculate_lead_score = AsyncMock(return_value=mock_base_score)
+        
+        async def retrieve_context(question, collection_name=None, **kwargs):
+            await asyncio.sleep(0.01)
+            return Mock(text=f"{question}要点", confidence=0.8, sources=[])
+        
+        mock_rag.retrieve_context = AsyncMock(side_effect=retrieve_context)
+        mock_llm.chat_completion = AsyncMock(return_value={"content": "跟进建议：\n• 安排产品演示"})
+    
+    @pytest.mark.asyncio
+    @patch('src.agents.professional.market_agent.get_db')
+    @patch('src.agents.professional.market_agent.rag_service')
+    @patch('src.agents.professional.market_agent.llm_service')
+    async def test_stream_score_leads_shares_industry_context(self, mock_llm, mock_rag, mock_db, market_agent):
+        """测试流式批量评分：限制并发，同一行业只检索一次评分知识"""
+        industries = {f"lead_{i}": ("制造业" if i % 2 else "金融") for i in range(10)}
+        self._mock_lead_scoring(market_agent, mock_llm, mock_rag, mock_db, industries)
+        
+        running = 0
+        max_running = 0
+        original_chat_completion = mock_llm.chat_completion.side_effect
+        
+        async def chat_completion(*args, **kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"content": "跟进建议：\n• 安排产品演示"}
+        
+        mock_llm.chat_completion.side_effect = chat_completion
+        
+        results = [
+            item async for item in market_agent.stream_score_leads(list(industries) + ["lead_missing"], max_concurrency=3)
+        ]
+        
+        assert len(results) == 11
+        assert all(isinstance(item, LeadBatchResult) for item in results)
+        assert {item.lead_id for item in results if item.score_detail} == set(industries)
+        missing = next(item for item in results if item.lead_id == "lead_missing")
+        assert missing.score_detail is None and "线索不存在" in missing.error
+        assert max_running <= 3
+        assert mock_rag.retrieve_context.call_count == 2
+    
+    @pytest.mark.asyncio
+    @patch('src.agents.professional.market_agent.get_db')
+    @patch('src.agents.professional.market_agent.rag_service')
+    @patch('src.agents.professional.market_agent.llm_service')
+    async def test_stream_score_leads_retries_failed_context(self, mock_llm, mock_rag, mock_db, market_agent):
+        """测试行业评分知识检索失败时不缓存失败结果"""
+        industries = {"lead_1": "制造业", "lead_2": "制造业"}
+        self._mock_lead_scoring(market_agent, mock_llm, mock_rag, mock_db, industries)
+        mock_rag.retrieve_context.side_effect = [
+            Exception("向量库不可用"),
+            Mock(text="制造业要点", confidence=0.8, sources=[])
+        ]
+        
+        results = {
+            item.lead_id: item
+            async for item in market_agent.stream_score_leads(list(industries), max_concurrency=1)
+        }
+        
+        assert results["lead_1"].error == "向量库不可用"
+        assert results["lead_2"].score_detail is not None
+        assert mock_rag.retrieve_context.call_count == 2
+    
+    @pytest.mark.asyncio
+    @patch('src.agents.professional.market_agent.get_db')
+    @patch('src.agents.professional.market_agent.rag_service')
+    @patch('src.agents.professional.market_agent.llm_service')
+    async def test_mcp_tool_score_lead_batch_timeout(self, mock_llm, mock_rag, mock_db, market_agent):
+        """测试批量评分单个线索超时不影响其他线索，结果按输入顺序返回"""
+        industries = {"lead_slow": "制造业", "lead_fast": "制造业"}
+        self._mock_lead_scoring(market_agent, mock_llm, mock_rag, mock_db, industries)
+        
+        async def chat_completion(messages, **kwargs):
+            if "lead_slow" in str(messages):
+                await asyncio.sleep(1)
+            return {"content": "跟进建议：\n• 安排产品演示"}
+        
+        mock_llm.chat_completion.side_effect = chat_completion
+        
+        result = await market_agent._handle_score_lead_batch(
+            lead_ids=["lead_slow", "lead_fast", "lead_fast"],
+            lead_timeout=0.2
+        )
+        
+        assert [r["lead_id"] for r in result["batch_results"]] == ["lead_slow", "lead_fast"]
+        assert result["batch_results"][0]["success"] is False
+        assert "超时" in result["batch_results"][0]["error"]
+        assert result["batch_results"][1]["success"] is True
+        assert result["summary"]["total"] == 2
+        assert result["summary"]["timed_out"] == 1
+        assert mock_rag.retrieve_context.call_count == 1
     
     def test_extract_lead_id_from_message(self, market_agent):
         """测试从消息中提取线索ID"""
@@ -730,8 +844,8 @@ class TestMarketAgentIntegration:
             market_agent.scoring_service.calculate_lead_score = AsyncMock(return_value=mock_base_score)
             
             # Mock RAG和LLM
-            mocks['rag_service'].query.return_value = Mock(
-                answer="评分指导...", confidence=0.8, sources=[]
+            mocks['rag_service'].retrieve_context.return_value = Mock(
+                text="评分指导...", confidence=0.8, sources=[]
             )
             mocks['llm_service'].chat_completion.return_value = {
                 "content": "评分分析结果..."
@@ -228,10 +228,10 @@ class TestProductAgent:
         """测试产品方案匹配"""
         # Mock RAG服务响应
         mock_rag_result = Mock()
-        mock_rag_result.answer = "推荐CRM产品A和产品B"
+        mock_rag_result.text_for = Mock(return_value="推荐CRM产品A和产品B")
         mock_rag_result.confidence = 0.85
         mock_rag_result.sources = ["产品目录", "解决方案模板"]
-        mock_rag_service.query = AsyncMock(return_value=mock_rag_result)
+        mock_rag_service.multi_collection_retrieve = AsyncMock(return_value=mock_rag_result)
         
         # Mock LLM服务响应
         mock_llm_response = {
@@ -294,9 +294,9 @@ class TestProductAgent:
             
             # Mock RAG服务响应
             mock_rag_result = Mock()
-            mock_rag_result.answer = "制造业CRM技术方案参考"
+            mock_rag_result.text = "制造业CRM技术方案参考"
             mock_rag_result.confidence = 0.8
-            mock_rag_service.query = AsyncMock(return_value=mock_rag_result)
+            mock_rag_service.retrieve_context = AsyncMock(return_value=mock_rag_result)
             
             # Mock LLM服务响应
             mock_llm_response = {
@@ -343,9 +343,9 @@ class TestProductAgent:
         """测试创建实施规划"""
         # Mock RAG服务响应
         mock_rag_result = Mock()
-        mock_rag_result.answer = "中等复杂度项目实施最佳实践"
+        mock_rag_result.text = "中等复杂度项目实施最佳实践"
         mock_rag_result.confidence = 0.8
-        mock_rag_service.query = AsyncMock(return_value=mock_rag_result)
+        mock_rag_service.retrieve_context = AsyncMock(return_value=mock_rag_result)
         
         # Mock LLM服务响应
         mock_llm_response = {
@@ -393,10 +393,10 @@ class TestProductAgent:
         """测试提供技术支持"""
         # Mock RAG服务响应
         mock_rag_result = Mock()
-        mock_rag_result.answer = "技术文档参考"
+        mock_rag_result.text_for = Mock(return_value="技术文档参考")
         mock_rag_result.confidence = 0.8
         mock_rag_result.sources = ["技术文档", "故障排除指南"]
-        mock_rag_service.query = AsyncMock(return_value=mock_rag_result)
+        mock_rag_service.multi_collection_retrieve = AsyncMock(return_value=mock_rag_result)
         
         # Mock LLM服务响应
         mock_llm_response = {
@@ -421,6 +421,7 @@ class TestProductAgent:
         assert result["urgency"] == "high"
         assert 0.0 <= result["confidence"] <= 1.0
         assert len(result["sources"]) > 0
+        mock_rag_service.multi_collection_retrieve.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_execute_task_solution_matching(self, product_agent, sample_message):
@@ -165,8 +165,8 @@ class TestSalesAgent:
         mock_customer_service.get_customer = AsyncMock(return_value=sample_customer)
         
         # Mock RAG服务
-        mock_rag.query = AsyncMock(return_value=Mock(
-            answer="客户分析最佳实践...",
+        mock_rag.retrieve_context = AsyncMock(return_value=Mock(
+            text="客户分析最佳实践...",
             confidence=0.8
         ))
         
@@ -207,8 +207,8 @@ class TestSalesAgent:
     async def test_generate_talking_points(self, mock_llm, mock_rag, sales_agent):
         """测试话术生成功能"""
         # Mock RAG服务
-        mock_rag.query = AsyncMock(return_value=Mock(
-            answer="销售话术模板...",
+        mock_rag.retrieve_context = AsyncMock(return_value=Mock(
+            text="销售话术模板...",
             confidence=0.8
         ))
         
@@ -255,8 +255,8 @@ class TestSalesAgent:
         mock_opportunity_service.get_opportunity = AsyncMock(return_value=sample_opportunity)
         
         # Mock RAG服务
-        mock_rag.query = AsyncMock(return_value=Mock(
-            answer="成功案例分析...",
+        mock_rag.retrieve_context = AsyncMock(return_value=Mock(
+            text="成功案例分析...",
             confidence=0.8
         ))
         
@@ -299,8 +299,8 @@ class TestSalesAgent:
     async def test_recommend_next_action(self, mock_llm, mock_rag, sales_agent):
         """测试行动建议功能"""
         # Mock RAG服务
-        mock_rag.query = AsyncMock(return_value=Mock(
-            answer="销售最佳实践...",
+        mock_rag.retrieve_context = AsyncMock(return_value=Mock(
+            text="销售最佳实践...",
             confidence=0.8
         ))
         
@@ -118,13 +118,13 @@ class TestSystemManagementAgent:
         assert "crm_expert_agent" in analysis["required_agents"]
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_monitor_system_health(self, mock_llm, mock_rag, agent):
         """测试系统健康监控"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="系统性能监控应关注CPU、内存、磁盘、网络等关键指标",
+            text="系统性能监控应关注CPU、内存、磁盘、网络等关键指标",
             confidence=0.85
         )
         
@@ -170,13 +170,13 @@ class TestSystemManagementAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_assess_security(self, mock_llm, mock_rag, agent):
         """测试安全评估"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="系统漏洞安全评估应包括配置检查、软件更新、访问控制等",
+            text="系统漏洞安全评估应包括配置检查、软件更新、访问控制等",
             confidence=0.9
         )
         
@@ -227,13 +227,13 @@ class TestSystemManagementAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_manage_integration(self, mock_llm, mock_rag, agent):
         """测试集成管理"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="系统集成更新操作需要考虑配置变更、测试验证、回滚计划等",
+            text="系统集成更新操作需要考虑配置变更、测试验证、回滚计划等",
             confidence=0.85
         )
         
@@ -282,13 +282,13 @@ class TestSystemManagementAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_optimize_performance(self, mock_llm, mock_rag, agent):
         """测试性能优化"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="数据库性能优化包括索引优化、查询优化、连接池调优等",
+            text="数据库性能优化包括索引优化、查询优化、连接池调优等",
             confidence=0.8
         )
         
@@ -341,13 +341,13 @@ class TestSystemManagementAgent:
         mock_llm.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('src.services.rag_service.rag_service.query')
+    @patch('src.services.rag_service.rag_service.retrieve_context')
     @patch('src.services.llm_service.llm_service.chat_completion')
     async def test_manage_infrastructure(self, mock_llm, mock_rag, agent):
         """测试基础设施管理"""
         # Mock RAG服务响应
         mock_rag.return_value = Mock(
-            answer="服务器配置操作需要考虑资源规划、安全配置、监控设置等",
+            text="服务器配置操作需要考虑资源规划、安全配置、监控设置等",
             confidence=0.85
         )
         
@@ -652,11 +652,11 @@ class TestSystemManagementAgent:
     @pytest.mark.asyncio
     async def test_full_workflow_system_monitoring(self, agent, sample_message):
         """测试完整的系统监控工作流"""
-        with patch('src.services.rag_service.rag_service.query') as mock_rag, \
+        with patch('src.services.rag_service.rag_service.retrieve_context') as mock_rag, \
              patch('src.services.llm_service.llm_service.chat_completion') as mock_llm:
             
             # Mock服务响应
-            mock_rag.return_value = Mock(answer="系统监控指导", confidence=0.8)
+            mock_rag.return_value = Mock(text="系统监控指导", confidence=0.8)
             mock_llm.return_value = {"content": "详细的系统健康分析"}
             
             # 执行完整工作流
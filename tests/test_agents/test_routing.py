@@ -0,0 +1,96 @@
+"""
+Agent任务路由测试
+"""
+
+import pytest
+
+from src.agents.base import AgentMessage, MessageType
+from src.agents.routing import KeywordRouter, TaskRoute, CollaborationRule, RoutingMetrics
+from src.agents.professional.market_agent import MarketAgent
+from src.agents.professional.sales_agent import SalesAgent
+
+
+@pytest.fixture
+def router():
+    return KeywordRouter(
+        routes=[
+            TaskRoute("customer_analysis", keywords=("客户分析", "客户画像"), patterns=(r'分析.*客户',)),
+            TaskRoute("lead_scoring", keywords=("线索评分",), keyword_groups=(("评估", "线索"),)),
+            TaskRoute("value_analysis", keywords=("roi", "价值分析"))
+        ],
+        collaborations=[
+            CollaborationRule(keywords=("销售", "销售流程"), agents=("sales_agent", "sales_management_agent")),
+            CollaborationRule(keywords=("画像",), agents=("market_agent",))
+        ]
+    )
+
+
+class TestKeywordRouter:
+    """关键词路由器测试"""
+
+    def test_match_overlapping_keywords(self, router):
+        """测试重叠和包含关系的关键词都能命中"""
+        # "客户分析"和"分析客户"在"客户分析客户画像"中相互重叠
+        assert router.match_keywords("客户分析客户画像") >= {"客户分析", "客户画像", "画像"}
+        # 命中"销售流程"时被它包含的"销售"也算命中
+        assert router.match_keywords("优化销售流程") == {"销售流程", "销售"}
+        assert router.match_keywords("无关内容") == frozenset()
+
+    def test_route_order(self, router):
+        """测试按路由表顺序匹配任务类型"""
+        assert router.route("客户画像和线索评分").task_type == "customer_analysis"
+        assert router.route("线索评分").task_type == "lead_scoring"
+        assert router.route("随便聊聊").task_type == "general"
+
+    def test_route_keyword_groups_and_patterns(self, router):
+        """测试关键词组和正则规则"""
+        assert router.route("请评估这批线索").task_type == "lead_scoring"
+        assert router.route("请评估一下").task_type == "general"
+        assert router.route("分析一下这个重要客户").task_type == "customer_analysis"
+
+    def test_route_case_insensitive(self, router):
+        """测试英文关键词不区分大小写"""
+        assert router.route("计算ROI").task_type == "value_analysis"
+
+    def test_collaboration(self, router):
+        """测试一次扫描得到所有协作Agent"""
+        decision = router.route("客户画像对销售流程的影响")
+        assert decision.required_agents == ["sales_agent", "sales_management_agent", "market_agent"]
+        assert decision.needs_collaboration is True
+        assert router.route("线索评分").needs_collaboration is False
+
+    def test_metrics(self, router):
+        """测试路由统计"""
+        metrics = RoutingMetrics()
+        router.route("线索评分", metrics)
+        router.route("线索评分和销售", metrics)
+        router.route("随便聊聊", metrics)
+
+        stats = metrics.to_dict()
+        assert stats["total_routed"] == 3
+        assert stats["task_type_counts"] == {"lead_scoring": 2, "general": 1}
+        assert stats["collaboration_counts"] == {"sales_agent": 1, "sales_management_agent": 1}
+        assert stats["total_time_ms"] > 0
+
+
+class TestAgentRouting:
+    """专业Agent路由测试"""
+
+    @pytest.mark.asyncio
+    async def test_analyze_task_records_metrics(self):
+        """测试analyze_task使用路由表并按Agent记录统计"""
+        sales_agent = SalesAgent()
+        market_agent = MarketAgent()
+        message = AgentMessage(
+            type=MessageType.TASK,
+            sender_id="user_123",
+            content="请分析一下这个客户，需要产品技术方案支持"
+        )
+
+        analysis = await sales_agent.analyze_task(message)
+
+        assert analysis["task_type"] == "customer_analysis"
+        assert analysis["required_agents"] == ["product_agent"]
+        assert analysis["collaboration_type"] == "sequential"
+        assert sales_agent.get_routing_metrics()["task_type_counts"] == {"customer_analysis": 1}
+        assert market_agent.get_routing_metrics()["total_routed"] == 0
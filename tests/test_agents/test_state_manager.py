@@ -38,6 +38,9 @@ async def state_manager(state_config):
     mock_redis.srem = AsyncMock()
     mock_redis.smembers = AsyncMock()
     mock_redis.ttl = AsyncMock()
+    mock_redis.scard = AsyncMock()
+    mock_redis.zrangebyscore = AsyncMock()
+    mock_redis.eval = AsyncMock(return_value=0)
     mock_redis.close = AsyncMock()
     mock_redis.pipeline = Mock()
     
@@ -48,6 +51,11 @@ async def state_manager(state_config):
     mock_pipe.sadd = Mock(return_value=mock_pipe)
     mock_pipe.delete = Mock(return_value=mock_pipe)
     mock_pipe.srem = Mock(return_value=mock_pipe)
+    mock_pipe.zadd = Mock(return_value=mock_pipe)
+    mock_pipe.eval = Mock(return_value=mock_pipe)
+    mock_pipe.scard = Mock(return_value=mock_pipe)
+    mock_pipe.zcount = Mock(return_value=mock_pipe)
+    mock_pipe.hget = Mock(return_value=mock_pipe)
     mock_pipe.execute = AsyncMock(return_value=[True, True, True])
     mock_redis.pipeline.return_value = mock_pipe
     
@@ -241,53 +249,33 @@ class TestAgentStateManager:
     @pytest.mark.asyncio
     async def test_get_agents_by_status(self, state_manager):
         """测试按状态获取Agent"""
-        # 模拟多个Agent状态
         mock_redis = state_manager.redis_client
-        mock_redis.smembers.return_value = {"agent-1", "agent-2", "agent-3"}
-        
-        # 模拟不同状态的Agent
-        def mock_hgetall(key):
-            if "agent-1" in key:
-                return {"data": '{"agent_id": "agent-1", "status": "idle", "last_active": "2024-01-01T12:00:00"}'}
-            elif "agent-2" in key:
-                return {"data": '{"agent_id": "agent-2", "status": "busy", "last_active": "2024-01-01T12:00:00"}'}
-            elif "agent-3" in key:
-                return {"data": '{"agent_id": "agent-3", "status": "idle", "last_active": "2024-01-01T12:00:00"}'}
-            return {}
-        
-        mock_redis.hgetall.side_effect = mock_hgetall
+        mock_redis.smembers.return_value = {"agent-1", "agent-3"}
         
         idle_agents = await state_manager.get_agents_by_status(AgentStatus.IDLE)
         
         assert len(idle_agents) == 2
         assert "agent-1" in idle_agents
         assert "agent-3" in idle_agents
-        assert "agent-2" not in idle_agents
+        # 直接读取状态集合，不再逐个加载状态
+        mock_redis.smembers.assert_called_once_with("test:agent:state:status:idle")
+        mock_redis.hgetall.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_get_active_agents(self, state_manager):
         """测试获取活跃Agent"""
-        now = datetime.now()
-        active_time = now - timedelta(minutes=30)  # 30分钟前
-        inactive_time = now - timedelta(hours=2)   # 2小时前
+        since = datetime.now() - timedelta(hours=1)
         
         mock_redis = state_manager.redis_client
-        mock_redis.smembers.return_value = {"agent-1", "agent-2"}
+        mock_redis.zrangebyscore.return_value = ["agent-1"]
         
-        def mock_hgetall(key):
-            if "agent-1" in key:
-                return {"data": f'{{"agent_id": "agent-1", "status": "idle", "last_active": "{active_time.isoformat()}"}}'}
-            elif "agent-2" in key:
-                return {"data": f'{{"agent_id": "agent-2", "status": "idle", "last_active": "{inactive_time.isoformat()}"}}'}
-            return {}
-        
-        mock_redis.hgetall.side_effect = mock_hgetall
+        active_agents = await state_manager.get_active_agents(since)
         
-        active_agents = await state_manager.get_active_agents()
-        
-        assert len(active_agents) == 1
-        assert "agent-1" in active_agents
-        assert "agent-2" not in active_agents
+        assert active_agents == ["agent-1"]
+        mock_redis.zrangebyscore.assert_called_once_with(
+            "test:agent:state:last_active", since.timestamp(), "+inf"
+        )
+        mock_redis.hgetall.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_update_agent_status(self, state_manager):
@@ -334,20 +322,10 @@ class TestAgentStateManager:
     @pytest.mark.asyncio
     async def test_get_system_metrics(self, state_manager):
         """测试获取系统指标"""
-        now = datetime.now()
-        active_time = now - timedelta(minutes=30)
-        
         mock_redis = state_manager.redis_client
-        mock_redis.smembers.return_value = {"agent-1", "agent-2"}
-        
-        def mock_hgetall(key):
-            if "agent-1" in key:
-                return {"data": f'{{"agent_id": "agent-1", "status": "idle", "error_count": 1, "last_active": "{active_time.isoformat()}"}}'}
-            elif "agent-2" in key:
-                return {"data": f'{{"agent_id": "agent-2", "status": "busy", "error_count": 2, "last_active": "{active_time.isoformat()}"}}'}
-            return {}
-        
-        mock_redis.hgetall.side_effect = mock_hgetall
+        pipe = mock_redis.pipeline.return_value
+        # 清理数量, 总数, 活跃数, 错误总数, 各状态数量(idle, busy, error, offline)
+        pipe.execute.return_value = [0, 2, 2, "3", 1, 1, 0, 0]
         
         metrics = await state_manager.get_system_metrics()
         
@@ -355,15 +333,32 @@ class TestAgentStateManager:
         assert metrics["active_agents"] == 2
         assert metrics["total_errors"] == 3
         assert metrics["average_errors"] == 1.5
-        assert AgentStatus.IDLE in metrics["status_distribution"]
-        assert AgentStatus.BUSY in metrics["status_distribution"]
+        assert metrics["status_distribution"][AgentStatus.IDLE] == 1
+        assert metrics["status_distribution"][AgentStatus.BUSY] == 1
+        # 单次管道往返，不再逐个加载状态
+        pipe.execute.assert_called_once()
+        mock_redis.hgetall.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_save_state_updates_indexes(self, state_manager, test_agent_state):
+        """测试保存状态时同步维护二级索引"""
+        await state_manager.save_state("test-agent-1", test_agent_state)
+        
+        pipe = state_manager.redis_client.pipeline.return_value
+        pipe.sadd.assert_any_call("test:agent:state:status:idle", "test-agent-1")
+        pipe.srem.assert_any_call("test:agent:state:status:busy", "test-agent-1")
+        
+        zadd_keys = [call.args[0] for call in pipe.zadd.call_args_list]
+        assert "test:agent:state:last_active" in zadd_keys
+        assert "test:agent:state:expires" in zadd_keys
+        pipe.eval.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_health_check_healthy(self, state_manager):
         """测试健康检查 - 健康状态"""
         mock_redis = state_manager.redis_client
         mock_redis.ping = AsyncMock()
-        mock_redis.smembers.return_value = {"agent-1", "agent-2"}
+        mock_redis.scard.return_value = 2
         
         health = await state_manager.health_check()
         
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from unittest.mock import AsyncMock, MagicMock
 
 from src.services.conversation_service import ConversationService
-from src.services.conversation_state_tracker import ConversationStateTracker
+from src.services.conversation_state_tracker import ConversationStateTracker, ConversationStateCache
 from src.models.conversation import Conversation, Message, ConversationState, ConversationStatus, MessageRole
 from src.schemas.conversation import (
     ConversationCreate, MessageCreate, ConversationStateUpdate
@@ -402,6 +402,69 @@ class TestConversationStateTracker:
         assert summary["memory_summary"]["short_term_items"] == 1
         assert summary["memory_summary"]["long_term_items"] == 1
 
+    
+    async def test_turn_coalesces_updates_into_single_write(self, state_tracker, sample_conversation_id):
+        """测试轮次内多次修改合并为一次UPDATE"""
+        mock_state = ConversationState(
+            conversation_id=sample_conversation_id,
+            flow_state="initialized",
+            step_history=["start"],
+            context_variables={},
+            short_term_memory={},
+            long_term_memory={}
+        )
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = mock_state
+        state_tracker.db.execute.return_value = mock_result
+        
+        async with state_tracker.turn(sample_conversation_id):
+            await state_tracker.add_to_context(sample_conversation_id, "customer", "ABC Company")
+            await state_tracker.update_short_term_memory(sample_conversation_id, "topic", "pricing")
+            await state_tracker.promote_to_long_term_memory(sample_conversation_id, "industry", "manufacturing")
+            await state_tracker.update_flow_state(sample_conversation_id, "processing")
+            
+            assert await state_tracker.get_context_variable(sample_conversation_id, "customer") == "ABC Company"
+            assert await state_tracker.get_short_term_memory(sample_conversation_id, "topic") == "pricing"
+        
+        # 一次SELECT加一次UPDATE
+        assert state_tracker.db.execute.call_count == 2
+        assert state_tracker.db.commit.call_count == 1
+    
+    async def test_cached_state_skips_select(self, mock_db, sample_conversation_id):
+        """测试状态缓存命中时不再查询数据库"""
+        tracker = ConversationStateTracker(mock_db, cache=ConversationStateCache())
+        mock_state = ConversationState(
+            conversation_id=sample_conversation_id,
+            flow_state="active",
+            context_variables={"user_name": "John"}
+        )
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = mock_state
+        mock_db.execute.return_value = mock_result
+        
+        await tracker.get_conversation_state(sample_conversation_id)
+        await tracker.add_to_context(sample_conversation_id, "company", "ABC")
+        
+        assert await tracker.get_context_variable(sample_conversation_id, "company") == "ABC"
+        assert await tracker.get_context_variable(sample_conversation_id, "user_name") == "John"
+        # 一次SELECT加一次UPDATE，后续读取命中缓存
+        assert mock_db.execute.call_count == 2
+    
+    async def test_failed_turn_discards_pending_updates(self, state_tracker, sample_conversation_id):
+        """测试轮次异常时丢弃待写入的修改"""
+        state_tracker.get_conversation_state = AsyncMock(return_value=ConversationState(
+            conversation_id=sample_conversation_id,
+            context_variables={}
+        ))
+        
+        with pytest.raises(ValueError):
+            async with state_tracker.turn(sample_conversation_id):
+                await state_tracker.add_to_context(sample_conversation_id, "key", "value")
+                raise ValueError("agent failed")
+        
+        assert not state_tracker.db.execute.called
+        assert not state_tracker.db.commit.called
+
 
 class TestConversationService:
     """对话服务测试"""
@@ -0,0 +1,108 @@
+"""
+按需创建的服务单例测试
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from unittest.mock import Mock, patch
+
+from src.core.lazy import LazyService, ServiceProxy
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+class _DemoService:
+    def __init__(self):
+        self.value = 1
+
+    def ping(self):
+        return "pong"
+
+
+@pytest.fixture
+def lazy_service():
+    return LazyService(Mock(side_effect=_DemoService))
+
+
+class TestLazyService:
+    """延迟服务单例测试类"""
+
+    def test_created_on_first_get(self, lazy_service):
+        """测试首次get()时才创建实例，之后复用"""
+        assert lazy_service.created is False
+
+        instance = lazy_service.get()
+        assert lazy_service.get() is instance
+        assert lazy_service.created is True
+        lazy_service._factory.assert_called_once()
+
+
+class TestServiceProxy:
+    """服务代理测试类"""
+
+    def test_created_on_first_attribute(self, lazy_service):
+        """测试创建代理不创建实例，首次访问属性时才创建"""
+        proxy = ServiceProxy(lazy_service)
+        assert lazy_service.created is False
+        assert "未创建" in repr(proxy)
+
+        assert proxy.ping() == "pong"
+        assert proxy.value == 1
+        assert isinstance(proxy, _DemoService)
+        lazy_service._factory.assert_called_once()
+
+    def test_attribute_assignment_forwarded(self, lazy_service):
+        """测试属性赋值和删除作用于真正的实例"""
+        proxy = ServiceProxy(lazy_service)
+
+        proxy.value = 2
+        assert lazy_service.get().value == 2
+
+        del proxy.value
+        assert not hasattr(lazy_service.get(), "value")
+
+    def test_patch_object(self, lazy_service):
+        """测试patch.object代理后作用于实例，退出后恢复"""
+        proxy = ServiceProxy(lazy_service)
+
+        with patch.object(proxy, "ping", return_value="mocked"):
+            assert lazy_service.get().ping() == "mocked"
+
+        assert proxy.ping() == "pong"
+
+
+class TestServiceModules:
+    """服务模块延迟加载测试类"""
+
+    def test_import_app_does_not_create_services(self):
+        """测试导入API应用不创建任何服务单例"""
+        script = (
+            "import src.main\n"
+            "from src.services import (chinese_semantic_search, elasticsearch_service, embedding_service,\n"
+            "    hybrid_search_service, llm_service, rag_service, vector_service)\n"
+            "print([\n"
+            "    chinese_semantic_search._chinese_search_service.created,\n"
+            "    elasticsearch_service._elasticsearch_service.created,\n"
+            "    embedding_service._embedding_service.created,\n"
+            "    hybrid_search_service._hybrid_search_service.created,\n"
+            "    llm_service._enhanced_llm_service.created,\n"
+            "    rag_service._rag_service.created,\n"
+            "    vector_service._vector_service.created,\n"
+            "])"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=300
+        )
+
+        assert completed.returncode == 0, completed.stderr[-2000:]
+        assert completed.stdout.strip().splitlines()[-1] == str([False] * 7)
+
+    def test_llm_service_aliases(self):
+        """测试llm_service与enhanced_llm_service是同一个实例"""
+        from src.services.llm_service import llm_service, enhanced_llm_service, get_llm_service
+
+        assert llm_service is enhanced_llm_service
+        assert llm_service.model_configs is get_llm_service().model_configs
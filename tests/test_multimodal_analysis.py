@@ -200,6 +200,76 @@ class TestBehaviorAnalysisService:
         assert result['customer_id'] == "test_customer_1"
         assert result['data_points_count'] <= len(sample_behavior_data)
 
+    @pytest.mark.asyncio
+    async def test_analyze_customers_batch(self, behavior_service, sample_behavior_data):
+        """测试批量分析与逐个分析结果一致"""
+        other_customer_data = [
+            BehaviorData(
+                customer_id="test_customer_2",
+                session_id=f"other_session_{i}",
+                page_views=[{"url": "/pricing"}, {"url": "/demo"}],
+                click_events=[],
+                time_spent={"/pricing": 60.0 * (i + 1)},
+                interaction_patterns={},
+                engagement_score=0.3,
+                conversion_indicators=["pricing_page_view"],
+                timestamp=datetime.now() - timedelta(days=i)
+            )
+            for i in range(3)
+        ]
+        
+        results = await behavior_service.analyze_customers_batch({
+            "test_customer_1": sample_behavior_data,
+            "test_customer_empty": [],
+            "test_customer_2": other_customer_data
+        })
+        
+        assert list(results) == ["test_customer_1", "test_customer_empty", "test_customer_2"]
+        assert results["test_customer_empty"]['behavior_profile']['customer_type'] == 'unknown'
+        
+        for customer_id, behavior_data in (
+            ("test_customer_1", sample_behavior_data),
+            ("test_customer_2", other_customer_data)
+        ):
+            single = await behavior_service.analyze_customer_behavior(customer_id, behavior_data)
+            for key in ('engagement_metrics', 'access_patterns', 'conversion_metrics', 'anomalies'):
+                assert results[customer_id][key] == single[key]
+        
+        access_patterns = results["test_customer_2"]['access_patterns']
+        assert access_patterns['top_pages'] == [("/pricing", 3), ("/demo", 3)]
+        assert access_patterns['common_access_paths'] == [
+            {'path': ["/pricing", "/demo"], 'frequency': 3, 'percentage': 1.0}
+        ]
+        assert results["test_customer_2"]['conversion_metrics']['funnel_stages'] == {'pricing_interest': 3}
+        assert results["test_customer_2"]['conversion_metrics']['conversion_velocity'] == pytest.approx(24.0)
+    
+    @pytest.mark.asyncio
+    async def test_detect_behavior_anomalies(self, behavior_service):
+        """测试按z-score识别参与度和会话时长异常"""
+        behavior_data = [
+            BehaviorData(
+                customer_id="anomaly_customer",
+                session_id=f"session_{i}",
+                page_views=[{"url": f"/page_{j}"} for j in range(60 if i == 0 else 2)],
+                click_events=[],
+                time_spent={"/page": 3000.0 if i == 5 else 100.0},
+                interaction_patterns={},
+                engagement_score=0.5,
+                conversion_indicators=[],
+                timestamp=datetime.now()
+            )
+            for i in range(20)
+        ]
+        
+        result = await behavior_service.analyze_customer_behavior("anomaly_customer", behavior_data)
+        anomalies = [(anomaly['type'], anomaly['session_id']) for anomaly in result['anomalies']]
+        
+        assert anomalies == [
+            ('excessive_browsing', 'session_0'),
+            ('duration_anomaly', 'session_5')
+        ]
+        assert result['anomalies'][1]['severity'] == 'high'
+
 
 class TestHighValueCustomerService:
     """高价值客户识别服务测试"""
@@ -318,6 +388,66 @@ class TestHighValueCustomerService:
         )
         
         assert isinstance(profiles, list)
+    
+    @pytest.mark.asyncio
+    async def test_score_customers_batch(
+        self,
+        high_value_service,
+        sample_customer_data,
+        sample_behavior_data_for_hv,
+        sample_voice_data_for_hv
+    ):
+        """测试批量评分与识别结果一致，价值分布按评分统计"""
+        value_scores = await high_value_service.score_customers(
+            sample_customer_data,
+            sample_behavior_data_for_hv,
+            sample_voice_data_for_hv
+        )
+        profiles = await high_value_service.identify_high_value_customers(
+            sample_customer_data,
+            sample_behavior_data_for_hv,
+            sample_voice_data_for_hv
+        )
+        
+        assert value_scores.customer_ids == ['customer_1', 'customer_2']
+        scores = dict(zip(value_scores.customer_ids, value_scores.scores.tolist()))
+        for profile in profiles:
+            assert profile.overall_score == pytest.approx(scores[profile.customer_id])
+        
+        # customer_2 没有行为和语音数据，只有基础信息指标
+        indicators = value_scores.indicators(1)
+        assert [indicator.source_modality for indicator in indicators] == [DataModalityType.TEXT] * 5
+        text_score = (
+            sum(indicator.weight * indicator.confidence * indicator.value for indicator in indicators) /
+            sum(indicator.weight * indicator.confidence for indicator in indicators)
+        )
+        assert scores['customer_2'] == pytest.approx(text_score * 0.25 / 0.4)
+        
+        distribution = await high_value_service.get_value_distribution(value_scores)
+        assert distribution['total_customers'] == 2
+        assert sum(distribution['value_distribution'].values()) == 2
+        assert distribution['average_score'] == pytest.approx(sum(scores.values()) / 2)
+    
+    @pytest.mark.asyncio
+    async def test_sharded_scoring_matches_inline(self, sample_customer_data):
+        """测试分片到进程池的评分结果与单进程一致"""
+        customer_data = [
+            {**customer, 'id': f"{customer['id']}_{i}"}
+            for i in range(5)
+            for customer in sample_customer_data
+        ]
+        
+        inline_service = HighValueCustomerService()
+        sharded_service = HighValueCustomerService(shard_size=3, max_workers=2)
+        try:
+            inline = await inline_service.score_customers(customer_data, [], [])
+            sharded = await sharded_service.score_customers(customer_data, [], [])
+        finally:
+            sharded_service.close()
+        
+        assert sharded.customer_ids == inline.customer_ids
+        np.testing.assert_allclose(sharded.scores, inline.scores)
+        np.testing.assert_array_equal(sharded.indicator_present, inline.indicator_present)
 
 
 class TestMultimodalFusionService:
@@ -414,6 +544,60 @@ class TestMultimodalFusionService:
             assert customer_id in customer_ids
             assert isinstance(result, MultimodalAnalysisResult)
             assert result.customer_id == customer_id
+    
+    @pytest.mark.asyncio
+    async def test_stream_process_customers(self, fusion_service):
+        """测试流式批量处理限制并发并整批加载行为和交互数据"""
+        customer_ids = [f"stream_customer_{i}" for i in range(5)]
+        process = fusion_service.process_multimodal_analysis
+        in_flight = peak = 0
+        
+        async def tracked_process(request, preloaded_data=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await process(request, preloaded_data)
+            finally:
+                in_flight -= 1
+        
+        with patch.object(fusion_service, 'process_multimodal_analysis', side_effect=tracked_process), \
+             patch.object(fusion_service, '_collect_behavior_data_bulk', wraps=fusion_service._collect_behavior_data_bulk) as bulk_behavior, \
+             patch.object(fusion_service, '_collect_behavior_data', wraps=fusion_service._collect_behavior_data) as single_behavior:
+            items = [
+                item async for item in fusion_service.stream_process_customers(
+                    customer_ids, max_concurrency=2, load_size=2
+                )
+            ]
+        
+        assert sorted(item.customer_id for item in items) == customer_ids
+        assert all(item.error is None and item.result.customer_id == item.customer_id for item in items)
+        assert peak == 2
+        assert bulk_behavior.call_count == 3
+        assert single_behavior.call_count == 0
+    
+    @pytest.mark.asyncio
+    async def test_stream_process_customers_timeout(self, fusion_service):
+        """测试单个客户超时不阻塞其他客户"""
+        process = fusion_service.process_multimodal_analysis
+        
+        async def slow_process(request, preloaded_data=None):
+            if request.customer_id == "slow_customer":
+                await asyncio.sleep(10)
+            return await process(request, preloaded_data)
+        
+        with patch.object(fusion_service, 'process_multimodal_analysis', side_effect=slow_process):
+            items = {
+                item.customer_id: item
+                async for item in fusion_service.stream_process_customers(
+                    ["slow_customer", "fast_customer"], customer_timeout=0.1
+                )
+            }
+        
+        assert items["slow_customer"].result is None
+        assert "超时" in items["slow_customer"].error
+        assert isinstance(items["fast_customer"].result, MultimodalAnalysisResult)
 
 
 class TestMultimodalDataIntegration:
@@ -0,0 +1,223 @@
+"""
+Agent消息通信性能测试
+
+序列化和进程内传输测试离线运行；RabbitMQ吞吐和往返延迟测试需要本地RabbitMQ，
+例如: docker run -d -p 5672:5672 rabbitmq:3
+连接不上时自动跳过，两种传输的往返延迟可直接对比。
+"""
+
+import pytest
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import aio_pika
+
+from src.agents.base import AgentMessage, MessageType
+from src.agents.communication import (
+    MessageBroker, AgentCommunicator, CommunicationConfig, MessageSerializer, InMemoryTransport
+)
+from src.core.config import settings
+
+
+def _sample_message() -> AgentMessage:
+    return AgentMessage(
+        type=MessageType.COLLABORATION,
+        sender_id="sales_agent",
+        receiver_id="market_agent",
+        content="请分析制造业客户的市场趋势并给出线索评分建议" * 4,
+        metadata={"customer_id": str(uuid.uuid4()), "priority": 5, "tags": ["制造业", "华东"]},
+        correlation_id=str(uuid.uuid4())
+    )
+
+
+async def _measure_round_trips(requester: AgentCommunicator, receiver_id: str, count: int):
+    """顺序发送请求并返回每次往返延迟（秒）"""
+    latencies = []
+    for i in range(count):
+        request = AgentMessage(
+            type=MessageType.TASK,
+            sender_id=requester.agent_id,
+            receiver_id=receiver_id,
+            content=f"ping {i}"
+        )
+        start_time = time.perf_counter()
+        response = await requester.send_message(request, wait_for_response=True)
+        latencies.append(time.perf_counter() - start_time)
+        assert response is not None
+    latencies.sort()
+    return latencies
+
+
+def _print_latencies(title: str, latencies):
+    print(f"\n{title}:")
+    print(f"平均延迟: {statistics.mean(latencies) * 1000:.3f}ms")
+    print(f"p99延迟: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f}ms")
+
+
+async def _echo_handler(message: AgentMessage):
+    return message.content
+
+
+async def _rabbitmq_available() -> bool:
+    try:
+        connection = await asyncio.wait_for(aio_pika.connect(settings.RABBITMQ_URL), timeout=2)
+        await connection.close()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture
+async def rabbitmq_config():
+    """独立exchange/队列前缀的通信配置，RabbitMQ不可用时跳过"""
+    if not await _rabbitmq_available():
+        pytest.skip("RabbitMQ不可用，跳过消息吞吐性能测试")
+
+    suffix = uuid.uuid4().hex[:8]
+    return CommunicationConfig(
+        exchange_name=f"bench_agent_communication_{suffix}",
+        queue_prefix=f"bench_agent_queue_{suffix}_",
+        prefetch_count=200,
+        max_concurrent_handlers=50
+    )
+
+
+class TestMessageSerializationPerformance:
+    """消息序列化性能测试"""
+
+    def test_serializer_throughput(self):
+        """测试各序列化器吞吐（对比旧的json.dumps(message.dict())路径）"""
+        message = _sample_message()
+        iterations = 5000
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            body = json.dumps(message.dict(), default=str).encode()
+            data = json.loads(body.decode())
+            AgentMessage(**data)
+        legacy_rate = iterations / (time.perf_counter() - start_time)
+
+        print(f"\n消息序列化吞吐 ({iterations} 次往返):")
+        print(f"旧json路径: {legacy_rate:.0f} msgs/s")
+
+        for fmt in ("json", "orjson", "msgpack"):
+            serializer = MessageSerializer(fmt)
+            start_time = time.perf_counter()
+            for _ in range(iterations):
+                MessageSerializer.loads(serializer.dumps(message), serializer.content_type)
+            rate = iterations / (time.perf_counter() - start_time)
+            print(f"{fmt} (实际使用 {serializer.format}): {rate:.0f} msgs/s")
+
+            assert rate > 0
+
+
+class TestLocalTransportLatency:
+    """进程内传输往返延迟测试"""
+
+    @pytest.mark.asyncio
+    async def test_in_memory_round_trip_latency(self):
+        """测试进程内传输请求/响应往返延迟"""
+        broker = MessageBroker(CommunicationConfig())
+        transport = InMemoryTransport()
+        requester = AgentCommunicator("bench-requester", broker, local_transport=transport)
+        responder = AgentCommunicator("bench-responder", broker, local_transport=transport)
+        responder.register_handler(MessageType.TASK, _echo_handler)
+
+        for communicator in (requester, responder):
+            communicator._local_consumer_task = asyncio.create_task(
+                communicator._consume_local(transport.register(communicator.agent_id))
+            )
+
+        try:
+            latencies = await _measure_round_trips(requester, "bench-responder", 2000)
+            _print_latencies("进程内传输请求/响应往返", latencies)
+
+            assert statistics.mean(latencies) < 0.005
+        finally:
+            await requester.close()
+            await responder.close()
+
+
+class TestBrokerThroughput:
+    """RabbitMQ吞吐和往返延迟测试"""
+
+    @pytest.mark.integration
+    @pytest.mark.asyncio
+    async def test_publish_throughput(self, rabbitmq_config):
+        """测试逐条发布与批量流水线发布吞吐"""
+        broker = MessageBroker(rabbitmq_config)
+        await broker.initialize()
+
+        try:
+            queue = await broker.declare_agent_queue("bench-receiver")
+            message_count = 5000
+            messages = [(_sample_message(), "bench-receiver") for _ in range(message_count)]
+
+            start_time = time.perf_counter()
+            for message, routing_key in messages[:1000]:
+                await broker.publish_message(message, routing_key)
+            sequential_rate = 1000 / (time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            await broker.publish_batch(messages, batch_size=250)
+            batch_rate = message_count / (time.perf_counter() - start_time)
+
+            await queue.purge()
+            await queue.delete(if_unused=False, if_empty=False)
+
+            print(f"\nRabbitMQ发布吞吐:")
+            print(f"逐条发布(等待确认): {sequential_rate:.0f} msgs/s")
+            print(f"批量流水线发布: {batch_rate:.0f} msgs/s")
+
+            assert batch_rate > sequential_rate
+        finally:
+            await broker.close()
+
+    @pytest.mark.integration
+    @pytest.mark.asyncio
+    async def test_request_response_latency(self, rabbitmq_config):
+        """测试Agent间请求/响应往返延迟"""
+        broker = MessageBroker(rabbitmq_config)
+        await broker.initialize()
+
+        requester = AgentCommunicator("bench-requester", broker, rabbitmq_config)
+        responder = AgentCommunicator("bench-responder", broker, rabbitmq_config)
+
+        responder.register_handler(MessageType.TASK, _echo_handler)
+
+        try:
+            await requester.initialize()
+            await responder.initialize()
+
+            latencies = await _measure_round_trips(requester, "bench-responder", 200)
+
+            start_time = time.perf_counter()
+            concurrent_requests = 500
+            responses = await asyncio.gather(*(
+                requester.send_message(
+                    AgentMessage(
+                        type=MessageType.TASK,
+                        sender_id="bench-requester",
+                        receiver_id="bench-responder",
+                        content=f"ping {i}"
+                    ),
+                    wait_for_response=True
+                )
+                for i in range(concurrent_requests)
+            ))
+            concurrent_rate = concurrent_requests / (time.perf_counter() - start_time)
+
+            _print_latencies("RabbitMQ请求/响应往返", latencies)
+            print(f"并发往返吞吐: {concurrent_rate:.0f} req/s")
+
+            assert all(response is not None for response in responses)
+        finally:
+            await requester.close()
+            await responder.close()
+            for communicator in (requester, responder):
+                if communicator.queue:
+                    await communicator.queue.delete(if_unused=False, if_empty=False)
+            await broker.close()
@@ -0,0 +1,104 @@
+"""
+Agent检索增强性能测试
+
+模拟每次LLM调用耗时固定时间，对比旧实现先由rag_service.query()为每个检索生成回答、
+再把回答嵌套进Agent提示词生成，与retrieve_context()只检索、Agent只调用一次LLM的
+LLM调用次数和耗时。以市场趋势分析为例（两次检索 + 一次生成）。
+RAGService.generate()调用的llm_service.generate_response在桩中提供，模拟嵌套生成可用时的开销。
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import patch
+from langchain.schema import Document
+
+from src.agents.professional.market_agent import MarketAgent
+from src.services.llm_service import llm_service
+from src.services.rag_service import rag_service, RetrievalResult
+
+LLM_LATENCY = 0.05
+RETRIEVAL_LATENCY = 0.005
+ROUNDS = 5
+
+
+class _StubBackends:
+    """记录LLM调用次数的检索和生成桩"""
+
+    def __init__(self):
+        self.llm_calls = 0
+
+    async def retrieve(self, query, mode=None, collection_name="rag_knowledge"):
+        await asyncio.sleep(RETRIEVAL_LATENCY)
+        documents = [
+            Document(page_content=f"{query}相关资料{i}：" + "行业数据" * 50, metadata={'score': 0.9 - i * 0.1})
+            for i in range(3)
+        ]
+        return RetrievalResult(
+            documents=documents,
+            scores=[doc.metadata['score'] for doc in documents],
+            retrieval_time=RETRIEVAL_LATENCY
+        )
+
+    async def generate_response(self, **kwargs):
+        self.llm_calls += 1
+        await asyncio.sleep(LLM_LATENCY)
+        return {'content': "基于资料的回答"}
+
+    async def chat_completion(self, **kwargs):
+        self.llm_calls += 1
+        await asyncio.sleep(LLM_LATENCY)
+        return {'content': "趋势：上升\n增长率：15%\n市场机会：\n- 数字化转型"}
+
+
+async def _legacy_market_trend(agent, industry):
+    """旧实现：两次query()各生成一次回答，再嵌套进最终生成"""
+    rag_result = await rag_service.query(
+        question=f"中国{industry}行业市场趋势和发展前景",
+        collection_name=agent.knowledge_collections["market_trends"]
+    )
+    industry_report = await rag_service.query(
+        question=f"{industry}行业分析报告",
+        collection_name=agent.knowledge_collections["industry_reports"]
+    )
+    return await llm_service.chat_completion(
+        messages=[{"role": "user", "content": f"{rag_result.answer}\n{industry_report.answer}"}],
+        temperature=0.1,
+        max_tokens=2000
+    )
+
+
+async def _measure(stub, run):
+    """返回 (最短耗时, 每轮LLM调用次数)"""
+    best_time = float('inf')
+    stub.llm_calls = 0
+    for _ in range(ROUNDS):
+        start_time = time.perf_counter()
+        await run()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time, stub.llm_calls // ROUNDS
+
+
+class TestAgentRAGContextPerformance:
+    """Agent检索增强性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_single_generation(self):
+        """测试retrieve_context与嵌套生成的LLM调用次数和耗时"""
+        stub = _StubBackends()
+        agent = MarketAgent()
+
+        with patch.object(rag_service, 'retrieve', stub.retrieve), \
+             patch.object(llm_service, 'generate_response', stub.generate_response, create=True), \
+             patch.object(llm_service, 'chat_completion', stub.chat_completion):
+            legacy_time, legacy_calls = await _measure(stub, lambda: _legacy_market_trend(agent, "软件"))
+            context_time, context_calls = await _measure(stub, lambda: agent.analyze_market_trend("软件"))
+
+        assert legacy_calls == 3
+        assert context_calls == 1
+        assert context_time < legacy_time / 2
+
+        print(f"\n市场趋势分析 (LLM耗时 {LLM_LATENCY * 1000:.0f}ms/次):")
+        print(f"嵌套生成: {legacy_calls} 次LLM调用, 耗时 {legacy_time * 1000:.0f}ms")
+        print(f"只检索上下文: {context_calls} 次LLM调用, 耗时 {context_time * 1000:.0f}ms")
+        print(f"加速比: {legacy_time / context_time:.1f}x")
@@ -0,0 +1,92 @@
+"""
+Agent任务路由性能测试
+
+2000条消息分别由8个专业Agent判断任务类型和协作需求，对比旧实现按if/elif链逐组
+any(keyword in content ...)扫描，与路由表编译成的多模式匹配器一次扫描的耗时和结果一致性。
+"""
+
+import pytest
+import random
+import re
+import time
+
+from src.agents.professional.crm_expert_agent import CRMExpertAgent
+from src.agents.professional.customer_success_agent import CustomerSuccessAgent
+from src.agents.professional.management_strategy_agent import ManagementStrategyAgent
+from src.agents.professional.market_agent import MarketAgent
+from src.agents.professional.product_agent import ProductAgent
+from src.agents.professional.sales_agent import SalesAgent
+from src.agents.professional.sales_management_agent import SalesManagementAgent
+from src.agents.professional.system_management_agent import SystemManagementAgent
+
+MESSAGE_COUNT = 2000
+AGENT_CLASSES = [
+    CRMExpertAgent, CustomerSuccessAgent, ManagementStrategyAgent, MarketAgent,
+    ProductAgent, SalesAgent, SalesManagementAgent, SystemManagementAgent
+]
+
+
+def _legacy_route(router, content):
+    """旧实现：按顺序逐组any()扫描关键词，再逐组判断协作"""
+    content = content.lower()
+    task_type = "general"
+    for route in router.routes:
+        if (any(keyword in content for keyword in route.keywords) or
+                any(all(keyword in content for keyword in group) for group in route.keyword_groups) or
+                any(re.search(pattern, content) for pattern in route.patterns)):
+            task_type = route.task_type
+            break
+
+    required_agents = []
+    for rule in router.collaborations:
+        if any(keyword in content for keyword in rule.keywords):
+            required_agents.extend(rule.agents)
+    return task_type, required_agents
+
+
+def _generate_messages(routers):
+    random.seed(42)
+    keywords = sorted({
+        keyword
+        for router in routers
+        for rules in (router.routes, router.collaborations)
+        for rule in rules
+        for keyword in rule.keywords
+    })
+    fillers = ["请帮我", "看一下", "我们公司", "本季度", "的情况，", "尽快给出结论", "谢谢"]
+    messages = []
+    for _ in range(MESSAGE_COUNT):
+        parts = random.sample(keywords, random.randint(0, 3)) + random.sample(fillers, random.randint(2, 5))
+        random.shuffle(parts)
+        messages.append("".join(parts))
+    return messages
+
+
+class TestAgentRoutingPerformance:
+    """Agent任务路由性能测试"""
+
+    def test_compiled_router(self):
+        """测试编译后的路由表与逐组扫描的耗时和结果一致性"""
+        routers = [agent_class.task_router for agent_class in AGENT_CLASSES]
+        messages = _generate_messages(routers)
+
+        legacy_time = router_time = float('inf')
+        for _ in range(3):
+            start_time = time.perf_counter()
+            legacy = [[_legacy_route(router, message) for router in routers] for message in messages]
+            legacy_time = min(legacy_time, time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            decisions = [[router.route(message) for router in routers] for message in messages]
+            router_time = min(router_time, time.perf_counter() - start_time)
+
+        assert [
+            [(decision.task_type, decision.required_agents) for decision in row] for row in decisions
+        ] == legacy
+        assert router_time < legacy_time
+
+        routings = MESSAGE_COUNT * len(routers)
+        print(f"\nAgent任务路由 ({MESSAGE_COUNT} 条消息 x {len(routers)} 个Agent):")
+        print(f"逐组any()扫描: {legacy_time * 1000:.0f}ms ({legacy_time / routings * 1e6:.2f}us/次)")
+        print(f"编译路由表: {router_time * 1000:.0f}ms ({router_time / routings * 1e6:.2f}us/次)")
+        print(f"加速比: {legacy_time / router_time:.1f}x")
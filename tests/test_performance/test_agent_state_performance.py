@@ -0,0 +1,139 @@
+"""
+Agent状态管理性能测试
+
+注册10k个Agent后，对比逐个加载状态的旧实现与基于Redis二级索引的系统指标、
+按状态查询和活跃Agent查询耗时。优先使用本地Redis（第15号库），
+不可用时退回fakeredis，两者都没有时跳过。
+"""
+
+import pytest
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import redis.asyncio as redis
+
+from src.agents.base import AgentState, AgentStatus
+from src.agents.state_manager import AgentStateManager, StateManagerConfig
+
+AGENT_COUNT = 10000
+
+
+async def _create_redis_client():
+    client = redis.from_url("redis://localhost:6379/15", encoding="utf-8", decode_responses=True)
+    try:
+        await asyncio.wait_for(client.ping(), timeout=2)
+        return client
+    except Exception:
+        await client.close()
+
+    fakeredis = pytest.importorskip("fakeredis", reason="Redis不可用且未安装fakeredis")
+    pytest.importorskip("lupa", reason="fakeredis执行Lua脚本需要lupa")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def _legacy_system_metrics(manager: AgentStateManager):
+    """旧实现：列出全部Agent后逐个加载状态统计"""
+    agent_ids = await manager.list_agents()
+
+    status_counts = {status: 0 for status in AgentStatus}
+    total_errors = 0
+    active_count = 0
+
+    for agent_id in agent_ids:
+        state = await manager.load_state(agent_id)
+        if state:
+            status_counts[state.status] += 1
+            total_errors += state.error_count
+            if (datetime.now() - state.last_active).total_seconds() < 3600:
+                active_count += 1
+
+    return {
+        "total_agents": len(agent_ids),
+        "active_agents": active_count,
+        "status_distribution": status_counts,
+        "total_errors": total_errors,
+    }
+
+
+@pytest.fixture
+async def seeded_manager():
+    """注册大量Agent状态的状态管理器"""
+    manager = AgentStateManager(StateManagerConfig(key_prefix=f"bench:{uuid.uuid4().hex[:8]}:agent:state:"))
+    manager.redis_client = await _create_redis_client()
+
+    statuses = list(AgentStatus)
+    now = datetime.now()
+    states = [
+        AgentState(
+            agent_id=f"agent-{i}",
+            status=statuses[i % len(statuses)],
+            error_count=i % 5,
+            last_active=now - timedelta(minutes=i % 180)
+        )
+        for i in range(AGENT_COUNT)
+    ]
+    for offset in range(0, AGENT_COUNT, 500):
+        await asyncio.gather(*(
+            manager.save_state(state.agent_id, state) for state in states[offset:offset + 500]
+        ))
+
+    yield manager
+
+    keys = [key async for key in manager.redis_client.scan_iter(f"{manager.config.key_prefix}*")]
+    for offset in range(0, len(keys), 1000):
+        await manager.redis_client.delete(*keys[offset:offset + 1000])
+    await manager.close()
+
+
+class TestAgentStatePerformance:
+    """Agent状态管理性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_indexed_queries_match_legacy_and_are_faster(self, seeded_manager):
+        """测试索引查询与逐个加载结果一致且更快"""
+        manager = seeded_manager
+
+        start_time = time.perf_counter()
+        legacy = await _legacy_system_metrics(manager)
+        legacy_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        metrics = await manager.get_system_metrics()
+        indexed_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        busy_agents = await manager.get_agents_by_status(AgentStatus.BUSY)
+        active_agents = await manager.get_active_agents()
+        query_time = time.perf_counter() - start_time
+
+        assert metrics["total_agents"] == legacy["total_agents"] == AGENT_COUNT
+        assert metrics["active_agents"] == legacy["active_agents"]
+        assert metrics["status_distribution"] == legacy["status_distribution"]
+        assert metrics["total_errors"] == legacy["total_errors"]
+        assert len(busy_agents) == legacy["status_distribution"][AgentStatus.BUSY]
+        assert len(active_agents) == legacy["active_agents"]
+        assert indexed_time < legacy_time
+
+        print(f"\nAgent系统指标性能 ({AGENT_COUNT} 个Agent):")
+        print(f"逐个加载统计耗时: {legacy_time * 1000:.1f}ms")
+        print(f"二级索引统计耗时: {indexed_time * 1000:.2f}ms")
+        print(f"按状态+活跃时间查询耗时: {query_time * 1000:.2f}ms")
+        print(f"加速比: {legacy_time / indexed_time:.0f}x")
+
+    @pytest.mark.asyncio
+    async def test_status_change_and_delete_keep_metrics_consistent(self, seeded_manager):
+        """测试状态变更和删除后索引计数保持一致"""
+        manager = seeded_manager
+        before = await manager.get_system_metrics()
+
+        await manager.update_agent_status("agent-0", AgentStatus.ERROR)
+        await manager.delete_state("agent-1")
+
+        after = await manager.get_system_metrics()
+        legacy = await _legacy_system_metrics(manager)
+
+        assert after["total_agents"] == before["total_agents"] - 1
+        assert after["status_distribution"] == legacy["status_distribution"]
+        assert after["total_errors"] == legacy["total_errors"]
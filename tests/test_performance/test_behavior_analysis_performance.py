@@ -0,0 +1,139 @@
+"""
+客户行为分析性能测试
+
+2000个客户、每个客户30个会话，对比旧实现逐对象多次遍历计算指标与列式批量分析的耗时。
+"""
+
+import pytest
+import random
+import time
+import numpy as np
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from src.models.multimodal import BehaviorData
+from src.services.behavior_analysis_service import BehaviorAnalysisService, BehaviorColumns
+
+CUSTOMER_COUNT = 2000
+SESSIONS_PER_CUSTOMER = 30
+
+
+def _legacy_metrics(behavior_data):
+    """旧实现：参与度、访问模式、转化和异常分别遍历会话对象"""
+    engagement_scores = [data.engagement_score for data in behavior_data]
+    session_durations = [sum(data.time_spent.values()) for data in behavior_data]
+    engagement = {
+        'average_engagement_score': np.mean(engagement_scores),
+        'total_page_views': sum(len(data.page_views) for data in behavior_data),
+        'total_clicks': sum(len(data.click_events) for data in behavior_data),
+        'average_session_duration': sum(sum(data.time_spent.values()) for data in behavior_data) / len(behavior_data),
+        'bounce_rate': sum(1 for data in behavior_data if len(data.page_views) == 1) / len(behavior_data)
+    }
+
+    hour_distribution = defaultdict(int)
+    page_frequency = defaultdict(int)
+    path_frequency = defaultdict(int)
+    for data in behavior_data:
+        hour_distribution[data.timestamp.hour] += 1
+        path = [page_view.get('url', 'unknown') for page_view in data.page_views]
+        for url in path:
+            page_frequency[url] += 1
+        for i in range(len(path) - 1):
+            path_frequency[tuple(path[i:i + 2])] += 1
+    access = {
+        'hour_distribution': dict(hour_distribution),
+        'top_pages': sorted(page_frequency.items(), key=lambda x: x[1], reverse=True)[:5],
+        'common_paths': sorted(path_frequency.items(), key=lambda x: x[1], reverse=True)[:5]
+    }
+
+    conversion_events = []
+    for data in behavior_data:
+        conversion_events.extend(data.conversion_indicators)
+    conversion_rate = len(set(conversion_events)) / len(behavior_data)
+
+    anomalies = 0
+    avg_engagement, std_engagement = np.mean(engagement_scores), np.std(engagement_scores)
+    avg_duration, std_duration = np.mean(session_durations), np.std(session_durations)
+    for data in behavior_data:
+        if abs(data.engagement_score - avg_engagement) > 2 * std_engagement:
+            anomalies += 1
+        if abs(sum(data.time_spent.values()) - avg_duration) > 2 * std_duration:
+            anomalies += 1
+        if len(data.page_views) > 50:
+            anomalies += 1
+
+    return engagement, access, conversion_rate, anomalies
+
+
+def _generate_behavior_data():
+    random.seed(42)
+    base_time = datetime.now() - timedelta(days=30)
+    pages = [f"/page_{i}" for i in range(40)]
+    indicators = ["demo_request", "contact_form_submit", "pricing_page_view", "whitepaper_download", "newsletter"]
+
+    behavior_by_customer = {}
+    for c in range(CUSTOMER_COUNT):
+        customer_id = f"customer_{c}"
+        behavior_by_customer[customer_id] = [
+            BehaviorData(
+                customer_id=customer_id,
+                session_id=f"{customer_id}_session_{s}",
+                page_views=[{"url": random.choice(pages)} for _ in range(random.randint(1, 8))],
+                click_events=[{"element": "button"}] * random.randint(0, 5),
+                time_spent={page: random.uniform(5, 300) for page in random.sample(pages, 3)},
+                interaction_patterns={},
+                engagement_score=random.random(),
+                conversion_indicators=random.sample(indicators, random.randint(0, 2)),
+                timestamp=base_time + timedelta(minutes=random.randint(0, 43200))
+            )
+            for s in range(SESSIONS_PER_CUSTOMER)
+        ]
+    return behavior_by_customer
+
+
+class TestBehaviorAnalysisPerformance:
+    """客户行为分析性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_analysis(self):
+        """测试批量列式分析与逐对象计算的耗时和结果一致性"""
+        behavior_by_customer = _generate_behavior_data()
+        service = BehaviorAnalysisService()
+
+        # 取多次运行的最短耗时，避免大堆上的垃圾回收影响单次结果
+        legacy_time = batch_time = float('inf')
+        for _ in range(3):
+            start_time = time.perf_counter()
+            legacy = {
+                customer_id: _legacy_metrics(behavior_data)
+                for customer_id, behavior_data in behavior_by_customer.items()
+            }
+            legacy_time = min(legacy_time, time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            results = await service.analyze_customers_batch(behavior_by_customer)
+            batch_time = min(batch_time, time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        BehaviorColumns.from_sessions(behavior_by_customer)
+        ingest_time = time.perf_counter() - start_time
+
+        for customer_id, (engagement, access, conversion_rate, anomalies) in legacy.items():
+            result = results[customer_id]
+            for key, value in engagement.items():
+                assert result['engagement_metrics'][key] == pytest.approx(value)
+            assert result['access_patterns']['hour_distribution'] == access['hour_distribution']
+            assert result['access_patterns']['top_pages'] == access['top_pages']
+            assert [
+                (tuple(path['path']), path['frequency']) for path in result['access_patterns']['common_access_paths']
+            ] == access['common_paths']
+            assert result['conversion_metrics']['conversion_rate'] == pytest.approx(conversion_rate)
+            assert len(result['anomalies']) == anomalies
+
+        # 旧实现只计算了部分指标，列式批量分析包含画像和建议仍应更快
+        assert batch_time < legacy_time
+
+        print(f"\n客户行为分析性能 ({CUSTOMER_COUNT} 个客户 x {SESSIONS_PER_CUSTOMER} 个会话):")
+        print(f"逐对象计算指标耗时: {legacy_time * 1000:.0f}ms")
+        print(f"列式批量完整分析耗时: {batch_time * 1000:.0f}ms (其中列式转换 {ingest_time * 1000:.0f}ms)")
+        print(f"加速比: {legacy_time / batch_time:.1f}x")
@@ -0,0 +1,129 @@
+"""
+对话状态跟踪性能测试
+
+在内存SQLite上统计一个典型对话轮次的SQL语句数，对比逐项读写数据库的旧路径
+与状态缓存加轮次合并写入的新路径，并校验两者最终落库的状态一致。
+"""
+
+import pytest
+import time
+import uuid
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.core.database import Base
+from src.models.conversation import Conversation, ConversationState
+from src.services.conversation_state_tracker import ConversationStateTracker, ConversationStateCache
+
+pytest.importorskip("aiosqlite")
+
+TURNS = 20
+
+
+async def _run_turn(tracker: ConversationStateTracker, conversation_id, turn_index: int):
+    """模拟一个对话轮次中Agent对状态的典型读写"""
+    await tracker.get_context_variable(conversation_id, "customer")
+    await tracker.add_to_context(conversation_id, f"slot_{turn_index}", turn_index)
+    await tracker.update_short_term_memory(conversation_id, "last_question", f"问题{turn_index}")
+    await tracker.get_short_term_memory(conversation_id, "last_question")
+    await tracker.promote_to_long_term_memory(conversation_id, "industry", "制造业", importance_score=0.8)
+    await tracker.get_long_term_memory(conversation_id, "industry")
+    await tracker.update_flow_state(conversation_id, f"step_{turn_index}")
+
+
+@pytest.fixture
+async def session_factory():
+    """带查询计数的内存数据库"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    tables = [Conversation.__table__, ConversationState.__table__]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    factory.statements = statements
+    yield factory
+
+    await engine.dispose()
+
+
+async def _create_conversation(factory) -> uuid.UUID:
+    conversation_id = uuid.uuid4()
+    async with factory() as session:
+        await session.execute(insert(Conversation.__table__), [{"id": conversation_id, "user_id": "bench-user"}])
+        await session.execute(insert(ConversationState.__table__), [{
+            "id": uuid.uuid4(),
+            "conversation_id": conversation_id,
+            "flow_state": "initialized",
+            "step_history": ["start"],
+            "context_variables": {"customer": "ABC公司"},
+            "short_term_memory": {},
+            "long_term_memory": {},
+        }])
+        await session.commit()
+    return conversation_id
+
+
+async def _load_state(factory, conversation_id):
+    async with factory() as session:
+        result = await session.execute(
+            select(ConversationState).where(ConversationState.conversation_id == conversation_id)
+        )
+        return result.scalar_one()
+
+
+class TestConversationStatePerformance:
+    """对话状态跟踪性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_queries_per_turn(self, session_factory):
+        """测试每轮SQL语句数与耗时，并校验两种路径落库结果一致"""
+        statements = session_factory.statements
+
+        legacy_id = await _create_conversation(session_factory)
+        statements.clear()
+        start_time = time.perf_counter()
+        async with session_factory() as session:
+            tracker = ConversationStateTracker(session)
+            for turn_index in range(TURNS):
+                await _run_turn(tracker, legacy_id, turn_index)
+        legacy_time = time.perf_counter() - start_time
+        legacy_queries = len(statements) / TURNS
+
+        cached_id = await _create_conversation(session_factory)
+        cache = ConversationStateCache()
+        statements.clear()
+        start_time = time.perf_counter()
+        async with session_factory() as session:
+            tracker = ConversationStateTracker(session, cache=cache)
+            for turn_index in range(TURNS):
+                async with tracker.turn(cached_id):
+                    await _run_turn(tracker, cached_id, turn_index)
+        cached_time = time.perf_counter() - start_time
+        cached_queries = len(statements) / TURNS
+
+        legacy_state = await _load_state(session_factory, legacy_id)
+        cached_state = await _load_state(session_factory, cached_id)
+        assert cached_state.flow_state == legacy_state.flow_state == f"step_{TURNS - 1}"
+        assert cached_state.step_history == legacy_state.step_history
+        assert cached_state.context_variables == legacy_state.context_variables
+        assert cached_state.short_term_memory.keys() == legacy_state.short_term_memory.keys()
+        assert (
+            cached_state.long_term_memory["industry"]["access_count"]
+            == legacy_state.long_term_memory["industry"]["access_count"]
+        )
+
+        # 首轮一次SELECT，之后每轮只有一次UPDATE
+        assert cached_queries <= 1 + 1 / TURNS
+        assert cached_queries < legacy_queries
+
+        print(f"\n对话状态每轮SQL语句数 ({TURNS} 轮):")
+        print(f"逐项读写: {legacy_queries:.1f} 条/轮, 耗时 {legacy_time / TURNS * 1000:.2f}ms/轮")
+        print(f"缓存+合并写入: {cached_queries:.2f} 条/轮, 耗时 {cached_time / TURNS * 1000:.2f}ms/轮")
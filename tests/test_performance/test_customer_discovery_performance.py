@@ -0,0 +1,95 @@
+"""
+客户发现流程性能测试
+
+50个潜在客户，模拟每次Agent调用耗时固定时间，对比最大在途调用数为1（等同逐个处理）
+与并发执行时资格认证和接触规划阶段的总耗时。
+"""
+
+import pytest
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock, AsyncMock
+
+from src.workflows.customer_discovery import (
+    CustomerDiscoveryWorkflow, DiscoveryTask, DiscoveryStage, Priority
+)
+from src.workflows.prospect_executor import ProspectExecutor, ProspectStatus
+
+PROSPECT_COUNT = 50
+AGENT_LATENCY = 0.01
+
+
+def _agent_method(build_result):
+    async def call(**kwargs):
+        await asyncio.sleep(AGENT_LATENCY)
+        return build_result(kwargs)
+    return AsyncMock(side_effect=call)
+
+
+def _create_workflow() -> CustomerDiscoveryWorkflow:
+    sales_agent = Mock()
+    sales_agent.qualify_customer = _agent_method(
+        lambda kwargs: {'qualified': True, 'score': kwargs['customer_data']['annual_revenue']}
+    )
+    sales_agent.generate_contact_strategy = _agent_method(lambda kwargs: {'primary_method': 'email'})
+    sales_agent.create_visit_plan = _agent_method(lambda kwargs: {'objectives': ['了解需求']})
+
+    crm_expert_agent = Mock()
+    crm_expert_agent.enhance_customer_profile = _agent_method(lambda kwargs: {'pain_points': ['效率低']})
+
+    return CustomerDiscoveryWorkflow(
+        sales_agent=sales_agent,
+        market_agent=Mock(),
+        crm_expert_agent=crm_expert_agent,
+        customer_service=Mock(),
+        lead_service=Mock()
+    )
+
+
+async def _run_stages(max_concurrent_calls: int):
+    workflow = _create_workflow()
+    task = DiscoveryTask(
+        task_id="bench_task",
+        customer_id=None,
+        stage=DiscoveryStage.QUALIFICATION,
+        priority=Priority.HIGH,
+        title="性能测试",
+        description="",
+        assigned_agent="sales_agent",
+        due_date=datetime.now() + timedelta(days=30)
+    )
+    task.results['potential_customers'] = await workflow._generate_potential_customer_list({}, {}, None)
+    task.results['potential_customers'] = [
+        {**customer, 'company_name': f"公司{i}", 'annual_revenue': 1000000 + i}
+        for i, customer in enumerate(task.results['potential_customers'] * 3)
+    ][:PROSPECT_COUNT]
+    workflow.active_tasks[task.task_id] = task
+    workflow._executors[task.task_id] = ProspectExecutor(max_concurrent_calls=max_concurrent_calls, tokens_per_minute=0)
+
+    start_time = time.perf_counter()
+    await workflow._execute_qualification_stage(task.task_id)
+    elapsed = time.perf_counter() - start_time
+
+    status = await workflow.get_task_status(task.task_id)
+    return elapsed, task, status
+
+
+class TestCustomerDiscoveryPerformance:
+    """客户发现流程性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_prospect_processing(self):
+        """测试并发处理潜在客户与逐个处理的耗时和结果一致性"""
+        sequential_time, sequential_task, _ = await _run_stages(1)
+        concurrent_time, concurrent_task, status = await _run_stages(8)
+
+        assert len(concurrent_task.results['qualified_customers']) == PROSPECT_COUNT
+        assert concurrent_task.results['contact_plans'] == sequential_task.results['contact_plans']
+        assert status['prospect_progress']['by_status'] == {ProspectStatus.COMPLETED.value: PROSPECT_COUNT}
+        assert concurrent_time < sequential_time / 4
+
+        print(f"\n客户发现资格认证+接触规划 ({PROSPECT_COUNT} 个潜在客户, Agent耗时 {AGENT_LATENCY * 1000:.0f}ms/次):")
+        print(f"逐个处理耗时: {sequential_time * 1000:.0f}ms")
+        print(f"并发处理耗时(最大在途8): {concurrent_time * 1000:.0f}ms")
+        print(f"加速比: {sequential_time / concurrent_time:.1f}x")
@@ -0,0 +1,214 @@
+"""
+高价值客户评分性能测试
+
+2万个客户（每个5个行为会话、1次语音通话），对比旧实现逐客户计算指标对象与加权评分，
+与特征矩阵向量化评分的耗时；并测量100万客户从构建矩阵到评分的吞吐量。
+"""
+
+import pytest
+import random
+import time
+import numpy as np
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.models.multimodal import BehaviorData, CustomerValueIndicator
+from src.services.high_value_customer_service import (
+    HighValueCustomerService, CustomerFeatureMatrix, VALUE_INDICATORS,
+    COMPANY_SIZE_SCORES, HIGH_VALUE_INDUSTRIES, CUSTOMER_STATUS_SCORES, CITY_TIER_SCORES,
+    SENTIMENT_ENGAGEMENT, _company_stability_score
+)
+
+CUSTOMER_COUNT = 20000
+SESSIONS_PER_CUSTOMER = 5
+LARGE_CUSTOMER_COUNT = 1000000
+SPECS = {spec.name: spec for spec in VALUE_INDICATORS}
+
+
+def _indicator(name, value):
+    spec = SPECS[name]
+    return CustomerValueIndicator(
+        indicator_name=name,
+        value=value,
+        weight=spec.weight,
+        confidence=spec.confidence,
+        source_modality=spec.source_modality,
+        calculation_method=spec.calculation_method
+    )
+
+
+def _legacy_score(service, customer_info, behavior_data, voice_data):
+    """旧实现：逐客户生成指标对象，再按模态分组加权"""
+    indicators = []
+    if behavior_data:
+        indicators += [
+            _indicator('visit_frequency', min(1.0, len(behavior_data) / 30 / 5)),
+            _indicator('average_engagement', np.mean([data.engagement_score for data in behavior_data])),
+            _indicator('session_depth', min(1.0, np.mean([len(data.page_views) for data in behavior_data]) / 20)),
+            _indicator('conversion_activity', min(1.0, sum(len(data.conversion_indicators) for data in behavior_data) / 10))
+        ]
+    indicators += [
+        _indicator('company_size', COMPANY_SIZE_SCORES.get(customer_info.get('size', 'small'), 0.4)),
+        _indicator('industry_value', 0.8 if customer_info.get('industry', 'unknown').lower() in HIGH_VALUE_INDUSTRIES else 0.4),
+        _indicator('customer_status', CUSTOMER_STATUS_SCORES.get(customer_info.get('status', 'prospect'), 0.3))
+    ]
+    if behavior_data:
+        indicators.append(_indicator('digital_engagement', np.mean([data.engagement_score for data in behavior_data])))
+    if voice_data:
+        indicators.append(_indicator('voice_engagement', np.mean([
+            voice.confidence * 0.4 + SENTIMENT_ENGAGEMENT.get(voice.sentiment, 0.2) * 0.3 + (1.0 if voice.intent else 0.5) * 0.3
+            for voice in voice_data
+        ])))
+    indicators += [
+        _indicator('location_value', CITY_TIER_SCORES.get(customer_info.get('location', {}).get('city', ''), 0.6)),
+        _indicator('company_stability', _company_stability_score(customer_info.get('founded_year'), datetime.now().year))
+    ]
+    if voice_data:
+        indicators += [
+            _indicator('sentiment_positivity', sum(1 for voice in voice_data if voice.sentiment == 'positive') / len(voice_data)),
+            _indicator('voice_clarity', np.mean([voice.confidence for voice in voice_data])),
+            _indicator('intent_clarity', sum(1 for voice in voice_data if voice.intent) / len(voice_data))
+        ]
+
+    modality_groups = defaultdict(list)
+    for indicator in indicators:
+        modality_groups[indicator.source_modality].append(indicator)
+    modality_scores = {
+        modality: sum(i.value * i.weight * i.confidence for i in group) / max(sum(i.weight * i.confidence for i in group), 0.001)
+        for modality, group in modality_groups.items()
+    }
+    weights = service.scoring_weights
+    final_score = (
+        modality_scores.get('behavior', 0) * weights.behavioral_weight +
+        modality_scores.get('text', 0) * weights.transactional_weight +
+        modality_scores.get('voice', 0) * weights.voice_sentiment_weight
+    )
+    available_weight = (
+        ('behavior' in modality_scores) * weights.behavioral_weight +
+        ('text' in modality_scores) * (weights.transactional_weight + weights.demographic_weight) +
+        ('voice' in modality_scores) * weights.voice_sentiment_weight
+    )
+    return min(1.0, max(0.0, final_score / available_weight))
+
+
+def _generate_customers(count):
+    random.seed(42)
+    sizes = list(COMPANY_SIZE_SCORES)
+    industries = ['finance', 'technology', 'education', 'retail', 'media']
+    statuses = list(CUSTOMER_STATUS_SCORES)
+    cities = ['北京', '杭州', '长沙', '上海', '昆明']
+    return [
+        {
+            'id': f"customer_{i}",
+            'size': sizes[i % 5],
+            'industry': industries[i % 5],
+            'status': statuses[i % 4],
+            'location': {'city': cities[i % 5]},
+            'founded_year': 1990 + i % 35
+        }
+        for i in range(count)
+    ]
+
+
+def _generate_activity(count):
+    base_time = datetime.now() - timedelta(days=29)
+    behavior_data = [
+        BehaviorData(
+            customer_id=f"customer_{c}",
+            session_id=f"customer_{c}_session_{s}",
+            page_views=[{"url": "/pricing"}] * random.randint(1, 10),
+            click_events=[],
+            time_spent={},
+            interaction_patterns={},
+            engagement_score=random.random(),
+            conversion_indicators=["demo_request"] * random.randint(0, 2),
+            timestamp=base_time + timedelta(hours=random.randint(0, 600))
+        )
+        for c in range(count)
+        for s in range(SESSIONS_PER_CUSTOMER)
+    ]
+    voice_data = [
+        SimpleNamespace(
+            customer_id=f"customer_{c}",
+            confidence=random.random(),
+            sentiment=random.choice(['positive', 'neutral', 'negative']),
+            intent=random.choice(['purchase', None])
+        )
+        for c in range(count)
+    ]
+    return behavior_data, voice_data
+
+
+class TestHighValueScoringPerformance:
+    """高价值客户评分性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_vectorized_scoring(self):
+        """测试特征矩阵评分与逐客户计算的耗时和结果一致性"""
+        customers = _generate_customers(CUSTOMER_COUNT)
+        behavior_data, voice_data = _generate_activity(CUSTOMER_COUNT)
+        service = HighValueCustomerService()
+
+        behavior_by_customer = defaultdict(list)
+        for behavior in behavior_data:
+            behavior_by_customer[behavior.customer_id].append(behavior)
+        voice_by_customer = defaultdict(list)
+        for voice in voice_data:
+            voice_by_customer[voice.customer_id].append(voice)
+
+        # 取多次运行的最短耗时，避免大堆上的垃圾回收影响单次结果
+        legacy_time = batch_time = float('inf')
+        for _ in range(3):
+            start_time = time.perf_counter()
+            legacy = [
+                _legacy_score(service, customer, behavior_by_customer[customer['id']], voice_by_customer[customer['id']])
+                for customer in customers
+            ]
+            legacy_time = min(legacy_time, time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            value_scores = await service.score_customers(customers, behavior_data, voice_data)
+            batch_time = min(batch_time, time.perf_counter() - start_time)
+
+        np.testing.assert_allclose(value_scores.scores, legacy)
+        assert batch_time < legacy_time / 5
+
+        print(f"\n高价值客户评分性能 ({CUSTOMER_COUNT} 个客户):")
+        print(f"逐客户计算耗时: {legacy_time * 1000:.0f}ms")
+        print(f"特征矩阵评分耗时: {batch_time * 1000:.0f}ms")
+        print(f"加速比: {legacy_time / batch_time:.1f}x")
+
+    @pytest.mark.asyncio
+    async def test_million_customer_throughput(self):
+        """测试100万客户构建特征矩阵和评分的吞吐量，以及进程池分片评分的一致性"""
+        customers = _generate_customers(LARGE_CUSTOMER_COUNT)
+        behavior_data, voice_data = _generate_activity(CUSTOMER_COUNT)
+
+        start_time = time.perf_counter()
+        matrix = CustomerFeatureMatrix.build(customers, behavior_data, voice_data)
+        build_time = time.perf_counter() - start_time
+
+        service = HighValueCustomerService(max_workers=1)
+        score_time = float('inf')
+        for _ in range(3):
+            start_time = time.perf_counter()
+            inline = await service.score_feature_matrix(matrix)
+            score_time = min(score_time, time.perf_counter() - start_time)
+
+        sharded_service = HighValueCustomerService(shard_size=LARGE_CUSTOMER_COUNT // 4, max_workers=4)
+        try:
+            start_time = time.perf_counter()
+            sharded = await sharded_service.score_feature_matrix(matrix)
+            sharded_time = time.perf_counter() - start_time
+        finally:
+            sharded_service.close()
+
+        np.testing.assert_allclose(sharded.scores, inline.scores)
+        assert len(inline.scores) == LARGE_CUSTOMER_COUNT
+
+        print(f"\n高价值客户评分吞吐量 ({LARGE_CUSTOMER_COUNT} 个客户):")
+        print(f"构建特征矩阵耗时: {build_time * 1000:.0f}ms")
+        print(f"单进程评分耗时: {score_time * 1000:.0f}ms ({LARGE_CUSTOMER_COUNT / score_time:,.0f} 客户/秒)")
+        print(f"进程池分片评分耗时(4分片, 含进程启动): {sharded_time * 1000:.0f}ms")
+        print(f"端到端吞吐量: {LARGE_CUSTOMER_COUNT / (build_time + score_time):,.0f} 客户/秒")
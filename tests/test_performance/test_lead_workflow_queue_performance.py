@@ -0,0 +1,145 @@
+"""
+线索工作流阶段任务队列性能测试
+
+在内存SQLite上突发提交一批新线索，模拟Agent每次调用耗时固定时间，
+对比不同worker并发数下的接口返回耗时、队列深度、阶段耗时和吞吐。
+"""
+
+import pytest
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.core.database import Base
+from src.models.lead import LeadSource
+from src.models.workflow_job import WorkflowJob, WorkflowJobStatus
+from src.workflows.job_queue import StageJobQueue
+from src.workflows.lead_management import LeadManagementWorkflow, WorkflowStage
+
+pytest.importorskip("aiosqlite")
+
+LEAD_COUNT = 40
+AGENT_LATENCY = 0.02
+
+
+class FakeLeadService:
+    """内存线索服务"""
+
+    def __init__(self):
+        self.leads = {}
+
+    async def create_lead(self, lead_create):
+        lead = SimpleNamespace(
+            id=f"lead_{len(self.leads) + 1}",
+            company_name="测试公司",
+            contact_name="张三",
+            job_title="技术总监",
+            industry="制造业",
+            company_size="中型企业",
+            annual_revenue=5000000,
+            location="北京",
+            source=LeadSource.WEBSITE,
+            score=85,
+            custom_fields={}
+        )
+        self.leads[lead.id] = lead
+        return lead
+
+    async def get_lead(self, lead_id):
+        return self.leads.get(lead_id)
+
+    async def update_lead(self, lead_id, lead_update):
+        return True
+
+
+class SlowAgents:
+    """每次调用耗时固定时间的模拟Agent"""
+
+    async def score_lead(self, **kwargs):
+        await asyncio.sleep(AGENT_LATENCY)
+        return {'total_score': 85.0, 'demographic_score': 80.0, 'behavioral_score': 90.0,
+                'firmographic_score': 85.0, 'engagement_score': 87.0, 'confidence': 0.9}
+
+    async def qualify_lead(self, **kwargs):
+        await asyncio.sleep(AGENT_LATENCY)
+        return {'qualified': True}
+
+    async def assign_lead(self, **kwargs):
+        await asyncio.sleep(AGENT_LATENCY)
+        return {'assigned_rep_id': 'rep_001', 'reason': '技能匹配', 'strategy': 'skill_based'}
+
+    async def create_follow_up_plan(self, **kwargs):
+        await asyncio.sleep(AGENT_LATENCY)
+        return {'plan_id': 'plan_001', 'activities': []}
+
+
+async def _run_burst(concurrency: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[WorkflowJob.__table__]))
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    agents = SlowAgents()
+    workflow = LeadManagementWorkflow(
+        market_agent=agents,
+        sales_management_agent=agents,
+        sales_agent=agents,
+        lead_service=FakeLeadService(),
+        job_queue=StageJobQueue("lead_management", session_factory=factory),
+        worker_concurrency=concurrency
+    )
+    await asyncio.sleep(0)
+
+    try:
+        start_time = time.perf_counter()
+        task_ids = [
+            await workflow.process_new_lead({'company_name': f'公司{i}'}, "website")
+            for i in range(LEAD_COUNT)
+        ]
+        submit_time = time.perf_counter() - start_time
+        depth = await workflow.job_queue.get_depth()
+
+        start_time = time.perf_counter()
+        await workflow.worker.drain(timeout=120)
+        process_time = time.perf_counter() - start_time
+
+        assert depth[WorkflowJobStatus.PENDING.value] == LEAD_COUNT
+        assert all(workflow.active_tasks[task_id].stage == WorkflowStage.FOLLOW_UP for task_id in task_ids)
+
+        metrics = await workflow.get_queue_metrics()
+        assert metrics['depth'][WorkflowJobStatus.SUCCEEDED.value] == LEAD_COUNT * 4
+        return submit_time, process_time, metrics['worker']['stage_latency']
+    finally:
+        await engine.dispose()
+
+
+class TestLeadWorkflowQueuePerformance:
+    """线索工作流队列性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_worker_concurrency_throughput(self):
+        """测试突发线索下接口返回耗时与不同并发数的处理吞吐"""
+        with patch.multiple(
+            'src.workflows.lead_management',
+            LeadCreate=Mock(),
+            LeadUpdate=Mock(),
+            LeadStatus=Mock()
+        ):
+            results = {concurrency: await _run_burst(concurrency) for concurrency in (1, 8)}
+
+        print(f"\n线索工作流队列性能 ({LEAD_COUNT} 个线索, Agent耗时 {AGENT_LATENCY * 1000:.0f}ms/次):")
+        for concurrency, (submit_time, process_time, stage_latency) in results.items():
+            print(f"并发数 {concurrency}:")
+            print(f"  接口返回平均耗时: {submit_time / LEAD_COUNT * 1000:.2f}ms")
+            print(f"  阶段吞吐: {LEAD_COUNT * 4 / process_time:.0f} stages/s")
+            for stage, latency in stage_latency.items():
+                print(f"  {stage} 平均耗时: {latency['average_seconds'] * 1000:.1f}ms")
+
+        serial_time = results[1][1]
+        concurrent_time = results[8][1]
+        # 提交只入队，不等待Agent调用
+        assert results[8][0] / LEAD_COUNT < AGENT_LATENCY * 4
+        assert concurrent_time < serial_time / 2
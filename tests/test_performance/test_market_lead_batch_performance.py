@@ -0,0 +1,94 @@
+"""
+批量线索评分性能测试
+
+200个线索分布在5个行业，模拟数据库、评分知识检索和LLM分析的耗时，对比旧实现逐个
+串行调用score_lead()（每个线索都检索一次评分知识）与stream_score_leads()限制并发、
+同一行业共享一次检索的耗时、吞吐量和检索次数。
+"""
+
+import pytest
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import Mock, AsyncMock, patch
+
+from src.agents.professional.market_agent import MarketAgent
+
+LEAD_COUNT = 200
+INDUSTRIES = ["制造业", "金融", "零售", "医疗", "教育"]
+DB_LATENCY = 0.002
+RAG_LATENCY = 0.02
+LLM_LATENCY = 0.01
+CONCURRENCY = 16
+
+
+class _StubBackends:
+    """记录评分知识检索次数的数据库、RAG和LLM桩"""
+
+    def __init__(self):
+        self.retrieve_calls = 0
+
+    @asynccontextmanager
+    async def get_db(self):
+        yield AsyncMock()
+
+    async def get_lead(self, lead_id, db):
+        await asyncio.sleep(DB_LATENCY)
+        lead = Mock()
+        lead.name = lead_id
+        lead.industry = INDUSTRIES[int(lead_id.split("_")[1]) % len(INDUSTRIES)]
+        return lead
+
+    async def calculate_lead_score(self, lead, db):
+        await asyncio.sleep(DB_LATENCY)
+        return Mock(total_score=75.0, score_factors=[])
+
+    async def retrieve_context(self, question, collection_name=None, **kwargs):
+        self.retrieve_calls += 1
+        await asyncio.sleep(RAG_LATENCY)
+        return Mock(text=f"{question}要点", confidence=0.8, sources=[])
+
+    async def chat_completion(self, messages, **kwargs):
+        await asyncio.sleep(LLM_LATENCY)
+        return {"content": "跟进建议：\n• 安排产品演示\n风险因素：\n• 决策周期较长"}
+
+
+class TestMarketLeadBatchPerformance:
+    """批量线索评分性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batch_scoring(self):
+        """测试并发批量评分与串行逐个评分的耗时和评分知识检索次数"""
+        stub = _StubBackends()
+        agent = MarketAgent()
+        agent.lead_service.get_lead = stub.get_lead
+        agent.scoring_service.calculate_lead_score = stub.calculate_lead_score
+        lead_ids = [f"lead_{i}" for i in range(LEAD_COUNT)]
+
+        with patch('src.agents.professional.market_agent.get_db', stub.get_db), \
+             patch('src.agents.professional.market_agent.rag_service.retrieve_context', stub.retrieve_context), \
+             patch('src.agents.professional.market_agent.llm_service.chat_completion', stub.chat_completion):
+            start_time = time.perf_counter()
+            sequential = [await agent.score_lead(lead_id) for lead_id in lead_ids]
+            sequential_time = time.perf_counter() - start_time
+            sequential_retrieves = stub.retrieve_calls
+
+            stub.retrieve_calls = 0
+            result = await agent._handle_score_lead_batch(lead_ids=lead_ids, max_concurrency=CONCURRENCY)
+            concurrent_retrieves = stub.retrieve_calls
+
+        summary = result["summary"]
+        concurrent_time = summary["elapsed_seconds"]
+
+        assert len(sequential) == LEAD_COUNT
+        assert summary["success"] == LEAD_COUNT
+        assert [r["lead_id"] for r in result["batch_results"]] == lead_ids
+        assert concurrent_retrieves == len(INDUSTRIES)
+        assert concurrent_time < sequential_time / 5
+
+        print(f"\n批量线索评分 ({LEAD_COUNT} 个线索, {len(INDUSTRIES)} 个行业, 并发 {CONCURRENCY}):")
+        print(f"串行score_lead: 检索评分知识 {sequential_retrieves} 次, 耗时 {sequential_time * 1000:.0f}ms "
+              f"({LEAD_COUNT / sequential_time:.0f} 线索/秒)")
+        print(f"stream_score_leads: 检索评分知识 {concurrent_retrieves} 次, 耗时 {concurrent_time * 1000:.0f}ms "
+              f"({summary['leads_per_second']:.0f} 线索/秒)")
+        print(f"加速比: {sequential_time / concurrent_time:.1f}x")
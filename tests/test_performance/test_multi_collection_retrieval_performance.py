@@ -0,0 +1,105 @@
+"""
+多集合检索性能测试
+
+以CRM专家Agent知识整合的6个知识库集合为例，模拟查询向量生成、重排序和向量搜索的耗时，
+对比旧实现逐个集合调用retrieve_context()（每次都重新生成查询向量）与
+multi_collection_retrieve()只生成一次查询向量、并发检索各集合的查询向量生成次数和耗时。
+"""
+
+import pytest
+import asyncio
+import time
+import numpy as np
+from unittest.mock import patch
+
+from src.agents.professional.crm_expert_agent import CRMExpertAgent
+from src.services.embedding_service import embedding_service
+from src.services.rag_service import rag_service
+from src.services.vector_service import vector_service, VectorDocument, VectorSearchResult
+
+EMBEDDING_LATENCY = 0.02
+RERANK_LATENCY = 0.02
+SEARCH_LATENCY = 0.01
+ROUNDS = 3
+
+
+class _StubBackends:
+    """记录查询向量生成次数的嵌入和向量搜索桩"""
+
+    def __init__(self):
+        self.encode_calls = 0
+
+    async def encode(self, text):
+        self.encode_calls += 1
+        await asyncio.sleep(EMBEDDING_LATENCY)
+        return np.ones(8)
+
+    async def rerank(self, query, documents, top_k):
+        await asyncio.sleep(RERANK_LATENCY)
+        return [(i, 0.9 - i * 0.05) for i in range(min(top_k, len(documents)))]
+
+    async def search_by_vector(self, vector, collection_name=None, limit=10, score_threshold=0.0, filters=None):
+        await asyncio.sleep(SEARCH_LATENCY)
+        return [
+            VectorSearchResult(
+                document=VectorDocument(f"{collection_name}_{i}", f"{collection_name}知识{i}：" + "内容" * 60, {}),
+                score=0.9 - i * 0.05,
+                distance=0.1 + i * 0.05
+            )
+            for i in range(limit)
+        ]
+
+    async def search(self, query, collection_name=None, limit=10, score_threshold=0.0, filters=None):
+        vector = await self.encode(query)
+        return await self.search_by_vector(vector, collection_name, limit, score_threshold)
+
+
+async def _measure(stub, run):
+    """返回 (最短耗时, 每轮查询向量生成次数)"""
+    best_time = float('inf')
+    stub.encode_calls = 0
+    for _ in range(ROUNDS):
+        start_time = time.perf_counter()
+        await run()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time, stub.encode_calls // ROUNDS
+
+
+class TestMultiCollectionRetrievalPerformance:
+    """多集合检索性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_shared_embedding_fan_out(self):
+        """测试多集合检索与逐集合检索的查询向量生成次数和耗时"""
+        stub = _StubBackends()
+        collections = list(CRMExpertAgent().knowledge_collections.values())
+        topic = "CRM最佳实践"
+
+        async def sequential():
+            return [
+                await rag_service.retrieve_context(question=topic, collection_name=collection_name, max_tokens=500)
+                for collection_name in collections
+            ]
+
+        async def fan_out():
+            return await rag_service.multi_collection_retrieve(
+                question=topic, collections=collections, max_tokens=500 * len(collections)
+            )
+
+        with patch.object(embedding_service, 'encode', stub.encode), \
+             patch.object(embedding_service, 'rerank', stub.rerank), \
+             patch.object(vector_service, 'search', stub.search), \
+             patch.object(vector_service, 'search_by_vector', stub.search_by_vector):
+            sequential_time, sequential_encodes = await _measure(stub, sequential)
+            fan_out_time, fan_out_encodes = await _measure(stub, fan_out)
+            context = await fan_out()
+
+        assert fan_out_encodes == 1
+        assert context.collections == collections
+        assert fan_out_time < sequential_time / 5
+
+        print(f"\n多集合检索 ({len(collections)} 个集合, 查询向量 {EMBEDDING_LATENCY * 1000:.0f}ms/次, "
+              f"搜索 {SEARCH_LATENCY * 1000:.0f}ms/次):")
+        print(f"逐集合retrieve_context: 生成查询向量 {sequential_encodes} 次, 耗时 {sequential_time * 1000:.0f}ms")
+        print(f"multi_collection_retrieve: 生成查询向量 {fan_out_encodes} 次, 耗时 {fan_out_time * 1000:.0f}ms")
+        print(f"加速比: {sequential_time / fan_out_time:.1f}x")
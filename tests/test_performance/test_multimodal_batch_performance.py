@@ -0,0 +1,89 @@
+"""
+多模态批量分析性能测试
+
+2000个客户，对比旧实现一次性gather所有客户并在内存中保留全部结果，
+与限制并发、整批加载数据并流式消费结果的吞吐量和峰值内存。
+流式处理的峰值内存只取决于并发数和整批加载的客户数，不随客户总数增长。
+"""
+
+import pytest
+import asyncio
+import logging
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.models.multimodal import DataModalityType, MultimodalAnalysisRequest
+from src.services.multimodal_fusion_service import MultimodalFusionService
+
+CUSTOMER_COUNT = 2000
+
+
+async def _legacy_batch(service, customer_ids):
+    """旧实现：每个客户一个协程，全部同时启动，结果保存在一个字典中"""
+    tasks = [
+        service.process_multimodal_analysis(MultimodalAnalysisRequest(
+            customer_id=customer_id,
+            analysis_type='high_value_identification',
+            modalities=[
+                DataModalityType.TEXT,
+                DataModalityType.VOICE,
+                DataModalityType.BEHAVIOR,
+                DataModalityType.INTERACTION
+            ],
+            time_range={'start': datetime.now() - timedelta(days=30), 'end': datetime.now()}
+        ))
+        for customer_id in customer_ids
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        customer_id: result for customer_id, result in zip(customer_ids, results)
+        if not isinstance(result, Exception)
+    }
+
+
+async def _streamed_batch(service, customer_ids):
+    """流式消费：每个结果处理后即丢弃（如写入存储）"""
+    processed = 0
+    async for item in service.stream_process_customers(customer_ids):
+        if item.result is not None:
+            processed += 1
+    return processed
+
+
+async def _measure(run):
+    """返回 (耗时, 峰值内存字节数, 结果)，耗时和内存分两次测量避免tracemalloc影响计时"""
+    start_time = time.perf_counter()
+    result = await run()
+    elapsed = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    try:
+        await run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak_memory, result
+
+
+class TestMultimodalBatchPerformance:
+    """多模态批量分析性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_streaming_batch(self):
+        """测试流式批量处理与一次性gather的吞吐量和峰值内存"""
+        service = MultimodalFusionService()
+        customer_ids = [f"batch_customer_{i}" for i in range(CUSTOMER_COUNT)]
+        logging.disable(logging.INFO)
+        try:
+            legacy_time, legacy_memory, legacy = await _measure(lambda: _legacy_batch(service, customer_ids))
+            stream_time, stream_memory, processed = await _measure(lambda: _streamed_batch(service, customer_ids))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        assert len(legacy) == processed == CUSTOMER_COUNT
+        assert stream_memory < legacy_memory / 3
+
+        print(f"\n多模态批量分析 ({CUSTOMER_COUNT} 个客户):")
+        print(f"一次性gather: {CUSTOMER_COUNT / legacy_time:.0f} 客户/秒, 峰值内存 {legacy_memory / 1024 / 1024:.1f}MB")
+        print(f"流式处理(并发32): {CUSTOMER_COUNT / stream_time:.0f} 客户/秒, 峰值内存 {stream_memory / 1024 / 1024:.1f}MB")
@@ -0,0 +1,190 @@
+"""
+销售机会统计性能测试
+
+在内存SQLite上灌入大量销售机会，对比逐行加载到Python计算的旧实现
+与数据库端分组聚合实现的耗时，并校验两者结果一致。
+"""
+
+import pytest
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.core.database import Base
+from src.models.customer import Customer, CompanySize, CustomerStatus
+from src.models.opportunity import (
+    Opportunity, OpportunityStage, OpportunityStatus, OpportunityPriority, StageType
+)
+from src.services.opportunity_service import OpportunityService, opportunity_statistics_cache
+
+pytest.importorskip("aiosqlite")
+
+SEED_OPPORTUNITIES = 20000
+
+
+async def _legacy_statistics(db: AsyncSession):
+    """旧实现：加载全部机会后在Python中统计"""
+    result = await db.execute(select(Opportunity))
+    opportunities = result.scalars().all()
+
+    stage_names = {
+        stage.id: stage.name
+        for stage in (await db.execute(select(OpportunityStage))).scalars().all()
+    }
+
+    total_value = sum(opp.value for opp in opportunities)
+    weighted_value = sum(opp.value * (opp.probability or 0) for opp in opportunities)
+    by_status = {
+        status.value: len([opp for opp in opportunities if opp.status == status])
+        for status in OpportunityStatus
+    }
+    by_stage = {}
+    by_assigned = {}
+    for opp in opportunities:
+        stage_name = stage_names.get(opp.stage_id, "未知")
+        by_stage[stage_name] = by_stage.get(stage_name, 0) + 1
+        assignee = opp.assigned_to or "未分配"
+        by_assigned[assignee] = by_assigned.get(assignee, 0) + 1
+    closed = [opp for opp in opportunities if opp.actual_close_date]
+    average_sales_cycle = (
+        sum((opp.actual_close_date - opp.created_at).days for opp in closed) / len(closed)
+        if closed else 0
+    )
+
+    return {
+        "total_opportunities": len(opportunities),
+        "total_value": total_value,
+        "weighted_value": weighted_value,
+        "by_status": by_status,
+        "by_stage": by_stage,
+        "by_assigned": by_assigned,
+        "average_sales_cycle": average_sales_cycle,
+    }
+
+
+@pytest.fixture
+async def seeded_session():
+    """灌入大量销售机会的内存数据库会话"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    tables = [Customer.__table__, OpportunityStage.__table__, Opportunity.__table__]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    customer_id = uuid.uuid4()
+    stage_ids = [uuid.uuid4() for _ in range(5)]
+    statuses = list(OpportunityStatus)
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(Customer.__table__), [{
+            "id": customer_id,
+            "name": "性能测试客户",
+            "company": "性能测试公司",
+            "size": CompanySize.LARGE,
+            "status": CustomerStatus.QUALIFIED,
+        }])
+        await conn.execute(insert(OpportunityStage.__table__), [
+            {
+                "id": stage_id,
+                "name": f"阶段{order}",
+                "stage_type": StageType.QUALIFICATION,
+                "order": order,
+                "probability": order / 5,
+            }
+            for order, stage_id in enumerate(stage_ids, start=1)
+        ])
+        rows = []
+        for i in range(SEED_OPPORTUNITIES):
+            created_at = now - timedelta(days=rng.randint(0, 365), hours=rng.randint(0, 23))
+            status = statuses[i % len(statuses)]
+            rows.append({
+                "id": uuid.uuid4(),
+                "name": f"机会{i}",
+                "customer_id": customer_id,
+                "stage_id": stage_ids[i % len(stage_ids)],
+                "value": float(rng.randint(1000, 500000)),
+                "probability": rng.random() if i % 7 else None,
+                "status": status,
+                "priority": OpportunityPriority.MEDIUM,
+                "assigned_to": f"销售{i % 50}" if i % 11 else None,
+                "created_at": created_at,
+                "actual_close_date": (
+                    created_at + timedelta(days=rng.randint(1, 120))
+                    if status != OpportunityStatus.OPEN else None
+                ),
+            })
+        await conn.execute(insert(Opportunity.__table__), rows)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+class TestOpportunityStatisticsPerformance:
+    """销售机会统计性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_aggregate_statistics_matches_legacy_and_is_faster(self, seeded_session):
+        """测试聚合统计与旧实现结果一致且更快"""
+        service = OpportunityService(seeded_session)
+        opportunity_statistics_cache.invalidate()
+
+        start_time = time.perf_counter()
+        legacy = await _legacy_statistics(seeded_session)
+        legacy_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        statistics = await service.get_statistics(use_cache=False)
+        aggregate_time = time.perf_counter() - start_time
+
+        assert statistics.total_opportunities == legacy["total_opportunities"] == SEED_OPPORTUNITIES
+        assert statistics.total_value == pytest.approx(legacy["total_value"])
+        assert statistics.weighted_value == pytest.approx(legacy["weighted_value"])
+        assert statistics.by_status == legacy["by_status"]
+        assert statistics.by_stage == legacy["by_stage"]
+        assert statistics.by_assigned == legacy["by_assigned"]
+        assert statistics.average_sales_cycle == pytest.approx(legacy["average_sales_cycle"])
+        assert aggregate_time < legacy_time
+
+        print(f"\n销售机会统计性能 ({SEED_OPPORTUNITIES} 条):")
+        print(f"逐行加载统计耗时: {legacy_time * 1000:.1f}ms")
+        print(f"分组聚合统计耗时: {aggregate_time * 1000:.1f}ms")
+        print(f"加速比: {legacy_time / aggregate_time:.1f}x")
+
+    @pytest.mark.asyncio
+    async def test_statistics_cache_hit_and_invalidation(self, seeded_session):
+        """测试统计缓存命中以及写入后失效"""
+        service = OpportunityService(seeded_session)
+        opportunity_statistics_cache.invalidate()
+
+        first = await service.get_statistics(assigned_to="销售1")
+
+        start_time = time.perf_counter()
+        cached = await service.get_statistics(assigned_to="销售1")
+        cached_time = time.perf_counter() - start_time
+
+        assert cached == first
+        assert cached_time < 0.01
+
+        stage_id = (await seeded_session.execute(select(OpportunityStage.id).limit(1))).scalar_one()
+        customer_id = (await seeded_session.execute(select(Customer.id).limit(1))).scalar_one()
+        seeded_session.add(Opportunity(
+            name="新机会",
+            customer_id=customer_id,
+            stage_id=stage_id,
+            value=1000.0,
+            assigned_to="销售1"
+        ))
+        await seeded_session.commit()
+
+        refreshed = await service.get_statistics(assigned_to="销售1")
+        assert refreshed.total_opportunities == first.total_opportunities + 1
+
+        print(f"\n缓存命中耗时: {cached_time * 1000:.3f}ms")
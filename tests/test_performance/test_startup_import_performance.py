@@ -0,0 +1,74 @@
+"""
+API启动导入性能测试
+
+在子进程中用 python -X importtime 导入 src.main，统计导入耗时并检查预算：
+模型和索引相关的重量级依赖（torch、sentence_transformers、llama_index）不应在导入阶段加载，
+服务单例也不应在导入阶段创建。对比项为同时导入这些依赖（即旧实现导入阶段的开销）。
+"""
+
+import pytest
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ROUNDS = 3
+IMPORT_BUDGET_SECONDS = 6.0
+HEAVY_MODULES = ("torch", "sentence_transformers", "llama_index")
+
+
+def _import_profile(statement):
+    """运行 python -X importtime，返回 ({模块名: 累计导入耗时(秒)}, 标准输出)"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=300
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us) / 1e6
+    return cumulative, completed.stdout
+
+
+def _best_import_time(statement, *modules):
+    """返回多次导入中 modules 累计导入耗时之和的最小值"""
+    best_time = float('inf')
+    for _ in range(ROUNDS):
+        profile, _ = _import_profile(statement)
+        best_time = min(best_time, sum(profile[module] for module in modules))
+    return best_time
+
+
+class TestStartupImportPerformance:
+    """API启动导入性能测试"""
+
+    def test_api_import_budget(self):
+        """测试导入API应用的耗时预算和重量级依赖延迟加载"""
+        profile, stdout = _import_profile(
+            "import src.main\n"
+            "from src.services import rag_service\n"
+            "print(rag_service._rag_service.created)"
+        )
+        loaded = sorted({name.split(".")[0] for name in profile} & set(HEAVY_MODULES))
+
+        lazy_time = _best_import_time("import src.main", "src.main")
+        heavy_time = _best_import_time(
+            "import sentence_transformers, llama_index.core", "sentence_transformers", "llama_index.core"
+        )
+
+        assert loaded == []
+        assert stdout.strip() == "False"
+        assert lazy_time < IMPORT_BUDGET_SECONDS
+
+        print(f"\nAPI启动导入 (最好 {ROUNDS} 次, 预算 {IMPORT_BUDGET_SECONDS:.1f}s):")
+        print(f"延迟加载: import src.main {lazy_time * 1000:.0f}ms")
+        print(f"导入阶段加载模型依赖: 约 {(lazy_time + heavy_time) * 1000:.0f}ms "
+              f"(sentence_transformers/torch + llama_index {heavy_time * 1000:.0f}ms)")
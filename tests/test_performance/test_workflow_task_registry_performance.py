@@ -0,0 +1,119 @@
+"""
+工作流任务注册表性能测试
+
+线索管理工作流持有10万个任务时，对比遍历全部任务的旧指标计算与注册表增量计数，
+以及销售代表负载和活跃任务列表分页的耗时。
+"""
+
+import pytest
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from src.workflows.lead_management import (
+    LeadManagementWorkflow, LeadWorkflowTask, WorkflowStage, LeadPriority
+)
+
+TASK_COUNT = 100000
+
+
+def _legacy_metrics(tasks):
+    """旧实现：遍历全部任务统计"""
+    tasks_by_stage = {}
+    tasks_by_priority = {}
+    total_progress = 0
+    completed_tasks = 0
+    for task in tasks.values():
+        tasks_by_stage[task.stage.value] = tasks_by_stage.get(task.stage.value, 0) + 1
+        tasks_by_priority[task.priority.value] = tasks_by_priority.get(task.priority.value, 0) + 1
+        total_progress += task.progress
+        if task.status == "completed":
+            completed_tasks += 1
+    return {
+        'tasks_by_stage': tasks_by_stage,
+        'tasks_by_priority': tasks_by_priority,
+        'average_progress': total_progress / len(tasks),
+        'completion_rate': completed_tasks / len(tasks)
+    }
+
+
+@pytest.fixture
+async def workflow():
+    """持有大量任务的线索管理工作流"""
+    workflow = LeadManagementWorkflow(
+        market_agent=Mock(),
+        sales_management_agent=Mock(),
+        sales_agent=Mock(),
+        lead_service=Mock()
+    )
+    # 等待默认销售代表加载
+    await asyncio.sleep(0)
+
+    stages = [WorkflowStage.SCORING, WorkflowStage.QUALIFICATION, WorkflowStage.ASSIGNMENT, WorkflowStage.FOLLOW_UP]
+    priorities = list(LeadPriority)
+    base_time = datetime.now() - timedelta(days=7)
+    for i in range(TASK_COUNT):
+        created_at = base_time + timedelta(seconds=i)
+        workflow.active_tasks[f"task_{i}"] = LeadWorkflowTask(
+            task_id=f"task_{i}",
+            lead_id=f"lead_{i}",
+            stage=stages[i % len(stages)],
+            priority=priorities[i % len(priorities)],
+            assigned_to=f"rep_00{i % 3 + 1}",
+            title=f"任务{i}",
+            description="",
+            due_date=created_at + timedelta(hours=24),
+            status="completed" if i % 10 == 0 else "pending",
+            progress=(i % 5) / 4,
+            created_at=created_at,
+            updated_at=created_at
+        )
+    return workflow
+
+
+class TestWorkflowTaskRegistryPerformance:
+    """工作流任务注册表性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_metrics_with_100k_tasks(self, workflow):
+        """测试10万任务下工作流指标、销售代表负载和分页列表耗时"""
+        iterations = 20
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            legacy = _legacy_metrics(workflow.active_tasks)
+        legacy_time = (time.perf_counter() - start_time) / iterations
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            metrics = await workflow.get_workflow_metrics()
+        indexed_time = (time.perf_counter() - start_time) / iterations
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            workload = await workflow.get_sales_rep_workload("rep_001")
+        workload_time = (time.perf_counter() - start_time) / iterations
+
+        start_time = time.perf_counter()
+        page, cursor = workflow.active_tasks.list_page(limit=50)
+        next_page, _ = workflow.active_tasks.list_page(limit=50, cursor=cursor)
+        page_time = time.perf_counter() - start_time
+
+        assert metrics['tasks_by_stage'] == legacy['tasks_by_stage']
+        assert metrics['tasks_by_priority'] == legacy['tasks_by_priority']
+        assert metrics['average_progress'] == pytest.approx(legacy['average_progress'])
+        assert metrics['completion_rate'] == pytest.approx(legacy['completion_rate'])
+        assert workload['assigned_tasks_count'] == sum(
+            1 for task in workflow.active_tasks.values()
+            if task.assigned_to == "rep_001" and task.status != "completed"
+        )
+        assert page[0].task_id == f"task_{TASK_COUNT - 1}"
+        assert next_page[0].task_id == f"task_{TASK_COUNT - 51}"
+        assert indexed_time < legacy_time / 10
+
+        print(f"\n工作流指标性能 ({TASK_COUNT} 个任务):")
+        print(f"遍历统计耗时: {legacy_time * 1000:.2f}ms")
+        print(f"注册表计数耗时: {indexed_time * 1000:.3f}ms")
+        print(f"销售代表负载耗时: {workload_time * 1000:.3f}ms")
+        print(f"两页游标分页耗时: {page_time * 1000:.3f}ms")
@@ -939,6 +939,75 @@ class TestOpportunityService:
         assert stage2_analysis.total_value == 150000.0
         assert stage2_analysis.weighted_value == 90000.0
         assert stage2_analysis.conversion_rate == 0.6
+    
+    @pytest.mark.asyncio
+    async def test_funnel_analysis_uses_transition_rollups(self, db_session: AsyncSession):
+        """测试漏斗转化率来自阶段转换汇总"""
+        opportunity_service = OpportunityService(db_session)
+        
+        customer = Customer(
+            name="测试客户",
+            company="测试公司",
+            industry="制造业",
+            size=CompanySize.LARGE,
+            status=CustomerStatus.QUALIFIED
+        )
+        stage1 = OpportunityStage(
+            name="需求分析",
+            stage_type=StageType.NEEDS_ANALYSIS,
+            order=1,
+            probability=0.3
+        )
+        stage2 = OpportunityStage(
+            name="方案提议",
+            stage_type=StageType.PROPOSAL,
+            order=2,
+            probability=0.6
+        )
+        db_session.add_all([customer, stage1, stage2])
+        await db_session.flush()
+        
+        opportunities = [
+            Opportunity(
+                name=f"机会{i}",
+                customer_id=customer.id,
+                stage_id=stage1.id,
+                value=100000.0,
+                probability=0.3,
+                status=OpportunityStatus.OPEN
+            )
+            for i in range(4)
+        ]
+        db_session.add_all(opportunities)
+        await db_session.flush()
+        db_session.add_all([
+            OpportunityStageHistory(opportunity_id=opp.id, to_stage_id=stage1.id, reason="初始创建")
+            for opp in opportunities
+        ])
+        await db_session.commit()
+        
+        await opportunity_service.rebuild_stage_rollups()
+        
+        transition_request = StageTransitionRequest(
+            opportunity_id=str(opportunities[0].id),
+            to_stage_id=str(stage2.id),
+            validate_criteria=False
+        )
+        await opportunity_service.transition_stage(transition_request)
+        
+        result = await opportunity_service.get_funnel_analysis()
+        
+        stage1_analysis = result.funnel_stages[0]
+        assert stage1_analysis.entered_count == 4
+        assert stage1_analysis.advanced_count == 1
+        assert stage1_analysis.conversion_rate == 0.25
+        assert stage1_analysis.opportunity_count == 3
+        
+        stage2_analysis = result.funnel_stages[1]
+        assert stage2_analysis.entered_count == 1
+        assert stage2_analysis.advanced_count == 0
+        assert stage2_analysis.conversion_rate == 0.0
+        assert stage2_analysis.opportunity_count == 1
 
 
 class TestOpportunityActivityService:
@@ -12,7 +12,7 @@ import numpy as np
 from langchain.schema import Document
 
 from src.services.rag_service import (
-    RAGService, RAGConfig, RAGMode, RAGResult, RetrievalResult,
+    RAGService, RAGConfig, RAGMode, RAGResult, RAGContext, RetrievalResult,
     ChineseTextSplitter, ContextWindowManager, ResultFusion
 )
 from src.services.vector_service import VectorDocument, VectorSearchResult
@@ -435,7 +435,109 @@ class TestRAGService:
             assert result.confidence == 0.0
             assert len(result.sources) == 0
             assert 'error' in result.metadata
-    
+
+    @pytest.mark.asyncio
+    async def test_retrieve_context(self, rag_service, mock_vector_results):
+        """测试只检索不生成的上下文"""
+        with patch('src.services.rag_service.vector_service') as mock_vector, \
+             patch('src.services.rag_service.llm_service') as mock_llm:
+
+            mock_vector.search = AsyncMock(return_value=mock_vector_results)
+            mock_llm.generate_response = AsyncMock()
+
+            context = await rag_service.retrieve_context("什么是RAG？", RAGMode.SIMPLE)
+
+            assert isinstance(context, RAGContext)
+            assert len(context.documents) == 2
+            assert context.scores == [0.9, 0.8]
+            assert context.confidence > 0
+            assert context.token_count == sum(len(doc.page_content) for doc in context.documents)
+            assert context.text.startswith("文档1: 这是第一个测试文档的内容")
+            assert "文档2: 这是第二个测试文档的内容" in context.text
+            assert [source['score'] for source in context.sources] == [0.9, 0.8]
+
+            # 不应调用LLM生成回答
+            mock_llm.generate_response.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_retrieve_context_token_budget(self, rag_service):
+        """测试上下文按token预算截断"""
+        long_results = [
+            VectorSearchResult(
+                document=VectorDocument(id=f"doc{i}", content="客" * 300, metadata={'score': 0.9 - i * 0.1}),
+                score=0.9 - i * 0.1,
+                distance=0.1 + i * 0.1
+            )
+            for i in range(3)
+        ]
+
+        with patch('src.services.rag_service.vector_service') as mock_vector:
+            mock_vector.search = AsyncMock(return_value=long_results)
+
+            context = await rag_service.retrieve_context("测试问题", RAGMode.SIMPLE, max_tokens=500)
+
+            assert context.token_count == 500
+            assert len(context.documents) == 2
+            assert context.documents[1].page_content.endswith("...")
+
+    @pytest.mark.asyncio
+    async def test_multi_collection_retrieve(self, rag_service):
+        """测试多集合检索只生成一次查询向量，并按排名融合、保留来源"""
+        collection_results = {
+            "product_catalog": [
+                VectorSearchResult(VectorDocument("doc1", "产品A介绍", {}), score=0.92, distance=0.08),
+                VectorSearchResult(VectorDocument("doc2", "产品B介绍", {}), score=0.81, distance=0.19)
+            ],
+            "solution_templates": [
+                VectorSearchResult(VectorDocument("doc1", "方案模板", {}), score=0.88, distance=0.12)
+            ]
+        }
+
+        async def search_by_vector(vector, collection_name, limit, score_threshold):
+            return collection_results[collection_name]
+
+        with patch('src.services.rag_service.embedding_service') as mock_embedding, \
+             patch('src.services.rag_service.vector_service') as mock_vector:
+            mock_embedding.encode = AsyncMock(return_value=np.ones(4))
+            mock_vector.search_by_vector = AsyncMock(side_effect=search_by_vector)
+
+            context = await rag_service.multi_collection_retrieve(
+                "CRM产品", ["product_catalog", "solution_templates"], per_collection_k=2
+            )
+
+            mock_embedding.encode.assert_called_once_with("CRM产品")
+            assert mock_vector.search_by_vector.call_count == 2
+            assert all(call[1]['limit'] == 2 for call in mock_vector.search_by_vector.call_args_list)
+
+            # 同ID的文档来自不同集合，不应被合并
+            assert [doc.page_content for doc in context.documents] == ["产品A介绍", "方案模板", "产品B介绍"]
+            assert context.scores == [0.92, 0.88, 0.81]
+            assert context.collections == ["product_catalog", "solution_templates"]
+            assert context.text_for("solution_templates") == "文档1: 方案模板"
+            assert [source['metadata']['collection_name'] for source in context.sources] == [
+                "product_catalog", "solution_templates", "product_catalog"
+            ]
+            assert context.documents[0].metadata['rrf_score'] > context.documents[2].metadata['rrf_score']
+            assert context.confidence > 0
+
+    @pytest.mark.asyncio
+    async def test_multi_collection_retrieve_partial_failure(self, rag_service, mock_vector_results):
+        """测试单个集合检索失败不影响其他集合"""
+        async def search_by_vector(vector, collection_name, limit, score_threshold):
+            if collection_name == "broken":
+                raise Exception("集合不存在")
+            return mock_vector_results
+
+        with patch('src.services.rag_service.embedding_service') as mock_embedding, \
+             patch('src.services.rag_service.vector_service') as mock_vector:
+            mock_embedding.encode = AsyncMock(return_value=np.ones(4))
+            mock_vector.search_by_vector = AsyncMock(side_effect=search_by_vector)
+
+            context = await rag_service.multi_collection_retrieve("测试问题", ["broken", "rag_knowledge"])
+
+            assert len(context.documents) == 2
+            assert context.collections == ["rag_knowledge"]
+
     def test_calculate_confidence(self, rag_service):
         """测试置信度计算"""
         # 高分数，多文档
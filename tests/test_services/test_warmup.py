@@ -0,0 +1,63 @@
+"""
+服务预热测试
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.services.warmup import WarmupStatus, warm_up_services, start_warmup
+
+
+@pytest.fixture
+def mock_embedding_service():
+    service = Mock()
+    service.initialize = AsyncMock()
+    service.initialize_reranker = AsyncMock()
+    with patch('src.services.embedding_service.get_embedding_service', return_value=service):
+        yield service
+
+
+class TestWarmup:
+    """服务预热测试类"""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_services(self, mock_embedding_service):
+        """测试预热加载嵌入和重排序模型"""
+        status = await warm_up_services(WarmupStatus())
+
+        mock_embedding_service.initialize.assert_awaited_once()
+        mock_embedding_service.initialize_reranker.assert_awaited_once()
+        assert status.state == "completed"
+        assert status.to_dict()["elapsed_seconds"] >= 0
+        assert status.errors == {}
+
+    @pytest.mark.asyncio
+    async def test_warm_up_partial_failure(self, mock_embedding_service):
+        """测试单个模型加载失败不影响其他模型"""
+        mock_embedding_service.initialize.side_effect = Exception("模型下载失败")
+
+        status = await warm_up_services(WarmupStatus())
+
+        mock_embedding_service.initialize_reranker.assert_awaited_once()
+        assert status.state == "failed"
+        assert status.errors == {"embedding_model": "模型下载失败"}
+
+    @pytest.mark.asyncio
+    async def test_start_warmup_disabled(self, mock_embedding_service):
+        """测试关闭预热配置时不启动任务"""
+        status = WarmupStatus()
+        with patch('src.services.warmup.settings.BGE_WARMUP_ON_STARTUP', False):
+            assert start_warmup(status) is None
+
+        assert status.state == "disabled"
+        mock_embedding_service.initialize.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_start_warmup_background(self, mock_embedding_service):
+        """测试预热在后台任务中执行"""
+        status = WarmupStatus()
+        task = start_warmup(status)
+
+        assert status.state == "pending"
+        await task
+        assert status.state == "completed"
@@ -359,13 +359,14 @@ class TestLeadManagementWorkflow:
             mock_db = AsyncMock()
             mock_get_db.return_value.__aenter__.return_value = mock_db
             
-            await workflow._execute_qualification_stage("test_task")
+            next_stage = await workflow._execute_qualification_stage("test_task")
         
         # 验证销售Agent被调用
         mock_sales_agent.qualify_lead.assert_called_once()
         
-        # 验证任务状态更新
-        assert task.stage == WorkflowStage.FOLLOW_UP  # 应该进展到跟进阶段
+        # 验证任务状态更新（每次只执行一个阶段，返回下一阶段）
+        assert next_stage == WorkflowStage.ASSIGNMENT
+        assert task.stage == WorkflowStage.ASSIGNMENT
         assert task.progress >= 0.5
         assert 'qualification_result' in task.results
     
@@ -723,7 +724,7 @@ class TestLeadManagementWorkflow:
             mock_db = AsyncMock()
             mock_get_db.return_value.__aenter__.return_value = mock_db
             
-            await workflow._execute_scoring_stage("test_task")
+            await workflow._run_stages("test_task", WorkflowStage.SCORING)
         
         # 验证低分线索进入培育阶段
         assert task.stage == WorkflowStage.NURTURING
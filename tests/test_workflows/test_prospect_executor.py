@@ -0,0 +1,182 @@
+"""
+潜在客户并发执行器测试
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, AsyncMock, patch
+
+from src.workflows.customer_discovery import CustomerDiscoveryWorkflow, DiscoveryStage
+from src.workflows.prospect_executor import (
+    ProspectExecutor, ProspectExecutionCancelled, ProspectStatus, TokenBudget
+)
+
+
+class TestProspectExecutor:
+    """执行器测试"""
+
+    @pytest.mark.asyncio
+    async def test_limits_in_flight_calls(self):
+        """测试同时在途的调用数不超过上限"""
+        executor = ProspectExecutor(max_concurrent_calls=3, tokens_per_minute=0)
+        peak = 0
+
+        async def agent_call(value):
+            nonlocal peak
+            peak = max(peak, executor.in_flight)
+            await asyncio.sleep(0.01)
+            return value * 2
+
+        async def handler(value):
+            return await executor.call(agent_call, value)
+
+        finished = []
+        results = await executor.map(list(range(10)), handler, lambda index, result, error: finished.append(index))
+
+        assert results == [value * 2 for value in range(10)]
+        assert sorted(finished) == list(range(10))
+        assert peak == 3
+        assert executor.calls == 10
+
+    @pytest.mark.asyncio
+    async def test_failures_are_isolated(self):
+        """测试单个对象失败不影响其他对象"""
+        executor = ProspectExecutor(max_concurrent_calls=4, tokens_per_minute=0)
+        errors = {}
+
+        async def handler(value):
+            if value == 2:
+                raise RuntimeError("Agent超时")
+            return value
+
+        results = await executor.map(
+            [1, 2, 3], handler,
+            lambda index, result, error: errors.__setitem__(index, error)
+        )
+
+        assert results == [1, None, 3]
+        assert isinstance(errors[1], RuntimeError)
+        assert errors[0] is None and errors[2] is None
+
+    @pytest.mark.asyncio
+    async def test_token_budget_throttles_calls(self):
+        """测试token预算耗尽后等待补充"""
+        budget = TokenBudget(tokens_per_minute=6000)  # 每秒补充100个token
+
+        start_time = time.perf_counter()
+        await budget.acquire(6000)
+        await budget.acquire(10)
+        elapsed = time.perf_counter() - start_time
+
+        assert elapsed >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_in_flight_calls(self):
+        """测试取消后在途调用被中断且map抛出取消异常"""
+        executor = ProspectExecutor(max_concurrent_calls=2, tokens_per_minute=0)
+        started = asyncio.Event()
+
+        async def slow_call():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def handler(_):
+            return await executor.call(slow_call)
+
+        statuses = []
+        run = asyncio.create_task(executor.map(
+            list(range(5)), handler,
+            lambda index, result, error: statuses.append(type(error))
+        ))
+        await started.wait()
+        executor.cancel()
+
+        with pytest.raises(ProspectExecutionCancelled):
+            await asyncio.wait_for(run, timeout=1)
+        assert statuses == [ProspectExecutionCancelled] * 5
+
+
+def _discovery_workflow(agent_latency: float = 0.0):
+    def agent_method(build_result):
+        async def call(**kwargs):
+            await asyncio.sleep(agent_latency)
+            return build_result(kwargs)
+        return AsyncMock(side_effect=call)
+
+    sales_agent = Mock()
+    sales_agent.qualify_customer = agent_method(
+        lambda kwargs: {'qualified': True, 'score': kwargs['customer_data']['annual_revenue']}
+    )
+    sales_agent.generate_contact_strategy = agent_method(lambda kwargs: {'primary_method': 'email'})
+    sales_agent.create_visit_plan = agent_method(lambda kwargs: {'objectives': ['了解需求']})
+
+    market_agent = Mock()
+    market_agent.analyze_market_segment = AsyncMock(return_value={'market_size': '大'})
+
+    crm_expert_agent = Mock()
+    crm_expert_agent.enhance_customer_profile = agent_method(lambda kwargs: {'pain_points': ['效率低']})
+
+    return CustomerDiscoveryWorkflow(
+        sales_agent=sales_agent,
+        market_agent=market_agent,
+        crm_expert_agent=crm_expert_agent,
+        customer_service=Mock(),
+        lead_service=Mock()
+    )
+
+
+def _mock_rag():
+    return AsyncMock(return_value=Mock(dict=Mock(return_value={'answer': '行业洞察'})))
+
+
+class TestCustomerDiscoveryConcurrency:
+    """客户发现流程并发测试"""
+
+    @pytest.mark.asyncio
+    async def test_prospect_progress_reported(self):
+        """测试任务状态返回每个潜在客户的处理进度"""
+        workflow = _discovery_workflow()
+
+        with patch('src.workflows.customer_discovery.rag_service') as mock_rag:
+            mock_rag.query = _mock_rag()
+            task_id = await workflow.start_customer_discovery({'industry': '制造业'}, ['找到客户'])
+
+        status = await workflow.get_task_status(task_id)
+        progress = status['prospect_progress']
+
+        assert status['stage'] == DiscoveryStage.INITIAL_CONTACT.value
+        assert progress['total'] == 20
+        assert progress['by_status'] == {ProspectStatus.COMPLETED.value: 20}
+
+        # 接触计划按资格分数顺序排列
+        task = workflow.active_tasks[task_id]
+        scores = [customer['qualification_score'] for customer in task.results['qualified_customers']]
+        assert scores == sorted(scores, reverse=True)
+        planned = [plan['customer_profile']['company_name'] for plan in task.results['contact_plans']]
+        assert planned == [
+            customer['customer_data']['company_name'] for customer in task.results['qualified_customers'][:10]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cancel_discovery(self):
+        """测试取消进行中的客户发现任务"""
+        workflow = _discovery_workflow(agent_latency=10)
+
+        with patch('src.workflows.customer_discovery.rag_service') as mock_rag:
+            mock_rag.query = _mock_rag()
+            run = asyncio.create_task(workflow.start_customer_discovery({'industry': '制造业'}, ['找到客户']))
+
+            while not workflow.active_tasks or not any(
+                task.results.get('prospect_progress') for task in workflow.active_tasks.values()
+            ):
+                await asyncio.sleep(0.01)
+            task_id = next(iter(workflow.active_tasks))
+
+            assert await workflow.cancel_discovery(task_id) is True
+            assert await asyncio.wait_for(run, timeout=1) == task_id
+
+        status = await workflow.get_task_status(task_id)
+        assert status['status'] == "cancelled"
+        assert status['prospect_progress']['by_status'] == {ProspectStatus.CANCELLED.value: 20}
+        assert task_id not in workflow._executors
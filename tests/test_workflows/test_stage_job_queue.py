@@ -0,0 +1,268 @@
+"""
+工作流阶段任务队列测试
+
+在内存SQLite上运行持久化队列，使用模拟Agent和进程内worker验证
+异步执行、重试退避、重试耗尽、崩溃恢复和重复入队。
+"""
+
+import pytest
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, AsyncMock, patch
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.core.database import Base
+from src.models.lead import LeadSource
+from src.models.workflow_job import WorkflowJob, WorkflowJobStatus
+from src.workflows.job_queue import StageJobQueue, StageWorker, StageOutcome
+from src.workflows.lead_management import LeadManagementWorkflow, WorkflowStage
+
+pytest.importorskip("aiosqlite")
+
+
+class FakeLeadService:
+    """内存线索服务"""
+
+    def __init__(self):
+        self.leads = {}
+        self.update_lead = AsyncMock(return_value=True)
+
+    async def create_lead(self, lead_create):
+        lead = SimpleNamespace(
+            id=f"lead_{len(self.leads) + 1}",
+            company_name="测试公司",
+            contact_name="张三",
+            job_title="技术总监",
+            industry="制造业",
+            company_size="中型企业",
+            annual_revenue=5000000,
+            location="北京",
+            source=LeadSource.WEBSITE,
+            score=85,
+            custom_fields={}
+        )
+        self.leads[lead.id] = lead
+        return lead
+
+    async def get_lead(self, lead_id):
+        return self.leads.get(lead_id)
+
+
+def _fake_agents():
+    market_agent = Mock()
+    market_agent.score_lead = AsyncMock(return_value={
+        'total_score': 85.0,
+        'demographic_score': 80.0,
+        'behavioral_score': 90.0,
+        'firmographic_score': 85.0,
+        'engagement_score': 87.0,
+        'factors': {'job_title': 0.8},
+        'confidence': 0.92
+    })
+
+    sales_management_agent = Mock()
+    sales_management_agent.assign_lead = AsyncMock(return_value={
+        'assigned_rep_id': 'rep_001',
+        'reason': '技能匹配度最高',
+        'strategy': 'skill_based'
+    })
+
+    sales_agent = Mock()
+    sales_agent.qualify_lead = AsyncMock(return_value={'qualified': True, 'score': 0.85})
+    sales_agent.create_follow_up_plan = AsyncMock(return_value={
+        'plan_id': 'plan_001',
+        'activities': [{'type': 'call', 'description': '初次接触电话'}],
+        'timeline_days': 14
+    })
+    return market_agent, sales_management_agent, sales_agent
+
+
+@pytest.fixture
+async def session_factory():
+    """内存数据库"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[WorkflowJob.__table__]))
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+@pytest.fixture
+def lead_schemas():
+    """线索schema与工作流字段映射不在本测试范围内，替换为模拟对象"""
+    with patch.multiple(
+        'src.workflows.lead_management',
+        LeadCreate=Mock(),
+        LeadUpdate=Mock(),
+        LeadStatus=Mock()
+    ):
+        yield
+
+
+@pytest.fixture
+def lead_service():
+    return FakeLeadService()
+
+
+def _create_workflow(session_factory, lead_service, agents=None, **queue_options):
+    market_agent, sales_management_agent, sales_agent = agents or _fake_agents()
+    return LeadManagementWorkflow(
+        market_agent=market_agent,
+        sales_management_agent=sales_management_agent,
+        sales_agent=sales_agent,
+        lead_service=lead_service,
+        job_queue=StageJobQueue("lead_management", session_factory=session_factory, **queue_options)
+    )
+
+
+async def _get_jobs(session_factory, task_id):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(WorkflowJob).where(WorkflowJob.task_id == task_id).order_by(WorkflowJob.created_at)
+        )
+        return result.scalars().all()
+
+
+class TestStageJobQueue:
+    """阶段任务队列测试"""
+
+    @pytest.mark.asyncio
+    async def test_process_new_lead_returns_before_stages_run(self, session_factory, lead_service, lead_schemas):
+        """测试新线索入队后立即返回，由worker执行完各阶段"""
+        workflow = _create_workflow(session_factory, lead_service)
+        await asyncio.sleep(0)
+
+        task_id = await workflow.process_new_lead({'company_name': '测试公司'}, "website")
+
+        # 接口返回时只入队了评分阶段
+        workflow.market_agent.score_lead.assert_not_called()
+        depth = await workflow.job_queue.get_depth()
+        assert depth[WorkflowJobStatus.PENDING.value] == 1
+
+        await workflow.worker.drain()
+
+        task = workflow.active_tasks[task_id]
+        assert task.stage == WorkflowStage.FOLLOW_UP
+        assert task.assigned_to == 'rep_001'
+        assert 'follow_up_plan' in task.results
+
+        jobs = await _get_jobs(session_factory, task_id)
+        assert [job.stage for job in jobs] == ['scoring', 'qualification', 'assignment', 'follow_up']
+        assert all(job.status == WorkflowJobStatus.SUCCEEDED for job in jobs)
+
+        metrics = await workflow.get_queue_metrics()
+        assert metrics['depth'][WorkflowJobStatus.SUCCEEDED.value] == 4
+        assert metrics['worker']['succeeded'] == 4
+        assert set(metrics['worker']['stage_latency']) == {'scoring', 'qualification', 'assignment', 'follow_up'}
+
+    @pytest.mark.asyncio
+    async def test_failed_stage_retries_with_backoff(self, session_factory, lead_service, lead_schemas):
+        """测试阶段失败后按退避时间重新排队，重试成功后继续后续阶段"""
+        agents = _fake_agents()
+        agents[1].assign_lead.side_effect = [
+            ConnectionError("Agent超时"),
+            {'assigned_rep_id': 'rep_001', 'reason': '重试成功', 'strategy': 'skill_based'}
+        ]
+        workflow = _create_workflow(session_factory, lead_service, agents, retry_delay=0.05)
+        await asyncio.sleep(0)
+        rep_load = workflow.sales_reps['rep_001'].current_load
+
+        task_id = await workflow.process_new_lead({'company_name': '测试公司'}, "website")
+        await workflow.worker.drain()
+
+        jobs = {job.stage: job for job in await _get_jobs(session_factory, task_id)}
+        assignment_job = jobs['assignment']
+        assert assignment_job.status == WorkflowJobStatus.PENDING
+        assert assignment_job.attempts == 1
+        assert assignment_job.last_error == "Agent超时"
+        assert assignment_job.available_at > datetime.utcnow()
+
+        await asyncio.sleep(0.1)
+        await workflow.worker.drain()
+
+        jobs = {job.stage: job for job in await _get_jobs(session_factory, task_id)}
+        assert jobs['assignment'].status == WorkflowJobStatus.SUCCEEDED
+        assert jobs['assignment'].attempts == 2
+        assert jobs['follow_up'].status == WorkflowJobStatus.SUCCEEDED
+        assert workflow.worker.retried == 1
+        assert workflow.sales_reps['rep_001'].current_load == rep_load + 1
+
+    @pytest.mark.asyncio
+    async def test_stage_dead_after_max_attempts(self, session_factory, lead_service, lead_schemas):
+        """测试重试次数耗尽后任务标记为失败且不再入队后续阶段"""
+        agents = _fake_agents()
+        agents[0].score_lead.side_effect = RuntimeError("评分服务不可用")
+        workflow = _create_workflow(session_factory, lead_service, agents, max_attempts=2, retry_delay=0)
+        await asyncio.sleep(0)
+
+        task_id = await workflow.process_new_lead({'company_name': '测试公司'}, "website")
+        await workflow.worker.drain()
+
+        jobs = await _get_jobs(session_factory, task_id)
+        assert len(jobs) == 1
+        assert jobs[0].status == WorkflowJobStatus.DEAD
+        assert jobs[0].attempts == 2
+        assert agents[0].score_lead.await_count == 2
+        assert workflow.worker.dead == 1
+
+    @pytest.mark.asyncio
+    async def test_resume_after_worker_crash(self, session_factory, lead_service, lead_schemas):
+        """测试worker崩溃后新实例接管租约过期的任务并恢复任务状态"""
+        crashed = _create_workflow(session_factory, lead_service)
+        await asyncio.sleep(0)
+        task_id = await crashed.process_new_lead({'company_name': '测试公司'}, "website")
+
+        # 模拟领取后进程退出：任务停留在运行中，租约过期
+        jobs = await crashed.job_queue.claim("crashed-worker", 1)
+        assert len(jobs) == 1
+        async with session_factory() as session:
+            await session.execute(
+                update(WorkflowJob)
+                .where(WorkflowJob.id == jobs[0].id)
+                .values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await session.commit()
+
+        restarted = _create_workflow(session_factory, lead_service)
+        await asyncio.sleep(0)
+        assert task_id not in restarted.active_tasks
+
+        await restarted.worker.drain()
+
+        status = await restarted.get_task_status(task_id)
+        assert status['stage'] == WorkflowStage.FOLLOW_UP.value
+        assert status['assigned_to'] == 'rep_001'
+
+        jobs = await _get_jobs(session_factory, task_id)
+        assert jobs[0].attempts == 2
+        assert all(job.status == WorkflowJobStatus.SUCCEEDED for job in jobs)
+
+        # 新进程中只有快照时也能查询任务状态
+        fresh = _create_workflow(session_factory, lead_service)
+        status = await fresh.get_task_status(task_id)
+        assert status['stage'] == WorkflowStage.FOLLOW_UP.value
+
+    @pytest.mark.asyncio
+    async def test_duplicate_enqueue_is_ignored(self, session_factory):
+        """测试同一任务同一阶段重复入队不会重复执行"""
+        queue = StageJobQueue("lead_management", session_factory=session_factory)
+        handled = []
+
+        async def handler(job):
+            handled.append(job.stage)
+            return StageOutcome(snapshot=job.payload)
+
+        assert await queue.enqueue("task_1", "scoring", {"task_id": "task_1"}) is True
+        assert await queue.enqueue("task_1", "scoring", {"task_id": "task_1"}) is False
+
+        worker = StageWorker(queue, handler, concurrency=2)
+        await worker.drain()
+
+        assert handled == ["scoring"]
+        assert await queue.get_latest_snapshot("task_1") == {"task_id": "task_1"}
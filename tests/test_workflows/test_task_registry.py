@@ -0,0 +1,131 @@
+"""
+工作流任务注册表测试
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.core.database import Base
+from src.models.workflow_job import WorkflowTaskArchive
+from src.workflows.lead_management import LeadWorkflowTask, WorkflowStage, LeadPriority
+from src.workflows.task_registry import TaskRegistry
+
+
+def _task(index: int, **overrides) -> LeadWorkflowTask:
+    created_at = datetime(2024, 1, 1) + timedelta(minutes=index)
+    values = dict(
+        task_id=f"task_{index}",
+        lead_id=f"lead_{index}",
+        stage=WorkflowStage.SCORING,
+        priority=LeadPriority.MEDIUM,
+        assigned_to=None,
+        title=f"任务{index}",
+        description="测试",
+        due_date=created_at + timedelta(hours=24),
+        created_at=created_at,
+        updated_at=created_at
+    )
+    values.update(overrides)
+    return LeadWorkflowTask(**values)
+
+
+def _registry(**kwargs) -> TaskRegistry:
+    return TaskRegistry("lead_management", assignee_field="assigned_to", **kwargs)
+
+
+class TestTaskRegistry:
+    """任务注册表测试"""
+
+    def test_indexes_follow_field_changes(self):
+        """测试直接修改任务字段后索引和计数保持一致"""
+        registry = _registry()
+        for i in range(4):
+            registry[f"task_{i}"] = _task(i, progress=0.2)
+
+        task = registry["task_0"]
+        task.stage = WorkflowStage.ASSIGNMENT
+        task.assigned_to = "rep_001"
+        task.progress = 1.0
+        task.status = "completed"
+
+        assert registry.counts("stage") == {"scoring": 3, "assignment": 1}
+        assert registry.count(assigned_to="rep_001") == 1
+        assert registry.count(assigned_to="rep_001", status="completed") == 1
+        assert registry.count(stage=WorkflowStage.SCORING, assigned_to="rep_001") == 0
+        assert registry.average_progress == pytest.approx((1.0 + 0.2 * 3) / 4)
+
+        del registry["task_0"]
+        task.stage = WorkflowStage.FOLLOW_UP
+
+        assert "assignment" not in registry.counts("stage")
+        assert registry.count(assigned_to="rep_001") == 0
+        assert registry.average_progress == pytest.approx(0.2)
+
+    def test_replace_task_with_same_id(self):
+        """测试同一任务ID重复写入时替换旧任务的索引"""
+        registry = _registry()
+        registry["task_1"] = _task(1, priority=LeadPriority.LOW)
+        registry["task_1"] = _task(1, priority=LeadPriority.HIGH)
+
+        assert len(registry) == 1
+        assert registry.counts("priority") == {"high": 1}
+
+    def test_cursor_pagination(self):
+        """测试按创建时间倒序的游标分页和过滤"""
+        registry = _registry()
+        for i in range(25):
+            registry[f"task_{i}"] = _task(i, priority=LeadPriority.HIGH if i % 2 else LeadPriority.LOW)
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = registry.list_page(limit=10, cursor=cursor)
+            seen.extend(task.task_id for task in page)
+            if cursor is None:
+                break
+
+        assert seen == [f"task_{i}" for i in reversed(range(25))]
+
+        page, cursor = registry.list_page(limit=5, priority=LeadPriority.HIGH)
+        assert [task.task_id for task in page] == ["task_23", "task_21", "task_19", "task_17", "task_15"]
+        page, _ = registry.list_page(limit=5, cursor=cursor, priority=LeadPriority.HIGH)
+        assert page[0].task_id == "task_13"
+
+        with pytest.raises(ValueError):
+            registry.list_page(cursor="invalid")
+
+    @pytest.mark.asyncio
+    async def test_archive_expired_completed_tasks(self):
+        """测试已完成任务超过保留时间后归档到数据库"""
+        pytest.importorskip("aiosqlite")
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[WorkflowTaskArchive.__table__])
+            )
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        try:
+            registry = _registry(session_factory=factory, retention_hours=1)
+            for i in range(3):
+                registry[f"task_{i}"] = _task(i)
+
+            now = datetime(2024, 1, 2)
+            registry["task_0"].status = "completed"
+            registry["task_0"].updated_at = now - timedelta(hours=2)
+            registry["task_1"].status = "completed"
+            registry["task_1"].updated_at = now
+
+            assert await registry.archive_expired(now) == 1
+            assert "task_0" not in registry
+            assert registry.count(status="completed") == 1
+            assert registry.archived_count == 1
+
+            snapshot = await registry.get_archived("task_0")
+            assert snapshot["task_id"] == "task_0"
+            assert snapshot["status"] == "completed"
+            assert await registry.get_archived("task_1") is None
+        finally:
+            await engine.dispose()